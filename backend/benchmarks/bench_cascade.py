@@ -0,0 +1,160 @@
+"""
+Compute saved and accuracy lost by the classifier -> zero-shot cascade (CASCADE_ENABLED).
+
+The same images are tagged twice by ImageAnalysisService.analyze_images, with zero-shot
+scoring enabled: once with both models on every image (the reference), once with the cascade,
+where the zero-shot scorer only runs on the images the classifier is not confident about.
+Reports, per run, the wall time and images/s, and for the cascade:
+  - the share of images that exited early (zero-shot scorer skipped) and the zero-shot
+    inference time saved,
+  - agreement with the reference: share of images with the same top tag, mean overlap of the
+    tag sets, and share of images with exactly the same tags,
+  - top-1/top-5 accuracy of both runs, when a labelled set is given (see bench_precision).
+
+The result cache and near-duplicate index are disabled and inference runs inline, so both runs
+do the same work in the same order (the mock classifier is re-seeded before each run).
+
+The mock classifier scores every label independently, like a multi-label model. With
+--softmax-temperature T its scores are turned into a softmax over the labels (logits = scores / T;
+the lower T, the more peaked), like the ONNX, Torch and CLIP classifiers, whose scores sum to 1.
+
+Usage:
+    python -m backend.benchmarks.bench_cascade
+    python -m backend.benchmarks.bench_cascade --softmax-temperature 0.1
+    MODEL_BACKEND=onnx ONNX_MODEL_PATH=vit.onnx ONNX_LABELS_PATH=labels.txt ZERO_SHOT_BACKEND=clip \\
+        python -m backend.benchmarks.bench_cascade --labelled /data/imagenet-val-1k
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "False")
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+os.environ.setdefault("EXECUTOR_BACKEND", "inline")
+os.environ.setdefault("ZERO_SHOT_ENABLED", "True")
+
+from backend.benchmarks.bench_precision import _matches, load_labelled_set
+from backend.benchmarks.common import print_report
+from backend.benchmarks.corpus import generate_corpus
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.services.image_analysis import ImageAnalysisService
+from backend.src.services.model_backends import MockBackend, softmax
+
+
+def use_softmax_scores(temperature: float) -> None:
+    """
+    Makes the mock classifier return a softmax over its labels instead of independent scores.
+    """
+    predict = MockBackend._predict
+    MockBackend._predict = lambda self, batch: softmax(predict(self, batch) / temperature)
+
+
+async def tag_images(images: List[Tuple[bytes, str]], cascade: bool, batch_size: int) -> Dict:
+    """
+    Tags the images with a fresh service, with the cascade on or off.
+    """
+    get_settings().CASCADE_ENABLED = cascade
+    random.seed(0)
+    registry = get_metrics_registry()
+    inference = registry.histogram("analysis_inference_seconds")
+    early_exits = registry.counter("cascade_early_exits_total")
+    before = (inference.sum, early_exits.value)
+    service = ImageAnalysisService()
+    service.model_backend.warmup()
+    if service.zero_shot_backend is not None:
+        service.zero_shot_backend.warmup()
+    try:
+        tags: List[List[str]] = []
+        start = time.perf_counter()
+        for i in range(0, len(images), batch_size):
+            items = await service.analyze_images(images[i:i + batch_size])
+            tags.extend([tag.name for tag in item.result.tags] if item.result else [] for item in items)
+        seconds = time.perf_counter() - start
+    finally:
+        await service.aclose()
+    return {
+        "seconds": seconds,
+        "images_per_second": len(images) / seconds if seconds else 0.0,
+        "inference_seconds": inference.sum - before[0],
+        "early_exits": int(early_exits.value - before[1]),
+        "tags": tags,
+    }
+
+
+def agreement(reference: Sequence[List[str]], tags: Sequence[List[str]]) -> Dict[str, float]:
+    same_top = [bool(a) and bool(b) and a[0] == b[0] for a, b in zip(reference, tags)]
+    overlap = [len(set(a) & set(b)) / max(1, len(set(a) | set(b))) for a, b in zip(reference, tags)]
+    identical = [a == b for a, b in zip(reference, tags)]
+    return {"top1_agreement": sum(same_top) / len(same_top),
+            "tag_overlap": sum(overlap) / len(overlap),
+            "identical_tags": sum(identical) / len(identical)}
+
+
+def accuracy(tags: Sequence[List[str]], expected: Sequence[List[str]], k: int = 5) -> Dict[str, float]:
+    return {
+        "top1_accuracy": sum(bool(row) and _matches(row[0], truth) for row, truth in zip(tags, expected)) / len(tags),
+        f"top{k}_accuracy": sum(any(_matches(name, truth) for name in row[:k])
+                                for row, truth in zip(tags, expected)) / len(tags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labelled", help="Labelled set: label-per-directory tree or JSON-lines manifest.")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many labelled images.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--softmax-temperature", type=float, default=0.0,
+                        help="Turn the mock classifier scores into a softmax at this temperature.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args()
+
+    if args.softmax_temperature > 0:
+        use_softmax_scores(args.softmax_temperature)
+
+    expected: Optional[List[List[str]]] = None
+    if args.labelled:
+        labelled = load_labelled_set(args.labelled)[:args.limit or None]
+        images = []
+        for path, _ in labelled:
+            with open(path, "rb") as f:
+                images.append((f.read(), os.path.basename(path)))
+        expected = [labels for _, labels in labelled]
+    else:
+        images = [(image.data, image.name) for image in generate_corpus()]
+
+    full = asyncio.run(tag_images(images, cascade=False, batch_size=args.batch_size))
+    cascade = asyncio.run(tag_images(images, cascade=True, batch_size=args.batch_size))
+    reference, tags = full.pop("tags"), cascade.pop("tags")
+    del full["early_exits"]
+    cascade["early_exit_rate"] = cascade["early_exits"] / max(1, len(images))
+    cascade["inference_seconds_saved"] = full["inference_seconds"] - cascade["inference_seconds"]
+    cascade.update(agreement(reference, tags))
+    if expected is not None:
+        full.update(accuracy(reference, expected))
+        cascade.update(accuracy(tags, expected))
+
+    settings = get_settings()
+    report = {
+        "images": len(images),
+        "model_backend": settings.MODEL_BACKEND,
+        "zero_shot_backend": settings.ZERO_SHOT_BACKEND,
+        "HIGH_CONFIDENCE_THRESHOLD_GENERAL": settings.HIGH_CONFIDENCE_THRESHOLD_GENERAL,
+        "MIN_CONFIDENT_TAGS_GENERAL": settings.MIN_CONFIDENT_TAGS_GENERAL,
+        "MIN_CONFIDENT_MARGIN_GENERAL": settings.MIN_CONFIDENT_MARGIN_GENERAL,
+        "softmax_temperature": args.softmax_temperature or None,
+        "both_models": full,
+        "cascade": cascade,
+    }
+    print_report("cascade", report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold-start timing report of the model backend.
+
+Each scenario runs in a fresh Python process and reports:
+  - import time of the application module,
+  - the backend warmup report (load, first inference, warm inference, memory footprint),
+  - latency of the first and second /api/v1/analyze requests,
+with the startup warmup hook enabled and disabled, so the cost moved out of the first
+request is visible.
+
+Usage:
+    python -m backend.benchmarks.bench_cold_start --backend mock
+    MODEL_BACKEND=onnx ONNX_MODEL_PATH=vit.onnx ONNX_LABELS_PATH=labels.txt \\
+        python -m backend.benchmarks.bench_cold_start --backend onnx
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from backend.benchmarks.common import print_report
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+_SCENARIO = r"""
+import json, time
+start = time.perf_counter()
+from backend.src.main import app
+import_seconds = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+from backend.src.core.dependencies import get_model_backend
+
+with open({image_path!r}, "rb") as f:
+    image_data = f.read()
+
+start = time.perf_counter()
+with TestClient(app) as client:  # Runs the lifespan (and the warmup hook, when enabled)
+    startup_seconds = time.perf_counter() - start
+    latencies = []
+    for i in range(2):
+        files = {{"file": (f"{{i}}.jpg", image_data + bytes([i]), "image/jpeg")}}
+        t0 = time.perf_counter()
+        client.post("/api/v1/analyze", files=files).raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+
+print(json.dumps({{
+    "import_seconds": import_seconds,
+    "startup_seconds": startup_seconds,
+    "first_request_seconds": latencies[0],
+    "second_request_seconds": latencies[1],
+    "model_memory_footprint_bytes": get_model_backend().memory_footprint_bytes(),
+}}))
+"""
+
+
+def run_scenario(backend: str, warmup: bool) -> dict:
+    env = dict(os.environ, MODEL_BACKEND=backend, MODEL_WARMUP_ON_STARTUP=str(warmup), RESULT_CACHE_ENABLED="False")
+    output = subprocess.run(
+        [sys.executable, "-c", _SCENARIO.format(image_path=TEST_IMAGE_PATH)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="mock", help="Registered model backend to measure.")
+    args = parser.parse_args()
+
+    print_report("cold_start", {
+        "backend": args.backend,
+        "with_startup_warmup": run_scenario(args.backend, warmup=True),
+        "without_startup_warmup": run_scenario(args.backend, warmup=False),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Cold-start import cost of the application module (what a serverless cold start pays before
+the first request), from `python -X importtime` in fresh processes.
+
+Reports, over the runs:
+  - the import time of the application module, and the share of it spent importing FastAPI
+    (the framework floor: the rest is the application's own),
+  - the slowest modules by cumulative and by self time (of the fastest run),
+  - the heavy modules (NumPy, PIL, model runtimes) that were imported, which should be none:
+    they are imported on first use, at startup (lifespan) or in the workers.
+
+With --budget-ratio, exits with status 1 when the application import takes more than that
+many times the FastAPI import (a ratio, so it holds across machines), or when a heavy module
+is imported.
+
+Usage:
+    python -m backend.benchmarks.bench_import_time
+    python -m backend.benchmarks.bench_import_time --runs 5 --budget-ratio 1.8
+"""
+from typing import Dict, List, NamedTuple
+import argparse
+import os
+import subprocess
+import sys
+
+from backend.benchmarks.common import print_report
+
+APP_MODULE = "backend.src.main"
+FRAMEWORK_MODULE = "fastapi"
+# Modules that must stay out of the application import
+HEAVY_MODULES = ("numpy", "PIL", "onnxruntime", "onnx", "torch", "transformers")
+# Application import time / FastAPI import time; about 1.5 without the heavy modules, 2+ with NumPy and PIL
+IMPORT_BUDGET_RATIO = 1.8
+
+
+class ImportRecord(NamedTuple):
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """
+    Parses the `import time: self [us] | cumulative | imported package` lines of -X importtime.
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append(ImportRecord(name.strip(), (len(name) - len(name.lstrip())) // 2,
+                                    int(self_us), int(cumulative_us)))
+    return records
+
+
+def measure_import(module: str = APP_MODULE) -> List[ImportRecord]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime and returns its records.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def summarize(records: List[ImportRecord], module: str = APP_MODULE) -> Dict:
+    by_name = {record.name: record for record in records}
+    total = by_name[module].cumulative_us
+    framework = by_name[FRAMEWORK_MODULE].cumulative_us if FRAMEWORK_MODULE in by_name else 0
+    return {
+        "import_seconds": total / 1e6,
+        "framework_seconds": framework / 1e6,
+        "ratio_to_framework": total / framework if framework else None,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in by_name],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=APP_MODULE, help="Module to import (default: the FastAPI app).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list.")
+    parser.add_argument("--budget-ratio", type=float, default=0.0,
+                        help=f"Fail above this import time / FastAPI import time (e.g. {IMPORT_BUDGET_RATIO}).")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    summaries = [summarize(records, args.module) for records in runs]
+    fastest = min(range(len(runs)), key=lambda i: summaries[i]["import_seconds"])
+    records = runs[fastest]
+    own = [record for record in records if not record.name.startswith(FRAMEWORK_MODULE)]
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_seconds": sorted(summary["import_seconds"] for summary in summaries),
+        "ratio_to_framework": min(summary["ratio_to_framework"] or 0.0 for summary in summaries),
+        "heavy_modules": summaries[fastest]["heavy_modules"],
+        "slowest_cumulative_ms": {record.name: record.cumulative_us / 1000 for record in
+                                  sorted(own, key=lambda r: -r.cumulative_us)[1:args.top + 1]},
+        "slowest_self_ms": {record.name: record.self_us / 1000 for record in
+                            sorted(records, key=lambda r: -r.self_us)[:args.top]},
+    }
+    print_report("import_time", report)
+    if args.budget_ratio:
+        if report["heavy_modules"]:
+            print(f"Heavy modules imported: {report['heavy_modules']}", file=sys.stderr)
+            sys.exit(1)
+        if report["ratio_to_framework"] > args.budget_ratio:
+            print(f"Import time is {report['ratio_to_framework']:.2f}x the FastAPI import "
+                  f"(budget: {args.budget_ratio}x)", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
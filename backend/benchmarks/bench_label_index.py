@@ -0,0 +1,80 @@
+"""
+Zero-shot scoring cost against precomputed label embeddings.
+
+For each label-set size, reports:
+  - the one-off cost of encoding and persisting the label set,
+  - the cost of re-opening the persisted (memory-mapped) index,
+  - per-batch latency of matmul + argpartition top-k, compared with a full argsort,
+  - what re-encoding the label prompts on every request would cost instead.
+Text embeddings come from the deterministic mock backend (512 dimensions).
+
+Usage:
+    python -m backend.benchmarks.bench_label_index --labels 1000 10000 50000 --batch 16
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.src.core.config import Settings
+from backend.src.services.label_index import build_label_index
+from backend.src.services.model_backends import MockBackend, l2_normalize
+
+
+def measure(num_labels: int, batch_size: int, repeats: int, directory: str) -> dict:
+    backend = MockBackend(Settings())
+    labels = [f"label {i}" for i in range(num_labels)]
+
+    start = time.perf_counter()
+    build_label_index(labels, backend.encode_text, directory, model_id="mock", prompt_template="a photo of {}.")
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = build_label_index(labels, backend.encode_text, directory, model_id="mock", prompt_template="a photo of {}.")
+    load_seconds = time.perf_counter() - start
+
+    images = l2_normalize(np.random.default_rng(0).standard_normal((batch_size, backend.embedding_dim)))
+    index.top_k(images, 5)  # Page the memory-mapped embeddings in
+
+    top_k_samples, argsort_samples = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        index.top_k(images, 5)
+        top_k_samples.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        np.argsort(-(images @ index.embeddings.T), axis=1)[:, :5]
+        argsort_samples.append(time.perf_counter() - t0)
+
+    sample = labels[:min(num_labels, 1000)]
+    t0 = time.perf_counter()
+    backend.encode_text([f"a photo of {label}." for label in sample])
+    encode_per_request_seconds = (time.perf_counter() - t0) * num_labels / len(sample)
+
+    return {
+        "labels": num_labels,
+        "batch_size": batch_size,
+        "build_seconds": build_seconds,
+        "load_seconds": load_seconds,
+        "top_k_seconds": percentiles(top_k_samples),
+        "full_argsort_seconds": percentiles(argsort_samples),
+        "encode_per_request_seconds": encode_per_request_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, nargs="+", default=[1000, 10000, 50000], help="Label-set sizes.")
+    parser.add_argument("--batch", type=int, default=16, help="Images scored per call.")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [measure(size, args.batch, args.repeats, directory) for size in args.labels]
+    print_report("label_index", {"results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Per-request cost of logging on the request thread (the event loop, for /api/v1/analyze).
+
+Each scenario replays the log calls of one successful single-image request and times them
+on the calling thread. Output goes to a real file, so synchronous handlers pay for the write:
+  - eager_sync:    the previous code: f-string messages (including the tag list comprehension)
+                   at INFO, written synchronously by a StreamHandler (`logging.basicConfig`),
+  - lazy_sync:     %-style messages with `extra=` fields, still written synchronously,
+  - lazy_queued:   the current setup: JSON records handed to the background listener (`configure_logging`),
+  - lazy_sampled:  as lazy_queued, keeping 1% of the INFO records of the service and endpoint loggers.
+An end-to-end /api/v1/analyze load is then run with the synchronous and the queued handler.
+
+Usage:
+    python -m backend.benchmarks.bench_logging --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "False")
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+
+from backend.benchmarks.common import asgi_load, percentiles, print_report
+from backend.src.core.logging_config import configure_logging, shutdown_logging
+from backend.src.models.image import Tag
+
+SERVICE_LOGGER = "backend.src.services.image_analysis"
+ENDPOINT_LOGGER = "backend.src.api.v1.endpoints.analyze"
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+_TAGS = [("dog", 0.9123, "MockModel"), ("animal", 0.7311, "MockModel"), ("pet", 0.5512, "MockModel"),
+         ("grass", 0.2201, "MockModel"), ("outdoor", 0.1043, "MockModel")]
+
+
+def eager_request(i: int) -> None:
+    service, endpoint = logging.getLogger(SERVICE_LOGGER), logging.getLogger(ENDPOINT_LOGGER)
+    filename, image_id = f"image_{i}.jpg", f"{i:032x}"
+    final_tags = [Tag(name=name, confidence=confidence, source_model=source) for name, confidence, source in _TAGS]
+    endpoint.info(f"Requisição POST /api/v1/analyze recebida para o arquivo: {filename}")
+    endpoint.info(f"Dados da imagem de {filename} lidos ({123456} bytes).")
+    service.info(f"Starting analysis for image: '{filename}'")
+    service.info(f"Decoded '{filename}' ({123456} bytes, {1280}x{720}) in {12.3456:.1f} ms; RSS {123.456:.1f} MiB.")
+    service.info(f"Analysis of '{filename}' completed. Final tags: {[f'{t.name} ({t.confidence:.2f} from {t.source_model})' for t in final_tags]}")
+    endpoint.info(f"Análise de {filename} concluída com sucesso.")
+    del image_id
+
+
+def lazy_request(i: int) -> None:
+    service, endpoint = logging.getLogger(SERVICE_LOGGER), logging.getLogger(ENDPOINT_LOGGER)
+    filename, image_id = f"image_{i}.jpg", f"{i:032x}"
+    endpoint.debug("Requisição POST /api/v1/analyze recebida para o arquivo: %s", filename)
+    endpoint.debug("Dados da imagem de %s lidos (%d bytes).", filename, 123456)
+    service.debug("Starting analysis for image: '%s'", filename, extra={"image_filename": filename})
+    service.debug("Decoded '%s' (%d bytes, %dx%d) in %.1f ms; RSS %.1f MiB.", filename, 123456, 1280, 720, 12.3456, 123.456)
+    service.info("Analysis of '%s' completed.", filename,
+                 extra={"image_filename": filename, "image_id": image_id, "tags": _TAGS})
+    endpoint.info("Análise de %s concluída com sucesso.", filename,
+                  extra={"image_filename": filename, "image_id": image_id, "upload_bytes": 123456})
+
+
+def _sync_logging(path: str) -> logging.Handler:
+    shutdown_logging()
+    handler = logging.StreamHandler(open(path, "a", encoding="utf-8"))
+    handler.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(handler)
+    return handler
+
+
+def _remove_sync_logging(handler: logging.Handler) -> None:
+    logging.getLogger().removeHandler(handler)
+    handler.close()
+
+
+def time_requests(request, num_requests: int) -> dict:
+    samples = []
+    for i in range(num_requests):
+        t0 = time.perf_counter()
+        request(i)
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="Simulated requests per scenario.")
+    parser.add_argument("--e2e-requests", type=int, default=300, help="End-to-end requests per handler (0 to skip).")
+    parser.add_argument("--concurrency", type=int, default=16, help="End-to-end requests in flight at once.")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.log")
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        for name, request in (("eager_sync", eager_request), ("lazy_sync", lazy_request)):
+            handler = _sync_logging(path)
+            report[f"{name}_seconds_per_request"] = time_requests(request, args.requests)
+            _remove_sync_logging(handler)
+
+        for name, sample_rates in (("lazy_queued", {}), ("lazy_sampled", {SERVICE_LOGGER: 0.01, ENDPOINT_LOGGER: 0.01})):
+            with open(path, "a", encoding="utf-8") as stream:
+                configure_logging(level="INFO", log_format="json", sample_rates=sample_rates, stream=stream)
+                report[f"{name}_seconds_per_request"] = time_requests(lazy_request, args.requests)
+                shutdown_logging()
+
+        if args.e2e_requests:
+            from backend.src.main import app  # Imported here: it configures logging on import
+            with open(TEST_IMAGE_PATH, "rb") as f:
+                uploads = [("dog.jpg", f.read(), "image/jpeg")]
+
+            handler = _sync_logging(path)
+            report["end_to_end_sync"] = asyncio.run(asgi_load(app, uploads, args.e2e_requests, args.concurrency))
+            _remove_sync_logging(handler)
+
+            with open(path, "a", encoding="utf-8") as stream:
+                configure_logging(level="INFO", log_format="json", stream=stream)
+                report["end_to_end_queued"] = asyncio.run(asgi_load(app, uploads, args.e2e_requests, args.concurrency))
+                shutdown_logging()
+
+    report["speedup_p50"] = (report["eager_sync_seconds_per_request"]["p50"]
+                             / report["lazy_queued_seconds_per_request"]["p50"])
+    print_report("logging", report)
+
+
+if __name__ == "__main__":
+    main()
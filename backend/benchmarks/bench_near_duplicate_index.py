@@ -0,0 +1,87 @@
+"""
+Lookup latency of the perceptual-hash near-duplicate index.
+
+Fills a NearDuplicateIndex with N random 64-bit hashes (1M by default), then queries
+perturbed copies of stored hashes (hits) and fresh random hashes (misses) at the given
+Hamming radius. A NumPy linear scan over the same hashes is timed as a reference.
+
+Usage:
+    python -m backend.benchmarks.bench_near_duplicate_index --size 1000000 --radius 4
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.src.services.perceptual_hash import NearDuplicateIndex
+
+
+def _perturb(rng: random.Random, value: int, bits: int) -> int:
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def _linear_scan(stored: np.ndarray, query: int, radius: int) -> bool:
+    xor = np.bitwise_xor(stored, np.uint64(query))
+    distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+    return bool((distances <= radius).any())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000, help="Number of stored hashes.")
+    parser.add_argument("--queries", type=int, default=2000, help="Number of lookups per kind (hit/miss).")
+    parser.add_argument("--radius", type=int, default=4, help="Hamming radius of the lookups.")
+    parser.add_argument("--linear-queries", type=int, default=20, help="Lookups timed for the linear-scan reference.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stored = [rng.getrandbits(64) for _ in range(args.size)]
+
+    index = NearDuplicateIndex(max_entries=args.size)
+    start = time.perf_counter()
+    for i, value in enumerate(stored):
+        index.add(value, i)
+    build_seconds = time.perf_counter() - start
+
+    hit_queries = [_perturb(rng, rng.choice(stored), rng.randint(0, args.radius)) for _ in range(args.queries)]
+    miss_queries = [rng.getrandbits(64) for _ in range(args.queries)]
+
+    def time_lookups(queries):
+        latencies, found = [], 0
+        for query in queries:
+            t0 = time.perf_counter()
+            found += index.search(query, args.radius) is not None
+            latencies.append(time.perf_counter() - t0)
+        return latencies, found
+
+    hit_latencies, hits_found = time_lookups(hit_queries)
+    miss_latencies, misses_found = time_lookups(miss_queries)
+
+    stored_array = np.array(stored, dtype=np.uint64)
+    linear_latencies = []
+    for query in hit_queries[:args.linear_queries]:
+        t0 = time.perf_counter()
+        _linear_scan(stored_array, query, args.radius)
+        linear_latencies.append(time.perf_counter() - t0)
+
+    to_ms = lambda stats: {key: round(value * 1000, 4) for key, value in stats.items()}
+    print_report("near_duplicate_index", {
+        "size": args.size,
+        "radius": args.radius,
+        "build_seconds": round(build_seconds, 2),
+        "inserts_per_second": round(args.size / build_seconds),
+        "hit_lookup_ms": to_ms(percentiles(hit_latencies)),
+        "hit_recall": hits_found / len(hit_queries),
+        "miss_lookup_ms": to_ms(percentiles(miss_latencies)),
+        "false_hits_on_random_queries": misses_found,
+        "linear_scan_ms": to_ms(percentiles(linear_latencies)),
+    })
+
+
+if __name__ == "__main__":
+    main()
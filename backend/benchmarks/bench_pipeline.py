@@ -0,0 +1,134 @@
+"""
+Benchmark suite of the /analyze pipeline, on a synthetic corpus of many sizes and formats.
+
+Stages are timed separately:
+  - decode:        decode_image (decode with draft/reduce, resize to the model input, dHash), per corpus image,
+  - preprocess:    stacking a batch and normalizing it into a pooled float32 NCHW tensor,
+  - inference:     one predict_batch call of the configured model backend,
+  - aggregation:   TagAggregator over the batch scores,
+  - serialization: building and JSON-encoding the responses of the batch,
+followed by an end-to-end /api/v1/analyze load at fixed concurrency through an in-process
+ASGI client. The result cache, near-duplicate index and admission control are disabled, so
+every request does the full work.
+
+The JSON report can be saved as a baseline and later runs compared against it; the process
+exits with status 1 when a latency percentile or a throughput regressed beyond the tolerance,
+or when there are more errors.
+
+Usage:
+    python -m backend.benchmarks.bench_pipeline --output report.json
+    python -m backend.benchmarks.bench_pipeline --quick --baseline backend/benchmarks/baselines/mock.json --tolerance 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "False")
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+os.environ.setdefault("ADMISSION_ENABLED", "False")
+
+import numpy as np
+
+from backend.benchmarks.common import asgi_load, compare_to_baseline, percentiles, print_report
+from backend.benchmarks.corpus import generate_corpus
+from backend.src.core.config import get_settings
+from backend.src.core.dependencies import get_model_backend
+from backend.src.main import app
+from backend.src.models.image import ImageAnalysisResponse, Tag
+from backend.src.services.image_analysis import decode_image
+from backend.src.services.preprocessing import preprocessed_batch
+from backend.src.services.tag_aggregation import TagAggregator, TagSource
+
+
+def _timed(fn, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def measure_stages(corpus, repeats: int) -> dict:
+    settings = get_settings()
+    backend = get_model_backend()
+    backend.warmup()
+
+    decode = {image.name: _timed(lambda: decode_image(image.data, settings.MODEL_INPUT_SIZE), repeats)
+              for image in corpus}
+    decoded = [decode_image(image.data, settings.MODEL_INPUT_SIZE).pixels for image in corpus]
+    batch = np.stack([decoded[i % len(decoded)] for i in range(settings.INFERENCE_BATCH_SIZE)])
+
+    scores = backend.predict_batch(batch)
+    aggregator = TagAggregator(top_k=settings.MAX_TAGS_PER_IMAGE)
+    tags = aggregator.aggregate([TagSource(backend.source_model, backend.labels, scores)])
+
+    def preprocess(stacked: np.ndarray) -> None:
+        with preprocessed_batch(stacked, backend.input_spec):
+            pass
+
+    def serialize() -> None:
+        for i, row in enumerate(tags):
+            ImageAnalysisResponse(
+                image_id=f"{i:032x}", filename=f"{i}.jpg", message=backend.analysis_message,
+                tags=[Tag(name=name, confidence=confidence, source_model=source) for name, confidence, source in row],
+            ).model_dump_json()
+
+    return {
+        "decode_seconds": decode,
+        "preprocess_seconds": _timed(lambda: preprocess(np.stack(list(batch))), repeats),
+        "inference_seconds": _timed(lambda: backend.predict_batch(batch), repeats),
+        "aggregation_seconds": _timed(
+            lambda: aggregator.aggregate([TagSource(backend.source_model, backend.labels, scores)]), repeats),
+        "serialization_seconds": _timed(serialize, repeats),
+        "batch_size": len(batch),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions and requests (for CI).")
+    parser.add_argument("--requests", type=int, default=None, help="End-to-end requests (default 400, quick 100).")
+    parser.add_argument("--concurrency", type=int, default=16, help="End-to-end requests in flight at once.")
+    parser.add_argument("--output", help="Write the JSON report to this file (e.g. to store a new baseline).")
+    parser.add_argument("--baseline", help="Compare against this stored report; exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    repeats = 5 if args.quick else 20
+    num_requests = args.requests or (100 if args.quick else 400)
+    settings = get_settings()
+    corpus = generate_corpus()
+    # Uploads above MAX_UPLOAD_BYTES would only measure the 413 path
+    uploads = [(image.name, image.data, image.content_type)
+               for image in corpus if len(image.data) <= settings.MAX_UPLOAD_BYTES]
+
+    report = {
+        "backend": settings.MODEL_BACKEND,
+        "executor": settings.EXECUTOR_BACKEND,
+        "corpus": {image.name: len(image.data) for image in corpus},
+        "stages": measure_stages(corpus, repeats),
+        "end_to_end": asyncio.run(asgi_load(app, uploads, num_requests, args.concurrency)),
+    }
+    print_report("pipeline", report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against the baseline.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
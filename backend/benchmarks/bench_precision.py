@@ -0,0 +1,199 @@
+"""
+fp32 vs reduced-precision (int8) and smaller-model variants of a model backend, on the CPU.
+
+Every variant is first loaded once in a throwaway process, which creates cached artifacts
+(e.g. the int8 copy of an ONNX model) and reports the time of that first load. It then runs
+in a fresh process (so its memory is measured alone) and reports:
+  - load time from the cached artifacts,
+  - weight bytes, RSS increase after loading and RSS after the measurements,
+  - latency percentiles of a batch and the resulting images/s,
+  - agreement with the first variant (the reference, normally base/fp32): share of images with
+    the same top-1 label and mean overlap of the top-5 labels,
+  - top-1/top-5 accuracy, when a labelled set is given.
+
+A labelled set is a directory with one subdirectory per label (`cat/1.jpg`), or a JSON-lines
+manifest of {"path": ..., "labels": [...]}. A label matches a prediction equal to it or to any
+of its comma-separated synonyms (ImageNet style: "tabby, tabby cat"). Without one, the
+synthetic benchmark corpus is used and only agreement is reported.
+
+With ONNX_MODEL_PATH unset, the ONNX backend runs a synthetic ViT-shaped model
+with random weights (see synthetic_model): fine for speed and memory, but its agreement
+numbers say nothing about a real model.
+
+Usage:
+    python -m backend.benchmarks.bench_precision --variants base/fp32,base/int8
+    ONNX_MODEL_PATH=vit.onnx ONNX_LABELS_PATH=labels.txt ONNX_SMALL_MODEL_PATH=deit-small.onnx \\
+        python -m backend.benchmarks.bench_precision --labelled /data/imagenet-val-1k \\
+        --variants base/fp32,base/int8,small/fp32,small/int8
+    python -m backend.benchmarks.bench_precision --backend torch --variants base/fp32,base/int8,small/fp32
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.benchmarks.corpus import generate_corpus
+from backend.src.core.config import Settings
+from backend.src.services.image_analysis import decode_image
+from backend.src.services.model_backends import create_backend
+
+
+def load_labelled_set(source: str) -> List[Tuple[str, List[str]]]:
+    """
+    Returns (image path, accepted labels) pairs from a label-per-directory tree or a JSON-lines manifest.
+    """
+    if os.path.isdir(source):
+        return [(os.path.join(source, label, name), [label])
+                for label in sorted(os.listdir(source)) if os.path.isdir(os.path.join(source, label))
+                for name in sorted(os.listdir(os.path.join(source, label)))]
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(record["path"] if os.path.isabs(record["path"]) else os.path.join(base, record["path"]), record["labels"])
+            for record in records]
+
+
+def _matches(predicted: str, expected: Sequence[str]) -> bool:
+    synonyms = {name.strip().lower() for name in predicted.split(",")}
+    return any(label.strip().lower() in synonyms for label in expected)
+
+
+def prepare_variant(backend_name: str, updates: Dict) -> float:
+    """
+    Loads one variant (creating its cached artifacts) and returns the load time. Runs in a fresh process.
+    """
+    start = time.perf_counter()
+    create_backend(backend_name, Settings(**updates)).ensure_loaded()
+    return time.perf_counter() - start
+
+
+def measure_variant(backend_name: str, updates: Dict, images: np.ndarray, batch_size: int, repeats: int) -> Dict:
+    """
+    Loads one variant and measures it. Runs in a fresh process.
+    """
+    from backend.src.utils.resource_usage import current_rss_bytes
+
+    backend = create_backend(backend_name, Settings(**updates))
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    backend.ensure_loaded()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = current_rss_bytes()
+
+    scores = np.concatenate([backend.predict_batch(images[i:i + batch_size]) for i in range(0, len(images), batch_size)])
+    batch = images[np.arange(batch_size) % len(images)]
+    backend.predict_batch(batch)
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        backend.predict_batch(batch)
+        samples.append(time.perf_counter() - t0)
+    latency = percentiles(samples)
+    return {
+        "load_seconds": load_seconds,
+        "model_bytes": backend.memory_footprint_bytes(),
+        "rss_increase_bytes": rss_loaded - rss_before,
+        "rss_after_inference_bytes": current_rss_bytes(),
+        "batch_latency_seconds": latency,
+        "images_per_second": batch_size / latency["p50"] if latency["p50"] else 0.0,
+        "labels": backend.labels,
+        "scores": scores,
+    }
+
+
+def agreement(reference: np.ndarray, scores: np.ndarray, k: int = 5) -> Dict[str, float]:
+    top_reference = np.argsort(-reference, axis=1)[:, :k]
+    top_scores = np.argsort(-scores, axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top_reference, top_scores)]
+    return {"top1_agreement": float(np.mean(top_reference[:, 0] == top_scores[:, 0])),
+            f"top{k}_overlap": float(np.mean(overlap))}
+
+
+def accuracy(scores: np.ndarray, labels: List[str], expected: List[List[str]], k: int = 5) -> Dict[str, float]:
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return {
+        "top1_accuracy": float(np.mean([_matches(labels[row[0]], truth) for row, truth in zip(top, expected)])),
+        f"top{k}_accuracy": float(np.mean([any(_matches(labels[i], truth) for i in row) for row, truth in zip(top, expected)])),
+    }
+
+
+def parse_variants(spec: str) -> List[Tuple[str, str]]:
+    variants = []
+    for item in spec.split(","):
+        size, precision = item.strip().split("/")
+        variants.append((size, precision))
+    return variants
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="onnx", help="Backend to compare (default: onnx).")
+    parser.add_argument("--variants", default="base/fp32,base/int8",
+                        help="Comma-separated size/precision pairs; the first is the reference.")
+    parser.add_argument("--labelled", help="Labelled set: label-per-directory tree or JSON-lines manifest.")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many labelled images.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args()
+
+    settings = Settings()
+    base_updates: Dict = {"MODEL_NUM_THREADS": settings.MODEL_NUM_THREADS}
+    model_note: Optional[str] = None
+    if args.backend == "onnx" and not settings.ONNX_MODEL_PATH:
+        directory = os.path.join(tempfile.gettempdir(), "visual_tagger_bench_models")
+        from backend.benchmarks.synthetic_model import export_synthetic_classifier
+        model_path, labels_path = export_synthetic_classifier(directory)
+        small_path, _ = export_synthetic_classifier(directory, dim=192, depth=4)
+        base_updates.update(ONNX_MODEL_PATH=model_path, ONNX_LABELS_PATH=labels_path, ONNX_SMALL_MODEL_PATH=small_path,
+                            QUANTIZED_MODEL_DIR=directory)
+        model_note = "synthetic random-weight model: agreement and accuracy are not meaningful"
+
+    geometry = create_backend(args.backend, Settings(**base_updates)).input_spec.geometry
+    expected: Optional[List[List[str]]] = None
+    if args.labelled:
+        labelled = load_labelled_set(args.labelled)[:args.limit or None]
+        data = []
+        for path, _ in labelled:
+            with open(path, "rb") as f:
+                data.append(f.read())
+        expected = [labels for _, labels in labelled]
+    else:
+        data = [image.data for image in generate_corpus()]
+    images = np.stack([decode_image(item, [geometry]).pixels for item in data])
+
+    results: Dict[str, Dict] = {}
+    reference: Optional[np.ndarray] = None
+    for size, precision in parse_variants(args.variants):
+        updates = dict(base_updates, MODEL_SIZE={args.backend: size}, MODEL_PRECISION={args.backend: precision})
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            first_load_seconds = pool.submit(prepare_variant, args.backend, updates).result()
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(measure_variant, args.backend, updates, images, args.batch_size, args.repeats).result()
+        result["first_load_seconds"] = first_load_seconds
+        scores, labels = result.pop("scores"), result.pop("labels")
+        if reference is None:
+            reference = scores
+        result.update(agreement(reference, scores))
+        if expected is not None:
+            result.update(accuracy(scores, labels, expected))
+        results[f"{size}/{precision}"] = result
+
+    report = {"backend": args.backend, "images": len(images), "batch_size": args.batch_size, "variants": results}
+    if model_note:
+        report["note"] = model_note
+    print_report("precision", report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Memory and throughput of the multi-process server (backend.src.server) from 1 to N workers,
+with the models preloaded in the master and shared by the workers ("prefork") versus loaded by
+every worker ("independent", what `uvicorn --workers N` does).
+
+For every mode and worker count, a server is started on a free port and /api/v1/analyze is
+loaded over HTTP with the test image (result cache and near-duplicate index disabled, so every
+request runs inference). Reported:
+  - requests/s, and the scaling efficiency against one worker (rps / (N x rps of 1 worker)),
+  - per worker (mean): RSS, the part of it shared with other processes, private memory and PSS,
+  - the total PSS of the master and workers: what the server really costs in RAM.
+
+The ONNX backend runs a ViT-B-sized synthetic model (see synthetic_model) unless
+ONNX_MODEL_PATH and ONNX_LABELS_PATH are set.
+
+Usage:
+    python -m backend.benchmarks.bench_prefork --backends mock,onnx --workers 1,2,4
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.benchmarks.synthetic_model import export_synthetic_classifier
+from backend.src.utils.resource_usage import memory_breakdown
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def backend_env(backend: str, model_dir: str) -> Dict[str, str]:
+    env = {"MODEL_BACKEND": backend}
+    if backend == "onnx" and not os.environ.get("ONNX_MODEL_PATH"):
+        model_path, labels_path = export_synthetic_classifier(model_dir, dim=768, depth=12)
+        env.update(ONNX_MODEL_PATH=model_path, ONNX_LABELS_PATH=labels_path)
+    return env
+
+
+async def http_load(url: str, data: bytes, num_requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    next_request = iter(range(num_requests))
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for _ in next_request:
+                t0 = time.perf_counter()
+                response = await client.post("/api/v1/analyze", files={"file": ("dog.jpg", data, "image/jpeg")})
+                latencies.append(time.perf_counter() - t0)
+                errors += response.status_code >= 300
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"requests_per_second": num_requests / elapsed, "errors": errors, "latency_seconds": percentiles(latencies)}
+
+
+def run_server(env: Dict[str, str], workers: int, preload: bool, args: argparse.Namespace, data: bytes) -> Dict:
+    port = _free_port()
+    command = [sys.executable, "-m", "backend.src.server", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers)] + ([] if preload else ["--no-preload"])
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + args.startup_timeout
+        while True:
+            try:
+                # Ready once every worker finished its startup (the socket accepts before that)
+                if httpx.get(url + "/").status_code == 200 and len(_children(server.pid)) == workers:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline or server.poll() is not None:
+                raise RuntimeError(f"Server with {workers} workers did not start.")
+            time.sleep(0.2)
+        startup_seconds = args.startup_timeout - (deadline - time.monotonic())
+        asyncio.run(http_load(url, data, args.warmup_requests, workers))
+        load = asyncio.run(http_load(url, data, args.requests, args.concurrency * workers))
+
+        worker_memory = [memory_breakdown(pid) for pid in _children(server.pid)]
+        master_memory = memory_breakdown(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+    def mean(field: str) -> float:
+        return sum(memory[field] for memory in worker_memory) / len(worker_memory) / 2 ** 20
+
+    return dict(load, startup_seconds=startup_seconds, worker_rss_mib=mean("rss_bytes"),
+                worker_shared_mib=mean("shared_bytes"), worker_private_mib=mean("private_bytes"),
+                worker_pss_mib=mean("pss_bytes"), master_pss_mib=master_memory.get("pss_bytes", 0) / 2 ** 20,
+                total_pss_mib=(sum(memory["pss_bytes"] for memory in worker_memory)
+                               + master_memory.get("pss_bytes", 0)) / 2 ** 20)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="mock,onnx", help="Comma-separated MODEL_BACKENDs.")
+    parser.add_argument("--workers", default="", help="Comma-separated worker counts (default: 1, 2, 4 .. CPU cores).")
+    parser.add_argument("--modes", default="prefork,independent")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per run.")
+    parser.add_argument("--warmup-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight per worker.")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--model-dir", default=os.path.join(tempfile.gettempdir(), "visual_tagger_bench_models"))
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else sorted(
+        {1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores})
+    os.makedirs(args.model_dir, exist_ok=True)
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        data = f.read()
+
+    results = {}
+    for backend in args.backends.split(","):
+        env = dict(os.environ, RESULT_CACHE_ENABLED="False", NEAR_DUPLICATE_ENABLED="False", JOBS_ENABLED="False",
+                   ADMISSION_ENABLED="False", LOG_LEVEL="WARNING", **backend_env(backend, args.model_dir))
+        for mode in args.modes.split(","):
+            runs = {}
+            for workers in counts:
+                runs[str(workers)] = run_server(env, workers, mode == "prefork", args, data)
+                single = runs[str(counts[0])]["requests_per_second"] / counts[0]
+                runs[str(workers)]["scaling_efficiency"] = runs[str(workers)]["requests_per_second"] / (workers * single)
+            results[f"{backend}/{mode}"] = runs
+
+    print_report("prefork", {"cores": cores, "requests": args.requests, "runs": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Preprocessing cost per inference batch: uint8 NHWC images -> normalized float32 NCHW tensor,
+and resizing decoded images for two models with different input geometries.
+
+Normalization variants, timed and traced with tracemalloc (peak bytes allocated per batch):
+  - naive:   the previous code: astype(float32), subtract, divide, transpose, ascontiguousarray,
+  - into:    `normalize_into` a freshly allocated tensor,
+  - pooled:  `preprocessed_batch`, reusing a pooled tensor across batches (no allocation).
+Resize variants, for a classifier (squashed) and a CLIP encoder (center crop) input:
+  - separate: one full decode + resize per model,
+  - shared:   `resize_for_models`, one decode and one RGB conversion shared by both.
+
+Usage:
+    python -m backend.benchmarks.bench_preprocessing --batch-size 32 --repeats 50
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.benchmarks.corpus import generate_corpus
+from backend.src.services.preprocessing import (
+    IMAGENET_MEAN, IMAGENET_STD, InputSpec, normalize_into, preprocessed_batch, resize_for_models,
+)
+
+
+def naive_normalize(batch: np.ndarray) -> np.ndarray:
+    scale = np.asarray(IMAGENET_STD, dtype=np.float32) * 255.0
+    offset = np.asarray(IMAGENET_MEAN, dtype=np.float32) * 255.0
+    normalized = (batch.astype(np.float32) - offset) / scale
+    return np.ascontiguousarray(normalized.transpose(0, 3, 1, 2))
+
+
+def into_normalize(batch: np.ndarray) -> np.ndarray:
+    n, height, width, _ = batch.shape
+    return normalize_into(batch, np.empty((n, 3, height, width), dtype=np.float32))
+
+
+def pooled_normalize(batch: np.ndarray, spec: InputSpec) -> float:
+    with preprocessed_batch(batch, spec) as tensor:
+        return float(tensor[0, 0, 0, 0])  # Stands in for the model reading the tensor
+
+
+def measure(fn, repeats: int) -> dict:
+    fn()  # Warm up (and fill the tensor pool)
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": percentiles(samples), "peak_allocated_bytes": peak}
+
+
+def separate_resize(data: bytes, size: int) -> None:
+    for crop in (False, True):
+        with Image.open(io.BytesIO(data)) as img:
+            resize_for_models(img, [(size, crop)])
+
+
+def shared_resize(data: bytes, size: int) -> None:
+    with Image.open(io.BytesIO(data)) as img:
+        resize_for_models(img, [(size, False), (size, True)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--size", type=int, default=224, help="Model input side, in pixels.")
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = rng.integers(0, 256, size=(args.batch_size, args.size, args.size, 3), dtype=np.uint8)
+    spec = InputSpec(args.size)
+    normalize = {
+        "naive": measure(lambda: naive_normalize(batch), args.repeats),
+        "into": measure(lambda: into_normalize(batch), args.repeats),
+        "pooled": measure(lambda: pooled_normalize(batch, spec), args.repeats),
+    }
+    images_per_second = {name: round(args.batch_size / result["seconds"]["p50"], 1) for name, result in normalize.items()}
+
+    corpus = generate_corpus()
+    resize = {
+        name: {image.name: measure(lambda: fn(image.data, args.size), max(3, args.repeats // 5))["seconds"]
+               for image in corpus}
+        for name, fn in (("separate", separate_resize), ("shared", shared_resize))
+    }
+
+    print_report("preprocessing", {
+        "batch_size": args.batch_size,
+        "normalize": normalize,
+        "normalize_images_per_second": images_per_second,
+        "resize_two_geometries": resize,
+    })
+
+
+if __name__ == "__main__":
+    main()
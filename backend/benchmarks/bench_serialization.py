@@ -0,0 +1,104 @@
+"""
+Cost of building and encoding analysis responses, per batch size.
+
+Building:
+  - per_tag:        one validated Tag per tag, then the ImageAnalysisResponse (previous code),
+  - single_validate: one model_validate call per image, tags included (ImageAnalysisService).
+Encoding a BatchImageAnalysisResponse (and response bytes):
+  - response_model_round_trip: what FastAPI does with a returned model and a `response_model`
+    (dump to Python, validate again, dump to JSON-able, json.dumps),
+  - model_dump_json:  pydantic-core's encoder (ModelResponse, 'json' format),
+  - orjson_model_dump: orjson over model_dump(), for comparison,
+  - compact_json / compact_orjson / compact_msgpack: the compact format (tags as parallel
+    arrays) with the standard json module, orjson and msgpack (when installed).
+
+Usage:
+    python -m backend.benchmarks.bench_serialization --batch-sizes 1,64,256
+"""
+import argparse
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.src.core.responses import compact_payload
+from backend.src.models.image import BatchImageAnalysisItem, BatchImageAnalysisResponse, ImageAnalysisResponse, Tag
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _timed(fn, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def aggregated_tags(batch_size: int, tags_per_image: int = 5) -> list:
+    return [[(f"label_{(i * 7 + j) % 1000}", round(0.95 - j * 0.1, 4), "ViT") for j in range(tags_per_image)]
+            for i in range(batch_size)]
+
+
+def build_per_tag(tags: list) -> list:
+    return [ImageAnalysisResponse(image_id=f"{i:064x}", filename=f"{i}.jpg", message="Analysis completed.",
+                                  tags=[Tag(name=name, confidence=confidence, source_model=source)
+                                        for name, confidence, source in row])
+            for i, row in enumerate(tags)]
+
+
+def build_single_validate(tags: list) -> list:
+    return [ImageAnalysisResponse.model_validate({
+        "image_id": f"{i:064x}", "filename": f"{i}.jpg", "message": "Analysis completed.",
+        "tags": [{"name": name, "confidence": confidence, "source_model": source} for name, confidence, source in row],
+    }) for i, row in enumerate(tags)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", default="1,64,256", help="Comma-separated images per response.")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(BatchImageAnalysisResponse)
+    results = {}
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        tags = aggregated_tags(batch_size)
+        build = {
+            "per_tag": _timed(lambda: build_per_tag(tags), args.repeats),
+            "single_validate": _timed(lambda: build_single_validate(tags), args.repeats),
+        }
+        items = [BatchImageAnalysisItem(index=i, filename=result.filename, result=result)
+                 for i, result in enumerate(build_single_validate(tags))]
+        response = BatchImageAnalysisResponse(items=items, total=batch_size, succeeded=batch_size, failed=0)
+
+        encoders = {
+            "response_model_round_trip": lambda: json.dumps(adapter.dump_python(
+                adapter.validate_python(response.model_dump()), mode="json")).encode("utf-8"),
+            "model_dump_json": lambda: response.model_dump_json().encode("utf-8"),
+            "compact_json": lambda: json.dumps(compact_payload(response), separators=(",", ":")).encode("utf-8"),
+        }
+        if orjson is not None:
+            encoders["orjson_model_dump"] = lambda: orjson.dumps(response.model_dump())
+            encoders["compact_orjson"] = lambda: orjson.dumps(compact_payload(response))
+        if msgpack is not None:
+            encoders["compact_msgpack"] = lambda: msgpack.packb(compact_payload(response), use_bin_type=True)
+        encode = {name: dict(_timed(fn, args.repeats), bytes=len(fn())) for name, fn in encoders.items()}
+        results[str(batch_size)] = {"build_seconds": build, "encode_seconds": encode}
+
+    print_report("serialization", {"orjson": orjson is not None, "msgpack": msgpack is not None,
+                                   "batch_sizes": results})
+
+
+if __name__ == "__main__":
+    main()
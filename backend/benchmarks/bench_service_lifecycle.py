@@ -0,0 +1,63 @@
+"""
+Throughput of /api/v1/analyze with a per-request ImageAnalysisService versus the
+singleton created by the application lifespan.
+
+Requests are sent in-process through httpx's ASGI transport (no network), with the result
+cache and near-duplicate index disabled so every request runs the full pipeline. The
+"per_request" scenario overrides the dependency to build a new service for every request,
+which is how the endpoint behaved before the service became a lifespan-managed singleton.
+The cost of constructing one service is also timed on its own.
+
+Usage:
+    python -m backend.benchmarks.bench_service_lifecycle --requests 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Settings are read when the application is imported: every request must do the full work
+os.environ.setdefault("RESULT_CACHE_ENABLED", "False")
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+
+from backend.benchmarks.common import asgi_load, percentiles, print_report
+from backend.src.api.v1.endpoints.analyze import get_image_analysis_service_instance
+from backend.src.main import app
+from backend.src.services.image_analysis import ImageAnalysisService
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def time_service_construction(repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        ImageAnalysisService()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+    args = parser.parse_args()
+
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        uploads = [("dog.jpg", f.read(), "image/jpeg")]
+
+    app.dependency_overrides[get_image_analysis_service_instance] = lambda: ImageAnalysisService()
+    per_request = asyncio.run(asgi_load(app, uploads, args.requests, args.concurrency))
+    app.dependency_overrides.clear()
+    singleton = asyncio.run(asgi_load(app, uploads, args.requests, args.concurrency))
+
+    print_report("service_lifecycle", {
+        "service_construction_seconds": time_service_construction(200),
+        "per_request": per_request,
+        "singleton": singleton,
+        "speedup": singleton["requests_per_second"] / per_request["requests_per_second"],
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Recall and latency of the image-embedding store (EmbeddingStore) at scale.
+
+Fills a store with N synthetic L2-normalized embeddings (1M by default, in clusters like real
+image embeddings), once per dtype, then searches noisy copies of stored vectors:
+  - insert throughput (vectors/s) and the time the IVF index took to train,
+  - store size on disk,
+  - per nprobe: recall@k against an exact float32 search over the original vectors (so it
+    includes the quantization error) and the search latency percentiles.
+nprobe = nlist scans every vector: the exact-search latency of the store.
+
+Usage:
+    python -m backend.benchmarks.bench_similarity
+    python -m backend.benchmarks.bench_similarity --vectors 200000 --dtypes int8 --nprobe 8,32
+"""
+from typing import Dict, Iterator, List
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.src.services.embedding_store import EmbeddingStore
+
+CHUNK_SIZE = 50000
+
+
+def synthetic_embeddings(count: int, dim: int, clusters: int, noise: float, seed: int = 0) -> Iterator[np.ndarray]:
+    """
+    Yields `count` clustered unit vectors in chunks of CHUNK_SIZE (deterministic, so the exact
+    ground truth can be computed by generating them again).
+    """
+    centers = np.random.default_rng(seed).standard_normal((clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    for start in range(0, count, CHUNK_SIZE):
+        rng = np.random.default_rng((seed, start))
+        size = min(CHUNK_SIZE, count - start)
+        vectors = centers[rng.integers(0, clusters, size)] + noise * rng.standard_normal((size, dim)).astype(np.float32)
+        yield vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(args: argparse.Namespace, queries: np.ndarray, k: int) -> List[set]:
+    scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    rows = np.zeros((len(queries), k), dtype=np.int64)
+    start = 0
+    for chunk in synthetic_embeddings(args.vectors, args.dim, args.clusters, args.noise):
+        chunk_scores = queries @ chunk.T
+        merged_scores = np.concatenate([scores, chunk_scores], axis=1)
+        merged_rows = np.concatenate([rows, np.broadcast_to(np.arange(start, start + len(chunk)), chunk_scores.shape)], axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        scores, rows = np.take_along_axis(merged_scores, top, 1), np.take_along_axis(merged_rows, top, 1)
+        start += len(chunk)
+    return [{f"{row:012d}" for row in row_set} for row_set in rows]
+
+
+def fill_store(args: argparse.Namespace, directory: str, dtype: str) -> Dict:
+    store = EmbeddingStore(directory, dim=args.dim, dtype=dtype, nlist=args.nlist,
+                           train_size=args.train_size, train_in_background=False)
+    insert_seconds, train_seconds, start = 0.0, 0.0, 0
+    for chunk in synthetic_embeddings(args.vectors, args.dim, args.clusters, args.noise):
+        t0 = time.perf_counter()
+        trained = store.index is not None
+        store.add([f"{row:012d}" for row in range(start, start + len(chunk))], chunk)
+        elapsed = time.perf_counter() - t0
+        if not trained and store.index is not None:
+            train_seconds = elapsed  # This chunk crossed train_size: the index was trained inline
+        else:
+            insert_seconds += elapsed
+        start += len(chunk)
+    store.flush()
+    return {"store": store, "insert_vectors_per_second": (args.vectors - args.train_size) / max(insert_seconds, 1e-9),
+            "train_seconds": train_seconds,
+            "disk_bytes": sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1_000_000, help="Number of stored embeddings.")
+    parser.add_argument("--dim", type=int, default=512, help="Embedding dimension (CLIP ViT-B/32: 512).")
+    parser.add_argument("--dtypes", default="float16,int8", help="Comma-separated store dtypes.")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--train-size", type=int, default=40000)
+    parser.add_argument("--nprobe", default="1,4,16,64", help="Comma-separated IVF lists scanned per query.")
+    parser.add_argument("--exact-queries", type=int, default=5, help="Queries timed with nprobe = nlist (full scan).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=10000, help="Clusters of the synthetic embeddings.")
+    parser.add_argument("--noise", type=float, default=0.04, help="Per-dimension noise around the cluster centers.")
+    parser.add_argument("--dir", default="", help="Where the stores are written (default: a temporary directory).")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    stored = next(synthetic_embeddings(min(args.vectors, CHUNK_SIZE), args.dim, args.clusters, args.noise))
+    queries = stored[rng.integers(0, len(stored), args.queries)] + args.noise * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    expected = exact_top_k(args, queries, args.k)
+
+    root = tempfile.mkdtemp(prefix="bench_similarity_", dir=args.dir or None)
+    results = {}
+    try:
+        for dtype in args.dtypes.split(","):
+            filled = fill_store(args, os.path.join(root, dtype), dtype)
+            store = filled.pop("store")
+            searches = {}
+            for nprobe in [int(n) for n in args.nprobe.split(",")] + [args.nlist]:
+                count = args.exact_queries if nprobe == args.nlist else args.queries
+                latencies, recall = [], []
+                for query, truth in zip(queries[:count], expected):
+                    t0 = time.perf_counter()
+                    found = store.search(query, args.k, nprobe=nprobe)
+                    latencies.append(time.perf_counter() - t0)
+                    recall.append(len(truth & {image_id for image_id, _ in found}) / args.k)
+                searches["exact" if nprobe == args.nlist else str(nprobe)] = dict(
+                    percentiles(latencies), recall=float(np.mean(recall)))
+            store.close()
+            results[dtype] = dict(filled, search_seconds=searches)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_report("similarity", {"vectors": args.vectors, "dim": args.dim, "nlist": args.nlist, "k": args.k,
+                                "queries": args.queries, "dtypes": results})
+
+
+if __name__ == "__main__":
+    main()
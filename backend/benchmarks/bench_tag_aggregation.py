@@ -0,0 +1,68 @@
+"""
+Cost of turning model scores into the final tags of a batch.
+
+Compares the previous per-image approach (build a pydantic Tag for every non-zero score,
+sort them, slice the top 5, then rebuild every selected Tag) with the NumPy TagAggregator
+(one argpartition over the whole batch, Tags built only for the selected labels).
+
+Usage:
+    python -m backend.benchmarks.bench_tag_aggregation --labels 1000 --batch 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import percentiles, print_report
+from backend.src.models.image import Tag
+from backend.src.services.tag_aggregation import TagAggregator, TagSource
+
+
+def legacy_tags(scores: np.ndarray, labels: list) -> list:
+    results = []
+    for row in scores:
+        all_tags = [Tag(name=labels[i], confidence=round(min(float(row[i]), 1.0), 4), source_model="ViT")
+                    for i in np.flatnonzero(row > 0)]
+        all_tags.sort(key=lambda t: t.confidence, reverse=True)
+        final_tags = all_tags[:5]
+        results.append([Tag(name=t.name, confidence=t.confidence, source_model=t.source_model) for t in final_tags])
+    return results
+
+
+def aggregated_tags(aggregator: TagAggregator, scores: np.ndarray, labels: list) -> list:
+    return [[Tag(name=name, confidence=confidence, source_model=source) for name, confidence, source in row]
+            for row in aggregator.aggregate([TagSource("ViT", labels, scores)])]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=1000, help="Labels of the classifier (1000 for ImageNet).")
+    parser.add_argument("--batch", type=int, default=64, help="Images per batch.")
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    labels = [f"label{i}" for i in range(args.labels)]
+    scores = np.random.default_rng(0).dirichlet(np.ones(args.labels), size=args.batch).astype(np.float32)
+    aggregator = TagAggregator(top_k=5)
+    aggregated_tags(aggregator, scores, labels)  # Builds the cached label columns
+
+    legacy, vectorized = [], []
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        legacy_tags(scores, labels)
+        legacy.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        aggregated_tags(aggregator, scores, labels)
+        vectorized.append(time.perf_counter() - t0)
+
+    print_report("tag_aggregation", {
+        "labels": args.labels,
+        "batch_size": args.batch,
+        "legacy_seconds": percentiles(legacy),
+        "aggregator_seconds": percentiles(vectorized),
+        "speedup_p50": percentiles(legacy)["p50"] / percentiles(vectorized)["p50"],
+    })
+
+
+if __name__ == "__main__":
+    main()
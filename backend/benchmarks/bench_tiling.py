@@ -0,0 +1,120 @@
+"""
+Cost of tile-based analysis (TILING_ENABLED) on large images, per image and per megapixel.
+
+Synthetic photos of several sizes (a smooth background with a few small textured objects,
+saved as JPEG) are analyzed one at a time by ImageAnalysisService.analyze_image, with tiling
+off (the whole image squashed to the model input) and on (the whole image plus up to
+TILING_MAX_TILES salient tiles, classified in one call). Reported per size and mode:
+  - seconds per image and per megapixel (mean over the repeats),
+  - tiles classified per image,
+  - decode and inference time (from the analysis_*_seconds histograms).
+
+The result cache and near-duplicate index are disabled and inference runs inline. The ONNX
+backend runs a ViT-B-sized synthetic model (see synthetic_model) unless ONNX_MODEL_PATH and
+ONNX_LABELS_PATH are set.
+
+Usage:
+    python -m backend.benchmarks.bench_tiling --sizes 2000x1500,4000x3000,6000x4000 --backend onnx
+"""
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "False")
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+os.environ.setdefault("EXECUTOR_BACKEND", "inline")
+
+import numpy as np
+from PIL import Image
+
+from backend.benchmarks.common import print_report
+from backend.benchmarks.synthetic_model import export_synthetic_classifier
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.services.image_analysis import ImageAnalysisService
+
+
+def synthetic_photo(width: int, height: int, objects: int = 4, seed: int = 0) -> bytes:
+    """
+    A vertical gradient with `objects` textured squares of ~3% of the short side each.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(60, 200, height, dtype=np.float32)[:, None, None]
+    pixels = np.broadcast_to(gradient * np.array([0.6, 0.8, 1.0], dtype=np.float32), (height, width, 3)).copy()
+    side = max(8, min(width, height) // 32)
+    for _ in range(objects):
+        x, y = int(rng.integers(0, width - side)), int(rng.integers(0, height - side))
+        pixels[y:y + side, x:x + side] = rng.integers(0, 256, size=(side, side, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def analyze(data: bytes, repeats: int, tiling: bool) -> Dict:
+    get_settings().TILING_ENABLED = tiling
+    registry = get_metrics_registry()
+    decode, inference = registry.histogram("analysis_decode_seconds"), registry.histogram("analysis_inference_seconds")
+    tiles = registry.histogram("analysis_tiles_per_image")
+    service = ImageAnalysisService()
+    service.model_backend.warmup()
+    try:
+        await service.analyze_image(data, "warmup.jpg")
+        before = (decode.sum, inference.sum, tiles.sum)
+        start = time.perf_counter()
+        for i in range(repeats):
+            await service.analyze_image(data, f"{i}.jpg")
+        seconds = (time.perf_counter() - start) / repeats
+    finally:
+        await service.aclose()
+    return {
+        "seconds_per_image": seconds,
+        "decode_seconds": (decode.sum - before[0]) / repeats,
+        "inference_seconds": (inference.sum - before[1]) / repeats,
+        "tiles_per_image": (tiles.sum - before[2]) / repeats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000x1500,4000x3000,6000x4000", help="Comma-separated WxH image sizes.")
+    parser.add_argument("--backend", default=os.environ.get("MODEL_BACKEND", "mock"), help="MODEL_BACKEND to use.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--model-dir", default=os.path.join(tempfile.gettempdir(), "visual_tagger_bench_models"))
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.MODEL_BACKEND = args.backend
+    if args.backend == "onnx" and not os.environ.get("ONNX_MODEL_PATH"):
+        os.makedirs(args.model_dir, exist_ok=True)
+        settings.ONNX_MODEL_PATH, settings.ONNX_LABELS_PATH = export_synthetic_classifier(args.model_dir, dim=768,
+                                                                                           depth=12)
+    sizes: List[Tuple[int, int]] = [tuple(int(side) for side in size.split("x")) for size in args.sizes.split(",")]
+
+    results = {}
+    for width, height in sizes:
+        data = synthetic_photo(width, height)
+        megapixels = width * height / 1e6
+        runs = {}
+        for mode in ("global", "tiled"):
+            run = asyncio.run(analyze(data, args.repeats, tiling=mode == "tiled"))
+            run["seconds_per_megapixel"] = run["seconds_per_image"] / megapixels
+            runs[mode] = run
+        runs["tiled_overhead"] = runs["tiled"]["seconds_per_image"] / runs["global"]["seconds_per_image"]
+        results[f"{width}x{height}"] = runs
+
+    print_report("tiling", {
+        "model_backend": settings.MODEL_BACKEND,
+        "TILING_MIN_MEGAPIXELS": settings.TILING_MIN_MEGAPIXELS,
+        "TILING_MAX_SIDE": settings.TILING_MAX_SIDE,
+        "TILING_MAX_TILES": settings.TILING_MAX_TILES,
+        "TILE_SIZE": settings.TILE_SIZE,
+        "sizes": results,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Throughput of URL ingestion (ImageAnalysisService.analyze_urls) against a local origin that
+adds a fixed latency to every response (a stand-in for object-store / CDN round trips).
+
+The same list of distinct images is analyzed three ways:
+  - "sequential": each URL downloaded with a new connection, then analyzed, one at a time
+    (what a client looping over /analyze/url without keep-alive would cost);
+  - "pipelined": analyze_urls, which downloads concurrently over the shared pool (up to
+    FETCH_MAX_CONNECTIONS_PER_HOST per host) while the downloaded images are analyzed;
+  - "revalidated": analyze_urls again on the same URLs, answered by 304s and the result cache.
+
+Reported per run: seconds, images/s, origin requests and bytes downloaded.
+
+Usage:
+    python -m backend.benchmarks.bench_url_ingestion --images 64 --latency-ms 50 --per-host 8
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "False")
+
+import httpx
+
+from backend.benchmarks.common import print_report
+from backend.benchmarks.corpus import generate_corpus
+from backend.src.core.config import get_settings
+from backend.src.services.image_analysis import ImageAnalysisService
+
+
+class Origin(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, images: Dict[str, bytes], latency: float):
+        super().__init__(("127.0.0.1", 0), OriginHandler)
+        self.images = images
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled connections are reused
+
+    def do_GET(self):
+        origin = self.server
+        time.sleep(origin.latency)
+        data = origin.images.get(self.path.lstrip("/"))
+        etag = f'"{hash(data)}"'
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(data)
+            with origin.lock:
+                origin.bytes_sent += len(data)
+        with origin.lock:
+            origin.requests += 1
+
+    def log_message(self, *args):
+        pass
+
+
+async def sequential(service: ImageAnalysisService, urls: List[str]) -> None:
+    for url in urls:
+        async with httpx.AsyncClient() as client:
+            data = (await client.get(url)).content
+        await service.analyze_image(data, url.rsplit("/", 1)[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latency the origin adds to every response.")
+    parser.add_argument("--per-host", type=int, default=8, help="FETCH_MAX_CONNECTIONS_PER_HOST.")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.FETCH_MAX_CONNECTIONS_PER_HOST = args.per_host
+    settings.FETCH_ALLOW_PRIVATE_ADDRESSES = True  # The origin listens on 127.0.0.1
+    corpus = generate_corpus(formats=["JPEG"])
+    images = {f"{i}.{corpus[i % len(corpus)].name}": corpus[i % len(corpus)].data + i.to_bytes(4, "big")
+              for i in range(args.images)}
+    origin = Origin(images, args.latency_ms / 1000)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{origin.server_address[1]}/{name}" for name in images]
+
+    async def run(mode: str) -> Dict:
+        service = ImageAnalysisService()
+        if mode != "revalidated":
+            service.result_cache.clear()
+        requests, sent = origin.requests, origin.bytes_sent
+        start = time.perf_counter()
+        if mode == "sequential":
+            await sequential(service, urls)
+        else:
+            items = await service.analyze_urls(urls)
+            assert all(item.result is not None for item in items), [item.error for item in items if item.error]
+        seconds = time.perf_counter() - start
+        if mode != "pipelined":  # The revalidated run reuses its result cache and fetcher (with the ETags)
+            await service.aclose()
+        return {"seconds": seconds, "images_per_second": len(urls) / seconds,
+                "origin_requests": origin.requests - requests, "bytes_downloaded": origin.bytes_sent - sent}
+
+    async def run_all() -> Dict:
+        return {mode: await run(mode) for mode in ("sequential", "pipelined", "revalidated")}
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        origin.shutdown()
+    print_report("url_ingestion", {"images": args.images, "latency_ms": args.latency_ms,
+                                   "FETCH_MAX_CONNECTIONS_PER_HOST": args.per_host,
+                                   "model_backend": settings.MODEL_BACKEND, "runs": results})
+
+
+if __name__ == "__main__":
+    main()
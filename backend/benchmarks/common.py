@@ -0,0 +1,126 @@
+# Helpers shared by the benchmark scripts
+from typing import Dict, List, Sequence, Tuple
+import json
+import platform
+import os
+import time
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Returns p50/p95/p99, mean and max of the samples (e.g. latencies in seconds).
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+    }
+
+
+def environment() -> Dict[str, str]:
+    """
+    Describes the machine the benchmark ran on, so reports are comparable.
+    """
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def print_report(name: str, report: Dict) -> None:
+    print(json.dumps({"benchmark": name, "environment": environment(), **report}, indent=2))
+
+
+async def asgi_load(app, uploads: Sequence[Tuple[str, bytes, str]], num_requests: int, concurrency: int,
+                    path: str = "/api/v1/analyze") -> Dict:
+    """
+    Sends `num_requests` single-image uploads to an ASGI app, `concurrency` at a time, in process
+    (httpx ASGI transport, no network), cycling through `uploads` ((filename, data, content type)).
+    The app's lifespan runs around the load, as it would in a server.
+
+    Returns:
+        Dict: Throughput, latency percentiles and the number of non-2xx responses.
+    """
+    import asyncio
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    next_request = iter(range(num_requests))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def worker() -> None:
+                nonlocal errors
+                for i in next_request:
+                    filename, data, content_type = uploads[i % len(uploads)]
+                    t0 = time.perf_counter()
+                    response = await client.post(path, files={"file": (filename, data, content_type)})
+                    latencies.append(time.perf_counter() - t0)
+                    if response.status_code >= 300:
+                        errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": num_requests / elapsed,
+        "latency_seconds": percentiles(latencies),
+    }
+
+
+def flatten_metrics(report: Dict, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Lists the regressions of a report against a stored baseline report.
+
+    Latency percentiles (p50/p95/p99 under a "*seconds" key) regress when they grow by more
+    than `tolerance` (0.25 = 25%); throughputs ("*per_second") regress when they drop by
+    more than `tolerance`. Error and failure counts ("errors", "failed", "failures") regress
+    on any increase, whatever the tolerance. Metrics missing from either report are ignored.
+    """
+    current, reference = flatten_metrics(report), flatten_metrics(baseline)
+    regressions = []
+    for name, old in reference.items():
+        new = current.get(name)
+        if new is None:
+            continue
+        parts = name.split(".")
+        if parts[-1] in ("errors", "failed", "failures"):
+            if new > old:
+                regressions.append(f"{name}: {old:.6g} -> {new:.6g}")
+            continue
+        if old <= 0:
+            continue
+        if parts[-1] in ("p50", "p95", "p99") and any(part.endswith("seconds") for part in parts[:-1]):
+            if new > old * (1 + tolerance):
+                regressions.append(f"{name}: {old:.6g} -> {new:.6g} (+{(new / old - 1) * 100:.0f}%)")
+        elif parts[-1].endswith("per_second"):
+            if new < old * (1 - tolerance):
+                regressions.append(f"{name}: {old:.6g} -> {new:.6g} ({(new / old - 1) * 100:.0f}%)")
+    return regressions
@@ -0,0 +1,56 @@
+# Synthetic image corpus for the benchmarks (no assets to download or commit)
+from typing import List, NamedTuple, Sequence, Tuple
+import io
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_SIZES: Tuple[Tuple[int, int], ...] = ((64, 64), (320, 240), (640, 480), (1280, 720), (1920, 1080), (4000, 3000))
+DEFAULT_FORMATS: Tuple[str, ...] = ("JPEG", "PNG", "WEBP")
+_CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif", "BMP": "image/bmp"}
+
+
+class CorpusImage(NamedTuple):
+    name: str
+    data: bytes
+    content_type: str
+    size: Tuple[int, int]  # (width, height)
+
+
+def synthetic_image(width: int, height: int, seed: int) -> Image.Image:
+    """
+    Smooth gradients plus noise and a few blocks: compresses like a photo, unlike flat colors or pure noise.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    channels = [
+        127 + 100 * np.sin(x / max(width, 1) * (3 + c) * np.pi + y / max(height, 1) * (2 + c) * np.pi + phase[c])
+        for c in range(3)
+    ]
+    pixels = np.stack(channels, axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    for _ in range(4):
+        x0, y0 = rng.integers(0, max(width // 2, 1)), rng.integers(0, max(height // 2, 1))
+        pixels[y0:y0 + height // 4, x0:x0 + width // 4] = rng.integers(0, 255, 3)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def generate_corpus(sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+                    formats: Sequence[str] = DEFAULT_FORMATS, seed: int = 0) -> List[CorpusImage]:
+    """
+    Encodes one synthetic image per (size, format) pair. Deterministic for a given seed.
+    """
+    corpus = []
+    for i, (width, height) in enumerate(sizes):
+        image = synthetic_image(width, height, seed + i)
+        for image_format in formats:
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format, **({"quality": 85} if image_format in ("JPEG", "WEBP") else {}))
+            corpus.append(CorpusImage(
+                name=f"synthetic_{width}x{height}.{image_format.lower()}",
+                data=buffer.getvalue(),
+                content_type=_CONTENT_TYPES[image_format],
+                size=(width, height),
+            ))
+    return corpus
@@ -0,0 +1,72 @@
+"""
+ViT-shaped ONNX classifier with random weights, for benchmarking the ONNX backend (e.g. fp32
+vs int8) where no real exported model is available: patch embedding, `depth` MLP blocks with
+residuals over the patch tokens, mean pooling and a linear head. Its compute profile (large
+MatMuls over the tokens) is close to a ViT's; its predictions are meaningless.
+"""
+from typing import Tuple
+import os
+
+import numpy as np
+
+
+def export_synthetic_classifier(directory: str, num_labels: int = 1000, dim: int = 384, depth: int = 6,
+                                patch: int = 16, size: int = 224, seed: int = 0) -> Tuple[str, str]:
+    """
+    Writes `synthetic_vit.onnx` and its labels file into `directory` (once) and returns their paths.
+    """
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError as e:
+        raise RuntimeError("The synthetic ONNX model requires the 'onnx' package.") from e
+
+    model_path = os.path.join(directory, f"synthetic_vit_d{dim}_l{depth}.onnx")
+    labels_path = os.path.join(directory, f"synthetic_vit_labels_{num_labels}.txt")
+    if os.path.exists(model_path) and os.path.exists(labels_path):
+        return model_path, labels_path
+
+    rng = np.random.default_rng(seed)
+
+    def weight(name, *shape):
+        fan_in = int(np.prod(shape[1:])) if len(shape) == 4 else shape[0]
+        return numpy_helper.from_array((rng.standard_normal(shape) / np.sqrt(fan_in)).astype(np.float32), name)
+
+    tokens = (size // patch) ** 2
+    nodes = [
+        helper.make_node("Conv", ["pixel_values", "patch_w"], ["patches"], kernel_shape=[patch, patch], strides=[patch, patch]),
+        helper.make_node("Reshape", ["patches", "tokens_shape"], ["tokens_chw"]),
+        helper.make_node("Transpose", ["tokens_chw"], ["x0"], perm=[0, 2, 1]),
+    ]
+    initializers = [
+        weight("patch_w", dim, 3, patch, patch),
+        numpy_helper.from_array(np.array([0, dim, tokens], dtype=np.int64), "tokens_shape"),
+    ]
+    for layer in range(depth):
+        x, h, a, o, y = f"x{layer}", f"h{layer}", f"a{layer}", f"o{layer}", f"x{layer + 1}"
+        nodes += [
+            helper.make_node("MatMul", [x, f"up{layer}"], [h]),
+            helper.make_node("Relu", [h], [a]),
+            helper.make_node("MatMul", [a, f"down{layer}"], [o]),
+            helper.make_node("Add", [x, o], [y]),
+        ]
+        initializers += [weight(f"up{layer}", dim, 4 * dim), weight(f"down{layer}", 4 * dim, dim)]
+    nodes += [
+        helper.make_node("ReduceMean", [f"x{depth}"], ["pooled"], axes=[1], keepdims=0),
+        helper.make_node("MatMul", ["pooled", "head"], ["logits"]),
+    ]
+    initializers.append(weight("head", dim, num_labels))
+
+    graph = helper.make_graph(
+        nodes, "synthetic_vit",
+        [helper.make_tensor_value_info("pixel_values", TensorProto.FLOAT, ["N", 3, size, size])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["N", num_labels])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    os.makedirs(directory, exist_ok=True)
+    onnx.save(model, model_path)
+    with open(labels_path, "w", encoding="utf-8") as f:
+        f.write("".join(f"label_{i}\n" for i in range(num_labels)))
+    return model_path, labels_path
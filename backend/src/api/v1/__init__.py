@@ -1,9 +1,13 @@
 from fastapi import APIRouter
-from backend.src.api.v1.endpoints import analyze
+from backend.src.api.v1.endpoints import analyze, jobs, metrics, profiler, similar
 
 v1_router = APIRouter(prefix="/v1", tags=["v1"]) # Prefixo e tags para a versão 1
 
 v1_router.include_router(analyze.router)
+v1_router.include_router(jobs.router)
+v1_router.include_router(metrics.router)
+v1_router.include_router(profiler.router)
+v1_router.include_router(similar.router)
 
 # Você pode adicionar mais routers específicos da v1 aqui, se tiver outros arquivos em `endpoints/`
 # v1_router.include_router(outro_modulo.router)
\ No newline at end of file
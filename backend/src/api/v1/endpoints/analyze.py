@@ -1,11 +1,22 @@
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Request, Response, status
+from pydantic import BaseModel
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import io
 import logging
 
-from backend.src.models.image import ImageAnalysisResponse
-# --- MUDANÇA: Importar o ImageAnalysisService para tipagem e a classe de dependência
-from backend.src.services.image_analysis import ImageAnalysisService
+from backend.src.core.config import get_settings
+from backend.src.core.responses import COMPACT_MEDIA_TYPE, ModelResponse
+from backend.src.core.tracing import stage_timer
+from backend.src.models.image import (ImageAnalysisRequest, ImageAnalysisResponse, BatchImageAnalysisResponse,
+                                      BatchUrlAnalysisRequest)
+from backend.src.utils.file_utils import is_archive, extract_archive_members, read_upload, UploadTooLargeError
+from backend.src.services.executor import ExecutorSaturatedError
+from backend.src.services.admission import AdmissionRejectedError, AdmissionTicket, get_admission_controller
+
+# O serviço de análise (NumPy, PIL, runtimes dos modelos) só é importado no primeiro uso,
+# para que importar a aplicação (cold start serverless) continue barato
+if TYPE_CHECKING:
+    from backend.src.services.image_analysis import ImageAnalysisService
 
 logger = logging.getLogger(__name__)
 
@@ -13,65 +24,350 @@ router = APIRouter()
 
 # --- NOVA FUNÇÃO DE DEPENDÊNCIA ---
 # Esta função será usada pelo FastAPI para injetar a instância do serviço
-def get_image_analysis_service_instance() -> ImageAnalysisService:
+def get_image_analysis_service_instance(request: Request) -> "ImageAnalysisService":
+    """
+    Retorna a instância única do ImageAnalysisService, criada no startup da aplicação (lifespan).
+    Se o lifespan não foi executado (ex: app montada sem os eventos de startup), a instância
+    é criada no primeiro uso e reaproveitada pelas requisições seguintes.
+    """
+    service = getattr(request.app.state, "image_analysis_service", None)
+    if service is None:
+        logger.info("ImageAnalysisService não encontrado no estado da aplicação; criando instância compartilhada.")
+        from backend.src.services.image_analysis import ImageAnalysisService
+        service = ImageAnalysisService()
+        request.app.state.image_analysis_service = service
+    return service
+
+def get_client_id(request: Request) -> str:
+    """
+    Identifica o cliente (tenant) para o limite de taxa: o header ADMISSION_CLIENT_HEADER, ou o IP.
+    """
+    client_id = request.headers.get(get_settings().ADMISSION_CLIENT_HEADER)
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
+
+
+def _rejection(e: AdmissionRejectedError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _model_response(request: Request, model: BaseModel, ticket: Optional[AdmissionTicket] = None) -> Response:
     """
-    Retorna uma instância do ImageAnalysisService.
-    FastAPI irá gerenciar o ciclo de vida desta dependência.
+    Serializa a resposta aqui (e não no FastAPI), para medir o estágio de serialização.
+    O modelo já foi construído e validado pelo serviço, então não é validado de novo.
+    O formato (JSON, compacto ou MessagePack) é negociado pelo header Accept (ver core.responses).
+    Respostas degradadas (sobrecarga) indicam o modo no header X-Degraded.
     """
-    return ImageAnalysisService()
+    headers: Dict[str, str] = {}
+    if ticket is not None and ticket.degraded:
+        headers["X-Degraded"] = ticket.mode
+    with stage_timer("serialization"):
+        return ModelResponse.negotiated(model, request.headers.get("accept"), headers=headers)
+
+
+# Formatos alternativos documentados no OpenAPI das rotas de análise
+_ALTERNATIVE_FORMATS = {200: {"content": {COMPACT_MEDIA_TYPE: {}, "application/msgpack": {}},
+                              "description": "Tags como arrays paralelos (name/confidence/source_model), em JSON ou MessagePack, conforme o header Accept."}}
+
 
 @router.post(
     "/analyze",
     response_model=ImageAnalysisResponse,
     status_code=status.HTTP_200_OK,
+    responses=_ALTERNATIVE_FORMATS,
     summary="Analisa uma imagem enviada e retorna tags e confianças.",
     description="Recebe uma imagem como arquivo (multipart/form-data), a processa usando o serviço de análise de IA e retorna uma lista de tags identificadas com seus respectivos níveis de confiança."
 )
 async def analyze_image_endpoint(
+    request: Request,
     file: UploadFile = File(..., description="O arquivo de imagem a ser analisado (JPEG, PNG)."),
     # --- MUDANÇA: Injetar a instância do serviço ---
-    image_analysis_service: ImageAnalysisService = Depends(get_image_analysis_service_instance)
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance)
 ) -> ImageAnalysisResponse:
     """
     Endpoint para análise de imagem.
     Recebe um arquivo de imagem, envia para o serviço de análise de IA
     e retorna os resultados.
+    Sob sobrecarga, a requisição é rejeitada (429/503 com Retry-After) ou degradada (ver AdmissionController).
     """
-    logger.info(f"Requisição POST /api/v1/analyze recebida para o arquivo: {file.filename}")
+    logger.debug("Requisição POST /api/v1/analyze recebida para o arquivo: %s", file.filename)
 
     if not file.content_type or not file.content_type.startswith("image/"):
-        logger.warning(f"Tipo de arquivo inválido recebido: {file.content_type} para {file.filename}")
+        logger.warning("Tipo de arquivo inválido recebido: %s para %s", file.content_type, file.filename,
+                       extra={"image_filename": file.filename, "content_type": file.content_type})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Tipo de arquivo inválido. Por favor, envie uma imagem (ex: JPEG, PNG, JPEG)."
         )
 
     try:
-        # Lê o conteúdo do arquivo
-        image_data = await file.read()
-        logger.info(f"Dados da imagem de {file.filename} lidos ({len(image_data)} bytes).")
+        # Lê o conteúdo do arquivo em blocos, abortando assim que o limite de tamanho é ultrapassado.
+        # A leitura vem antes da admissão: um upload lento não conta como carga dos workers
+        with stage_timer("upload_read"):
+            image_data = await read_upload(file, get_settings().MAX_UPLOAD_BYTES)
+        logger.debug("Dados da imagem de %s lidos (%d bytes).", file.filename, len(image_data))
 
-        # Chama o serviço de análise de imagem injetado
-        response = await image_analysis_service.analyze_image(image_data, file.filename)
-        logger.info(f"Análise de {file.filename} concluída com sucesso.")
+        with get_admission_controller().admit(get_client_id(request)) as ticket:
+            # Chama o serviço de análise de imagem injetado
+            if ticket.mode == "cache_only":
+                response = await image_analysis_service.get_cached_analysis(image_data, file.filename)
+                if response is None:
+                    raise ticket.overloaded()
+            else:
+                response = await image_analysis_service.analyze_image(image_data, file.filename, fast=ticket.mode == "fast")
+        logger.info("Análise de %s concluída com sucesso.", file.filename,
+                    extra={"image_filename": file.filename, "image_id": response.image_id,
+                           "upload_bytes": len(image_data), "mode": ticket.mode})
 
-        return response
+        return _model_response(request, response, ticket)
+    except AdmissionRejectedError as ae: # Sobrecarga ou cliente acima do limite: rejeitada antes de ocupar os workers
+        logger.warning("Requisição para %s rejeitada pelo controle de admissão (%d).", file.filename, ae.status_code,
+                       extra={"image_filename": file.filename})
+        raise _rejection(ae)
+    except ExecutorSaturatedError as se: # Workers ocupados: o cliente deve tentar novamente
+        logger.warning("Workers saturados; requisição para %s rejeitada.", file.filename, extra={"image_filename": file.filename})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(se),
+            headers={"Retry-After": str(se.retry_after)}
+        )
+    except UploadTooLargeError as te:
+        logger.warning("Arquivo muito grande rejeitado: %s (%s)", file.filename, te, extra={"image_filename": file.filename})
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(te)
+        )
     except ValueError as ve: # Captura erros específicos do serviço, como formato de imagem
-        logger.error(f"Erro de validação no serviço para {file.filename}: {ve}")
+        logger.error("Erro de validação no serviço para %s: %s", file.filename, ve, extra={"image_filename": file.filename})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(ve)
         )
     except RuntimeError as re: # Captura erros internos do serviço (ex: falha do modelo)
-        logger.error(f"Erro de runtime no serviço para {file.filename}: {re}", exc_info=True)
+        logger.error("Erro de runtime no serviço para %s: %s", file.filename, re, exc_info=True,
+                     extra={"image_filename": file.filename})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ocorreu um erro interno no serviço de análise. Detalhe: {re}"
         )
     except Exception as e:
-        logger.error(f"Erro inesperado ao processar imagem {file.filename}: {e}", exc_info=True)
+        logger.error("Erro inesperado ao processar imagem %s: %s", file.filename, e, exc_info=True,
+                     extra={"image_filename": file.filename})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ocorreu um erro interno desconhecido ao processar a imagem. Detalhe: {e}"
         )
 
+
+async def collect_uploaded_images(files: List[UploadFile]) -> Tuple[List[Tuple[bytes, str]], List[Tuple[int, str, str]]]:
+    """
+    Lê os arquivos de um lote: arquivos zip/tar são expandidos em suas imagens, e arquivos que
+    não são imagens (ou grandes demais) são rejeitados individualmente, sem falhar o lote.
+
+    Returns:
+        As imagens (dados, nome do arquivo) e os arquivos rejeitados (posição, nome do arquivo, erro).
+
+    Raises:
+        HTTPException: 413/400 para arquivos compactados grandes demais no total ou inválidos, ou
+            lotes grandes demais. Uma imagem grande demais dentro de um arquivo compactado é
+            rejeitada individualmente, como um arquivo avulso.
+    """
+    settings = get_settings()
+    images: List[Tuple[bytes, str]] = []
+    rejected: List[Tuple[int, str, str]] = []  # (posição, nome do arquivo, erro)
+    for file in files:
+        if is_archive(file.filename, file.content_type):
+            try:
+                with stage_timer("upload_read"):
+                    data = await read_upload(file, settings.MAX_REQUEST_BYTES)
+                members = extract_archive_members(data, file.filename, settings.BATCH_MAX_FILES, settings.MAX_UPLOAD_BYTES,
+                                                  settings.MAX_ARCHIVE_EXTRACTED_BYTES)
+            except UploadTooLargeError as te:
+                logger.warning("Arquivo compactado muito grande %s: %s", file.filename, te)
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(te))
+            except ValueError as ve:
+                logger.warning("Arquivo compactado inválido %s: %s", file.filename, ve)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+            for member_name, member_data in members:
+                if isinstance(member_data, UploadTooLargeError):
+                    logger.warning("Imagem muito grande no arquivo compactado %s: %s", file.filename, member_name)
+                    rejected.append((len(images) + len(rejected), member_name, str(member_data)))
+                else:
+                    images.append((member_data, member_name))
+        elif not file.content_type or not file.content_type.startswith("image/"):
+            logger.warning("Tipo de arquivo inválido no lote: %s para %s", file.content_type, file.filename)
+            rejected.append((len(images) + len(rejected), file.filename, "Invalid file type. Please upload an image or a zip/tar archive."))
+        else:
+            try:
+                with stage_timer("upload_read"):
+                    images.append((await read_upload(file, settings.MAX_UPLOAD_BYTES), file.filename))
+            except UploadTooLargeError as te:
+                logger.warning("Imagem muito grande no lote: %s", file.filename)
+                rejected.append((len(images) + len(rejected), file.filename, str(te)))
+
+        if len(images) + len(rejected) > settings.BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many images in batch. The maximum is {settings.BATCH_MAX_FILES}."
+            )
+    return images, rejected
+
+
+@router.post(
+    "/analyze/batch",
+    response_model=BatchImageAnalysisResponse,
+    status_code=status.HTTP_200_OK,
+    responses=_ALTERNATIVE_FORMATS,
+    summary="Analisa várias imagens (ou um arquivo zip/tar) em lote.",
+    description="Recebe várias imagens e/ou arquivos zip/tar (multipart/form-data), processa todas em lotes de inferência e retorna um resultado por imagem. Uma imagem corrompida gera apenas um erro no seu próprio item, sem falhar o lote inteiro."
+)
+async def analyze_images_batch_endpoint(
+    request: Request,
+    files: List[UploadFile] = File(..., description="Os arquivos de imagem (JPEG, PNG) e/ou arquivos zip/tar com imagens."),
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance)
+) -> BatchImageAnalysisResponse:
+    """
+    Endpoint para análise de imagens em lote.
+    Arquivos zip/tar são expandidos; cada imagem vira um item da resposta, na ordem de envio.
+    """
+    logger.debug("Requisição POST /api/v1/analyze/batch recebida com %d arquivo(s).", len(files))
+    images, rejected = await collect_uploaded_images(files)
+
+    try:
+        with get_admission_controller().admit(get_client_id(request), cost=len(images)) as ticket:
+            analyzed = await image_analysis_service.analyze_images(images, mode=ticket.mode)
+    except AdmissionRejectedError as ae:
+        logger.warning("Lote com %d imagens rejeitado pelo controle de admissão (%d).", len(images), ae.status_code)
+        raise _rejection(ae)
+    except ExecutorSaturatedError as se:
+        logger.warning("Workers saturados; lote com %d imagens rejeitado.", len(images))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(se),
+            headers={"Retry-After": str(se.retry_after)}
+        )
+    except Exception as e:
+        logger.error("Erro inesperado ao processar lote de imagens: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ocorreu um erro interno desconhecido ao processar o lote. Detalhe: {e}"
+        )
+
+    from backend.src.services.image_analysis import build_batch_response
+    response = build_batch_response(analyzed, rejected)
+    logger.info("Análise em lote concluída: %d/%d imagens com sucesso.", response.succeeded, response.total,
+                extra={"num_images": response.total, "succeeded": response.succeeded})
+    return _model_response(request, response, ticket)
+
+
+@router.post(
+    "/analyze/url",
+    response_model=ImageAnalysisResponse,
+    status_code=status.HTTP_200_OK,
+    responses=_ALTERNATIVE_FORMATS,
+    summary="Baixa uma imagem a partir de uma URL e retorna tags e confianças.",
+    description="Recebe a URL da imagem (http(s)://, s3:// ou file://) em JSON, em vez dos bytes da imagem. O download usa um pool de conexões compartilhado, com limite de tamanho (MAX_UPLOAD_BYTES); uma URL já analisada é pedida de novo com If-None-Match, e uma resposta 304 é atendida pelo cache de resultados."
+)
+async def analyze_url_endpoint(
+    request: Request,
+    body: ImageAnalysisRequest,
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance)
+) -> ImageAnalysisResponse:
+    """
+    Endpoint para análise de imagem por URL.
+    Erros de download viram 400 (URL inválida ou não permitida), 413 (imagem grande demais),
+    502 (falha da origem) ou 504 (tempo esgotado).
+    """
+    from backend.src.services.fetching import FetchError
+
+    logger.debug("Requisição POST /api/v1/analyze/url recebida para: %s", body.url)
+    try:
+        # Só a análise conta como carga dos workers, não o download (uma origem lenta não gera rejeições)
+        admission = get_admission_controller()
+        with admission.admit(get_client_id(request), count_load=False) as ticket:
+            response = await image_analysis_service.analyze_url(body.url, body.filename, mode=ticket.mode,
+                                                                serving=admission.serving)
+            if response is None:
+                raise ticket.overloaded()
+        logger.info("Análise de %s concluída com sucesso.", body.url,
+                    extra={"image_url": body.url, "image_id": response.image_id, "mode": ticket.mode})
+        return _model_response(request, response, ticket)
+    except AdmissionRejectedError as ae:
+        logger.warning("Requisição para %s rejeitada pelo controle de admissão (%d).", body.url, ae.status_code)
+        raise _rejection(ae)
+    except ExecutorSaturatedError as se:
+        logger.warning("Workers saturados; requisição para %s rejeitada.", body.url)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(se),
+            headers={"Retry-After": str(se.retry_after)}
+        )
+    except FetchError as fe:
+        logger.warning("Falha ao buscar a imagem %s: %s", body.url, fe, extra={"image_url": body.url})
+        raise HTTPException(status_code=fe.status_code, detail=str(fe))
+    except UploadTooLargeError as te:
+        logger.warning("Imagem muito grande rejeitada: %s (%s)", body.url, te, extra={"image_url": body.url})
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(te))
+    except ValueError as ve:
+        logger.error("Erro de validação no serviço para %s: %s", body.url, ve, extra={"image_url": body.url})
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except Exception as e:
+        logger.error("Erro inesperado ao processar imagem %s: %s", body.url, e, exc_info=True,
+                     extra={"image_url": body.url})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ocorreu um erro interno no serviço de análise. Detalhe: {e}"
+        )
+
+
+@router.post(
+    "/analyze/url/batch",
+    response_model=BatchImageAnalysisResponse,
+    status_code=status.HTTP_200_OK,
+    responses=_ALTERNATIVE_FORMATS,
+    summary="Baixa e analisa várias imagens a partir de suas URLs.",
+    description="Recebe uma lista de URLs em JSON. As imagens são baixadas em paralelo (com limite de conexões por host) enquanto as já baixadas são analisadas em lotes. Uma URL que falha gera apenas um erro no seu próprio item."
+)
+async def analyze_urls_batch_endpoint(
+    request: Request,
+    body: BatchUrlAnalysisRequest,
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance)
+) -> BatchImageAnalysisResponse:
+    """
+    Endpoint para análise em lote por URL; cada URL vira um item da resposta, na ordem de envio.
+    """
+    logger.debug("Requisição POST /api/v1/analyze/url/batch recebida com %d URL(s).", len(body.urls))
+    if len(body.urls) > get_settings().BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many images in batch. The maximum is {get_settings().BATCH_MAX_FILES}."
+        )
+
+    try:
+        # Só a análise de cada lote baixado conta como carga dos workers, não os downloads
+        admission = get_admission_controller()
+        with admission.admit(get_client_id(request), cost=len(body.urls), count_load=False) as ticket:
+            analyzed = await image_analysis_service.analyze_urls(body.urls, mode=ticket.mode, serving=admission.serving)
+    except AdmissionRejectedError as ae:
+        logger.warning("Lote com %d URLs rejeitado pelo controle de admissão (%d).", len(body.urls), ae.status_code)
+        raise _rejection(ae)
+    except ExecutorSaturatedError as se:
+        logger.warning("Workers saturados; lote com %d URLs rejeitado.", len(body.urls))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(se),
+            headers={"Retry-After": str(se.retry_after)}
+        )
+    except Exception as e:
+        logger.error("Erro inesperado ao processar lote de URLs: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ocorreu um erro interno desconhecido ao processar o lote. Detalhe: {e}"
+        )
+
+    from backend.src.services.image_analysis import build_batch_response
+    response = build_batch_response(analyzed, [])
+    logger.info("Análise em lote por URL concluída: %d/%d imagens com sucesso.", response.succeeded, response.total,
+                extra={"num_images": response.total, "succeeded": response.succeeded})
+    return _model_response(request, response, ticket)
@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from typing import List, Literal, Optional
+import asyncio
+import logging
+import time
+
+from backend.src.core.config import get_settings
+from backend.src.core.responses import ModelResponse
+from backend.src.models.image import JobResponse
+from backend.src.api.v1.endpoints.analyze import collect_uploaded_images, get_image_analysis_service_instance
+from backend.src.services.jobs import JobQueue, JobWorker, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def get_job_worker_instance(request: Request) -> Optional[JobWorker]:
+    """
+    Retorna o worker de jobs criado no startup da aplicação (lifespan), ou None se JOBS_ENABLED
+    estiver desligado. Sem o lifespan, o worker é criado e iniciado no primeiro uso.
+    """
+    if not get_settings().JOBS_ENABLED:
+        return None
+    worker = getattr(request.app.state, "job_worker", None)
+    if worker is None:
+        logger.info("Worker de jobs não encontrado no estado da aplicação; criando instância compartilhada.")
+        worker = create_job_worker(get_image_analysis_service_instance(request))
+        request.app.state.job_worker = worker
+    worker.start()
+    return worker
+
+
+def create_job_worker(service) -> JobWorker:
+    settings = get_settings()
+    return JobWorker(
+        get_job_queue(), service,
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        interactive_workers=settings.JOB_INTERACTIVE_WORKERS,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        retry_delay=settings.EXECUTOR_RETRY_AFTER_SECONDS,
+        result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS,
+    )
+
+
+def _get_job_or_404(queue: JobQueue, job_id: str):
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+@router.post(
+    "/jobs",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Enfileira a análise de uma ou mais imagens (ou arquivos zip/tar) e retorna o id do job.",
+    description="Para imagens grandes e lotes longos: a requisição retorna imediatamente com o id do job, e o resultado é obtido em GET /api/v1/jobs/{job_id} (com long-poll opcional). Jobs 'interactive' são sempre processados antes dos jobs 'bulk'."
+)
+async def create_job_endpoint(
+    files: List[UploadFile] = File(..., description="Os arquivos de imagem (JPEG, PNG) e/ou arquivos zip/tar com imagens."),
+    priority: Optional[Literal["interactive", "bulk"]] = Query(
+        None, description="Prioridade na fila. Padrão: 'interactive' para uma única imagem, 'bulk' para lotes."),
+    worker: Optional[JobWorker] = Depends(get_job_worker_instance),
+) -> JobResponse:
+    """
+    Endpoint de criação de jobs.
+    As imagens são gravadas na fila durável; um worker as analisa em segundo plano.
+    """
+    images, rejected = await collect_uploaded_images(files)
+    if not images and not rejected:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No images to analyze.")
+    if priority is None:
+        priority = "interactive" if len(images) + len(rejected) == 1 else "bulk"
+
+    job = await asyncio.to_thread(get_job_queue().enqueue, images, rejected, priority)
+    if worker is not None:
+        worker.notify()
+    logger.info("Job %s enfileirado (%d imagens, prioridade %s).", job.job_id, job.num_images, priority,
+                extra={"job_id": job.job_id, "num_images": job.num_images, "priority": priority})
+    return ModelResponse(job.to_json(), status_code=status.HTTP_202_ACCEPTED,
+                         headers={"Location": f"/api/v1/jobs/{job.job_id}"})
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    summary="Retorna o estado e, quando concluído, o resultado de um job.",
+    description="Com `wait`, a requisição aguarda até `wait` segundos (long-poll) que o job termine antes de responder."
+)
+async def get_job_endpoint(
+    job_id: str,
+    wait: float = Query(0.0, ge=0.0, description="Segundos a aguardar a conclusão do job (limitado por JOB_MAX_WAIT_SECONDS)."),
+    worker: Optional[JobWorker] = Depends(get_job_worker_instance),
+) -> JobResponse:
+    """
+    Endpoint de consulta de jobs.
+    """
+    settings = get_settings()
+    queue = get_job_queue()
+    deadline = time.monotonic() + min(wait, settings.JOB_MAX_WAIT_SECONDS)
+    job = await asyncio.to_thread(_get_job_or_404, queue, job_id)
+    while not job.finished:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Woken up as soon as this process finishes the job; the poll interval covers other processes
+        timeout = min(remaining, settings.JOB_POLL_INTERVAL_SECONDS)
+        if worker is not None:
+            await worker.wait_for(job_id, timeout)
+        else:
+            await asyncio.sleep(timeout)
+        job = await asyncio.to_thread(_get_job_or_404, queue, job_id)
+    return ModelResponse(job.to_json())
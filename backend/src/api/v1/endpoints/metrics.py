@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict
+import logging
+
+from backend.src.core.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Retorna as métricas internas do serviço (filas, lotes, latências).",
+    description="Retorna um snapshot JSON de todos os contadores, gauges e histogramas registrados, como profundidade da fila de lotes, distribuição do tamanho dos lotes e tempo de espera."
+)
+async def get_metrics_endpoint() -> Dict[str, Dict[str, Any]]:
+    """
+    Endpoint com o snapshot das métricas do processo.
+    """
+    return get_metrics_registry().snapshot()
+
+
+# Rota no formato Prometheus, montada na raiz da aplicação (/metrics), onde os scrapers a procuram por padrão
+prometheus_router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@prometheus_router.get(
+    "/metrics",
+    include_in_schema=False,
+    response_class=PlainTextResponse,
+)
+async def get_prometheus_metrics_endpoint() -> PlainTextResponse:
+    """
+    Endpoint com as métricas do processo no formato de exposição de texto do Prometheus.
+    """
+    return PlainTextResponse(get_metrics_registry().render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, Optional
+import logging
+
+from backend.src.core.config import get_settings
+from backend.src.core.profiler import get_profiler, sync_profiler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def require_profiler_endpoint() -> None:
+    """
+    As rotas do profiler expõem stacks internas: só existem com PROFILER_ENDPOINT_ENABLED=True.
+    """
+    if not get_settings().PROFILER_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+def _profiler_status() -> Dict[str, Any]:
+    profiler = get_profiler()
+    return {
+        "enabled": get_settings().PROFILER_ENABLED,
+        "running": profiler.running,
+        "interval_ms": profiler.interval_seconds * 1000,
+        "samples": profiler.samples.value,
+    }
+
+
+@router.get(
+    "/profiler",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_profiler_endpoint)],
+    summary="Retorna as stacks amostradas pelo profiler (formato 'collapsed' para flame graphs).",
+)
+async def get_profile_endpoint(limit: Optional[int] = Query(None, ge=1, description="Número máximo de stacks.")) -> PlainTextResponse:
+    return PlainTextResponse(get_profiler().collapsed(limit))
+
+
+@router.put(
+    "/profiler",
+    dependencies=[Depends(require_profiler_endpoint)],
+    summary="Liga ou desliga o profiler de amostragem em tempo de execução.",
+)
+async def toggle_profiler_endpoint(
+    enabled: bool = Query(..., description="Liga (true) ou desliga (false) a amostragem."),
+    interval_ms: Optional[float] = Query(None, gt=0, description="Intervalo entre amostras, em milissegundos."),
+) -> Dict[str, Any]:
+    settings = get_settings()
+    settings.PROFILER_ENABLED = enabled
+    if interval_ms is not None:
+        settings.PROFILER_INTERVAL_MS = interval_ms
+    sync_profiler()
+    logger.info(f"Profiler {'ligado' if enabled else 'desligado'} em tempo de execução.")
+    return _profiler_status()
+
+
+@router.delete(
+    "/profiler",
+    dependencies=[Depends(require_profiler_endpoint)],
+    summary="Descarta as stacks amostradas até agora.",
+)
+async def reset_profiler_endpoint() -> Dict[str, Any]:
+    get_profiler().reset()
+    return _profiler_status()
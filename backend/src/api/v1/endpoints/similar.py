@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import logging
+
+from backend.src.core.config import get_settings
+from backend.src.core.responses import ModelResponse
+from backend.src.models.image import SimilarImage, SimilarImagesResponse
+from backend.src.utils.file_utils import read_upload, UploadTooLargeError
+from backend.src.services.executor import ExecutorSaturatedError
+from backend.src.api.v1.endpoints.analyze import get_image_analysis_service_instance
+
+if TYPE_CHECKING:
+    from backend.src.services.image_analysis import ImageAnalysisService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def require_embedding_store() -> None:
+    """
+    A busca por similaridade usa os embeddings guardados na análise: só existe com
+    EMBEDDING_STORE_ENABLED=True (e ZERO_SHOT_ENABLED=True, que produz os embeddings).
+    """
+    settings = get_settings()
+    if not (settings.EMBEDDING_STORE_ENABLED and settings.ZERO_SHOT_ENABLED):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+def _similar_response(query: str, results: List[Tuple[str, float]]) -> ModelResponse:
+    return ModelResponse(SimilarImagesResponse(
+        query=query, results=[SimilarImage(image_id=image_id, score=score) for image_id, score in results]))
+
+
+async def _search(service: "ImageAnalysisService", query: str, k: int, **kwargs) -> ModelResponse:
+    k = min(k, get_settings().SIMILAR_MAX_RESULTS)
+    try:
+        results = await service.find_similar(k, **kwargs)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Image '{kwargs['image_id']}' not found in the embedding store.")
+    except ExecutorSaturatedError as se: # Workers ocupados: o cliente deve tentar novamente
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(se),
+                            headers={"Retry-After": str(se.retry_after)})
+    except ValueError as ve: # Imagem inválida
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    logger.info("Busca por similaridade (%s) retornou %d imagens.", query, len(results),
+                extra={"query": query, "num_results": len(results)})
+    return _similar_response(query, results)
+
+
+@router.get(
+    "/similar",
+    response_model=SimilarImagesResponse,
+    dependencies=[Depends(require_embedding_store)],
+    summary="Busca as imagens já analisadas mais parecidas com um texto ou com uma imagem já analisada.",
+    description="Informe exatamente um de `text` (busca texto-imagem) ou `image_id` (o id retornado pela análise). A similaridade é o cosseno entre os embeddings do modelo zero-shot."
+)
+async def similar_images_endpoint(
+    text: Optional[str] = Query(None, min_length=1, description="Descrição das imagens procuradas."),
+    image_id: Optional[str] = Query(None, description="Id de uma imagem já analisada."),
+    k: int = Query(10, ge=1, description="Número de imagens retornadas (limitado por SIMILAR_MAX_RESULTS)."),
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance),
+) -> SimilarImagesResponse:
+    """
+    Endpoint de busca por similaridade (texto ou imagem já armazenada).
+    """
+    if (text is None) == (image_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide exactly one of 'text' or 'image_id'.")
+    if text is not None:
+        return await _search(image_analysis_service, "text", k, text=text)
+    return await _search(image_analysis_service, "image_id", k, image_id=image_id)
+
+
+@router.post(
+    "/similar",
+    response_model=SimilarImagesResponse,
+    dependencies=[Depends(require_embedding_store)],
+    summary="Busca as imagens já analisadas mais parecidas com uma imagem enviada.",
+    description="A imagem enviada não é analisada nem armazenada; se ela já estiver armazenada, não aparece nos resultados."
+)
+async def similar_to_upload_endpoint(
+    file: UploadFile = File(..., description="A imagem de consulta (JPEG, PNG)."),
+    k: int = Query(10, ge=1, description="Número de imagens retornadas (limitado por SIMILAR_MAX_RESULTS)."),
+    image_analysis_service: "ImageAnalysisService" = Depends(get_image_analysis_service_instance),
+) -> SimilarImagesResponse:
+    """
+    Endpoint de busca por similaridade com uma imagem enviada.
+    """
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Tipo de arquivo inválido. Por favor, envie uma imagem (ex: JPEG, PNG, JPEG).")
+    try:
+        image_data = await read_upload(file, get_settings().MAX_UPLOAD_BYTES)
+    except UploadTooLargeError as te:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(te))
+    return await _search(image_analysis_service, "image", k, image_data=image_data)
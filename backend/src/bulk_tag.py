@@ -0,0 +1,307 @@
+"""
+Bulk tagging of a directory tree or a manifest of image paths, without going through HTTP.
+
+Images stream through read -> decode -> batched inference -> write: files are read ahead by
+I/O threads, decoded and tagged by ImageAnalysisService on a process pool (one worker per core
+by default), and several batches are in flight at once so reading, decoding and inference
+overlap. Results are appended to a JSONL file (or Parquet parts) as batches finish.
+
+Every finished path (tagged or failed) is appended to a checkpoint file next to the output once
+its results are flushed, so an interrupted run resumes where it stopped: re-run the same command
+and the checkpointed paths are skipped. A crash between a write and its checkpoint can repeat
+that batch in the output (results are at-least-once; `path` identifies the row).
+
+Usage:
+    python -m backend.src.bulk_tag /data/catalog --output tags.jsonl
+    python -m backend.src.bulk_tag manifest.txt --output tags.parquet --format parquet --workers 8
+"""
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from backend.src.core.config import get_settings
+from backend.src.core.logging_config import configure_logging, shutdown_logging
+from backend.src.models.image import BatchImageAnalysisItem
+from backend.src.services.executor import ExecutorSaturatedError
+from backend.src.services.image_analysis import ImageAnalysisService
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+T = TypeVar("T")
+
+
+def iter_image_paths(source: str) -> Iterator[str]:
+    """
+    Yields the image files under a directory (recursively, in a stable order), or the paths
+    listed in a manifest file: one path per line, or JSON lines with a "path" field. Relative
+    manifest paths are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            yield path if os.path.isabs(path) else os.path.join(base, path)
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def _read_file(path: str) -> Tuple[str, Optional[bytes], Optional[str]]:
+    try:
+        with open(path, "rb") as f:
+            return path, f.read(), None
+    except OSError as e:
+        return path, None, f"Could not read file: {e}"
+
+
+async def read_files(paths: Iterable[str], prefetch: int) -> AsyncIterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Reads files in I/O threads, keeping up to `prefetch` reads in flight, in input order.
+    Yields (path, data, None), or (path, None, error) for unreadable files.
+    """
+    pending: Deque[asyncio.Future] = deque()
+    paths = iter(paths)
+    while True:
+        for path in islice(paths, max(1, prefetch) - len(pending)):
+            pending.append(asyncio.ensure_future(asyncio.to_thread(_read_file, path)))
+        if not pending:
+            return
+        yield await pending.popleft()
+
+
+async def chunked(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    chunk: List[T] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _record(path: str, item: BatchImageAnalysisItem) -> dict:
+    result = item.result
+    return {
+        "path": path,
+        "image_id": result.image_id if result else None,
+        "tags": [tag.model_dump() for tag in result.tags] if result else [],
+        "error": item.error,
+    }
+
+
+class JsonlWriter:
+    """
+    Appends one JSON object per image to the output file.
+    """
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: List[dict]) -> None:
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes one row group per batch. Parquet files cannot be appended to, so a resumed run
+    writes a new part next to the previous ones (`tags.parquet`, `tags.1.parquet`, ...).
+    """
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("--format parquet requires the 'pyarrow' package.") from e
+        self._pa = pa
+        stem, extension = os.path.splitext(path)
+        part, self.path = 0, path
+        while os.path.exists(self.path):
+            part += 1
+            self.path = f"{stem}.{part}{extension}"
+        tag = pa.struct([("name", pa.string()), ("confidence", pa.float64()), ("source_model", pa.string())])
+        self._schema = pa.schema([("path", pa.string()), ("image_id", pa.string()),
+                                  ("tags", pa.list_(tag)), ("error", pa.string())])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def write(self, records: List[dict]) -> None:
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class Progress:
+    """
+    Prints the throughput (overall and over the last interval) to stderr every `interval` seconds.
+    """
+    def __init__(self, interval: float, skipped: int, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.start = self._last_time = time.perf_counter()
+        self._last_done = 0
+
+    def update(self, done: int, failed: int) -> None:
+        self.done += done
+        self.failed += failed
+        now = time.perf_counter()
+        if now - self._last_time >= self.interval:
+            recent = (self.done - self._last_done) / (now - self._last_time)
+            print(f"{self.done} images tagged ({self.failed} failed, {self.skipped} skipped): "
+                  f"{self.images_per_second:.1f} images/s overall, {recent:.1f} images/s now", file=self.stream)
+            self._last_time, self._last_done = now, self.done
+
+    @property
+    def images_per_second(self) -> float:
+        return self.done / max(time.perf_counter() - self.start, 1e-9)
+
+    def summary(self) -> dict:
+        return {"tagged": self.done, "failed": self.failed, "skipped": self.skipped,
+                "seconds": round(time.perf_counter() - self.start, 3), "images_per_second": round(self.images_per_second, 2)}
+
+
+async def _analyze_chunk(service, chunk: List[Tuple[str, Optional[bytes], Optional[str]]]) -> List[dict]:
+    readable = [(data, path) for path, data, error in chunk if error is None]
+    while True:
+        try:
+            analyzed = await service.analyze_images(readable) if readable else []
+            break
+        except ExecutorSaturatedError as e:
+            await asyncio.sleep(e.retry_after)
+    results = iter(analyzed)
+    return [_record(path, next(results)) if error is None
+            else {"path": path, "image_id": None, "tags": [], "error": error}
+            for path, _, error in chunk]
+
+
+def default_chunks_in_flight() -> int:
+    return max(2, get_settings().EXECUTOR_MAX_WORKERS or os.cpu_count() or 1)
+
+
+async def bulk_tag(source: str, output: str, output_format: str = "jsonl", checkpoint: Optional[str] = None,
+                   chunk_size: int = 64, max_chunks_in_flight: int = 0, progress_interval: float = 5.0) -> dict:
+    """
+    Tags every image of `source` (directory or manifest) not yet in the checkpoint, writing the
+    results to `output` as batches finish. Returns a summary of the run.
+    """
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    finished = load_checkpoint(checkpoint)
+    max_chunks_in_flight = max_chunks_in_flight or default_chunks_in_flight()
+
+    skipped = 0
+
+    def pending_paths() -> Iterator[str]:
+        nonlocal skipped
+        for path in iter_image_paths(source):
+            if path in finished:
+                skipped += 1
+            else:
+                yield path
+
+    writer = ParquetWriter(output) if output_format == "parquet" else JsonlWriter(output)
+    progress = Progress(progress_interval, skipped=0)
+    service = ImageAnalysisService()
+    in_flight: Set[asyncio.Task] = set()
+
+    def finish(task: asyncio.Task) -> None:
+        records = task.result()
+        writer.write(records)
+        with open(checkpoint, "a", encoding="utf-8") as f:
+            f.write("".join(record["path"] + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        progress.skipped = skipped
+        progress.update(len(records), sum(1 for record in records if record["error"]))
+
+    try:
+        async for chunk in chunked(read_files(pending_paths(), prefetch=chunk_size * 2), chunk_size):
+            in_flight.add(asyncio.ensure_future(_analyze_chunk(service, chunk)))
+            if len(in_flight) >= max_chunks_in_flight:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finish(task)
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finish(task)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        writer.close()
+        await service.aclose()
+
+    progress.skipped = skipped
+    return {"output": getattr(writer, "path", output), **progress.summary()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory to walk, or manifest file (one path, or JSON with a 'path', per line).")
+    parser.add_argument("--output", required=True, help="Results file (appended to when resuming).")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl", help="Output format (parquet needs pyarrow).")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint).")
+    parser.add_argument("--executor", choices=("thread", "process"), default="process",
+                        help="Where decode and inference run (default: one process per core).")
+    parser.add_argument("--workers", type=int, default=0, help="Pool workers; 0 = one per CPU core.")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Images handed to the service at once.")
+    parser.add_argument("--chunks-in-flight", type=int, default=0, help="Chunks processed concurrently; 0 = one per worker.")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines.")
+    parser.add_argument("--verbose", action="store_true", help="Log every analysis (INFO).")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    settings.EXECUTOR_BACKEND = args.executor
+    settings.EXECUTOR_MAX_WORKERS = args.workers
+    # Enough pool capacity for every decode of the chunks in flight (they wait for a worker instead of failing)
+    chunks_in_flight = args.chunks_in_flight or default_chunks_in_flight()
+    settings.EXECUTOR_MAX_PENDING = max(settings.EXECUTOR_MAX_PENDING, args.chunk_size * (chunks_in_flight + 1))
+    # Every image is tagged once: a request-level batching delay would only add latency
+    settings.BATCHING_ENABLED = False
+    configure_logging(level="INFO" if args.verbose else "WARNING", log_format="text")
+    try:
+        summary = asyncio.run(bulk_tag(
+            args.source, args.output, args.format, args.checkpoint,
+            chunk_size=args.chunk_size, max_chunks_in_flight=chunks_in_flight,
+            progress_interval=args.progress_interval,
+        ))
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    finally:
+        shutdown_logging()
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Dict, Literal
 import os
 import logging
 
@@ -21,6 +22,149 @@ class Settings(BaseSettings):
     MIN_OVERALL_CONFIDENCE_FOR_TAG: float = 0.001 # General threshold for tags
     HIGH_CONFIDENCE_THRESHOLD_GENERAL: float = 0.6 # Threshold for general classifier
     MIN_CONFIDENT_TAGS_GENERAL: int = 2 # Minimum confident tags from general classifier
+    MIN_CONFIDENT_MARGIN_GENERAL: float = 0.3 # Or: top tag at HIGH_CONFIDENCE_THRESHOLD_GENERAL, this far ahead of the second (softmax classifiers)
+    CASCADE_ENABLED: bool = True # Run the zero-shot scorer only on images where the general classifier is not confident (above)
+    MAX_TAGS_PER_IMAGE: int = 5 # Tags returned per image
+    TAG_SYNONYMS_PATH: str = "" # JSON object mapping synonyms to canonical tags, e.g. {"puppy": "dog"}
+
+    # --- MODEL BACKEND SETTINGS ---
+    MODEL_BACKEND: str = "mock" # Registered backend: 'mock' (Vercel Free Tier), 'onnx' or 'torch'
+    MODEL_WARMUP_ON_STARTUP: bool = True # Load the model and run dummy inferences before serving requests
+    MODEL_NUM_THREADS: int = 0 # Intra-op threads of the model runtime; 0 = runtime default
+    ONNX_MODEL_PATH: str = "" # Image classifier exported to ONNX (used by MODEL_BACKEND='onnx')
+    ONNX_LABELS_PATH: str = "" # Text file with one label per line, in model output order
+    TORCH_MODEL_NAME: str = "google/vit-base-patch16-224" # Hugging Face model id (used by MODEL_BACKEND='torch')
+    # Cheaper variants, per backend name (e.g. {"onnx": "int8", "clip": "int8"}); compare them with benchmarks/bench_precision.py
+    MODEL_PRECISION: Dict[str, Literal["fp32", "int8"]] = {} # int8 = dynamic quantization of the linear (MatMul) weights
+    MODEL_SIZE: Dict[str, Literal["base", "small"]] = {} # small = the *_SMALL_MODEL_* model of the backend
+    TORCH_SMALL_MODEL_NAME: str = "facebook/deit-small-patch16-224" # Same ImageNet labels as the default model, ~4x fewer weights
+    ONNX_SMALL_MODEL_PATH: str = "" # Smaller classifier with the labels of ONNX_LABELS_PATH
+    CLIP_SMALL_MODEL_NAME: str = "" # Smaller CLIP-compatible encoder; empty = none
+    QUANTIZED_MODEL_DIR: str = "" # Where int8 copies of ONNX models are cached; empty = system temp directory
+
+    # --- BATCH ANALYSIS SETTINGS ---
+    MODEL_INPUT_SIZE: int = 224 # Square input resolution (pixels) expected by the models
+    MODEL_INPUT_CROP: bool = False # Resize the shorter side and center-crop, instead of squashing the whole image
+    INFERENCE_BATCH_SIZE: int = 16 # Max images stacked into a single inference call
+    BATCH_MAX_FILES: int = 256 # Max images accepted by /analyze/batch (after archive expansion)
+
+    # --- TILING SETTINGS ---
+    # Large images are also classified tile by tile (salient tiles only, in the same inference
+    # batch as the whole image), so small objects are not lost to the downscale
+    TILING_ENABLED: bool = False
+    TILING_MIN_MEGAPIXELS: float = 4.0 # Smaller images are only classified whole
+    TILING_MAX_SIDE: int = 1792 # Long side (pixels) large images are decoded at before tiling
+    TILE_SIZE: int = 448 # Tile side, in pixels of that decoded image; resized to the model input
+    TILE_OVERLAP: float = 0.25 # Fraction of a tile shared with each neighbour
+    TILING_MAX_TILES: int = 8 # Most salient tiles classified per image (bounds the compute)
+    TILE_MIN_SALIENCY: float = 0.5 # Tiles with less edge density than this fraction of the most salient tile are skipped
+    TILE_POOLING: Literal["max", "attention"] = "max" # How the tile scores are merged with those of the whole image
+
+    # --- UPLOAD LIMITS ---
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024 # Max size of a single image (upload or archive member)
+    MAX_REQUEST_BYTES: int = 512 * 1024 * 1024 # Max body size of batch requests (images and archives)
+    MAX_ARCHIVE_EXTRACTED_BYTES: int = 512 * 1024 * 1024 # Max total uncompressed size of the files of one archive
+
+    # --- URL INGESTION SETTINGS ---
+    # /analyze/url downloads images (http(s)://, s3://, file://) over one shared connection pool
+    FETCH_MAX_CONNECTIONS: int = 64 # Connections of the shared pool (all hosts)
+    FETCH_MAX_CONNECTIONS_PER_HOST: int = 8 # Downloads running at once against the same host
+    FETCH_TIMEOUT_SECONDS: float = 15.0 # Max duration of a single download; slower origins get a 504
+    FETCH_ALLOWED_HOSTS: str = "" # Comma-separated hosts images may be downloaded from; empty = any public host
+    FETCH_ALLOW_PRIVATE_ADDRESSES: bool = False # Also download from loopback, private and link-local addresses (SSRF risk on public endpoints)
+    FETCH_ALLOWED_DIRS: str = "" # Comma-separated directories file:// sources may read from; empty = no local files
+    FETCH_S3_ENDPOINT_URL: str = "" # S3-compatible endpoint of s3://bucket/key sources (anonymous, path-style); empty = disabled
+    FETCH_VALIDATOR_CACHE_SIZE: int = 10000 # ETags remembered, so unchanged URLs are answered by a 304 and the result cache
+
+    # --- REQUEST COALESCING SETTINGS ---
+    # Concurrent single-image requests are grouped into one inference call of up to INFERENCE_BATCH_SIZE images
+    BATCHING_ENABLED: bool = True # Coalesce concurrent /analyze requests into batched inference calls
+    BATCHING_MAX_WAIT_MS: float = 10.0 # Max time the first queued image waits for others to join its batch
+
+    # --- EXECUTION SETTINGS ---
+    # CPU-bound work (decode, resize, model forward passes) runs here instead of on the event loop
+    EXECUTOR_BACKEND: Literal["inline", "thread", "process"] = "thread"
+    EXECUTOR_MAX_WORKERS: int = 0 # Worker threads/processes; 0 = one per CPU core
+    EXECUTOR_MAX_PENDING: int = 64 # Max tasks running or queued; beyond that requests get a 503
+    EXECUTOR_RETRY_AFTER_SECONDS: int = 1 # Value of the Retry-After header sent with the 503
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS: float = 30.0 # On shutdown, how long to wait for in-flight analyses to finish
+
+    # --- ADMISSION CONTROL SETTINGS ---
+    # /analyze requests are admitted against their estimated queueing delay (images in flight x EWMA service time)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_QUEUE_DELAY_SLO_SECONDS: float = 2.0 # Beyond this estimated delay, requests are rejected (503) or degraded
+    ADMISSION_DEGRADE_MODE: Literal["reject", "fast", "cache_only"] = "reject" # 'fast' = skip zero-shot scoring; 'cache_only' = cached results only
+    ADMISSION_REJECT_FACTOR: float = 2.0 # 'fast' requests are still rejected beyond this multiple of the SLO
+    ADMISSION_EWMA_ALPHA: float = 0.2 # Weight of the latest request in the service-time average
+    ADMISSION_CLIENT_RATE: float = 0.0 # Images per second per client (token bucket refill); 0 = no per-client limit
+    ADMISSION_CLIENT_BURST: float = 32.0 # Images a client can send at once (token bucket size)
+    ADMISSION_CLIENT_HEADER: str = "X-Client-Id" # Header identifying the client (tenant); falls back to the client IP
+
+    # --- SERVER SETTINGS ---
+    # Pre-fork multi-process serving (python -m backend.src.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1 # Worker processes; 0 = one per CPU core
+    SERVER_PRELOAD_MODELS: bool = True # Load the models once in the master process and share them with the workers (copy-on-write)
+
+    # --- JOB QUEUE SETTINGS ---
+    # POST /api/v1/jobs enqueues analyses in a durable SQLite queue, processed in the background
+    JOBS_ENABLED: bool = False # Run the job worker in this process (jobs can still be enqueued when off)
+    JOB_QUEUE_PATH: str = "" # SQLite file of the queue; empty = system temp directory
+    JOB_WORKER_CONCURRENCY: int = 2 # Jobs processed at once by this process
+    JOB_INTERACTIVE_WORKERS: int = 1 # Of those, workers that only take interactive jobs (never blocked by bulk jobs)
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0 # How often idle workers check for jobs enqueued by other processes
+    JOB_LEASE_SECONDS: float = 300.0 # A job whose worker stopped renewing its lease for this long is picked up again
+    JOB_MAX_ATTEMPTS: int = 3 # Times a job is picked up before it is marked failed
+    JOB_MAX_WAIT_SECONDS: float = 30.0 # Max long-poll duration of GET /api/v1/jobs/{id}?wait=
+    JOB_RESULT_TTL_SECONDS: float = 86400.0 # Finished jobs are deleted after this long
+
+    # --- OBSERVABILITY SETTINGS ---
+    # Per-stage latencies are exported at /metrics (Prometheus) and in the Server-Timing header
+    PROFILER_ENABLED: bool = False # Sample the stacks of every thread (can be toggled at runtime)
+    PROFILER_INTERVAL_MS: float = 10.0 # Time between stack samples
+    PROFILER_ENDPOINT_ENABLED: bool = False # Expose /api/v1/profiler (stack dumps and runtime toggle)
+    # Logs are written by a background thread (records are only queued by the request)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json" # One JSON object per line, or plain text
+    LOG_SAMPLE_RATES: Dict[str, float] = {} # Fraction of INFO records kept per logger, e.g. {"backend.src.services.image_analysis": 0.01}
+
+    # --- RESULT CACHE SETTINGS ---
+    # Results are keyed by a hash of the image bytes plus the model/threshold configuration
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 10000 # Bound of the in-memory LRU tier
+    RESULT_CACHE_TTL_SECONDS: float = 3600.0 # Entry lifetime in both tiers; 0 = never expire
+    RESULT_CACHE_DISK_PATH: str = "" # SQLite file for the persistent tier; empty = memory only
+    RESULT_CACHE_DISK_MAX_ENTRIES: int = 1_000_000 # Bound of the SQLite tier (oldest rows pruned first); 0 = unbounded
+
+    # --- NEAR-DUPLICATE SETTINGS ---
+    # Re-encoded or resized copies of an analyzed image reuse its tags instead of re-running inference
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 4 # Max Hamming distance between 64-bit dHashes to count as a duplicate
+    NEAR_DUPLICATE_MAX_ENTRIES: int = 100000 # Hashes kept in the index (oldest are dropped first)
+
+    # --- ZERO-SHOT LABEL SETTINGS ---
+    # Images are also scored against a text label set (CLIP-style zero-shot tagging); the label
+    # embeddings are computed once per label set and persisted, not re-encoded per request
+    ZERO_SHOT_ENABLED: bool = False
+    ZERO_SHOT_BACKEND: str = "mock" # Backend producing the image/text embeddings ('mock' or 'clip')
+    ZERO_SHOT_TOP_K: int = 5 # Zero-shot labels kept per image
+    CLIP_MODEL_NAME: str = "openai/clip-vit-base-patch32"
+    LABEL_SET_PATH: str = "" # Text file with one label per line (reloaded when it changes); empty = built-in tags
+    LABEL_PROMPT_TEMPLATE: str = "a photo of {}." # Prompt each label is embedded with
+    LABEL_INDEX_DIR: str = "" # Where label embeddings are persisted; empty = system temp directory
+    LABEL_RELOAD_CHECK_SECONDS: float = 2.0 # Min interval between checks of the label set file for changes
+
+    # --- EMBEDDING STORE SETTINGS ---
+    # The zero-shot image embedding of every analyzed image is kept (memory-mapped, keyed by
+    # image_id) for /api/v1/similar; requires ZERO_SHOT_ENABLED
+    EMBEDDING_STORE_ENABLED: bool = False
+    EMBEDDING_STORE_DIR: str = "" # Where embeddings are persisted; empty = system temp directory
+    EMBEDDING_STORE_DTYPE: Literal["float16", "int8"] = "int8" # One scale per int8 vector; half the size of float16 and faster to scan
+    EMBEDDING_INDEX_NLIST: int = 1024 # IVF lists (k-means centroids); ~sqrt(number of vectors)
+    EMBEDDING_INDEX_TRAIN_SIZE: int = 40000 # Vectors stored before the IVF index is trained (exact search until then)
+    EMBEDDING_INDEX_NPROBE: int = 16 # IVF lists scanned per query (recall vs latency)
+    SIMILAR_MAX_RESULTS: int = 100 # Max `k` of /api/v1/similar
 
     model_config = SettingsConfigDict(env_file=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
 
@@ -40,5 +184,6 @@ def get_settings():
     logger.info(f"Configurações obtidas: DEBUG={settings.DEBUG}, "
                 f"MIN_OVERALL_CONFIDENCE_FOR_TAG={settings.MIN_OVERALL_CONFIDENCE_FOR_TAG}, "
                 f"HIGH_CONFIDENCE_THRESHOLD_GENERAL={settings.HIGH_CONFIDENCE_THRESHOLD_GENERAL}, "
-                f"MIN_CONFIDENT_TAGS_GENERAL={settings.MIN_CONFIDENT_TAGS_GENERAL}")
+                f"MIN_CONFIDENT_TAGS_GENERAL={settings.MIN_CONFIDENT_TAGS_GENERAL}, "
+                f"MIN_CONFIDENT_MARGIN_GENERAL={settings.MIN_CONFIDENT_MARGIN_GENERAL}")
     return settings
\ No newline at end of file
@@ -1,18 +1,75 @@
 from functools import lru_cache
+from typing import TYPE_CHECKING, Dict
 import logging
-# REMOVIDO: from transformers import AutoProcessor, CLIPModel 
-# REMOVIDO: import torch
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+
+if TYPE_CHECKING:
+    from backend.src.services.model_backends import ModelBackend
 
 logger = logging.getLogger(__name__)
 
-# REMOVIDO: CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"             
+
+@lru_cache()
+def get_model_backend() -> "ModelBackend":
+    """
+    Returns the model backend selected by Settings.MODEL_BACKEND ('mock', 'onnx' or 'torch').
+    The backend is created here but only loads its weights on first use or on warmup.
+    On the Vercel Free Tier the 'mock' backend is used, since real models exceed the size limits.
+    """
+    # Imported on first use, not when the application is imported: NumPy and the model
+    # runtimes stay out of the cold-start import path
+    from backend.src.services.model_backends import create_backend
+
+    settings = get_settings()
+    logger.info(f"Selecting model backend '{settings.MODEL_BACKEND}'.")
+    return create_backend(settings.MODEL_BACKEND, settings)
+
+
+@lru_cache()
+def get_zero_shot_backend() -> "ModelBackend":
+    """
+    Returns the backend that embeds images and label prompts for zero-shot tagging
+    (Settings.ZERO_SHOT_BACKEND). Shares the instance with get_model_backend when both are the same.
+    """
+    settings = get_settings()
+    if settings.ZERO_SHOT_BACKEND == settings.MODEL_BACKEND:
+        return get_model_backend()
+    from backend.src.services.model_backends import create_backend
+
+    logger.info(f"Selecting zero-shot backend '{settings.ZERO_SHOT_BACKEND}'.")
+    return create_backend(settings.ZERO_SHOT_BACKEND, settings)
+
+
+def warm_up_model_backend() -> Dict[str, float]:
+    """
+    Loads the selected model and runs dummy inferences, then reports the cold-start costs.
+    Called from the application startup hook (and by process-pool workers when they start).
+    """
+    backend = get_model_backend()
+    report = backend.warmup()
+
+    registry = get_metrics_registry()
+    registry.gauge("model_load_seconds", "Time spent loading the model weights.").set(report["load_seconds"])
+    registry.gauge("model_first_inference_seconds", "Latency of the first (cold) inference.").set(report["first_inference_seconds"])
+    registry.gauge("model_warm_inference_seconds", "Latency of an inference after warmup.").set(report["warm_inference_seconds"])
+    registry.gauge("model_memory_footprint_bytes", "Approximate memory held by the model weights.").set(report["memory_footprint_bytes"])
+
+    logger.info(f"Model backend '{backend.name}' cold-start report: "
+                f"load={report['load_seconds'] * 1000:.1f} ms, "
+                f"first inference={report['first_inference_seconds'] * 1000:.1f} ms, "
+                f"warm inference={report['warm_inference_seconds'] * 1000:.1f} ms, "
+                f"footprint={report['memory_footprint_bytes'] / 2 ** 20:.1f} MiB")
+    return report
+
 
 @lru_cache()
 def get_all_image_models_and_processors(): # Function name kept for compatibility
     """
-    This function now serves as a placeholder for where AI models would be loaded.
-    In this Vercel Free Tier deployment, actual AI inference is mocked due to size limits.
+    Returns the (model, processor) handles of the selected backend, loading it if needed.
+    Both are None for the 'mock' backend used in the Vercel Free Tier deployment.
     """
-    logger.info("AI models loading is skipped for Vercel Free Tier deployment due to size limits. Using mock inference.") 
-    # Return dummy objects or None, as they won't be used for actual inference
-    return None, None # Return None for model and processor
+    backend = get_model_backend()
+    backend.ensure_loaded()
+    return backend.model, backend.processor
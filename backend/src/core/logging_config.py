@@ -0,0 +1,165 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Mapping, Optional
+import atexit
+import datetime
+import json
+import logging
+import multiprocessing.util
+import queue
+import sys
+import threading
+
+from backend.src.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Attributes every LogRecord has; anything else on a record was passed with `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line: timestamp, level, logger and message, plus
+    the fields passed with `extra=` (e.g. `logger.info("Analysis completed", extra={"image_id": ...})`).
+    Values that are not JSON types are written with `str()`.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the INFO (and DEBUG) records of some loggers, so success-path
+    messages of hot code do not cost an I/O per request. WARNING and above always pass.
+
+    `rates` maps a logger name to the fraction of its records to keep; it also applies to
+    the logger's children unless they have their own rate. Sampling is deterministic: a rate
+    of 0.01 keeps the 1st, 101st, 201st... record of the logger.
+    """
+    def __init__(self, rates: Optional[Mapping[str, float]] = None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._periods: Dict[str, int] = {}  # logger name -> keep one record every N
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _period(self, name: str) -> int:
+        period = self._periods.get(name)
+        if period is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            period = 0 if rate <= 0 else max(1, round(1 / min(rate, 1.0)))
+            self._periods[name] = period
+        return period
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        period = self._period(record.name)
+        if period <= 1:
+            return period == 1
+        with self._lock:
+            count = self._counts.get(record.name, 0)
+            self._counts[record.name] = count + 1
+        return count % period == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues records as they are. The stock QueueHandler formats the message in the logging
+    thread (so the record can be pickled); here formatting and I/O both happen in the
+    listener thread, and the request only pays for creating the record.
+    Arguments passed to the logger must therefore not be mutated after the call.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                      sample_rates: Optional[Mapping[str, float]] = None,
+                      stream=None) -> QueueListener:
+    """
+    Routes the records of every logger through a non-blocking queue: the root logger only
+    enqueues them, and a listener thread formats them (JSON or text) and writes them to
+    `stream` (stderr by default). Arguments default to the LOG_* settings.
+
+    Calling it again replaces the previous configuration (the old listener is flushed first).
+    """
+    global _listener, _handler
+    settings = get_settings()
+    level = level or settings.LOG_LEVEL
+    log_format = log_format or settings.LOG_FORMAT
+    sample_rates = settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(SamplingFilter(sample_rates))
+    listener = QueueListener(records, output)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(handler)
+    listener.start()
+    _listener, _handler = listener, handler
+    return listener
+
+
+def shutdown_logging() -> None:
+    """
+    Detaches the queue handler and writes out the records still queued.
+    """
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_worker_logging() -> None:
+    """
+    Configures logging in a pool worker process. Forked workers inherit the queue handler of
+    the parent but not its listener thread, so their records would be queued and never
+    written: the inherited handler is dropped (without touching the parent's queue) and a
+    listener is started in the worker. Pool workers do not run atexit handlers, so the queue
+    is flushed by a multiprocessing finalizer instead.
+    """
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+    _listener = _handler = None
+    configure_logging()
+    multiprocessing.util.Finalize(None, shutdown_logging, exitpriority=10)
+
+
+atexit.register(shutdown_logging)
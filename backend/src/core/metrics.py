@@ -0,0 +1,188 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Any
+import bisect
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets, in seconds (1 ms .. 10 s)
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    Monotonically increasing value (e.g. number of cache hits).
+    """
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "counter", "description": self.description, "value": self._value}
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name} {_format_value(self._value)}"]
+
+
+class Gauge:
+    """
+    Value that can go up and down (e.g. current queue depth).
+    """
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "gauge", "description": self.description, "value": self._value}
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name} {_format_value(self._value)}"]
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed, cumulative-style upper bounds.
+    """
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets: List[float] = sorted(buckets)
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_counts(self) -> List[int]:
+        """
+        Returns the number of observations <= each bucket bound (the last entry is +Inf).
+        """
+        cumulative, total = [], 0
+        for bucket_count in self._counts:
+            total += bucket_count
+            cumulative.append(total)
+        return cumulative
+
+    def snapshot(self) -> Dict[str, Any]:
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "type": "histogram",
+            "description": self.description,
+            "count": self._count,
+            "sum": self._sum,
+            "buckets": dict(zip(bounds, self.cumulative_counts())),
+        }
+
+    def exposition(self) -> List[str]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        lines = [f'{self.name}_bucket{{le="{bound}"}} {count}' for bound, count in zip(bounds, self.cumulative_counts())]
+        lines.append(f"{self.name}_sum {_format_value(self._sum)}")
+        lines.append(f"{self.name}_count {self._count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of named metrics.
+    Getting a metric that already exists returns the same instance, so modules can
+    declare the metrics they use without coordinating with each other.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {type(metric).__name__}.")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets or DEFAULT_LATENCY_BUCKETS)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a JSON-serializable view of every registered metric.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+
+    def render_prometheus(self) -> str:
+        """
+        Renders every registered metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        lines = []
+        for name, metric in sorted(metrics.items()):
+            metric_type = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+
+@lru_cache()
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Returns the single process-wide metrics registry.
+    """
+    return MetricsRegistry()
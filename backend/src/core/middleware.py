@@ -0,0 +1,51 @@
+from typing import Dict, Optional
+import logging
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies above a size limit before they are buffered or parsed.
+
+    Requests announcing a larger Content-Length are answered with 413 right away. Bodies
+    without (or with a lying) Content-Length are counted while streaming in, and the
+    request is aborted with 413 as soon as the limit is crossed.
+    """
+    def __init__(self, app: ASGIApp, default_limit: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"].rstrip("/"), self.default_limit)
+        detail = f"Request body too large. The maximum is {limit} bytes."
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                logger.warning(f"Rejecting {scope['path']}: Content-Length {int(value)} > {limit} bytes.")
+                response = JSONResponse({"detail": detail}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"Aborting {scope['path']}: streamed body exceeded {limit} bytes.")
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,123 @@
+from collections import Counter as StackCounter
+from functools import lru_cache
+from typing import Callable, Optional
+import os
+import sys
+import threading
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for a running server.
+
+    A background thread wakes up every `interval_seconds`, captures the stack of every other
+    thread (`sys._current_frames`) and counts identical stacks. `collapsed()` returns them in
+    the "collapsed stack" format read by flame graph tools (one `frame;frame;frame count` line
+    per stack). Nothing is captured while the profiler is stopped.
+
+    `should_run` is checked on every sample, so clearing the setting it reads stops sampling
+    without a call to `stop`.
+    """
+    def __init__(self, interval_seconds: float = 0.01, max_depth: int = 64,
+                 should_run: Optional[Callable[[], bool]] = None):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+        self.should_run = should_run or (lambda: True)
+        self._stacks: StackCounter = StackCounter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.samples = get_metrics_registry().counter("profiler_samples_total", "Stack samples taken by the sampling profiler.")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started (interval={self.interval_seconds * 1000:.1f} ms).")
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        logger.info("Sampling profiler stopped.")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+
+    def _format_frame(self, frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self) -> None:
+        own_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                frames.append(self._format_frame(frame))
+                frame = frame.f_back
+            frames.append(names.get(thread_id, f"thread-{thread_id}"))
+            stacks.append(";".join(reversed(frames)))
+        with self._lock:
+            self._stacks.update(stacks)
+        self.samples.inc()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            if not self.should_run():
+                logger.info("Sampling profiler disabled in settings; stopping.")
+                break
+            self._sample()
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """
+        Returns the captured stacks, most frequent first, in collapsed-stack format.
+        """
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+def sync_profiler() -> SamplingProfiler:
+    """
+    Starts or stops the process profiler to match Settings.PROFILER_ENABLED.
+    """
+    profiler = get_profiler()
+    settings = get_settings()
+    profiler.interval_seconds = settings.PROFILER_INTERVAL_MS / 1000.0
+    if settings.PROFILER_ENABLED:
+        profiler.start()
+    else:
+        profiler.stop()
+    return profiler
+
+
+@lru_cache()
+def get_profiler() -> SamplingProfiler:
+    """
+    Returns the process-wide sampling profiler (stopped until enabled in Settings).
+    """
+    settings = get_settings()
+    return SamplingProfiler(
+        interval_seconds=settings.PROFILER_INTERVAL_MS / 1000.0,
+        should_run=lambda: get_settings().PROFILER_ENABLED,
+    )
@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+import json
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from backend.src.models.image import BatchImageAnalysisResponse, ImageAnalysisResponse
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard json module is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is only offered when installed
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+# Same fields as the JSON response, but the tags of an image are parallel arrays
+# ({"name": [...], "confidence": [...], "source_model": [...]}) instead of one object per tag
+COMPACT_MEDIA_TYPE = "application/vnd.visual-tagger.compact+json"
+# The compact payload, in MessagePack
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+ResponseFormat = str  # 'json', 'compact' or 'msgpack'
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """
+    Returns the (media type, quality) pairs of an Accept header, in header order.
+    """
+    ranges = []
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_type.lower(), quality))
+    return ranges
+
+
+def negotiate_format(accept: Optional[str]) -> ResponseFormat:
+    """
+    Picks the response format preferred by an Accept header: 'compact' (COMPACT_MEDIA_TYPE),
+    'msgpack' (when the 'msgpack' package is installed) or 'json'. Anything else, including
+    a missing header or `*/*`, gets JSON.
+    """
+    if not accept:
+        return "json"
+    offered = {JSON_MEDIA_TYPE: "json", COMPACT_MEDIA_TYPE: "compact"}
+    if msgpack is not None:
+        offered.update((media_type, "msgpack") for media_type in MSGPACK_MEDIA_TYPES)
+    best, best_quality = "json", 0.0
+    for media_type, quality in _parse_accept(accept):
+        if media_type in offered and quality > best_quality:
+            best, best_quality = offered[media_type], quality
+    return best
+
+
+def compact_result(result: ImageAnalysisResponse) -> Dict[str, Any]:
+    tags = result.tags
+    return {
+        "image_id": result.image_id,
+        "filename": result.filename,
+        "tags": {
+            "name": [tag.name for tag in tags],
+            "confidence": [tag.confidence for tag in tags],
+            "source_model": [tag.source_model for tag in tags],
+        },
+        "message": result.message,
+    }
+
+
+def compact_payload(model: BaseModel) -> Dict[str, Any]:
+    """
+    Converts an analysis response (single or batch) into its compact form. Other models are
+    returned as plain dicts.
+    """
+    if isinstance(model, ImageAnalysisResponse):
+        return compact_result(model)
+    if isinstance(model, BatchImageAnalysisResponse):
+        return {
+            "items": [{"index": item.index, "filename": item.filename,
+                       "result": compact_result(item.result) if item.result is not None else None,
+                       "error": item.error} for item in model.items],
+            "total": model.total,
+            "succeeded": model.succeeded,
+            "failed": model.failed,
+        }
+    return model.model_dump(mode="json")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encodes a plain JSON-compatible payload, with orjson when installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ModelResponse(Response):
+    """
+    Response for models the service already built (and validated), or for their JSON already
+    encoded (bytes): models are encoded as they are, instead of going through FastAPI's
+    `response_model` round trip (dump to Python, validate again, encode with the standard json
+    module).
+
+    'json' uses pydantic-core's encoder, which is as fast as orjson on these models; the
+    'compact' and 'msgpack' payloads are plain dicts, encoded with orjson (when installed) or
+    msgpack.
+    """
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(self, content: Union[BaseModel, bytes], response_format: ResponseFormat = "json",
+                 status_code: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.response_format = response_format
+        media_type = {"compact": COMPACT_MEDIA_TYPE, "msgpack": MSGPACK_MEDIA_TYPES[0]}.get(response_format, JSON_MEDIA_TYPE)
+        super().__init__(content, status_code=status_code, headers=headers, media_type=media_type)
+
+    @classmethod
+    def negotiated(cls, content: BaseModel, accept: Optional[str], status_code: int = 200,
+                   headers: Optional[Dict[str, str]] = None) -> "ModelResponse":
+        """
+        Response in the format preferred by an Accept header (see negotiate_format), marked
+        `Vary: Accept` so shared caches keep one copy per format.
+        """
+        response = cls(content, negotiate_format(accept), status_code=status_code, headers=headers)
+        vary = [value.strip() for value in response.headers.get("vary", "").split(",") if value.strip()]
+        if not any(value.lower() in ("accept", "*") for value in vary):
+            response.headers["Vary"] = ", ".join(vary + ["Accept"])
+        return response
+
+    def render(self, content: Union[BaseModel, bytes]) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if self.response_format == "compact":
+            return dumps(compact_payload(content))
+        if self.response_format == "msgpack":
+            return msgpack.packb(compact_payload(content), use_bin_type=True)
+        return content.model_dump_json().encode("utf-8")
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stage durations (seconds) of the request being handled, for the Server-Timing header
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+_STAGE_DESCRIPTIONS = {
+    "upload_read": "Time spent reading the upload body.",
+    "fetch": "Time spent fetching an image from a URL, object store or file.",
+    "decode": "Latency of the decode/resize step.",
+    "inference": "Latency of a model inference call (one batch).",
+    "aggregation": "Latency of merging model scores into tags (one batch).",
+    "serialization": "Latency of encoding the response body.",
+}
+
+
+def record_stage(stage: str, seconds: float, observe: bool = True) -> None:
+    """
+    Records the duration of a pipeline stage in the `analysis_<stage>_seconds` histogram
+    and in the trace of the current request, if any.
+
+    Args:
+        observe (bool): Also record it in the histogram. False for request-side views of work
+            already recorded elsewhere (e.g. the wait for a coalesced inference batch).
+    """
+    if observe:
+        get_metrics_registry().histogram(f"analysis_{stage}_seconds", _STAGE_DESCRIPTIONS.get(stage, "")).observe(seconds)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Times the enclosed block as a pipeline stage (see `record_stage`).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+class TracingMiddleware:
+    """
+    Times every HTTP request (`http_request_seconds`) and reports the pipeline stages
+    recorded while handling it in a `Server-Timing` response header, e.g.
+    `Server-Timing: upload_read;dur=0.4, decode;dur=12.1, inference;dur=30.2`.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        registry = get_metrics_registry()
+        self.request_seconds = registry.histogram("http_request_seconds", "Latency of HTTP requests, until the response starts.")
+        self.requests_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled.")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: Dict[str, float] = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        self.requests_in_progress.inc()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                self.request_seconds.observe(elapsed)
+                headers = MutableHeaders(scope=message)
+                timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+                headers.append("Server-Timing", ", ".join(timings + [f"total;dur={elapsed * 1000:.1f}"]))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.requests_in_progress.dec()
+            _request_stages.reset(token)
@@ -1,20 +1,74 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI # Removed Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from backend.src.core.config import get_settings
+from backend.src.core.logging_config import configure_logging
+from backend.src.core.middleware import BodySizeLimitMiddleware
+from backend.src.core.profiler import get_profiler, sync_profiler
+from backend.src.core.tracing import TracingMiddleware
+from backend.src.core.dependencies import warm_up_model_backend
 from backend.src.api import api_router
+from backend.src.api.v1.endpoints.jobs import create_job_worker
+from backend.src.api.v1.endpoints.metrics import prometheus_router
+from backend.src.services.jobs import get_job_queue
+import asyncio
 import logging
 
-# Basic logging configuration for console output
-logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+# Structured (JSON) console logging, written by a background thread
+configure_logging()
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 logger.info("Starting FastAPI application...")
-logger.info(f"Loaded settings: APP_NAME='{settings.APP_NAME}', APP_VERSION='{settings.APP_VERSION}', DEBUG={settings.DEBUG}")
+logger.info("Loaded settings: APP_NAME='%s', APP_VERSION='%s', DEBUG=%s", settings.APP_NAME, settings.APP_VERSION, settings.DEBUG)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown hook.
+    On startup, warms up the model backend (so the first request does not pay the model load
+    and first-inference costs), creates the ImageAnalysisService shared by every request and
+    starts the background job worker.
+    On shutdown, waits for running jobs and in-flight analyses to finish, then releases the
+    worker pool, caches and job queue.
+
+    The analysis modules (NumPy, PIL, model runtimes) are imported here rather than at module
+    level, so importing the app (a serverless cold start) stays cheap.
+    """
+    from backend.src.services.image_analysis import ImageAnalysisService
+    from backend.src.services.label_index import warm_up_label_index
+
+    if settings.MODEL_WARMUP_ON_STARTUP:
+        logger.info("Warming up model backend '%s'...", settings.MODEL_BACKEND)
+        await asyncio.to_thread(warm_up_model_backend)
+    if settings.ZERO_SHOT_ENABLED:
+        # Encodes (or loads the persisted embeddings of) the label set before the first request
+        await asyncio.to_thread(warm_up_label_index)
+    app.state.image_analysis_service = ImageAnalysisService()
+    if settings.JOBS_ENABLED:
+        app.state.job_worker = create_job_worker(app.state.image_analysis_service)
+        app.state.job_worker.start()
+    sync_profiler()
+    yield
+    logger.info("Shutting down FastAPI application...")
+    worker = getattr(app.state, "job_worker", None)
+    if worker is not None:
+        # Running jobs get the drain timeout too; unfinished ones go back to the queue
+        del app.state.job_worker
+        await worker.aclose(timeout=settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+    service = app.state.image_analysis_service
+    del app.state.image_analysis_service
+    await service.aclose(timeout=settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+    if get_job_queue.cache_info().currsize:  # Only opened once jobs were used
+        get_job_queue().close()
+        get_job_queue.cache_clear()
+    get_profiler().stop()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     debug=settings.DEBUG,
@@ -33,6 +87,20 @@ app.add_middleware(
 )
 logger.info("CORS Middleware added successfully.")
 
+logger.info("Adding body size limit Middleware...")
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=settings.MAX_REQUEST_BYTES,
+    # Single-image uploads: the image itself plus room for the multipart envelope
+    path_limits={"/api/v1/analyze": settings.MAX_UPLOAD_BYTES + 64 * 1024},
+)
+logger.info("Body size limit Middleware added successfully.")
+
+logger.info("Adding tracing Middleware...")
+# Outermost middleware: times the whole request and reports its stages in the Server-Timing header
+app.add_middleware(TracingMiddleware)
+logger.info("Tracing Middleware added successfully.")
+
 @app.get("/", tags=["Root"])
 async def read_root():
     """
@@ -54,5 +122,6 @@ if settings.DEBUG:
 
 logger.info("Including main API router...")
 app.include_router(api_router)
+app.include_router(prometheus_router)
 logger.info("Main API router included successfully.")
 logger.info("FastAPI application configuration complete.")
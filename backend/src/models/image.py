@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class Tag(BaseModel):
     """
@@ -11,22 +11,31 @@ class Tag(BaseModel):
 
 class ImageAnalysisRequest(BaseModel):
     """
-    Model for the image analysis request.
-    Currently, we accept file upload. In the future, a URL may be added.
+    Model for the image analysis request by reference (POST /analyze/url).
+    Uploaded files are sent as multipart/form-data to /analyze instead.
     """
+    url: str = Field(..., min_length=1, description="Where to fetch the image from: an http(s):// URL, an s3://bucket/key object (see FETCH_S3_ENDPOINT_URL) or a file:// URL under FETCH_ALLOWED_DIRS.")
+    filename: Optional[str] = Field(None, description="Name reported in the response; defaults to the last path segment of the URL.")
+
     class Config:
         json_schema_extra = {
             "example": {
-                # "file": "binary_image_data",  # Example of file field
+                "url": "https://images.example.com/photos/my_image.jpg",
             }
         }
 
+class BatchUrlAnalysisRequest(BaseModel):
+    """
+    Model for the batch analysis request by reference (POST /analyze/url/batch).
+    """
+    urls: List[str] = Field(..., min_length=1, description="Image URLs (see ImageAnalysisRequest.url), analyzed in this order.")
+
 class ImageAnalysisResponse(BaseModel):
     """
     Model for the image analysis response.
     Contains a list of tags and an identifier for the image (if applicable).
     """
-    image_id: Optional[str] = Field(None, description="Unique ID for the analyzed image (if persisted).")
+    image_id: Optional[str] = Field(None, description="Deterministic ID for the analyzed image, derived from a hash of its content (identical uploads share the same ID).")
     filename: Optional[str] = Field(None, description="Original image file name.")
     tags: List[Tag] = Field(..., min_length=1, description="List of tags identified in the image with their respective confidence levels.")
     message: str = Field("Analysis completed successfully.", description="Analysis status message.")
@@ -44,3 +53,55 @@ class ImageAnalysisResponse(BaseModel):
                 "message": "Analysis completed successfully."
             }
         }
+
+
+class BatchImageAnalysisItem(BaseModel):
+    """
+    Result of a single image inside a batch analysis.
+    Exactly one of `result` or `error` is set, so one corrupt file does not fail the whole batch.
+    """
+    index: int = Field(..., ge=0, description="Position of the image in the submitted batch (after archive expansion).")
+    filename: Optional[str] = Field(None, description="Original image file name (or archive member name).")
+    result: Optional[ImageAnalysisResponse] = Field(None, description="Analysis result, when the image was processed successfully.")
+    error: Optional[str] = Field(None, description="Error message, when the image could not be processed.")
+
+class BatchImageAnalysisResponse(BaseModel):
+    """
+    Model for the batch image analysis response.
+    """
+    items: List[BatchImageAnalysisItem] = Field(..., description="Per-image results, in submission order.")
+    total: int = Field(..., ge=0, description="Number of images in the batch.")
+    succeeded: int = Field(..., ge=0, description="Number of images analyzed successfully.")
+    failed: int = Field(..., ge=0, description="Number of images that could not be analyzed.")
+
+
+class JobResponse(BaseModel):
+    """
+    State of an asynchronous analysis job (see POST /api/v1/jobs).
+    `result` is set once the job succeeded; `error` when it failed as a whole.
+    """
+    job_id: str = Field(..., description="Identifier to poll the job with.")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(..., description="Current state of the job.")
+    priority: Literal["interactive", "bulk"] = Field(..., description="Queue priority: interactive jobs are always picked before bulk ones.")
+    num_images: int = Field(..., ge=0, description="Number of images in the job (after archive expansion).")
+    created_at: float = Field(..., description="Enqueue time (Unix timestamp, seconds).")
+    started_at: Optional[float] = Field(None, description="Time a worker last picked the job up.")
+    finished_at: Optional[float] = Field(None, description="Time the job succeeded or failed.")
+    attempts: int = Field(0, ge=0, description="Times a worker picked the job up (more than one after a worker crash).")
+    result: Optional[BatchImageAnalysisResponse] = Field(None, description="Per-image results, when the job succeeded.")
+    error: Optional[str] = Field(None, description="Error message, when the job failed.")
+
+
+class SimilarImage(BaseModel):
+    """
+    A stored image returned by a similarity search.
+    """
+    image_id: str = Field(..., description="ID of the stored image (see ImageAnalysisResponse.image_id).")
+    score: float = Field(..., description="Cosine similarity between the image and the query embeddings (-1 to 1).")
+
+class SimilarImagesResponse(BaseModel):
+    """
+    Model for the similarity search response.
+    """
+    query: Literal["image", "text", "image_id"] = Field(..., description="Kind of query the results were searched with.")
+    results: List[SimilarImage] = Field(..., description="The most similar stored images, most similar first.")
@@ -0,0 +1,204 @@
+"""
+Pre-fork multi-process server: the models are loaded once and shared by every worker process.
+
+`uvicorn --workers N` starts N independent processes, each loading its own copy of the model
+weights (and label embeddings), so RAM limits how many workers fit on a node. Here the master
+process loads and warms up the models, then forks the workers, which inherit them: the weight
+pages stay shared (copy-on-write) as long as nobody writes to them, which inference does not.
+The label embeddings are memory-mapped files (see services.label_index), shared through the
+page cache in either mode.
+
+  - The workers share one listening socket, so the kernel spreads connections across them.
+  - The model runtimes' thread pools do not survive fork(): with MODEL_NUM_THREADS=0 every
+    process runs single-threaded inference (one worker per core is the intended layout), and
+    EXECUTOR_MAX_WORKERS=0 becomes one pool thread per worker's share of the cores.
+  - The GC is frozen before forking, so collections in the workers do not write to (and
+    un-share) the pages of the objects created at startup.
+  - Workers that die are restarted; SIGTERM/SIGINT stop every worker gracefully (each drains
+    its in-flight requests and jobs, see main.lifespan) before the master exits.
+  - Each worker has its own metrics registry and result cache memory tier; the job queue and
+    the result cache disk tier are shared SQLite files. The embedding store has a single
+    writer, so it cannot be enabled with more than one worker.
+
+Usage:
+    python -m backend.src.server --workers 4 --port 8000
+    python -m backend.src.server --workers 4 --no-preload  # Each worker loads its own models
+"""
+from typing import Dict, List, Optional
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+from backend.src.core.config import get_settings
+from backend.src.core.logging_config import configure_logging, shutdown_logging
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+
+def preload_models() -> None:
+    """
+    Loads and warms up the classifier, and the zero-shot backend and label index when enabled,
+    in this (the master) process.
+    """
+    from backend.src.core.dependencies import get_zero_shot_backend, warm_up_model_backend
+    from backend.src.services.label_index import warm_up_label_index
+
+    settings = get_settings()
+    warm_up_model_backend()
+    if settings.ZERO_SHOT_ENABLED:
+        get_zero_shot_backend().warmup()
+        warm_up_label_index()
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket) -> None:
+    """
+    Serves the application on the inherited socket until SIGTERM/SIGINT (in a forked worker).
+    """
+    import uvicorn
+
+    settings = get_settings()
+    config = uvicorn.Config(app, log_config=None, access_log=False, lifespan="on",
+                            timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkServer:
+    """
+    Master process: binds the socket, optionally preloads the models, then forks and
+    supervises `workers` worker processes.
+    """
+    def __init__(self, host: str, port: int, workers: int, preload: bool = True):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.children: Dict[int, int] = {}  # pid -> worker slot
+        self._stopping = False
+
+    def _spawn(self, app, slot: int, sock: socket.socket) -> int:
+        # The log writer thread does not survive fork(): flush it, then start one in each process
+        shutdown_logging()
+        # A stop signal received before the worker resets its handlers would run the master's
+        signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            self.children.clear()
+            for signum in _STOP_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+            # Own process group: a Ctrl+C reaches the master only, which stops the workers once
+            os.setpgid(0, 0)
+            configure_logging()
+            code = 0
+            try:
+                run_worker(app, sock)
+            except BaseException:
+                logger.exception("Worker %d crashed.", slot)
+                code = 1
+            finally:
+                shutdown_logging()
+                os._exit(code)
+        self.children[pid] = slot
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+        configure_logging()
+        logger.info("Started worker %d (pid %d).", slot, pid, extra={"worker": slot, "pid": pid})
+        return pid
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self) -> None:
+        settings = get_settings()
+        sock = bind_socket(self.host, self.port)
+        from backend.src.main import app  # Imported once, shared by the workers
+
+        if self.preload:
+            start = time.perf_counter()
+            preload_models()
+            logger.info("Models preloaded in the master process in %.2fs; forking %d workers.",
+                        time.perf_counter() - start, self.workers)
+        # Objects created so far are never collected (nor written to) by the workers' GC
+        gc.collect()
+        gc.freeze()
+
+        for signum in _STOP_SIGNALS:
+            signal.signal(signum, self._stop)
+        for slot in range(self.workers):
+            self._spawn(app, slot, sock)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            slot = self.children.pop(pid, None)
+            if slot is None or self._stopping:
+                continue
+            logger.warning("Worker %d (pid %d) exited with status %d; restarting it.", slot, pid, status,
+                           extra={"worker": slot, "pid": pid})
+            time.sleep(min(settings.EXECUTOR_RETRY_AFTER_SECONDS, 1))
+            self._spawn(app, slot, sock)
+        sock.close()
+        logger.info("All workers stopped.")
+
+
+def configure_worker_threads(workers: int) -> None:
+    """
+    Splits the cores between the worker processes: runtimes run single-threaded (their thread
+    pools do not survive fork), and each worker's decode pool gets its share of the cores.
+    """
+    settings = get_settings()
+    if not settings.MODEL_NUM_THREADS:
+        settings.MODEL_NUM_THREADS = 1
+    if not settings.EXECUTOR_MAX_WORKERS:
+        settings.EXECUTOR_MAX_WORKERS = max(1, (os.cpu_count() or 1) // workers)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="Worker processes; 0 = one per CPU core.")
+    parser.add_argument("--no-preload", dest="preload", action="store_false", default=settings.SERVER_PRELOAD_MODELS,
+                        help="Let every worker load its own models (as `uvicorn --workers` does).")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and settings.EMBEDDING_STORE_ENABLED:
+        raise SystemExit("EMBEDDING_STORE_ENABLED supports a single writer: run one worker, or disable it.")
+    configure_worker_threads(workers)
+    configure_logging()
+    logger.info("Starting %d workers on %s:%d (models %s).", workers, args.host, args.port,
+                "preloaded and shared" if args.preload else "loaded by each worker")
+    PreforkServer(args.host, args.port, workers, preload=args.preload).serve()
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator, Optional
+import math
+import time
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.services.executor import get_executor
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# What happens to requests beyond the SLO: rejected with 503, analyzed by the classifier only
+# (no zero-shot scoring), or answered from the result cache only
+DEGRADE_MODES = ("reject", "fast", "cache_only")
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Raised when a request is turned away before doing any work. `status_code` is the HTTP
+    status to answer with, `retry_after` the seconds the client should wait before retrying.
+    """
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientThrottledError(AdmissionRejectedError):
+    """
+    The client used up its token bucket.
+    """
+    status_code = 429
+
+
+class OverloadedError(AdmissionRejectedError):
+    """
+    The estimated queueing delay is beyond what the service level objective allows.
+    """
+    status_code = 503
+
+
+class TokenBucket:
+    """
+    Refills at `rate` tokens per second up to `burst`; a request costs one token per image.
+    """
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """
+        Takes `cost` tokens if available and returns 0, else returns the seconds until they are.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cost = min(cost, self.burst)  # A request larger than the bucket waits for a full bucket
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def give_back(self, cost: float) -> None:
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class ClientRateLimiter:
+    """
+    One token bucket per client, so a single tenant cannot monopolize the workers.
+    At most `max_clients` buckets are kept; the least recently seen clients are forgotten
+    first (a forgotten client starts again with a full bucket).
+    """
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def acquire(self, client: str, cost: float) -> float:
+        """
+        Returns 0 when the client may send `cost` images now, else the seconds to wait.
+        """
+        now = self.clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket.take(cost, now)
+
+    def refund(self, client: str, cost: float) -> None:
+        bucket = self._buckets.get(client)
+        if bucket is not None:
+            bucket.give_back(cost)
+
+
+class AdmissionTicket:
+    """
+    An admitted request: how it should be served (`mode`) and the queueing delay estimated
+    when it was admitted.
+    """
+    __slots__ = ("mode", "cost", "estimated_delay", "retry_after")
+
+    def __init__(self, mode: str, cost: int, estimated_delay: float, retry_after: int):
+        self.mode = mode
+        self.cost = cost
+        self.estimated_delay = estimated_delay
+        self.retry_after = retry_after
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode != "full"
+
+    def overloaded(self) -> OverloadedError:
+        """
+        The error to raise when a degraded request cannot be served (e.g. a cache-only miss).
+        """
+        return OverloadedError("The service is overloaded. Please retry later.", self.retry_after)
+
+
+class AdmissionController:
+    """
+    Admits, degrades or rejects analysis requests before they queue up for the workers.
+
+    The controller tracks the images in flight and an exponentially weighted moving average
+    (EWMA) of the service time per image. Service time is measured on a processor-sharing
+    clock: while `n` images are in flight on `capacity` workers, every image receives
+    `min(capacity, n) / n` seconds of work per second, whatever order the workers actually
+    serve them in. A request's service time is the advance of that clock over its lifetime,
+    so the time it spent queued behind others (including those admitted after it) is not
+    counted. The queueing delay of a new request of `cost` images is then estimated as the
+    work ahead of its last image divided by the capacity.
+
+    When that estimate exceeds `slo_seconds`, the request is rejected with OverloadedError,
+    or degraded when a `degrade_mode` is set: 'fast' requests skip the optional models (and
+    are still rejected beyond `reject_factor` x the SLO), 'cache_only' requests are answered
+    from the result cache only. Clients over their token bucket get ClientThrottledError first.
+    """
+    def __init__(self, capacity: int, slo_seconds: float, degrade_mode: str = "reject",
+                 reject_factor: float = 2.0, ewma_alpha: float = 0.2,
+                 rate_limiter: Optional[ClientRateLimiter] = None, min_retry_after: int = 1,
+                 enabled: bool = True, clock: Callable[[], float] = time.perf_counter):
+        if degrade_mode not in DEGRADE_MODES:
+            raise ValueError(f"Unknown degrade mode '{degrade_mode}'. Expected one of {DEGRADE_MODES}.")
+        self.capacity = max(1, capacity)
+        self.slo_seconds = slo_seconds
+        self.degrade_mode = degrade_mode
+        self.reject_factor = max(1.0, reject_factor)
+        self.ewma_alpha = ewma_alpha
+        self.rate_limiter = rate_limiter
+        self.min_retry_after = max(1, min_retry_after)
+        self.enabled = enabled
+        self.in_flight = 0
+        self.service_time: Optional[float] = None  # EWMA of the seconds of work per image
+        self.clock = clock
+        self._service_clock = 0.0  # Seconds of work every in-flight image has received (see above)
+        self._updated = clock()
+
+        registry = get_metrics_registry()
+        self.in_flight_gauge = registry.gauge("admission_in_flight_images", "Images of the admitted requests still being analyzed.")
+        self.service_time_gauge = registry.gauge("admission_service_time_seconds", "EWMA of the service time per image.")
+        self.queue_delay_gauge = registry.gauge("admission_estimated_queue_delay_seconds", "Queueing delay estimated at the last admission.")
+        self.throttled = registry.counter("admission_throttled_total", "Requests rejected with 429 (client over its rate limit).")
+        self.rejected = registry.counter("admission_rejected_total", "Requests rejected with 503 (estimated delay beyond the SLO).")
+        self.degraded = registry.counter("admission_degraded_total", "Requests served in a degraded mode.")
+
+    def estimated_queue_delay(self, cost: int = 1) -> float:
+        """
+        Seconds before the last image of a new request of `cost` images would start being served.
+        """
+        if self.service_time is None:
+            return 0.0
+        return max(0, self.in_flight + cost - self.capacity) * self.service_time / self.capacity
+
+    def _retry_after(self, seconds: float) -> int:
+        return max(self.min_retry_after, math.ceil(seconds))
+
+    @contextmanager
+    def admit(self, client: str, cost: int = 1, count_load: bool = True) -> Iterator[AdmissionTicket]:
+        """
+        Admits a request of `cost` images for the duration of the block.
+
+        With `count_load` off, the images are not counted as in flight by the block: the caller
+        wraps the work that occupies the workers in `serving` instead, so waiting on something
+        else (e.g. downloading the images) is neither load nor service time.
+
+        Raises:
+            ClientThrottledError: If the client is over its rate limit.
+            OverloadedError: If the estimated queueing delay is beyond the SLO (and the
+                request cannot be degraded).
+        """
+        if not self.enabled:
+            yield AdmissionTicket("full", cost, 0.0, self.min_retry_after)
+            return
+
+        cost = max(1, cost)
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.acquire(client, cost)
+            if wait > 0:
+                self.throttled.inc()
+                logger.warning("Client %s over its rate limit; retry in %.1fs.", client, wait,
+                               extra={"client": client, "cost": cost})
+                raise ClientThrottledError("Too many requests. Please retry later.", self._retry_after(wait))
+
+        delay = self.estimated_queue_delay(cost)
+        self.queue_delay_gauge.set(delay)
+        retry_after = self._retry_after(delay - self.slo_seconds)
+        mode = "full"
+        if delay > self.slo_seconds:
+            if self.degrade_mode == "fast" and delay <= self.slo_seconds * self.reject_factor:
+                mode = "fast"
+            elif self.degrade_mode == "cache_only":
+                mode = "cache_only"
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund(client, cost)
+                self.rejected.inc()
+                logger.warning("Estimated queue delay %.2fs beyond the %.2fs SLO; rejecting %d image(s).",
+                               delay, self.slo_seconds, cost, extra={"client": client, "cost": cost})
+                raise OverloadedError("The service is overloaded. Please retry later.", retry_after)
+            self.degraded.inc()
+
+        ticket = AdmissionTicket(mode, cost, delay, retry_after)
+        if mode == "cache_only" or not count_load:
+            # Cache lookups do not occupy the workers: not counted as load, nor as service time
+            yield ticket
+            return
+        with self.serving(cost):
+            yield ticket
+
+    @contextmanager
+    def serving(self, cost: int) -> Iterator[None]:
+        """
+        Counts `cost` images as in flight, and measures their service time, for the duration of the block.
+        """
+        if not self.enabled or cost <= 0:
+            yield
+            return
+        start = self._start(cost)
+        try:
+            yield
+        finally:
+            self._finish(cost, start)
+
+    def _advance(self) -> None:
+        """
+        Moves the processor-sharing clock forward to now, at the current number of images in flight.
+        """
+        now = self.clock()
+        if self.in_flight > 0:
+            self._service_clock += (now - self._updated) * min(self.capacity, self.in_flight) / self.in_flight
+        self._updated = now
+
+    def _start(self, cost: int) -> float:
+        """
+        Returns the processor-sharing clock when the images started.
+        """
+        self._advance()
+        self.in_flight += cost
+        self.in_flight_gauge.set(self.in_flight)
+        return self._service_clock
+
+    def _finish(self, cost: int, start: float) -> None:
+        self._advance()
+        per_image = self._service_clock - start
+        if self.service_time is None:
+            self.service_time = per_image
+        else:
+            self.service_time += self.ewma_alpha * (per_image - self.service_time)
+        self.in_flight -= cost
+        self.in_flight_gauge.set(self.in_flight)
+        self.service_time_gauge.set(self.service_time)
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """
+    Returns the admission controller of this process, sized to the worker pool.
+    """
+    settings = get_settings()
+    executor = get_executor()
+    rate_limiter = None
+    if settings.ADMISSION_CLIENT_RATE > 0:
+        rate_limiter = ClientRateLimiter(settings.ADMISSION_CLIENT_RATE, settings.ADMISSION_CLIENT_BURST)
+    return AdmissionController(
+        capacity=1 if executor.backend == "inline" else executor.max_workers,
+        slo_seconds=settings.ADMISSION_QUEUE_DELAY_SLO_SECONDS,
+        degrade_mode=settings.ADMISSION_DEGRADE_MODE,
+        reject_factor=settings.ADMISSION_REJECT_FACTOR,
+        ewma_alpha=settings.ADMISSION_EWMA_ALPHA,
+        rate_limiter=rate_limiter,
+        min_retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS,
+        enabled=settings.ADMISSION_ENABLED,
+    )
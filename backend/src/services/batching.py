@@ -0,0 +1,155 @@
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import contextvars
+import time
+import numpy as np
+
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Wait-time buckets, in seconds (0.5 ms .. 1 s)
+WAIT_TIME_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class MicroBatchScheduler:
+    """
+    Coalesces concurrent single-image inference requests into batched inference calls.
+
+    Each `submit` enqueues one preprocessed image and waits for its prediction. A background
+    task takes the first queued image, then keeps collecting more until either `max_batch_size`
+    images are gathered or `max_wait_ms` has elapsed, runs a single batched inference call and
+    fans the predictions back out to every waiting request.
+    """
+    def __init__(
+        self,
+        run_batch: Callable[[Any], Awaitable[List[Any]]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "inference",
+        collate: Callable[[List[Any]], Any] = np.stack,
+    ):
+        self.run_batch = run_batch
+        self.collate = collate  # Builds the `run_batch` argument from the submitted items
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        registry = get_metrics_registry()
+        self.queue_depth = registry.gauge(f"{name}_batch_queue_depth", "Images waiting to be batched.")
+        self.batch_size = registry.histogram(
+            f"{name}_batch_size", "Images per batched inference call.",
+            buckets=[2 ** i for i in range(self.max_batch_size.bit_length() + 1)],
+        )
+        self.wait_time = registry.histogram(
+            f"{name}_batch_wait_seconds", "Time an image waited in the queue before its batch was dispatched.",
+            buckets=WAIT_TIME_BUCKETS,
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """
+        Starts the batching task on the running event loop (once per loop).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # The task serves every request: start it in an empty context, not in that of the
+            # request that happened to create it (e.g. its per-request trace)
+            self._worker = contextvars.Context().run(loop.create_task, self._run())
+        return self._queue
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queues one preprocessed image and waits for its prediction.
+
+        Args:
+            item: A single preprocessed image (without the batch dimension), or whatever `collate` accepts.
+
+        Returns:
+            Any: The prediction produced for this image by `run_batch`.
+        """
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((item, future, time.perf_counter()))
+        self.queue_depth.set(queue.qsize())
+        return await future
+
+    async def _collect_batch(self, queue: asyncio.Queue, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        """
+        Fills `batch` in place, so the images already taken are known if the task is cancelled.
+        """
+        batch.append(await queue.get())
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        queue = self._queue
+        batch: List[Tuple[Any, asyncio.Future, float]] = []
+        try:
+            while True:
+                batch = []
+                await self._collect_batch(queue, batch)
+                self.queue_depth.set(queue.qsize())
+
+                # Requests cancelled while waiting (e.g. client disconnected) are not worth inferring
+                batch = [entry for entry in batch if not entry[1].done()]
+                if not batch:
+                    continue
+
+                dispatched_at = time.perf_counter()
+                for _, _, enqueued_at in batch:
+                    self.wait_time.observe(dispatched_at - enqueued_at)
+                self.batch_size.observe(len(batch))
+
+                try:
+                    predictions = await self.run_batch(self.collate([item for item, _, _ in batch]))
+                except Exception as e:
+                    logger.error("Batched inference failed for %d images: %s", len(batch), e, exc_info=True)
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future, _), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(prediction)
+        except asyncio.CancelledError:
+            # CancelledError is not an Exception: without this, the batch in hand would never resolve
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch scheduler was shut down."))
+            raise
+
+    async def close(self) -> None:
+        """
+        Stops the batching task. Images still queued or being batched are failed with a RuntimeError.
+        """
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch scheduler was shut down."))
+        self._worker = None
+        self.queue_depth.set(0)
@@ -0,0 +1,399 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPES = ("float16", "int8")
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes float32 embeddings as float16, or as int8 with one float32 scale per vector
+    (symmetric, max-abs). Returns (codes, scales); scales are all 1 for float16.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0,
+                     chunk_size: int = 16384) -> np.ndarray:
+    """
+    Clusters L2-normalized vectors by cosine similarity; returns (k, dim) normalized centroids.
+    Empty clusters are re-seeded with random vectors.
+    """
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(np.asarray(vectors[i:i + chunk_size], dtype=np.float32) @ centroids.T, axis=1)
+        for i in range(0, len(vectors), chunk_size)
+    ]).astype(np.int32) if len(vectors) else np.empty(0, dtype=np.int32)
+
+
+class IVFIndex:
+    """
+    Inverted-file index: every vector is filed under its nearest of `nlist` centroids, and a
+    query only scans the vectors filed under its `nprobe` nearest centroids. New vectors are
+    filed as they arrive, so inserts never need a rebuild (the centroids stay those of the
+    training sample).
+    """
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self._members: List[np.ndarray] = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self._sizes = np.zeros(len(self.centroids), dtype=np.int64)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def add(self, rows: np.ndarray, lists: np.ndarray) -> None:
+        """
+        Files the vectors at `rows` under their (already assigned) `lists`.
+        """
+        order = np.argsort(lists, kind="stable")
+        rows, lists = np.asarray(rows, dtype=np.int64)[order], np.asarray(lists)[order]
+        bounds = np.flatnonzero(np.diff(lists)) + 1
+        for group, members in zip(np.split(lists, bounds), np.split(rows, bounds)):
+            if not len(group):
+                continue
+            target = int(group[0])
+            size = self._sizes[target]
+            if size + len(members) > len(self._members[target]):
+                grown = np.empty(max(16, 2 * (size + len(members))), dtype=np.int64)
+                grown[:size] = self._members[target][:size]
+                self._members[target] = grown
+            self._members[target][size:size + len(members)] = members
+            self._sizes[target] = size + len(members)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """
+        Returns the rows filed under the `nprobe` centroids nearest to the query, in row order.
+        """
+        nprobe = max(1, min(nprobe, self.nlist))
+        scores = self.centroids @ query
+        probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        rows = np.concatenate([self._members[i][:self._sizes[i]] for i in probes])
+        rows.sort()  # Sequential reads of the memory-mapped vectors
+        return rows
+
+
+class _GrowableArray:
+    """
+    A memory-mapped array file whose first axis grows (capacity doubles) without rewriting it.
+    """
+    def __init__(self, path: str, dtype, row_shape: Tuple[int, ...] = ()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = row_shape
+        self.row_bytes = self.dtype.itemsize * int(np.prod(row_shape, dtype=np.int64))
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self.capacity = os.path.getsize(path) // self.row_bytes
+        self.array = self._map()
+
+    def _map(self) -> Optional[np.memmap]:
+        if self.capacity == 0:
+            return None
+        return np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(self.capacity,) + self.row_shape)
+
+    def reserve(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(1024, self.capacity)
+        while capacity < rows:
+            capacity *= 2
+        if self.array is not None:
+            self.array.flush()
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * self.row_bytes)
+        self.capacity = capacity
+        self.array = self._map()
+
+    def flush(self) -> None:
+        if self.array is not None:
+            self.array.flush()
+
+
+class EmbeddingStore:
+    """
+    Image embeddings keyed by `image_id`, persisted in `directory` and memory-mapped:
+
+      vectors.bin   one int8 (or float16) row per image,
+      scales.bin    float32 scale of every int8 row,
+      lists.bin     IVF list of every row (-1 while the index is not trained),
+      ids.txt       the image_id of every row, one per line (its length is the row count),
+      centroids.npy the trained IVF centroids.
+
+    Inserts append a row (vectors first, then the id line, so a crash never exposes a row
+    without its vector); an image_id already stored is not added again. Searches are exact
+    scans until `train_size` vectors are stored; the IVF index is then trained in a background
+    thread on those vectors, and every later insert is filed under its nearest centroid.
+
+    One process writes a store; the files are not locked. A new store takes the dimension of
+    the first vectors added unless `dim` is given.
+    """
+    def __init__(self, directory: str, dim: Optional[int] = None, dtype: str = "int8", nlist: int = 1024,
+                 train_size: int = 40000, nprobe: int = 16, train_in_background: bool = True):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}'. Expected one of {EMBEDDING_DTYPES}.")
+        self.directory = directory
+        self.dim = dim
+        self.dtype = dtype
+        self.nlist = nlist
+        self.train_size = train_size
+        self.nprobe = nprobe
+        self.train_in_background = train_in_background
+        self.index: Optional[IVFIndex] = None
+        self._training = False
+        self._lock = threading.RLock()
+        self._vectors: Optional[_GrowableArray] = None
+
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["dtype"] != dtype or (dim is not None and meta["dim"] != dim):
+                raise ValueError(f"Embedding store '{directory}' holds {meta['dtype']} vectors of dimension "
+                                 f"{meta['dim']}, not {dtype} of dimension {dim}.")
+            self._open_vectors(meta["dim"])
+        elif dim is not None:
+            self._open_vectors(dim)
+        self._scales = _GrowableArray(os.path.join(directory, "scales.bin"), np.float32)
+        self._lists = _GrowableArray(os.path.join(directory, "lists.bin"), np.int32)
+        ids_path = os.path.join(directory, "ids.txt")
+        self._ids: List[str] = []
+        if os.path.exists(ids_path) and self._vectors is not None:
+            with open(ids_path, "r", encoding="utf-8") as f:
+                self._ids = [line.rstrip("\n") for line in f if line.endswith("\n")]
+        self._rows: Dict[str, int] = {image_id: row for row, image_id in enumerate(self._ids)}
+        self._ids_file = open(ids_path, "a", encoding="utf-8")
+
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path) and self._ids:
+            self.index = IVFIndex(np.load(centroids_path))
+            self._file_rows(0, len(self._ids))
+
+        registry = get_metrics_registry()
+        self.size = registry.gauge("embedding_store_vectors", "Image embeddings in the store.")
+        self.inserts = registry.counter("embedding_store_inserts_total", "Image embeddings added to the store.")
+        self.searches = registry.histogram("embedding_search_seconds", "Latency of a nearest-neighbour search.")
+        self.size.set(len(self._ids))
+
+    def _open_vectors(self, dim: int) -> None:
+        """
+        Maps the vector file; a new store learns its dimension from the first vectors added.
+        """
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "dtype": self.dtype}, f)
+        self.dim = dim
+        self._vectors = _GrowableArray(os.path.join(self.directory, "vectors.bin"), self.dtype, (dim,))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._rows
+
+    def add(self, image_ids: Sequence[str], vectors: np.ndarray) -> int:
+        """
+        Appends the L2-normalized `vectors` of the images not stored yet. Returns how many were added.
+        """
+        with self._lock:
+            seen = set()
+            keep = [i for i, image_id in enumerate(image_ids)
+                    if image_id not in self._rows and not (image_id in seen or seen.add(image_id))]
+            if not keep:
+                return 0
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if self._vectors is None:
+                self._open_vectors(vectors.shape[1])
+            codes, scales = quantize(vectors[keep], self.dtype)
+            start, end = len(self._ids), len(self._ids) + len(keep)
+            for array in (self._vectors, self._scales, self._lists):
+                array.reserve(end)
+            self._vectors.array[start:end] = codes
+            self._scales.array[start:end] = scales
+            self._lists.array[start:end] = -1
+            if self.index is not None:
+                self._file_rows(start, end)
+            new_ids = [image_ids[i] for i in keep]
+            self._ids_file.write("".join(image_id + "\n" for image_id in new_ids))
+            self._ids_file.flush()
+            for row, image_id in enumerate(new_ids, start):
+                self._rows[image_id] = row
+            self._ids.extend(new_ids)
+            self.inserts.inc(len(keep))
+            self.size.set(len(self._ids))
+            if self.index is None and not self._training and len(self._ids) >= self.train_size:
+                self._training = True
+                if self.train_in_background:
+                    threading.Thread(target=self.train, name="embedding-index-training", daemon=True).start()
+                else:
+                    self.train()
+            return len(keep)
+
+    def get(self, image_id: str) -> Optional[np.ndarray]:
+        """
+        Returns the (dequantized) embedding of an image, or None if it is not stored.
+        """
+        row = self._rows.get(image_id)
+        if row is None:
+            return None
+        return self._decode(np.array([row]))[0]
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._vectors.array[rows], dtype=np.float32)
+        if self.dtype == "int8":
+            vectors *= self._scales.array[rows][:, None]
+        return vectors
+
+    def _file_rows(self, start: int, end: int) -> None:
+        """
+        Assigns rows [start, end) to their IVF lists (reusing persisted assignments) and files them.
+        """
+        if start >= end:
+            return
+        lists = np.array(self._lists.array[start:end])
+        missing = np.flatnonzero(lists < 0)
+        for i in range(0, len(missing), 65536):
+            chunk = missing[i:i + 65536]
+            lists[chunk] = nearest_centroids(self._decode(chunk + start), self.index.centroids)
+        self._lists.array[start:end] = lists
+        self.index.add(np.arange(start, end), lists)
+
+    def train(self) -> None:
+        """
+        Trains the IVF centroids (spherical k-means) on the stored vectors, then files every row.
+        On failure the error is logged and the store keeps scanning every vector; training is
+        retried on the next insert.
+        """
+        start = time.perf_counter()
+        try:
+            count = len(self._ids)
+            sample = np.random.default_rng(0).choice(count, min(count, self.train_size), replace=False)
+            centroids = spherical_kmeans(self._decode(np.sort(sample)), self.nlist)
+            np.save(os.path.join(self.directory, "centroids.npy"), centroids)
+            with self._lock:
+                self.index = IVFIndex(centroids)
+                self._file_rows(0, len(self._ids))
+        except Exception as e:
+            with self._lock:
+                self.index = None
+            logger.error("Failed to train the embedding index in %s: %s", self.directory, e, exc_info=True)
+            return
+        finally:
+            with self._lock:
+                self._training = False
+        logger.info("Trained the embedding index (%d lists) on %d vectors in %.1fs.",
+                    len(centroids), len(sample), time.perf_counter() - start)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+               exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Finds the `k` stored images most similar (cosine) to an L2-normalized query embedding.
+        Scans the `nprobe` nearest IVF lists once the index is trained, every vector before.
+
+        Returns:
+            List[Tuple[str, float]]: (image_id, cosine similarity) pairs, most similar first.
+        """
+        start = time.perf_counter()
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return []
+            if self.index is not None:
+                rows = self.index.candidates(query, nprobe or self.nprobe)
+            else:
+                rows = np.arange(count)
+            # Scored in chunks, so a large scan never holds a float32 copy of the whole store
+            scores = np.concatenate([self._scores(rows[i:i + 65536], query) for i in range(0, len(rows), 65536)]
+                                    or [np.empty(0, dtype=np.float32)])
+            ids = self._ids
+        wanted = min(len(rows), k + (1 if exclude else 0))
+        if wanted == 0:
+            return []
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top])]
+        results = [(ids[rows[i]], float(scores[i])) for i in top if ids[rows[i]] != exclude][:k]
+        self.searches.observe(time.perf_counter() - start)
+        return results
+
+    def _scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        vectors = self._vectors.array[rows]
+        if self.dtype == "int8":
+            return (vectors.astype(np.float32) @ query) * self._scales.array[rows]
+        return vectors.astype(np.float32) @ query
+
+    def flush(self) -> None:
+        with self._lock:
+            for array in (self._vectors, self._scales, self._lists):
+                if array is not None:
+                    array.flush()
+            self._ids_file.flush()
+            os.fsync(self._ids_file.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        self._ids_file.close()
+
+
+def store_version(model_id: str, dtype: str) -> str:
+    """
+    Names the store directory: embeddings of different models (or dtypes) are never mixed.
+    """
+    payload = json.dumps({"model": model_id, "dtype": dtype}, sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+@lru_cache()
+def get_embedding_store() -> EmbeddingStore:
+    """
+    Returns the store of the embeddings of the zero-shot backend configured in Settings
+    (a directory per model version and dtype under EMBEDDING_STORE_DIR).
+    """
+    from backend.src.core.dependencies import get_zero_shot_backend
+
+    settings = get_settings()
+    model_id = json.dumps(get_zero_shot_backend().version_info(), sort_keys=True, default=str)
+    root = settings.EMBEDDING_STORE_DIR or os.path.join(tempfile.gettempdir(), "visual_tagger_embeddings")
+    return EmbeddingStore(
+        os.path.join(root, store_version(model_id, settings.EMBEDDING_STORE_DTYPE)),
+        dtype=settings.EMBEDDING_STORE_DTYPE,
+        nlist=settings.EMBEDDING_INDEX_NLIST,
+        train_size=settings.EMBEDDING_INDEX_TRAIN_SIZE,
+        nprobe=settings.EMBEDDING_INDEX_NPROBE,
+    )
@@ -0,0 +1,142 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional
+import asyncio
+import os
+
+from backend.src.core.config import get_settings
+from backend.src.core.dependencies import warm_up_model_backend
+from backend.src.core.logging_config import configure_worker_logging
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_BACKENDS = ("inline", "thread", "process")
+
+
+class ExecutorSaturatedError(Exception):
+    """
+    Raised when the worker pool already holds its maximum amount of pending work.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__("Image analysis workers are busy. Please retry later.")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound work (PIL decode, resize, model forward passes) off the event loop.
+
+    Backends:
+        - "inline": runs in the calling thread (no isolation; useful for debugging and tests).
+        - "thread": thread pool; PIL and NumPy release the GIL for most of their work.
+        - "process": process pool; functions and arguments must be picklable.
+
+    At most `max_pending` tasks may be running or queued at once. Beyond that, `run`
+    fails fast with ExecutorSaturatedError (or waits for a slot when `wait=True`).
+    `initializer` runs once in every worker process (e.g. to load and warm up the model), after
+    the worker's logging is configured.
+    """
+    def __init__(self, backend: str = "thread", max_workers: Optional[int] = None,
+                 max_pending: int = 64, retry_after_seconds: int = 1,
+                 initializer: Optional[Callable[[], Any]] = None):
+        if backend not in EXECUTOR_BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend}'. Expected one of {EXECUTOR_BACKENDS}.")
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max(1, max_pending)
+        self.retry_after_seconds = retry_after_seconds
+
+        self._pool: Optional[Executor] = None
+        if backend == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis-worker")
+        elif backend == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_initialize_worker,
+                                             initargs=(initializer,))
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        registry = get_metrics_registry()
+        self.pending = registry.gauge("executor_pending_tasks", "Tasks running or queued in the worker pool.")
+        self.rejected = registry.counter("executor_rejected_tasks_total", "Tasks rejected because the worker pool was full.")
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def check_capacity(self) -> None:
+        """
+        Fails fast when every slot is taken.
+
+        Raises:
+            ExecutorSaturatedError: If the pool already holds `max_pending` tasks.
+        """
+        if self._get_slots().locked():
+            self.rejected.inc()
+            raise ExecutorSaturatedError(self.retry_after_seconds)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """
+        Runs `fn(*args)` on the configured backend.
+
+        Args:
+            fn (Callable): The function to run (module-level, when using the process backend).
+            *args: Positional arguments for `fn`.
+            wait (bool): Wait for a free slot instead of failing when the pool is full.
+                Used for work that was already admitted (e.g. the items of a batch request).
+
+        Returns:
+            Any: The return value of `fn`.
+
+        Raises:
+            ExecutorSaturatedError: If the pool is full and `wait` is False.
+        """
+        if not wait:
+            self.check_capacity()
+
+        async with self._get_slots():
+            self.pending.inc()
+            try:
+                if self._pool is None:
+                    return fn(*args)
+                return await asyncio.get_running_loop().run_in_executor(self._pool, partial(fn, *args))
+            finally:
+                self.pending.dec()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker pool, optionally waiting for running tasks to finish.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+def _initialize_worker(initializer: Optional[Callable[[], Any]]) -> None:
+    configure_worker_logging()
+    if initializer is not None:
+        initializer()
+
+
+@lru_cache()
+def get_executor() -> InferenceExecutor:
+    """
+    Returns the process-wide executor configured in Settings.
+    """
+    settings = get_settings()
+    logger.info(f"Creating '{settings.EXECUTOR_BACKEND}' executor: max_workers={settings.EXECUTOR_MAX_WORKERS or os.cpu_count()}, "
+                f"max_pending={settings.EXECUTOR_MAX_PENDING}")
+    return InferenceExecutor(
+        backend=settings.EXECUTOR_BACKEND,
+        max_workers=settings.EXECUTOR_MAX_WORKERS or None,
+        max_pending=settings.EXECUTOR_MAX_PENDING,
+        retry_after_seconds=settings.EXECUTOR_RETRY_AFTER_SECONDS,
+        # Process workers hold their own copy of the model: warm each one up when it starts
+        initializer=warm_up_model_backend if settings.MODEL_WARMUP_ON_STARTUP else None,
+    )
@@ -0,0 +1,362 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import SplitResult, quote, unquote, urljoin, urlsplit, urlunsplit
+import asyncio
+import ipaddress
+import os
+import socket
+import time
+
+import httpx
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.core.tracing import record_stage
+from backend.src.services.result_cache import content_hash
+from backend.src.utils.file_utils import UploadTooLargeError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+_MAX_REDIRECTS = 5
+
+
+class FetchError(Exception):
+    """
+    Raised when an image source cannot be fetched. `status_code` is the HTTP status to answer
+    with: 400 for sources that are invalid or not allowed, 502 when the origin failed, 504 on timeout.
+    """
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FetchedImage(NamedTuple):
+    """
+    An image fetched from a URL, an object store or a local file.
+    `data` is None when the origin answered that the image did not change since it was last
+    fetched (ETag / file metadata): its content hash is then that of the previous fetch.
+    """
+    source: str
+    filename: str
+    image_id: str  # Content hash of the image bytes (see result_cache.content_hash)
+    data: Optional[bytes] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.data is None
+
+
+def _split_url(source: str) -> SplitResult:
+    try:
+        return urlsplit(source)
+    except ValueError as e:  # e.g. an unbalanced IPv6 bracket
+        raise FetchError(f"Invalid URL '{source}': {e}.", 400) from e
+
+
+def source_filename(source: str) -> str:
+    """
+    The last path segment of a URL or path (e.g. 'dog.jpg'), or the source itself.
+
+    Raises:
+        FetchError: (400) If the source is a malformed URL.
+    """
+    path = _split_url(source).path if "://" in source else source
+    return unquote(path.rstrip("/").rsplit("/", 1)[-1]) or source
+
+
+class ImageFetcher:
+    """
+    Downloads images over one shared async HTTP connection pool.
+
+    Sources:
+      - http(s):// URLs (hosts restricted to FETCH_ALLOWED_HOSTS, when set). Unless
+        `allow_private_addresses`, hosts resolving to loopback, private, link-local or other
+        non-public addresses are refused, and the connection is pinned to the address that was
+        checked. Redirects are followed one hop at a time, each hop checked the same way;
+      - s3://bucket/key, read from the S3-compatible endpoint FETCH_S3_ENDPOINT_URL (path-style,
+        anonymous: public buckets, or a local MinIO/LocalStack);
+      - file:// URLs and absolute paths under FETCH_ALLOWED_DIRS (disabled when empty).
+
+    Downloads are streamed and abandoned as soon as they exceed `max_bytes`, and at most
+    `max_per_host` run at once against the same host. The ETag of every downloaded URL is kept
+    (with the content hash of its bytes), so the next fetch of the URL is a conditional request:
+    a 304 answer costs no download, and the caller can serve the cached result of that hash.
+    """
+    def __init__(self, max_bytes: int, max_connections: int = 64, max_per_host: int = 8, timeout: float = 15.0,
+                 allowed_hosts: Sequence[str] = (), allowed_dirs: Sequence[str] = (), s3_endpoint_url: str = "",
+                 max_validators: int = 10000, allow_private_addresses: bool = False):
+        self.max_bytes = max_bytes
+        self.max_connections = max(1, max_connections)
+        self.max_per_host = max(1, max_per_host)
+        self.timeout = timeout
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self.allowed_dirs = [os.path.realpath(directory) for directory in allowed_dirs]
+        self.s3_endpoint_url = s3_endpoint_url.rstrip("/")
+        self.max_validators = max(0, max_validators)
+        self.allow_private_addresses = allow_private_addresses
+        # source -> (validator: ETag or file mtime/size, content hash of the bytes it validates)
+        self._validators: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        registry = get_metrics_registry()
+        self.downloads = registry.counter("fetch_downloads_total", "Images downloaded from URLs, object stores or files.")
+        self.not_modified = registry.counter("fetch_not_modified_total", "Fetches answered by a validator (ETag or file metadata) without a download.")
+        self.failures = registry.counter("fetch_failures_total", "Fetches that failed (invalid source, origin error, timeout or too large).")
+        self.bytes = registry.histogram(
+            "fetch_bytes", "Size of the downloaded images, in bytes.",
+            buckets=[2 ** i for i in range(14, 27, 2)])
+
+    def _session(self) -> httpx.AsyncClient:
+        """
+        The shared client (and per-host limits) of the running event loop: connections cannot
+        be reused across loops, so a new loop (e.g. after a reload) gets a new pool.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=False,  # Each hop is checked (see _target)
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections))
+            self._loop = loop
+            self._host_limits = {}
+            self._slots = asyncio.Semaphore(self.max_connections)
+        return self._client
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    def resolve(self, source: str) -> Tuple[str, str]:
+        """
+        Returns ('http', url), ('s3', url of the object on the endpoint) or ('file', path) for a source.
+
+        Raises:
+            FetchError: (400) If the source is malformed or not allowed.
+        """
+        parts = _split_url(source)
+        if parts.scheme in ("http", "https"):
+            if not parts.hostname:
+                raise FetchError(f"Invalid URL '{source}'.", 400)
+            self._check_host(parts.hostname)
+            return "http", source
+        if parts.scheme == "s3":
+            if not self.s3_endpoint_url:
+                raise FetchError("s3:// sources require FETCH_S3_ENDPOINT_URL.", 400)
+            if not parts.netloc or not parts.path.strip("/"):
+                raise FetchError(f"Invalid object URL '{source}'. Expected s3://bucket/key.", 400)
+            return "s3", f"{self.s3_endpoint_url}/{parts.netloc}/{quote(parts.path.lstrip('/'))}"
+        if parts.scheme == "file" or (not parts.scheme and os.path.isabs(source)):
+            path = os.path.realpath(unquote(parts.path) if parts.scheme else source)
+            if not any(os.path.commonpath([path, directory]) == directory for directory in self.allowed_dirs):
+                raise FetchError(f"Local path '{source}' is not under FETCH_ALLOWED_DIRS.", 400)
+            return "file", path
+        raise FetchError(f"Unsupported image source '{source}'. Use an http(s)://, s3:// or file:// URL.", 400)
+
+    def _check_host(self, host: str) -> None:
+        if self.allowed_hosts and host.lower() not in self.allowed_hosts:
+            raise FetchError(f"Host '{host}' is not in FETCH_ALLOWED_HOSTS.", 400)
+
+    async def fetch(self, source: str, conditional: bool = True) -> FetchedImage:
+        """
+        Fetches an image. With `conditional`, a source fetched before is only downloaded again
+        if it changed; otherwise `data` is None (see FetchedImage).
+
+        Raises:
+            FetchError: If the source is invalid, not allowed, failed or timed out.
+            UploadTooLargeError: If the image is larger than `max_bytes`.
+        """
+        start = time.perf_counter()
+        try:
+            kind, target = self.resolve(source)
+            if kind == "file":
+                fetched = await asyncio.wait_for(self._read_file(source, target, conditional), self.timeout)
+            else:
+                # The S3 endpoint is configured by the operator: it may be a local address
+                fetched = await self._download(source, target, conditional, trusted=kind == "s3")
+        except asyncio.TimeoutError:
+            self.failures.inc()
+            raise FetchError(f"Timed out fetching '{source}' after {self.timeout}s.", 504)
+        except (FetchError, UploadTooLargeError):
+            self.failures.inc()
+            raise
+        record_stage("fetch", time.perf_counter() - start)
+        if fetched.not_modified:
+            self.not_modified.inc()
+        else:
+            self.downloads.inc()
+            self.bytes.observe(len(fetched.data))
+        return fetched
+
+    async def _download(self, source: str, url: str, conditional: bool, trusted: bool = False) -> FetchedImage:
+        client = self._session()
+        known = self._validators.get(source) if conditional else None
+        # The timeout starts once the download has a connection slot (of its host, then of the pool)
+        async with self._host_limit(urlsplit(url).netloc), self._slots:
+            try:
+                fetched, etag = await asyncio.wait_for(self._stream(client, source, url, known, trusted), self.timeout)
+            except httpx.TimeoutException:
+                raise asyncio.TimeoutError()
+            except httpx.InvalidURL as e:  # e.g. control characters
+                raise FetchError(f"Invalid URL '{source}': {e}.", 400) from e
+            except httpx.HTTPError as e:
+                raise FetchError(f"Fetching '{source}' failed: {e}")
+        if fetched.not_modified:
+            self._validators.move_to_end(source)
+        elif etag:
+            self._remember(source, etag, fetched.image_id)
+        return fetched
+
+    async def _stream(self, client: httpx.AsyncClient, source: str, url: str,
+                      known: Optional[Tuple[str, str]], trusted: bool) -> Tuple[FetchedImage, Optional[str]]:
+        """
+        Sends the (conditional) GET, following redirects hop by hop, and streams the body.
+        Returns the image and its ETag.
+        """
+        filename = source_filename(source)
+        origin = urlsplit(url).netloc
+        for _ in range(_MAX_REDIRECTS + 1):
+            request_url, headers, extensions = await self._target(url, trusted and urlsplit(url).netloc == origin)
+            if known:
+                headers["If-None-Match"] = known[0]
+            async with client.stream("GET", request_url, headers=headers, extensions=extensions) as response:
+                if response.has_redirect_location:
+                    url = urljoin(url, response.headers["location"])
+                    if urlsplit(url).scheme not in ("http", "https"):
+                        raise FetchError(f"Fetching '{source}' failed: redirected to an unsupported URL.")
+                    continue
+                if response.status_code == 304 and known:
+                    return FetchedImage(source, filename, known[1]), None
+                if response.status_code != 200:
+                    raise FetchError(f"Fetching '{source}' failed: the origin answered HTTP {response.status_code}.")
+                declared = response.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise UploadTooLargeError(filename, self.max_bytes)
+                chunks: List[bytes] = []
+                total = 0
+                async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_BYTES):
+                    total += len(chunk)
+                    if total > self.max_bytes:
+                        raise UploadTooLargeError(filename, self.max_bytes)
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+                return FetchedImage(source, filename, content_hash(data), data), response.headers.get("etag")
+        raise FetchError(f"Fetching '{source}' failed: more than {_MAX_REDIRECTS} redirects.")
+
+    async def _target(self, url: str, trusted: bool) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """
+        Checks the host of one request (allowed host, public address) before it is sent.
+
+        Returns:
+            The URL to request, pinned to the resolved address that was checked (so a second DNS
+            answer cannot point elsewhere), with the Host header and TLS server name of the
+            original host.
+
+        Raises:
+            FetchError: (400) If the host is not allowed or resolves to a non-public address.
+        """
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        self._check_host(host)
+        if trusted or self.allow_private_addresses:
+            return url, {}, {}
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise FetchError(f"Cannot resolve host '{host}': {e.strerror}.")
+        addresses = [ipaddress.ip_address(info[4][0].split("%", 1)[0]) for info in infos]
+        if not addresses or not all(_is_public(address) for address in addresses):
+            raise FetchError(f"Host '{host}' resolves to a private or reserved address.", 400)
+        address = str(addresses[0]) if addresses[0].version == 4 else f"[{addresses[0]}]"
+        netloc = address if parts.port is None else f"{address}:{parts.port}"
+        extensions = {"sni_hostname": host} if parts.scheme == "https" else {}
+        return urlunsplit(parts._replace(netloc=netloc)), {"Host": parts.netloc.rsplit("@", 1)[-1]}, extensions
+
+    async def _read_file(self, source: str, path: str, conditional: bool) -> FetchedImage:
+        filename = os.path.basename(path)
+        try:
+            stat = await asyncio.to_thread(os.stat, path)
+        except OSError as e:
+            raise FetchError(f"Cannot read '{source}': {e.strerror}.", 400)
+        validator = f"{stat.st_mtime_ns}-{stat.st_size}"
+        known = self._validators.get(source) if conditional else None
+        if known and known[0] == validator:
+            self._validators.move_to_end(source)
+            return FetchedImage(source, filename, known[1])
+        if stat.st_size > self.max_bytes:
+            raise UploadTooLargeError(filename, self.max_bytes)
+        try:
+            data = await asyncio.to_thread(_read_bytes, path)
+        except OSError as e:
+            raise FetchError(f"Cannot read '{source}': {e.strerror}.", 400)
+        image_id = content_hash(data)
+        self._remember(source, validator, image_id)
+        return FetchedImage(source, filename, image_id, data)
+
+    def _remember(self, source: str, validator: str, image_id: str) -> None:
+        if not self.max_validators:
+            return
+        self._validators[source] = (validator, image_id)
+        self._validators.move_to_end(source)
+        while len(self._validators) > self.max_validators:
+            self._validators.popitem(last=False)
+
+    async def aclose(self) -> None:
+        """
+        Closes the connection pool (it is reopened on the next fetch).
+        """
+        if self._client is not None:
+            client, self._client, self._loop = self._client, None, None
+            try:
+                await client.aclose()
+            except RuntimeError:  # Opened on an event loop that is already closed
+                pass
+
+
+def _is_public(address: "ipaddress._BaseAddress") -> bool:
+    """
+    Whether an address is globally routable (not loopback, private, link-local, multicast...).
+    """
+    mapped = getattr(address, "ipv4_mapped", None)
+    if mapped is not None:
+        address = mapped
+    return address.is_global and not address.is_multicast
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@lru_cache()
+def get_image_fetcher() -> ImageFetcher:
+    """
+    Returns the process-wide image fetcher configured in Settings.
+    """
+    settings = get_settings()
+    logger.info("Creating image fetcher: max_connections=%d, per_host=%d, timeout=%ss.",
+                settings.FETCH_MAX_CONNECTIONS, settings.FETCH_MAX_CONNECTIONS_PER_HOST, settings.FETCH_TIMEOUT_SECONDS)
+    return ImageFetcher(
+        max_bytes=settings.MAX_UPLOAD_BYTES,
+        max_connections=settings.FETCH_MAX_CONNECTIONS,
+        max_per_host=settings.FETCH_MAX_CONNECTIONS_PER_HOST,
+        timeout=settings.FETCH_TIMEOUT_SECONDS,
+        allowed_hosts=_split(settings.FETCH_ALLOWED_HOSTS),
+        allowed_dirs=_split(settings.FETCH_ALLOWED_DIRS),
+        s3_endpoint_url=settings.FETCH_S3_ENDPOINT_URL,
+        max_validators=settings.FETCH_VALIDATOR_CACHE_SIZE,
+        allow_private_addresses=settings.FETCH_ALLOW_PRIVATE_ADDRESSES,
+    )
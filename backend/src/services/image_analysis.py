@@ -1,91 +1,818 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Callable, ContextManager, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+from contextlib import contextmanager, nullcontext
+import asyncio
 import io
+import os
 from PIL import Image
-import random 
-import uuid
+import numpy as np
+import time
 
-from backend.src.models.image import Tag, ImageAnalysisResponse
+from backend.src.models.image import ImageAnalysisResponse, BatchImageAnalysisItem, BatchImageAnalysisResponse
 from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.core.tracing import record_stage, stage_timer
+from backend.src.core.dependencies import get_model_backend, get_zero_shot_backend
+from backend.src.services.batching import MicroBatchScheduler
+from backend.src.services.embedding_store import EmbeddingStore, get_embedding_store
+from backend.src.services.executor import ExecutorSaturatedError, get_executor
+from backend.src.services.fetching import FetchError, FetchedImage, get_image_fetcher, source_filename
+from backend.src.services.label_index import get_label_index_manager
+from backend.src.services.preprocessing import Geometry, resize_for_models, stack_views
+from backend.src.services.tag_aggregation import AggregatedTag, TagAggregator, TagSource, load_synonyms
+from backend.src.services.tiling import (TilingConfig, extract_tiles, load_for_tiling, pool_tile_scores,
+                                         select_salient_tiles)
+from backend.src.services.result_cache import ResultCache, content_hash, make_config_version, get_result_cache
+from backend.src.services.perceptual_hash import NearDuplicateIndex, dhash, get_near_duplicate_index
+from backend.src.utils.file_utils import UploadTooLargeError
+from backend.src.utils.resource_usage import current_rss_bytes, peak_rss_bytes
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-MIN_OVERALL_CONFIDENCE_FOR_TAG = 0.001 
+MIN_OVERALL_CONFIDENCE_FOR_TAG = 0.001
+
+class DecodedImage(NamedTuple):
+    """
+    Output of the decode step: model-ready pixels plus the perceptual hash of the image,
+    and what the decode cost.
+    """
+    pixels: np.ndarray  # The first view
+    phash: int
+    original_size: Tuple[int, int]  # (width, height) before any downscaling
+    decode_seconds: float
+    rss_bytes: int  # RSS of the decoding process right after the decode
+    views: Tuple[np.ndarray, ...] = ()  # One resized image per requested geometry (shared when equal)
+    tiles: Tuple[np.ndarray, ...] = ()  # Salient tiles at the classifier geometry (large images, with tiling)
+
+
+class ImageTags(NamedTuple):
+    """
+    Output of the inference step for one image: its aggregated tags and the models that
+    produced them ('classifier', or 'classifier+zero_shot' when the zero-shot scorer ran too),
+    and its image embedding.
+    """
+    tags: List[AggregatedTag]
+    path: str
+    embedding: Optional[np.ndarray] = None  # Zero-shot image embedding, when the embedding store is enabled
+
+
+def decode_image(image_data: bytes, target: Union[int, Sequence[Geometry]],
+                 tiling: Optional[TilingConfig] = None) -> DecodedImage:
+    """
+    Decodes image bytes into RGB uint8 arrays resized to the model input geometries,
+    and computes the perceptual hash (dHash) of the first one.
+
+    The models only need ~target-sized inputs, so large images are never fully decoded:
+    JPEGs are decoded straight to a smaller scale with `draft()` (DCT scaling), and any
+    remaining large factor is removed with a cheap integer `reduce()` before the final
+    resizes (see `resize_for_models`). Models with the same geometry share one array.
+
+    With `tiling`, images of at least `tiling.min_pixels` are decoded at `tiling.max_side`
+    instead, and their most salient tiles are resized to the first geometry as well.
+
+    Args:
+        image_data (bytes): The binary image data.
+        target: Side (in pixels) of a single squashed square input, or the (size, crop)
+            geometries of the model inputs.
+        tiling: How large images are tiled; None = never.
+
+    Returns:
+        DecodedImage: Pixels of shape (size, size, 3) and dtype uint8 (one view per geometry),
+        the 64-bit dHash, the original image size, the decode latency, the process RSS after
+        decoding and the salient tiles (if any).
+
+    Raises:
+        ValueError: If the data is not a valid (or is a truncated) image.
+    """
+    start = time.perf_counter()
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            original_size = img.size
+            geometries = [(target, False)] if isinstance(target, int) else list(target)
+            tiles: Tuple[np.ndarray, ...] = ()
+            if tiling is not None and original_size[0] * original_size[1] >= tiling.min_pixels:
+                img = load_for_tiling(img, tiling.max_side)
+                tiles = extract_tiles(img, select_salient_tiles(img, tiling), geometries[0][0])
+            resized = resize_for_models(img, geometries)
+            arrays = {id(image): np.asarray(image, dtype=np.uint8) for image in resized}
+            views = tuple(arrays[id(image)] for image in resized)
+            phash = dhash(resized[0])
+    except (Image.UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise ValueError("Invalid or corrupted image format.") from e
+    return DecodedImage(
+        pixels=views[0],
+        phash=phash,
+        original_size=original_size,
+        decode_seconds=time.perf_counter() - start,
+        rss_bytes=current_rss_bytes(),
+        views=views,
+        tiles=tiles,
+    )
+
+
+def run_model_inference(batch: np.ndarray) -> np.ndarray:
+    """
+    Runs the selected model backend on a stacked batch of preprocessed images.
+    Module-level so it can be shipped to process-pool workers, which load their own backend.
+
+    Args:
+        batch (np.ndarray): Array of shape (N, H, W, 3) with the preprocessed images.
+
+    Returns:
+        np.ndarray: Array of shape (N, number of labels) with per-label confidences.
+    """
+    return get_model_backend().predict_batch(batch)
+
+
+def run_zero_shot_inference(batch: np.ndarray, top_k: int, return_embeddings: bool = False):
+    """
+    Scores a stacked batch against the active label set (reloaded if its file changed):
+    one image-embedding pass, then a single matrix multiply against the precomputed
+    label embeddings. Module-level so it can run in process-pool workers.
+
+    Returns:
+        List[List[Tuple[str, float]]]: The top_k (label, confidence) pairs of every image;
+        with `return_embeddings`, a (pairs, image embeddings) tuple.
+    """
+    index = get_label_index_manager().get()
+    embeddings = get_zero_shot_backend().embed_images(batch)
+    ranked = index.top_k_labels(embeddings, top_k)
+    return (ranked, embeddings) if return_embeddings else ranked
+
+
+def run_image_embedding(batch: np.ndarray) -> np.ndarray:
+    """
+    Embeds a stacked batch with the zero-shot backend (similarity search queries).
+    """
+    return get_zero_shot_backend().embed_images(batch)
+
+
+def run_text_embedding(texts: List[str]) -> np.ndarray:
+    """
+    Embeds texts with the zero-shot backend (similarity search queries).
+    """
+    return get_zero_shot_backend().encode_text(texts)
+
+
+def build_batch_response(analyzed: List[BatchImageAnalysisItem],
+                         rejected: List[Tuple[int, str, str]]) -> BatchImageAnalysisResponse:
+    """
+    Builds the response of a batch from the analyzed items and the files rejected before
+    analysis ((position, filename, error)), which are put back at their original positions.
+    """
+    items: List[BatchImageAnalysisItem] = list(analyzed)
+    for position, filename, error in rejected:
+        items.insert(position, BatchImageAnalysisItem(index=position, filename=filename, error=error))
+    for index, item in enumerate(items):
+        item.index = index
+    succeeded = sum(1 for item in items if item.result is not None)
+    return BatchImageAnalysisResponse(items=items, total=len(items), succeeded=succeeded, failed=len(items) - succeeded)
+
 
 class ImageAnalysisService:
     """
     Service responsible for image analysis logic.
-    For Vercel Free Tier deployment, actual AI inference is mocked due to size limits.
+    Inference runs on the model backend selected in Settings; for Vercel Free Tier
+    deployment this is the mock backend, since real models exceed the size limits.
+
+    The API creates a single instance at startup (see `main.lifespan`) and shares it across
+    requests, so the batch scheduler, worker pool and caches are set up once. `aclose` drains
+    the analyses still in flight and releases those resources on shutdown.
     """
     def __init__(self):
-        self.settings = get_settings() 
+        self.settings = get_settings()
+        self.executor = get_executor()
+        self.model_backend = get_model_backend()
+        self.result_cache: Optional[ResultCache] = get_result_cache() if self.settings.RESULT_CACHE_ENABLED else None
+        self.fetcher = get_image_fetcher()
+        self.zero_shot_backend = get_zero_shot_backend() if self.settings.ZERO_SHOT_ENABLED else None
+        # Decode produces one view per backend: the classifier's, then the zero-shot encoder's
+        self.geometries: Tuple[Geometry, ...] = (self.model_backend.input_spec.geometry,) + (
+            (self.zero_shot_backend.input_spec.geometry,) if self.zero_shot_backend else ())
+        # Large images are also classified tile by tile (see decode_image)
+        self.tiling: Optional[TilingConfig] = (
+            TilingConfig.from_settings(self.settings) if self.settings.TILING_ENABLED else None)
+        self._base_config_version = make_config_version({
+            "model": self.model_backend.version_info(),
+            "zero_shot": self.zero_shot_backend.version_info() if self.zero_shot_backend else None,
+            "ZERO_SHOT_TOP_K": self.settings.ZERO_SHOT_TOP_K,
+            "LABEL_PROMPT_TEMPLATE": self.settings.LABEL_PROMPT_TEMPLATE,
+            "MODEL_INPUT_SIZE": self.settings.MODEL_INPUT_SIZE,
+            "geometries": self.geometries,
+            "MIN_OVERALL_CONFIDENCE_FOR_TAG": self.settings.MIN_OVERALL_CONFIDENCE_FOR_TAG,
+            "HIGH_CONFIDENCE_THRESHOLD_GENERAL": self.settings.HIGH_CONFIDENCE_THRESHOLD_GENERAL,
+            "MIN_CONFIDENT_TAGS_GENERAL": self.settings.MIN_CONFIDENT_TAGS_GENERAL,
+            "MIN_CONFIDENT_MARGIN_GENERAL": self.settings.MIN_CONFIDENT_MARGIN_GENERAL,
+            "CASCADE_ENABLED": self.settings.CASCADE_ENABLED,
+            "MAX_TAGS_PER_IMAGE": self.settings.MAX_TAGS_PER_IMAGE,
+            "TAG_SYNONYMS_PATH": self.settings.TAG_SYNONYMS_PATH,
+            "tiling": self.tiling,
+            "TILE_POOLING": self.settings.TILE_POOLING,
+        })
+        self.tag_aggregator = TagAggregator(
+            synonyms=load_synonyms(self.settings.TAG_SYNONYMS_PATH),
+            min_confidence=self.settings.MIN_OVERALL_CONFIDENCE_FOR_TAG,
+            high_confidence=self.settings.HIGH_CONFIDENCE_THRESHOLD_GENERAL,
+            min_confident_tags=self.settings.MIN_CONFIDENT_TAGS_GENERAL,
+            min_confident_margin=self.settings.MIN_CONFIDENT_MARGIN_GENERAL,
+            top_k=self.settings.MAX_TAGS_PER_IMAGE,
+        )
+        self.near_duplicates: Optional[NearDuplicateIndex] = (
+            get_near_duplicate_index() if self.settings.NEAR_DUPLICATE_ENABLED else None
+        )
+        # The embeddings come from the zero-shot encoder, which only runs with ZERO_SHOT_ENABLED
+        self.embedding_store: Optional[EmbeddingStore] = None
+        if self.settings.EMBEDDING_STORE_ENABLED:
+            if self.zero_shot_backend is None:
+                logger.warning("EMBEDDING_STORE_ENABLED requires ZERO_SHOT_ENABLED; image embeddings will not be stored.")
+            else:
+                self.embedding_store = get_embedding_store()
+
+        registry = get_metrics_registry()
+        self.near_duplicate_hits = registry.counter(
+            "near_duplicate_hits_total", "Analyses that reused the tags of a near-duplicate image.")
+        self.near_duplicate_misses = registry.counter(
+            "near_duplicate_misses_total", "Analyses with no near-duplicate image within the configured radius.")
+        self.upload_bytes = registry.histogram(
+            "analysis_upload_bytes", "Size of the analyzed image uploads.",
+            buckets=[2 ** i for i in range(12, 27)])  # 4 KiB .. 64 MiB
+        dimension_buckets = [2 ** i for i in range(5, 15)]  # 32 .. 16384 px
+        self.image_width = registry.histogram("analysis_image_width_pixels", "Width of the analyzed images.", buckets=dimension_buckets)
+        self.image_height = registry.histogram("analysis_image_height_pixels", "Height of the analyzed images.", buckets=dimension_buckets)
+        self.inference_batch_size = registry.histogram(
+            "analysis_inference_batch_size", "Images per model inference call (coalesced or batch requests).",
+            buckets=[2 ** i for i in range(10)])
+        self.tiles_per_image = registry.histogram(
+            "analysis_tiles_per_image", "Salient tiles classified per tiled image (large images, with TILING_ENABLED).",
+            buckets=[1, 2, 4, 8, 16, 32, 64])
+        self.cascade_early_exits = registry.counter(
+            "cascade_early_exits_total", "Images tagged by the classifier alone (confident enough to skip the zero-shot scorer).")
+        self.cascade_escalations = registry.counter(
+            "cascade_escalations_total", "Images sent on to the zero-shot scorer (classifier not confident).")
+        self.decode_rss_bytes = registry.gauge("analysis_decode_rss_bytes", "RSS of the decoding process after the last decode.")
+        self.peak_rss_bytes = registry.gauge("process_peak_rss_bytes", "Peak RSS of the API process.")
+        self.in_flight = registry.gauge("analysis_in_flight", "Analyses (single or batch) currently being processed.")
+        registry.counter("analysis_service_instances_total", "ImageAnalysisService instances created.").inc()
+
+        # Concurrent single-image requests are coalesced into batched inference calls
+        self.scheduler: Optional[MicroBatchScheduler] = None
+        if self.settings.BATCHING_ENABLED:
+            self.scheduler = MicroBatchScheduler(
+                run_batch=lambda batches: self._run_inference_batch(*batches),
+                collate=stack_views,
+                max_batch_size=self.settings.INFERENCE_BATCH_SIZE,
+                max_wait_ms=self.settings.BATCHING_MAX_WAIT_MS,
+            )
+        # Degraded ('fast') requests skip the zero-shot scorer, so they are batched separately
+        self.fast_scheduler: Optional[MicroBatchScheduler] = None
+        if self.settings.BATCHING_ENABLED and self.zero_shot_backend is not None:
+            self.fast_scheduler = MicroBatchScheduler(
+                run_batch=lambda batches: self._run_inference_batch(batches[0], zero_shot=False),
+                collate=stack_views,
+                max_batch_size=self.settings.INFERENCE_BATCH_SIZE,
+                max_wait_ms=self.settings.BATCHING_MAX_WAIT_MS,
+                name="fast_inference",
+            )
+        self._in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
 
-        logger.info("ImageAnalysisService initialized. Using mock AI inference for Vercel Free Tier.") 
+        logger.info("ImageAnalysisService initialized with model backend '%s'.", self.model_backend.name)
 
-    async def analyze_image(self, image_data: bytes, filename: str) -> ImageAnalysisResponse:
+    async def analyze_image(self, image_data: bytes, filename: str, fast: bool = False) -> ImageAnalysisResponse:
         """
-        Analyzes an image using mock data.
-        In a full deployment, this would involve actual AI model inference.
+        Analyzes an image with the configured model backend.
 
         Args:
             image_data (bytes): The binary image data.
             filename (str): The original filename of the image.
+            fast (bool): Degraded mode (under overload): skip the zero-shot scorer. Results that
+                differ from a full analysis are not cached.
 
         Returns:
             ImageAnalysisResponse: Object containing tags and confidences, with source model.
         """
-        logger.info(f"Starting mock analysis for image: '{filename}'") 
+        with self._track_in_flight():
+            return await self._analyze_image(image_data, filename, fast)
+
+    async def _analyze_image(self, image_data: bytes, filename: str, fast: bool) -> ImageAnalysisResponse:
+        logger.debug("Starting analysis for image: '%s'", filename, extra={"image_filename": filename})
+        image_id = content_hash(image_data)
+        cached = await self._get_cached(image_id, filename)
+        if cached is not None:
+            logger.info("Analysis of '%s' served from cache.", filename,
+                        extra={"image_filename": filename, "image_id": image_id, "cached": True})
+            return cached
+
         try:
-            Image.open(io.BytesIO(image_data))
-            
-            mock_tags_pool = [
-                "person", "dog", "cat", "building", "food", "car", "nature", 
-                "Michael Jackson", "concert", "city", "street", "tree", "flower",
-                "laptop", "smartphone", "beach", "mountain", "forest", "sky", "water",
-                # Adicione mais algumas tags para garantir que o pool seja grande o suficiente para 5 tags únicas
-                "ocean", "park", "vehicle", "animal", "plant", "bridge", "road", "audience"
-            ]
-            num_tags_to_select = 5 
-            selected_mock_tags = random.sample(mock_tags_pool, num_tags_to_select)
-
-            all_tags: List[Tag] = []
-            for tag_name in selected_mock_tags:
-                confidence = round(random.uniform(0.1, 0.99), 2) 
-                all_tags.append(Tag(name=tag_name, confidence=confidence, source_model="Mock AI"))
-            
-            all_tags.sort(key=lambda t: t.confidence, reverse=True)
-
-            # This will now consistently return 5 tags if `all_tags` has 5 or more
-            final_tags = self._select_top_n_tags(all_tags, 5)
-
-            if not final_tags:
-                logger.warning("No relevant mock tags generated. Returning 'unknown_object'.")
-                final_tags.append(Tag(name="unknown_object", confidence=0.01, source_model="fallback"))
-
-
-            cleaned_tags: List[Tag] = []
-            for tag in final_tags:
-                cleaned_tags.append(Tag(name=tag.name, confidence=tag.confidence, source_model=tag.source_model))
-
-
-            logger.info(f"Analysis of '{filename}' completed. Final tags: {[f'{t.name} ({t.confidence:.2f} from {t.source_model})' for t in cleaned_tags]}")
-            return ImageAnalysisResponse(
-                image_id=str(uuid.uuid4()), 
-                filename=filename,
-                tags=cleaned_tags, 
-                message="Image analysis completed (Mock AI for Vercel Free Tier)." 
-            )
+            decoded = await self.executor.run(decode_image, image_data, self.geometries, self.tiling)
+            self._record_decode(decoded, len(image_data), filename)
+            response = self._find_near_duplicate(decoded.phash, image_id, filename)
+            if response is not None:
+                self._store_cached(image_id, response)
+                return response
 
-        except Image.UnidentifiedImageError:
-            logger.error(f"Error: Unidentified image format for '{filename}'.")
-            raise ValueError("Invalid or corrupted image format.")
+            degraded = fast and self.zero_shot_backend is not None
+            scheduler = self.fast_scheduler if degraded else self.scheduler
+            if decoded.tiles and not fast:
+                # A tiled image is a batch of its own (the whole image and its tiles)
+                result = (await self._run_inference_batch(*stack_views([decoded.views]), tiles=[decoded.tiles]))[0]
+            elif scheduler is not None:
+                submitted = time.perf_counter()
+                result = await scheduler.submit(decoded.views)
+                # Request-side view of the coalesced batch, including the time spent waiting for it
+                record_stage("inference", time.perf_counter() - submitted, observe=False)
+            else:
+                result = (await self._run_inference_batch(*stack_views([decoded.views]), zero_shot=not degraded))[0]
+            response = self._build_response(result.tags, filename, image_id, result.path)
+            if not degraded:
+                self._store_cached(image_id, response)
+                self._remember_near_duplicate(decoded.phash, response)
+            self._store_embeddings([image_id], [result])
+            return response
+
+        except ExecutorSaturatedError:
+            logger.warning("Workers saturated; rejecting analysis of '%s'.", filename, extra={"image_filename": filename})
+            raise
+        except ValueError:
+            logger.error("Error: Unidentified image format for '%s'.", filename, extra={"image_filename": filename})
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error during image analysis for '{filename}': {e}", exc_info=True)
+            logger.error("Unexpected error during image analysis for '%s': %s", filename, e, exc_info=True,
+                         extra={"image_filename": filename})
             raise RuntimeError(f"Internal error in image analysis service: {e}")
 
-    def _select_top_n_tags(self, all_tags: List[Tag], n: int) -> List[Tag]:
+    async def analyze_images(self, images: List[Tuple[bytes, str]], mode: str = "full") -> List[BatchImageAnalysisItem]:
+        """
+        Analyzes many images at once.
+        Cached and duplicate images are resolved first; the remaining images are decoded
+        individually, then stacked into batches of up to INFERENCE_BATCH_SIZE images so
+        each batch costs a single inference call.
+
+        Args:
+            images (List[Tuple[bytes, str]]): (binary image data, filename) pairs.
+            mode (str): 'full', or a degraded mode (under overload): 'fast' skips the zero-shot
+                scorer (without caching the results), 'cache_only' only returns cached results.
+
+        Returns:
+            List[BatchImageAnalysisItem]: One item per input image, in the same order,
+            holding either the analysis result or the error that prevented it.
         """
-        Selects the top N tags from an already sorted list.
+        with self._track_in_flight():
+            return await self._analyze_images(images, mode)
+
+    async def _analyze_images(self, images: List[Tuple[bytes, str]], mode: str) -> List[BatchImageAnalysisItem]:
+        logger.info("Starting batch analysis for %d images.", len(images), extra={"num_images": len(images)})
+        items: List[BatchImageAnalysisItem] = [
+            BatchImageAnalysisItem(index=index, filename=filename) for index, (_, filename) in enumerate(images)
+        ]
+
+        # Identical images (same content hash) are analyzed once and share the result
+        pending: Dict[str, List[int]] = {}
+        for index, (image_data, filename) in enumerate(images):
+            image_id = content_hash(image_data)
+            cached = await self._get_cached(image_id, filename)
+            if cached is not None:
+                items[index].result = cached
+            else:
+                pending.setdefault(image_id, []).append(index)
+
+        if pending and mode == "cache_only":
+            for indexes in pending.values():
+                for index in indexes:
+                    items[index].error = "Not analyzed: the service is overloaded and this image is not in the cache."
+            return items
+
+        if pending:
+            # The batch is admitted as a whole: fail fast only if the pool is already full,
+            # then let the individual decode and inference tasks wait for free workers
+            self.executor.check_capacity()
+
+        pending_ids = list(pending)
+        decode_results = await asyncio.gather(
+            *(self.executor.run(decode_image, images[pending[image_id][0]][0], self.geometries, self.tiling, wait=True)
+              for image_id in pending_ids),
+            return_exceptions=True,
+        )
+        decoded: List[Tuple[str, DecodedImage]] = []
+        for image_id, result in zip(pending_ids, decode_results):
+            if isinstance(result, DecodedImage):
+                self._record_decode(result, len(images[pending[image_id][0]][0]), items[pending[image_id][0]].filename)
+                first, *duplicates = pending[image_id]
+                response = self._find_near_duplicate(result.phash, image_id, items[first].filename)
+                if response is None:
+                    decoded.append((image_id, result))
+                    continue
+                self._store_cached(image_id, response)
+                items[first].result = response
+                for index in duplicates:
+                    items[index].result = response.model_copy(update={"filename": items[index].filename})
+                continue
+            if isinstance(result, ValueError):
+                error = str(result)
+                logger.warning("Skipping '%s' in batch: %s", items[pending[image_id][0]].filename, error)
+            else:
+                error = f"Internal error in image analysis service: {result}"
+                logger.error("Unexpected error decoding '%s': %s", items[pending[image_id][0]].filename, result)
+            for index in pending[image_id]:
+                items[index].error = error
+
+        degraded = mode == "fast" and self.zero_shot_backend is not None
+        batch_size = max(1, self.settings.INFERENCE_BATCH_SIZE)
+        for start in range(0, len(decoded), batch_size):
+            chunk = decoded[start:start + batch_size]
+            try:
+                batch_results = await self._run_inference_batch(
+                    *stack_views([image.views for _, image in chunk]), zero_shot=not degraded,
+                    tiles=None if mode == "fast" else [image.tiles for _, image in chunk])
+            except Exception as e:
+                logger.error("Unexpected error during batch inference: %s", e, exc_info=True)
+                for image_id, _ in chunk:
+                    for index in pending[image_id]:
+                        items[index].error = f"Internal error in image analysis service: {e}"
+                continue
+            for (image_id, image), result in zip(chunk, batch_results):
+                first, *duplicates = pending[image_id]
+                response = self._build_response(result.tags, items[first].filename, image_id, result.path)
+                if not degraded:
+                    self._store_cached(image_id, response)
+                    self._remember_near_duplicate(image.phash, response)
+                items[first].result = response
+                for index in duplicates:
+                    items[index].result = response.model_copy(update={"filename": items[index].filename})
+            self._store_embeddings([image_id for image_id, _ in chunk], batch_results)
+
+        logger.info("Batch analysis completed: %d cached, %d/%d new images sent to inference.",
+                    len(images) - len(pending), len(decoded), len(pending),
+                    extra={"num_images": len(images), "cached": len(images) - len(pending), "inferred": len(decoded)})
+        return items
+
+    async def analyze_url(self, source: str, filename: Optional[str] = None, mode: str = "full",
+                          serving: Optional[Callable[[int], ContextManager[None]]] = None
+                          ) -> Optional[ImageAnalysisResponse]:
         """
-        return all_tags[:n]
+        Fetches an image from a URL, an object store or a local file (see ImageFetcher) and
+        analyzes it. A URL fetched before is requested conditionally (ETag): when it did not
+        change, its cached result is returned without downloading it again.
+
+        Args:
+            source (str): http(s)://, s3:// or file:// URL (or absolute path) of the image.
+            filename (Optional[str]): Name reported in the response; defaults to the last path segment.
+            mode (str): 'full', 'fast' or 'cache_only' (see analyze_images).
+            serving (Optional[Callable]): Called with the number of images about to be analyzed;
+                the analysis runs inside the returned context (e.g. AdmissionController.serving,
+                so the download is not counted as load).
+
+        Returns:
+            Optional[ImageAnalysisResponse]: The analysis, or None in 'cache_only' mode when the
+            image is not in the cache.
+
+        Raises:
+            FetchError: If the source is invalid, not allowed, or could not be fetched.
+            UploadTooLargeError: If the image is larger than MAX_UPLOAD_BYTES.
+        """
+        with self._track_in_flight():
+            fetched, cached = await self._fetch(source, filename)
+            if cached is not None:
+                return cached
+            filename = filename or fetched.filename
+            if mode == "cache_only":
+                return await self._get_cached(fetched.image_id, filename)
+            with serving(1) if serving is not None else nullcontext():
+                return await self._analyze_image(fetched.data, filename, mode == "fast")
+
+    async def analyze_urls(self, sources: List[str], mode: str = "full",
+                           serving: Optional[Callable[[int], ContextManager[None]]] = None
+                           ) -> List[BatchImageAnalysisItem]:
+        """
+        Fetches and analyzes many images (see analyze_url). All the sources are fetched
+        concurrently (within the per-host and pool limits of the fetcher) while the images
+        already downloaded are analyzed, in batches of whatever arrived during the previous
+        batch (up to INFERENCE_BATCH_SIZE images). `serving` wraps the analysis of every such
+        batch (see analyze_url).
+
+        Returns:
+            List[BatchImageAnalysisItem]: One item per source, in the same order, holding either
+            the analysis result or the error that prevented it (fetch errors included).
+        """
+        with self._track_in_flight():
+            return await self._analyze_urls(sources, mode, serving)
+
+    async def _analyze_urls(self, sources: List[str], mode: str,
+                            serving: Optional[Callable[[int], ContextManager[None]]]) -> List[BatchImageAnalysisItem]:
+        items = [BatchImageAnalysisItem(index=index, filename=source) for index, source in enumerate(sources)]
+        downloaded: "asyncio.Queue[Optional[Tuple[int, bytes]]]" = asyncio.Queue()
+
+        async def fetch(index: int) -> None:
+            try:
+                items[index].filename = source_filename(sources[index])
+                fetched, cached = await self._fetch(sources[index], None)
+            except (FetchError, UploadTooLargeError) as e:
+                logger.warning("Skipping '%s' in batch: %s", sources[index], e)
+                items[index].error = str(e)
+                return
+            if cached is not None:
+                items[index].result = cached
+            else:
+                downloaded.put_nowait((index, fetched.data))
+
+        async def fetch_all() -> None:
+            try:
+                await asyncio.gather(*(fetch(index) for index in range(len(sources))))
+            finally:
+                downloaded.put_nowait(None)
+
+        batch_size = max(1, self.settings.INFERENCE_BATCH_SIZE)
+        fetching = asyncio.ensure_future(fetch_all())
+        try:
+            done = False
+            while not done:
+                chunk = [await downloaded.get()]
+                while len(chunk) < batch_size and not downloaded.empty():
+                    chunk.append(downloaded.get_nowait())
+                if chunk[-1] is None:
+                    done = True
+                    chunk.pop()
+                if not chunk:
+                    continue
+                with serving(len(chunk)) if serving is not None and mode != "cache_only" else nullcontext():
+                    analyzed = await self._analyze_images([(data, items[index].filename) for index, data in chunk], mode)
+                for (index, _), item in zip(chunk, analyzed):
+                    items[index].result, items[index].error = item.result, item.error
+            await fetching
+        finally:
+            fetching.cancel()
+        return items
+
+    async def _fetch(self, source: str,
+                     filename: Optional[str]) -> Tuple[FetchedImage, Optional[ImageAnalysisResponse]]:
+        """
+        Fetches the image of a source. When the origin answers that it did not change, returns
+        the cached result of its content instead (downloading it again if that result expired).
+        """
+        fetched = await self.fetcher.fetch(source, conditional=self.result_cache is not None)
+        if not fetched.not_modified:
+            return fetched, None
+        cached = await self._get_cached(fetched.image_id, filename or fetched.filename)
+        if cached is not None:
+            logger.info("Analysis of '%s' served from cache (not modified).", source,
+                        extra={"image_filename": cached.filename, "image_id": fetched.image_id, "cached": True})
+            return fetched, cached
+        return await self.fetcher.fetch(source, conditional=False), None
+
+    async def _run_inference_batch(self, batch: np.ndarray, zero_shot_batch: Optional[np.ndarray] = None,
+                                   zero_shot: bool = True,
+                                   tiles: Optional[Sequence[Sequence[np.ndarray]]] = None) -> List[ImageTags]:
+        """
+        Runs the classifier on a stacked batch (and the zero-shot scorer, when enabled and
+        `zero_shot` is set, on `zero_shot_batch`, or on the same batch), then merges their
+        confidences into the selected tags of every image.
+
+        `tiles` holds the salient tiles of every image (see decode_image): they are classified
+        in the same call as the batch, and their scores pooled (TILE_POOLING) into those of
+        their image before the tags are selected. The zero-shot scorer only sees whole images.
+
+        With CASCADE_ENABLED, the models run one after the other: the zero-shot scorer only
+        sees the images for which the classifier is not confident (see TagAggregator.is_confident:
+        MIN_CONFIDENT_TAGS_GENERAL tags at HIGH_CONFIDENCE_THRESHOLD_GENERAL, or a top tag at that
+        threshold MIN_CONFIDENT_MARGIN_GENERAL ahead of the second). For the others
+        its tags would be dropped below that threshold anyway, so only its high-confidence
+        tags are lost. Otherwise both models run in parallel on every image.
+
+        With the embedding store enabled, the zero-shot encoder sees every image (its
+        embeddings are stored), so both models run in parallel and the cascade only decides
+        which images get zero-shot tags.
+        """
+        self.inference_batch_size.observe(len(batch))
+        zero_shot = zero_shot and self.zero_shot_backend is not None
+        zero_shot_batch = batch if zero_shot_batch is None else zero_shot_batch
+        top_k = self.settings.ZERO_SHOT_TOP_K
+        ranked: Optional[List[List[Tuple[str, float]]]] = None
+        embeddings: Optional[np.ndarray] = None
+        tile_counts = [len(image_tiles) for image_tiles in tiles] if tiles else []
+        classifier_batch = batch
+        if any(tile_counts):
+            classifier_batch = np.concatenate([batch, np.stack([tile for image_tiles in tiles for tile in image_tiles])])
+            for count in tile_counts:
+                if count:
+                    self.tiles_per_image.observe(count)
+
+        async def classify() -> np.ndarray:
+            scores = await self.executor.run(run_model_inference, classifier_batch, wait=True)
+            return pool_tile_scores(scores, tile_counts, self.settings.TILE_POOLING) if any(tile_counts) else scores
+
+        store = zero_shot and self.embedding_store is not None
+        # The images were already admitted, so wait for a worker instead of failing
+        if zero_shot and (store or not self.settings.CASCADE_ENABLED):
+            with stage_timer("inference"):
+                general, ranked = await asyncio.gather(
+                    classify(),
+                    self.executor.run(run_zero_shot_inference, zero_shot_batch, top_k, store, wait=True),
+                )
+            if store:
+                ranked, embeddings = ranked
+            escalated = np.ones(len(batch), dtype=bool)
+            if self.settings.CASCADE_ENABLED:
+                escalated = ~self.tag_aggregator.is_confident(general)
+                self.cascade_early_exits.inc(int(len(batch) - escalated.sum()))
+                self.cascade_escalations.inc(int(escalated.sum()))
+                ranked = [labels if unsure else [] for labels, unsure in zip(ranked, escalated)]
+        else:
+            with stage_timer("inference"):
+                general = await classify()
+            escalated = np.zeros(len(batch), dtype=bool)
+            if zero_shot:
+                escalated = ~self.tag_aggregator.is_confident(general)
+                self.cascade_early_exits.inc(int(len(batch) - escalated.sum()))
+                self.cascade_escalations.inc(int(escalated.sum()))
+                if escalated.any():
+                    with stage_timer("inference"):
+                        subset = await self.executor.run(run_zero_shot_inference, zero_shot_batch[escalated], top_k, wait=True)
+                    subset = iter(subset)
+                    ranked = [next(subset) if unsure else [] for unsure in escalated]
+
+        with stage_timer("aggregation"):
+            # Labels live with the model; in process-pool mode this process may not have loaded it yet
+            self.model_backend.ensure_loaded()
+            sources = [TagSource(self.model_backend.source_model, self.model_backend.labels, general)]
+            if ranked is not None:
+                sources.append(TagSource.from_ranked(self.zero_shot_backend.source_model, ranked))
+            aggregated = self.tag_aggregator.aggregate(sources)
+        return [ImageTags(tags, "classifier+zero_shot" if unsure else "classifier",
+                          embeddings[i] if embeddings is not None else None)
+                for i, (tags, unsure) in enumerate(zip(aggregated, escalated))]
+
+    @property
+    def config_version(self) -> str:
+        """
+        Fingerprint of the model/threshold configuration, including the version of the
+        label set file (which can change while the service runs) when zero-shot is enabled.
+        """
+        path = self.settings.LABEL_SET_PATH
+        if self.zero_shot_backend is None or not path:
+            return self._base_config_version
+        try:
+            label_set_mtime = os.stat(path).st_mtime
+        except OSError:
+            label_set_mtime = None
+        return make_config_version({"base": self._base_config_version, "label_set_mtime": label_set_mtime})
+
+    @contextmanager
+    def _track_in_flight(self) -> Iterator[None]:
+        self._in_flight += 1
+        self.in_flight.inc()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self.in_flight.dec()
+            if self._in_flight == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def aclose(self, timeout: float = 30.0) -> None:
+        """
+        Waits up to `timeout` seconds for the analyses in flight to finish, then stops the
+        batch scheduler, the worker pool, the result cache and the fetcher's connection pool.
+        """
+        if self._in_flight:
+            logger.info("Draining %d in-flight analyses (timeout=%ss)...", self._in_flight, timeout)
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%d analyses still in flight after %ss; shutting down anyway.", self._in_flight, timeout)
+
+        for scheduler in (self.scheduler, self.fast_scheduler):
+            if scheduler is not None:
+                await scheduler.close()
+        await asyncio.to_thread(self.executor.shutdown)
+        if self.result_cache is not None:
+            await asyncio.to_thread(self.result_cache.close)  # Writes the queued disk rows
+        await self.fetcher.aclose()
+        # The pool and cache are process-wide: let the next service (e.g. after a reload) build fresh ones
+        get_executor.cache_clear()
+        get_result_cache.cache_clear()
+        get_image_fetcher.cache_clear()
+        logger.info("ImageAnalysisService shut down.")
+
+    def _record_decode(self, decoded: DecodedImage, num_bytes: int, filename: str) -> None:
+        """
+        Records the per-request decode cost (latency, bytes in, image dimensions, memory).
+        """
+        width, height = decoded.original_size
+        self.upload_bytes.observe(num_bytes)
+        self.image_width.observe(width)
+        self.image_height.observe(height)
+        record_stage("decode", decoded.decode_seconds)
+        self.decode_rss_bytes.set(decoded.rss_bytes)
+        self.peak_rss_bytes.set(peak_rss_bytes())
+        logger.debug("Decoded '%s' (%d bytes, %dx%d) in %.1f ms; RSS %.1f MiB.", filename, num_bytes, width, height,
+                     decoded.decode_seconds * 1000, decoded.rss_bytes / 2 ** 20)
+
+    async def get_cached_analysis(self, image_data: bytes, filename: str) -> Optional[ImageAnalysisResponse]:
+        """
+        Returns the cached result for this image, without analyzing it on a miss (degraded
+        'cache_only' mode).
+        """
+        return await self._get_cached(content_hash(image_data), filename)
+
+    async def _get_cached(self, image_id: str, filename: str) -> Optional[ImageAnalysisResponse]:
+        """
+        Returns the cached result for this image content, relabelled with this upload's filename.
+        """
+        if self.result_cache is None:
+            return None
+        cached = await self.result_cache.aget(ResultCache.make_key(image_id, self.config_version))
+        if cached is None:
+            return None
+        return cached.model_copy(update={"filename": filename})
+
+    def _store_cached(self, image_id: str, response: ImageAnalysisResponse) -> None:
+        if self.result_cache is not None:
+            self.result_cache.put(ResultCache.make_key(image_id, self.config_version), response)
+
+    def _find_near_duplicate(self, phash: int, image_id: str, filename: str) -> Optional[ImageAnalysisResponse]:
+        """
+        Reuses the tags of a previously analyzed image whose perceptual hash is within
+        NEAR_DUPLICATE_MAX_DISTANCE bits (e.g. a re-encoded or resized copy).
+        """
+        if self.near_duplicates is None:
+            return None
+        match = self.near_duplicates.search(phash, self.settings.NEAR_DUPLICATE_MAX_DISTANCE)
+        if match is None or match[1][0] != self.config_version:
+            self.near_duplicate_misses.inc()
+            return None
+        distance, (_, neighbour) = match
+        self.near_duplicate_hits.inc()
+        logger.info("Reusing tags of near-duplicate image %s (distance=%d) for '%s'.", neighbour.image_id, distance, filename,
+                    extra={"image_filename": filename, "image_id": image_id, "duplicate_of": neighbour.image_id})
+        return neighbour.model_copy(update={"image_id": image_id, "filename": filename})
+
+    def _remember_near_duplicate(self, phash: int, response: ImageAnalysisResponse) -> None:
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(phash, (self.config_version, response))
+
+    def _store_embeddings(self, image_ids: List[str], results: Sequence[ImageTags]) -> None:
+        """
+        Adds the embeddings of newly analyzed images to the store (images already stored are skipped).
+        """
+        if self.embedding_store is None:
+            return
+        stored = [(image_id, result.embedding) for image_id, result in zip(image_ids, results)
+                  if result.embedding is not None]
+        if stored:
+            self.embedding_store.add([image_id for image_id, _ in stored], np.stack([vector for _, vector in stored]))
+
+    async def find_similar(self, k: int, image_data: Optional[bytes] = None, text: Optional[str] = None,
+                           image_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Finds the stored images most similar to an uploaded image, a text or a stored image
+        (exactly one of them), by cosine similarity of their zero-shot embeddings. The query
+        image itself is never returned.
+
+        Returns:
+            List[Tuple[str, float]]: Up to `k` (image_id, similarity) pairs, most similar first.
+
+        Raises:
+            RuntimeError: If the embedding store is not enabled.
+            KeyError: If `image_id` is not in the store.
+            ValueError: If `image_data` is not a valid image.
+        """
+        if self.embedding_store is None:
+            raise RuntimeError("Similarity search requires EMBEDDING_STORE_ENABLED and ZERO_SHOT_ENABLED.")
+        if image_id is not None:
+            query = self.embedding_store.get(image_id)
+            if query is None:
+                raise KeyError(image_id)
+        elif text is not None:
+            query = (await self.executor.run(run_text_embedding, [text]))[0]
+        else:
+            image_id = content_hash(image_data)
+            decoded = await self.executor.run(decode_image, image_data, self.geometries)
+            query = (await self.executor.run(run_image_embedding, decoded.views[-1][None]))[0]
+        with stage_timer("search"):
+            return await asyncio.to_thread(self.embedding_store.search, query, k, exclude=image_id)
+
+    def _build_response(self, tags: List[AggregatedTag], filename: str, image_id: str,
+                        path: str = "classifier") -> ImageAnalysisResponse:
+        """
+        Builds the response of one image from its aggregated (name, confidence, source_model) tags;
+        `path` (the models that ran, see ImageTags) is logged with the result.
+        """
+        final_tags = [{"name": name, "confidence": confidence, "source_model": source_model}
+                      for name, confidence, source_model in tags]
+        if not final_tags:
+            logger.warning("No relevant tags generated for '%s'. Returning 'unknown_object'.", filename,
+                           extra={"image_filename": filename, "image_id": image_id})
+            final_tags.append({"name": "unknown_object", "confidence": 0.01, "source_model": "fallback"})
+
+        # The (name, confidence, source_model) tuples are only serialized if the record is written
+        logger.info("Analysis of '%s' completed.", filename,
+                    extra={"image_filename": filename, "image_id": image_id, "tags": tags, "inference_path": path})
+        # Validated in a single pydantic-core call (tags included) instead of one call per Tag
+        return ImageAnalysisResponse.model_validate({
+            "image_id": image_id,
+            "filename": filename,
+            "tags": final_tags,
+            "message": self.model_backend.analysis_message,
+        })
@@ -0,0 +1,430 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import contextvars
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.models.image import BatchImageAnalysisResponse, JobResponse
+from backend.src.services.executor import ExecutorSaturatedError
+
+if TYPE_CHECKING:
+    from backend.src.services.image_analysis import ImageAnalysisService
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lower value = picked first
+JOB_PRIORITIES: Dict[str, int] = {"interactive": 0, "bulk": 1}
+_PRIORITY_NAMES = {value: name for name, value in JOB_PRIORITIES.items()}
+
+_JOB_COLUMNS = "job_id, status, priority, num_images, created_at, started_at, finished_at, attempts, result, error"
+
+
+class Job(NamedTuple):
+    """
+    Snapshot of a row of the job queue.
+    """
+    job_id: str
+    status: str  # queued, running, succeeded or failed
+    priority: int
+    num_images: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    attempts: int
+    result: Optional[str]  # BatchImageAnalysisResponse as JSON
+    error: Optional[str]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_response(self) -> JobResponse:
+        return JobResponse(
+            job_id=self.job_id,
+            status=self.status,
+            priority=_PRIORITY_NAMES[self.priority],
+            num_images=self.num_images,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            attempts=self.attempts,
+            result=BatchImageAnalysisResponse.model_validate_json(self.result) if self.result else None,
+            error=self.error,
+        )
+
+    def to_json(self) -> bytes:
+        """
+        The JSON of `to_response()`, with the stored result embedded as is instead of being
+        parsed into models and encoded again on every poll.
+        """
+        body = self._replace(result=None).to_response().model_dump_json(exclude={"result"})
+        if self.result:
+            body = body[:-1] + ',"result":' + self.result + "}"
+        return body.encode("utf-8")
+
+
+class ClaimedJob(NamedTuple):
+    """
+    A job picked up by a worker, with its payload.
+    """
+    job: Job
+    images: List[Tuple[bytes, str]]  # (binary image data, filename)
+    rejected: List[Tuple[int, str, str]]  # (position, filename, error) of files rejected on upload
+
+
+class JobQueue:
+    """
+    Durable priority queue of analysis jobs, stored in SQLite.
+
+    Jobs are picked by priority (interactive before bulk), then in submission order. A claimed
+    job is leased to its worker for `lease_seconds`, and the worker renews the lease while it
+    runs: if the process dies, the lease expires and the job is picked up again (up to
+    `max_attempts` times). Claims happen in an IMMEDIATE transaction, so several processes
+    can share the same queue file.
+
+    Image payloads are kept until the job finishes; results are kept until `purge`.
+    """
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, num_images INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_expires_at REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_by_priority ON jobs (status, priority, created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_images ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, filename TEXT, data BLOB, error TEXT, "
+            "PRIMARY KEY (job_id, position))"
+        )
+
+    def enqueue(self, images: List[Tuple[bytes, str]], rejected: List[Tuple[int, str, str]], priority: str) -> Job:
+        """
+        Stores a job and its images.
+
+        Args:
+            images (List[Tuple[bytes, str]]): (binary image data, filename) pairs to analyze.
+            rejected (List[Tuple[int, str, str]]): Files rejected on upload ((position, filename, error)),
+                reported as failed items of the result.
+            priority (str): "interactive" or "bulk".
+        """
+        job = Job(
+            job_id=uuid.uuid4().hex, status="queued", priority=JOB_PRIORITIES[priority],
+            num_images=len(images) + len(rejected), created_at=time.time(),
+            started_at=None, finished_at=None, attempts=0, result=None, error=None,
+        )
+        rows = [(job.job_id, i, filename, data, None) for i, (data, filename) in enumerate(images)]
+        rows += [(job.job_id, len(images) + i, filename, None, f"{position}:{error}")
+                 for i, (position, filename, error) in enumerate(rejected)]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs (job_id, status, priority, num_images, created_at, attempts) VALUES (?, ?, ?, ?, ?, 0)",
+                    (job.job_id, job.status, job.priority, job.num_images, job.created_at),
+                )
+                self._db.executemany(
+                    "INSERT INTO job_images (job_id, position, filename, data, error) VALUES (?, ?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return job
+
+    def claim(self, max_priority: Optional[int] = None) -> Optional[ClaimedJob]:
+        """
+        Takes the next job (queued, or running with an expired lease) and leases it.
+
+        Args:
+            max_priority (Optional[int]): Only consider jobs of this priority value or lower
+                (e.g. 0 for workers reserved to interactive jobs).
+
+        Returns:
+            Optional[ClaimedJob]: The job with its images, or None if there is nothing to do.
+        """
+        priority_filter = "" if max_priority is None else " AND priority <= ?"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = self._db.execute(
+                        f"SELECT job_id, attempts FROM jobs WHERE (status = 'queued' OR (status = 'running' AND lease_expires_at < ?))"
+                        f"{priority_filter} ORDER BY priority, created_at LIMIT 1",
+                        (now,) if max_priority is None else (now, max_priority),
+                    ).fetchone()
+                    if row is None:
+                        self._db.execute("COMMIT")
+                        return None
+                    job_id, attempts = row
+                    if attempts < self.max_attempts:
+                        break
+                    logger.warning("Job %s abandoned after %d attempts.", job_id, attempts, extra={"job_id": job_id})
+                    self._finish(job_id, "failed", None, f"Job abandoned after {attempts} attempts (worker crashed or timed out).")
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, lease_expires_at = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ?", (now, now + self.lease_seconds, job_id),
+                )
+                job = self._get(job_id)
+                payload = self._db.execute(
+                    "SELECT filename, data, error FROM job_images WHERE job_id = ? ORDER BY position", (job_id,)
+                ).fetchall()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        images = [(data, filename) for filename, data, error in payload if error is None]
+        rejected = []
+        for filename, _, error in payload:
+            if error is not None:
+                position, _, message = error.partition(":")
+                rejected.append((int(position), filename, message))
+        return ClaimedJob(job, images, rejected)
+
+    def renew_lease(self, job_id: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND status = 'running'",
+                             (time.time() + self.lease_seconds, job_id))
+
+    def release(self, job_id: str) -> None:
+        """
+        Puts a running job back in the queue without counting the attempt (e.g. on shutdown).
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', lease_expires_at = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE job_id = ? AND status = 'running'", (job_id,))
+
+    def complete(self, job_id: str, result: BatchImageAnalysisResponse) -> None:
+        with self._lock:
+            self._finish(job_id, "succeeded", result.model_dump_json(), None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock:
+            self._finish(job_id, "failed", None, error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+        # The images are no longer needed once the job has an outcome
+        self._db.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL, result = ?, error = ? WHERE job_id = ?",
+            (status, time.time(), result, error, job_id),
+        )
+        self._db.execute("DELETE FROM job_images WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        row = self._db.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job(*row) if row is not None else None
+
+    def depth(self) -> Dict[str, int]:
+        """
+        Returns the number of queued jobs per priority name.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT priority, COUNT(*) FROM jobs WHERE status = 'queued' GROUP BY priority").fetchall()
+        counts = {name: 0 for name in JOB_PRIORITIES}
+        counts.update({_PRIORITY_NAMES[priority]: count for priority, count in rows})
+        return counts
+
+    def purge(self, older_than_seconds: float) -> int:
+        """
+        Deletes the jobs that finished more than `older_than_seconds` ago. Returns how many.
+        """
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                                      (time.time() - older_than_seconds,))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class JobWorker:
+    """
+    Runs queued jobs on the shared ImageAnalysisService.
+
+    `concurrency` tasks claim jobs from the queue; the first `interactive_workers` of them only
+    take interactive jobs, so interactive requests always have a worker even while bulk jobs
+    (e.g. catalog backfills) occupy the others. Idle tasks wake up on `notify` (a job was
+    enqueued by this process) or every `poll_interval` seconds (jobs enqueued by other processes).
+    """
+    def __init__(self, queue: JobQueue, service: "ImageAnalysisService", concurrency: int = 2,
+                 interactive_workers: int = 1, poll_interval: float = 1.0, retry_delay: float = 1.0,
+                 result_ttl_seconds: float = 86400.0):
+        self.queue = queue
+        self.service = service
+        self.concurrency = max(1, concurrency)
+        self.interactive_workers = min(max(0, interactive_workers), self.concurrency - 1)
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._finished: Dict[str, asyncio.Event] = {}  # job id -> set when this process finishes it
+        self._waiters: Dict[str, int] = {}  # job id -> requests waiting for it
+        self._last_purge = 0.0
+
+        registry = get_metrics_registry()
+        self.completed = registry.counter("jobs_completed_total", "Jobs that finished successfully.")
+        self.failed = registry.counter("jobs_failed_total", "Jobs that failed.")
+        self.queue_wait = registry.histogram(
+            "job_queue_wait_seconds", "Time between enqueueing a job and a worker picking it up.",
+            buckets=[0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800])
+        self.running = registry.gauge("jobs_running", "Jobs being processed by this process.")
+
+    def start(self) -> None:
+        """
+        Starts the worker tasks on the running event loop (again if they ran on another, stopped loop).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and any(not task.done() for task in self._tasks):
+            return
+        self._loop = loop
+        self._tasks = []
+        self._wake = asyncio.Event()
+        self._stopping = False
+        for i in range(self.concurrency):
+            max_priority = JOB_PRIORITIES["interactive"] if i < self.interactive_workers else None
+            # Started in an empty context, like the batch scheduler: the tasks outlive the request that started them
+            self._tasks.append(contextvars.Context().run(loop.create_task, self._run(max_priority)))
+        logger.info("Job worker started (%d tasks, %d reserved for interactive jobs).", self.concurrency, self.interactive_workers)
+
+    def notify(self) -> None:
+        """
+        Wakes up idle worker tasks (call after enqueueing a job).
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def wait_for(self, job_id: str, timeout: float) -> None:
+        """
+        Waits until this process finishes the job, or `timeout` seconds.
+        """
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._finished.pop(job_id, None)
+
+    async def _run(self, max_priority: Optional[int]) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                claimed = await asyncio.to_thread(self.queue.claim, max_priority)
+            except Exception as e:
+                logger.error("Could not claim a job: %s", e, exc_info=True)
+                claimed = None
+            if claimed is None:
+                await self._maybe_purge()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(claimed)
+
+    async def _process(self, claimed: ClaimedJob) -> None:
+        job = claimed.job
+        self.queue_wait.observe(time.time() - job.created_at)
+        self.running.inc()
+        heartbeat = asyncio.create_task(self._renew_lease(job.job_id))
+        try:
+            analyzed = await self.service.analyze_images(claimed.images)
+            from backend.src.services.image_analysis import build_batch_response
+            result = build_batch_response(analyzed, claimed.rejected)
+            await asyncio.to_thread(self.queue.complete, job.job_id, result)
+            self.completed.inc()
+            logger.info("Job %s completed: %d/%d images succeeded.", job.job_id, result.succeeded, result.total,
+                        extra={"job_id": job.job_id, "num_images": result.total, "succeeded": result.succeeded})
+        except ExecutorSaturatedError:
+            # Interactive HTTP traffic has the workers: try again later
+            logger.info("Workers saturated; job %s returned to the queue.", job.job_id, extra={"job_id": job.job_id})
+            await asyncio.to_thread(self.queue.release, job.job_id)
+            await asyncio.sleep(self.retry_delay)
+            return
+        except asyncio.CancelledError:
+            self.queue.release(job.job_id)
+            raise
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.job_id, e, exc_info=True, extra={"job_id": job.job_id})
+            await asyncio.to_thread(self.queue.fail, job.job_id, f"Internal error in image analysis service: {e}")
+            self.failed.inc()
+        finally:
+            heartbeat.cancel()
+            self.running.dec()
+
+        event = self._finished.get(job.job_id)
+        if event is not None:
+            event.set()
+
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            await asyncio.to_thread(self.queue.renew_lease, job_id)
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < 60.0:
+            return
+        self._last_purge = now
+        purged = await asyncio.to_thread(self.queue.purge, self.result_ttl_seconds)
+        if purged:
+            logger.info("Purged %d finished jobs.", purged)
+
+    async def aclose(self, timeout: float = 30.0) -> None:
+        """
+        Stops claiming jobs and waits up to `timeout` seconds for the running ones. Jobs still
+        running after that are cancelled and returned to the queue for the next start.
+        """
+        self._stopping = True
+        self.notify()
+        tasks, self._tasks = self._tasks, []
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.info("Job worker stopped.")
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """
+    Returns the process-wide job queue configured in Settings.
+    """
+    settings = get_settings()
+    path = settings.JOB_QUEUE_PATH or os.path.join(tempfile.gettempdir(), "visual_tagger_jobs.sqlite3")
+    logger.info("Opening job queue at '%s'.", path)
+    return JobQueue(path, lease_seconds=settings.JOB_LEASE_SECONDS, max_attempts=settings.JOB_MAX_ATTEMPTS)
@@ -0,0 +1,233 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from backend.src.core.config import get_settings
+from backend.src.core.dependencies import get_zero_shot_backend
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.services.model_backends import MOCK_TAGS_POOL, read_labels
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TextEncoder = Callable[[List[str]], np.ndarray]
+
+
+class LabelIndex:
+    """
+    Normalized text embeddings of a label set, one row per label.
+
+    Scoring a batch of (normalized) image embeddings against every label is a single matrix
+    multiply; the top-k labels are then picked with `argpartition`, so only k scores per
+    image are ever sorted, even with thousands of labels.
+    """
+    def __init__(self, labels: List[str], embeddings: np.ndarray, version: str, logit_scale: float = 100.0):
+        if embeddings.shape[0] != len(labels):
+            raise ValueError(f"Got {embeddings.shape[0]} embeddings for {len(labels)} labels.")
+        self.labels = labels
+        self.embeddings = embeddings
+        self.version = version
+        self.logit_scale = logit_scale
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def top_k(self, image_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k best labels of every image.
+
+        Args:
+            image_embeddings (np.ndarray): L2-normalized array of shape (N, embedding_dim).
+            k (int): Labels to keep per image.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (N, k) label indices and their confidences, best first.
+            Confidences are the softmax over the whole label set, as in CLIP zero-shot classification.
+        """
+        logits = self.logit_scale * (image_embeddings @ self.embeddings.T)
+        k = max(1, min(k, len(self.labels)))
+        top = np.argpartition(logits, -k, axis=1)[:, -k:]
+        top_logits = np.take_along_axis(logits, top, axis=1)
+        order = np.argsort(-top_logits, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_logits = np.take_along_axis(top_logits, order, axis=1)
+
+        row_max = logits.max(axis=1, keepdims=True)
+        log_norm = row_max + np.log(np.exp(logits - row_max).sum(axis=1, keepdims=True))
+        return top, np.exp(top_logits - log_norm).astype(np.float32)
+
+    def top_k_labels(self, image_embeddings: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """
+        Same as `top_k`, with label names instead of indices (safe to use after a reload).
+        """
+        indices, confidences = self.top_k(image_embeddings, k)
+        return [
+            [(self.labels[i], float(c)) for i, c in zip(row_indices, row_confidences)]
+            for row_indices, row_confidences in zip(indices.tolist(), confidences.tolist())
+        ]
+
+
+def label_set_version(labels: List[str], model_id: str, prompt_template: str) -> str:
+    """
+    Fingerprint of everything the embeddings depend on; names the persisted files.
+    """
+    payload = json.dumps({"labels": labels, "model": model_id, "template": prompt_template}, sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def build_label_index(labels: List[str], encode_text: TextEncoder, directory: str, model_id: str,
+                      prompt_template: str = "{}", logit_scale: float = 100.0,
+                      chunk_size: int = 256) -> LabelIndex:
+    """
+    Returns the embedding index of a label set, computing and persisting it on first use.
+
+    Embeddings are stored as `<version>.npy` (float32, one normalized row per label) next to
+    `<version>.json` (the labels) and opened memory-mapped, so a label set is encoded once per
+    model and prompt template, and worker processes share the pages of the same file.
+
+    Args:
+        labels (List[str]): The label vocabulary.
+        encode_text (TextEncoder): Maps prompts to L2-normalized embeddings.
+        directory (str): Where the embeddings are persisted.
+        model_id (str): Identifies the text encoder (part of the file name).
+        prompt_template (str): Format string each label is embedded with, e.g. "a photo of {}.".
+        logit_scale (float): Temperature of the zero-shot softmax.
+        chunk_size (int): Prompts encoded per call.
+    """
+    version = label_set_version(labels, model_id, prompt_template)
+    embeddings_path = os.path.join(directory, f"{version}.npy")
+    labels_path = os.path.join(directory, f"{version}.json")
+
+    if not (os.path.exists(embeddings_path) and os.path.exists(labels_path)):
+        start = time.perf_counter()
+        prompts = [prompt_template.format(label) for label in labels]
+        embeddings = np.concatenate([
+            np.asarray(encode_text(prompts[i:i + chunk_size]), dtype=np.float32)
+            for i in range(0, len(prompts), chunk_size)
+        ])
+        os.makedirs(directory, exist_ok=True)
+        # Write to temporary files first, so concurrent readers never see a partial index
+        tmp_embeddings = f"{embeddings_path}.{os.getpid()}.tmp"
+        with open(tmp_embeddings, "wb") as f:
+            np.save(f, embeddings)
+        tmp_labels = f"{labels_path}.{os.getpid()}.tmp"
+        with open(tmp_labels, "w", encoding="utf-8") as f:
+            json.dump({"labels": labels, "model": model_id, "template": prompt_template}, f)
+        os.replace(tmp_embeddings, embeddings_path)
+        os.replace(tmp_labels, labels_path)
+        logger.info(f"Encoded {len(labels)} labels in {time.perf_counter() - start:.2f}s; saved to '{embeddings_path}'.")
+
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    return LabelIndex(labels, embeddings, version, logit_scale)
+
+
+def _unique(labels: List[str]) -> List[str]:
+    return list(dict.fromkeys(labels))
+
+
+class LabelIndexManager:
+    """
+    Keeps the label index in sync with the label set file.
+
+    `get` checks the file's modification time (at most every `check_interval` seconds) and
+    swaps in a new index when it changed, so label sets can be edited without a restart.
+    Requests keep using the previous index while the new one is being built.
+    """
+    def __init__(self, encode_text: TextEncoder, model_id: str, directory: str,
+                 label_set_path: str = "", prompt_template: str = "{}", logit_scale: float = 100.0,
+                 check_interval: float = 2.0, default_labels: Optional[List[str]] = None):
+        self.encode_text = encode_text
+        self.model_id = model_id
+        self.directory = directory
+        self.label_set_path = label_set_path
+        self.prompt_template = prompt_template
+        self.logit_scale = logit_scale
+        self.check_interval = check_interval
+        self.default_labels = default_labels or list(MOCK_TAGS_POOL)
+
+        self._index: Optional[LabelIndex] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+        registry = get_metrics_registry()
+        self.reloads = registry.counter("label_index_reloads_total", "Label set (re)loads.")
+        self.size = registry.gauge("label_index_labels", "Labels in the active label set.")
+
+    def _source_mtime(self) -> Optional[float]:
+        if not self.label_set_path:
+            return None
+        try:
+            return os.stat(self.label_set_path).st_mtime
+        except OSError:
+            return self._mtime  # File being replaced: keep the current index
+
+    def _load(self, mtime: Optional[float]) -> None:
+        labels = _unique(read_labels(self.label_set_path) if self.label_set_path else self.default_labels)
+        self._index = build_label_index(
+            labels, self.encode_text, self.directory, self.model_id, self.prompt_template, self.logit_scale
+        )
+        self._mtime = mtime
+        self.reloads.inc()
+        self.size.set(len(labels))
+        logger.info(f"Label index '{self._index.version}' active with {len(labels)} labels.")
+
+    def get(self) -> LabelIndex:
+        """
+        Returns the current label index, reloading it first if the label set file changed.
+        """
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._load(self._source_mtime())
+                    self._last_check = time.monotonic()
+            return self._index
+
+        now = time.monotonic()
+        if self.label_set_path and now - self._last_check >= self.check_interval:
+            # Only one thread reloads; the others keep serving the current index meanwhile
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._last_check = now
+                    mtime = self._source_mtime()
+                    if mtime != self._mtime:
+                        logger.info(f"Label set '{self.label_set_path}' changed; reloading.")
+                        self._load(mtime)
+                finally:
+                    self._lock.release()
+        return self._index
+
+
+@lru_cache()
+def get_label_index_manager() -> LabelIndexManager:
+    """
+    Returns the process-wide label index of the zero-shot backend configured in Settings.
+    """
+    settings = get_settings()
+    backend = get_zero_shot_backend()
+    backend.ensure_loaded()  # embedding_dim and logit_scale may only be known once loaded
+    directory = settings.LABEL_INDEX_DIR or os.path.join(tempfile.gettempdir(), "visual_tagger_label_index")
+    return LabelIndexManager(
+        encode_text=backend.encode_text,
+        model_id=json.dumps(backend.version_info(), sort_keys=True, default=str),
+        directory=directory,
+        label_set_path=settings.LABEL_SET_PATH,
+        prompt_template=settings.LABEL_PROMPT_TEMPLATE,
+        logit_scale=backend.logit_scale,
+        check_interval=settings.LABEL_RELOAD_CHECK_SECONDS,
+    )
+
+
+def warm_up_label_index() -> LabelIndex:
+    """
+    Loads the zero-shot backend and builds (or loads) the embeddings of the active label set.
+    """
+    return get_label_index_manager().get()
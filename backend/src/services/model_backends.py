@@ -0,0 +1,495 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Type
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from backend.src.core.config import Settings
+from backend.src.services.preprocessing import (
+    CLIP_MEAN, CLIP_STD, IMAGENET_MEAN, IMAGENET_STD, InputSpec, normalize_into, preprocessed_batch,
+)
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MOCK_TAGS_POOL = [
+    "person", "dog", "cat", "building", "food", "car", "nature",
+    "Michael Jackson", "concert", "city", "street", "tree", "flower",
+    "laptop", "smartphone", "beach", "mountain", "forest", "sky", "water",
+    # Adicione mais algumas tags para garantir que o pool seja grande o suficiente para 5 tags únicas
+    "ocean", "park", "vehicle", "animal", "plant", "bridge", "road", "audience"
+]
+
+
+def normalize_batch(batch: np.ndarray, mean=IMAGENET_MEAN, std=IMAGENET_STD) -> np.ndarray:
+    """
+    Converts a uint8 NHWC batch into the normalized float32 NCHW layout expected by the models,
+    in a new array (backends use the pooled `preprocessed_batch` instead).
+    """
+    n, height, width, _ = batch.shape
+    return normalize_into(batch, np.empty((n, 3, height, width), dtype=np.float32), mean, std)
+
+
+def quantize_onnx_model(path: str, cache_dir: str = "") -> str:
+    """
+    Returns the path of an int8 dynamic-quantized copy of an ONNX model (MatMul weights stored
+    as int8, activations quantized on the fly), creating it on first use. Copies are cached
+    under `cache_dir` (default: system temp directory), keyed by the source file and its mtime.
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise RuntimeError("int8 ONNX models require the 'onnxruntime' and 'onnx' packages.") from e
+
+    stat = os.stat(path)
+    key = hashlib.blake2b(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"), digest_size=8).hexdigest()
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "visual_tagger_models")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    quantized_path = os.path.join(cache_dir, f"{stem}.{key}.int8.onnx")
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    start = time.perf_counter()
+    partial_path = f"{quantized_path}.{os.getpid()}.tmp"
+    quantize_dynamic(path, partial_path, weight_type=QuantType.QInt8)
+    os.replace(partial_path, quantized_path)  # Atomic: concurrent workers never load a partial file
+    logger.info("Quantized '%s' to int8 in %.2fs (%.1f -> %.1f MiB).", path, time.perf_counter() - start,
+                stat.st_size / 2 ** 20, os.path.getsize(quantized_path) / 2 ** 20)
+    return quantized_path
+
+
+def quantize_torch_model(torch: Any, model: Any) -> Any:
+    """
+    int8 dynamic quantization of the linear layers of a PyTorch model (the bulk of ViT/CLIP compute).
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def torch_model_bytes(model: Any) -> int:
+    """
+    Bytes held by the weights of a PyTorch model, including packed quantized weights.
+    """
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if hasattr(tensor, "element_size"):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class ModelBackend(ABC):
+    """
+    Interface of an image tagging model runtime.
+
+    Backends are created cheaply and load their weights lazily on first use (or explicitly
+    through `warmup`, at application startup). `predict_batch` takes a stacked uint8 batch of
+    shape (N, H, W, 3) and returns an (N, len(labels)) array of confidences in [0, 1].
+
+    Backends that map images and text into a shared embedding space (CLIP-style) also
+    implement `_encode_text` / `_embed_images`, which enables zero-shot tagging against
+    arbitrary label sets (see services.label_index).
+    """
+    name: str = "base"
+    source_model: str = "unknown"
+    analysis_message: str = "Analysis completed successfully."
+    embedding_dim: int = 0
+    logit_scale: float = 100.0  # Temperature applied to cosine similarities before the softmax
+    input_mean = IMAGENET_MEAN
+    input_std = IMAGENET_STD
+    input_crop: Optional[bool] = None  # None = Settings.MODEL_INPUT_CROP
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.labels: List[str] = []
+        self.model: Any = None
+        self.processor: Any = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def precision(self) -> str:
+        """
+        'fp32', or 'int8' for dynamic-quantized weights (Settings.MODEL_PRECISION of this backend).
+        """
+        return self.settings.MODEL_PRECISION.get(self.name, "fp32")
+
+    @property
+    def model_size(self) -> str:
+        """
+        'base', or 'small' for the backend's smaller model (Settings.MODEL_SIZE of this backend).
+        """
+        return self.settings.MODEL_SIZE.get(self.name, "base")
+
+    def _select_model(self, base: str, small: str) -> str:
+        """
+        Returns the model (name or path) of the configured size.
+
+        Raises:
+            ValueError: If the small variant is selected but none is configured.
+        """
+        if self.model_size != "small":
+            return base
+        if not small:
+            raise ValueError(f"MODEL_SIZE selects the small model of backend '{self.name}', but none is configured.")
+        return small
+
+    @property
+    def input_spec(self) -> InputSpec:
+        """
+        Input expected by the model. Backends with the same geometry (size and crop) are fed
+        the same resized image; normalization is per backend.
+        """
+        crop = self.settings.MODEL_INPUT_CROP if self.input_crop is None else self.input_crop
+        return InputSpec(self.settings.MODEL_INPUT_SIZE, tuple(self.input_mean), tuple(self.input_std), crop)
+
+    def ensure_loaded(self) -> None:
+        """
+        Loads the model on first use. Safe to call from several worker threads.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self.load()
+                self._loaded = True
+                logger.info(f"Model backend '{self.name}' loaded in {time.perf_counter() - start:.2f}s.")
+
+    @abstractmethod
+    def load(self) -> None:
+        """
+        Loads weights and label vocabulary into memory.
+        """
+
+    @abstractmethod
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Runs the forward pass on a loaded model.
+        """
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Tags a stacked batch of preprocessed images.
+
+        Args:
+            batch (np.ndarray): uint8 array of shape (N, H, W, 3).
+
+        Returns:
+            np.ndarray: float32 array of shape (N, len(self.labels)) with per-label confidences.
+        """
+        self.ensure_loaded()
+        return self._predict(batch)
+
+    def encode_text(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds text prompts into the image embedding space.
+
+        Returns:
+            np.ndarray: L2-normalized float32 array of shape (len(texts), embedding_dim).
+        """
+        self.ensure_loaded()
+        return self._encode_text(texts)
+
+    def embed_images(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Embeds a stacked uint8 batch of shape (N, H, W, 3).
+
+        Returns:
+            np.ndarray: L2-normalized float32 array of shape (N, embedding_dim).
+        """
+        self.ensure_loaded()
+        return self._embed_images(batch)
+
+    def _encode_text(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError(f"Model backend '{self.name}' does not support zero-shot tagging.")
+
+    def _embed_images(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError(f"Model backend '{self.name}' does not support zero-shot tagging.")
+
+    def memory_footprint_bytes(self) -> int:
+        """
+        Approximate memory held by the model weights.
+        """
+        return 0
+
+    def version_info(self) -> Dict[str, Any]:
+        """
+        Identifies the model, so cached results are invalidated when it changes.
+        """
+        return {"backend": self.name, "precision": self.precision, "size": self.model_size}
+
+    def warmup(self) -> Dict[str, float]:
+        """
+        Loads the model and runs two dummy batches, so the first real request does not pay
+        the load and first-inference (allocation/compilation) costs.
+
+        Returns:
+            Dict[str, float]: Cold-start timing report.
+        """
+        size = self.input_spec.size
+        dummy = np.zeros((1, size, size, 3), dtype=np.uint8)
+
+        start = time.perf_counter()
+        self.ensure_loaded()
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self._predict(dummy)
+        first_inference_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self._predict(dummy)
+        warm_inference_seconds = time.perf_counter() - start
+
+        return {
+            "load_seconds": load_seconds,
+            "first_inference_seconds": first_inference_seconds,
+            "warm_inference_seconds": warm_inference_seconds,
+            "memory_footprint_bytes": float(self.memory_footprint_bytes()),
+        }
+
+
+_BACKENDS: Dict[str, Type[ModelBackend]] = {}
+
+
+def register_backend(name: str) -> Callable[[Type[ModelBackend]], Type[ModelBackend]]:
+    """
+    Class decorator that makes a backend selectable through Settings.MODEL_BACKEND.
+    """
+    def decorator(cls: Type[ModelBackend]) -> Type[ModelBackend]:
+        cls.name = name
+        _BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def create_backend(name: str, settings: Settings) -> ModelBackend:
+    """
+    Instantiates (without loading) the backend registered under `name`.
+
+    Raises:
+        ValueError: If no backend is registered under that name.
+    """
+    try:
+        backend_cls = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model backend '{name}'. Available backends: {available_backends()}.")
+    return backend_cls(settings)
+
+
+@register_backend("mock")
+class MockBackend(ModelBackend):
+    """
+    Random tags from a fixed pool. Used on the Vercel Free Tier, where real models do not fit.
+    Its embeddings are deterministic (text: seeded by a hash of the text; images: a fixed
+    random projection of a coarse color grid), so zero-shot results are reproducible.
+    """
+    source_model = "Mock AI"
+    analysis_message = "Image analysis completed (Mock AI for Vercel Free Tier)."
+    embedding_dim = 512
+    _grid = 8
+
+    def load(self) -> None:
+        self.labels = list(MOCK_TAGS_POOL)
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        rng = np.random.default_rng(0)
+        self._projection = rng.standard_normal((self._grid * self._grid * 3, self.embedding_dim)).astype(np.float32)
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        num_tags_to_select = 5
+        scores = np.zeros((batch.shape[0], len(self.labels)), dtype=np.float32)
+        for row in range(batch.shape[0]):
+            for tag_name in random.sample(self.labels, num_tags_to_select):
+                scores[row, self._label_index[tag_name]] = round(random.uniform(0.1, 0.99), 2)
+        return scores
+
+    def _encode_text(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.embedding_dim)
+        return l2_normalize(vectors)
+
+    def _embed_images(self, batch: np.ndarray) -> np.ndarray:
+        n, height, width, _ = batch.shape
+        cell_h, cell_w = height // self._grid, width // self._grid
+        cells = batch[:, :cell_h * self._grid, :cell_w * self._grid].astype(np.float32)
+        grid = cells.reshape(n, self._grid, cell_h, self._grid, cell_w, 3).mean(axis=(2, 4))
+        return l2_normalize((grid.reshape(n, -1) - 127.5) @ self._projection)
+
+
+def read_labels(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+@register_backend("onnx")
+class OnnxRuntimeBackend(ModelBackend):
+    """
+    ONNX Runtime on CPU. Expects an image classifier exported to ONNX (e.g. ViT) taking a
+    normalized float32 NCHW batch and returning logits, plus a text file with one label per line.
+    """
+    source_model = "General Classifier (ONNX)"
+
+    def load(self) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("MODEL_BACKEND='onnx' requires the 'onnxruntime' package.") from e
+
+        self._model_path = self.model_path
+        if self.precision == "int8":
+            self._model_path = quantize_onnx_model(self._model_path, self.settings.QUANTIZED_MODEL_DIR)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.settings.MODEL_NUM_THREADS:
+            options.intra_op_num_threads = self.settings.MODEL_NUM_THREADS
+        self.model = ort.InferenceSession(
+            self._model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.model.get_inputs()[0].name
+        self.labels = read_labels(self.settings.ONNX_LABELS_PATH)
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        with preprocessed_batch(batch, self.input_spec) as pixel_values:
+            (logits,) = self.model.run(None, {self._input_name: pixel_values})
+        return softmax(logits.astype(np.float32))
+
+    @property
+    def model_path(self) -> str:
+        return self._select_model(self.settings.ONNX_MODEL_PATH, self.settings.ONNX_SMALL_MODEL_PATH)
+
+    def memory_footprint_bytes(self) -> int:
+        path = getattr(self, "_model_path", None) or self.model_path
+        return os.path.getsize(path) if path else 0
+
+    def version_info(self) -> Dict[str, Any]:
+        path = self.model_path
+        mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+        return {**super().version_info(), "model_path": path, "model_mtime": mtime}
+
+
+@register_backend("torch")
+class TorchBackend(ModelBackend):
+    """
+    PyTorch on CPU, through Hugging Face Transformers (e.g. google/vit-base-patch16-224).
+    """
+    source_model = "General Classifier"
+
+    def load(self) -> None:
+        try:
+            import torch
+            from transformers import AutoImageProcessor, AutoModelForImageClassification
+        except ImportError as e:
+            raise RuntimeError("MODEL_BACKEND='torch' requires the 'torch' and 'transformers' packages.") from e
+
+        if self.settings.MODEL_NUM_THREADS:
+            torch.set_num_threads(self.settings.MODEL_NUM_THREADS)
+        self._torch = torch
+        self.processor = AutoImageProcessor.from_pretrained(self.model_name)
+        self.model = AutoModelForImageClassification.from_pretrained(self.model_name).eval()
+        if self.precision == "int8":
+            self.model = quantize_torch_model(torch, self.model)
+        self.labels = [self.model.config.id2label[i] for i in range(len(self.model.config.id2label))]
+        self.input_mean = getattr(self.processor, "image_mean", IMAGENET_MEAN)
+        self.input_std = getattr(self.processor, "image_std", IMAGENET_STD)
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        with preprocessed_batch(batch, self.input_spec) as pixel_values, self._torch.inference_mode():
+            logits = self.model(pixel_values=self._torch.from_numpy(pixel_values)).logits
+        return self._torch.softmax(logits, dim=-1).numpy()
+
+    @property
+    def model_name(self) -> str:
+        return self._select_model(self.settings.TORCH_MODEL_NAME, self.settings.TORCH_SMALL_MODEL_NAME)
+
+    def memory_footprint_bytes(self) -> int:
+        return torch_model_bytes(self.model) if self.model is not None else 0
+
+    def version_info(self) -> Dict[str, Any]:
+        return {**super().version_info(), "model_name": self.model_name}
+
+
+@register_backend("clip")
+class ClipBackend(ModelBackend):
+    """
+    OpenAI CLIP on CPU, through Hugging Face Transformers (e.g. openai/clip-vit-base-patch32).
+    Used as a classifier it scores images against LABEL_SET_PATH (or the built-in tags);
+    its main use is as the ZERO_SHOT_BACKEND, embedding images and label prompts.
+    """
+    source_model = "CLIP Zero-Shot"
+    input_mean = CLIP_MEAN
+    input_std = CLIP_STD
+    input_crop = True  # CLIP is trained on center crops
+
+    def load(self) -> None:
+        try:
+            import torch
+            from transformers import CLIPModel, CLIPTokenizer
+        except ImportError as e:
+            raise RuntimeError("MODEL_BACKEND='clip' requires the 'torch' and 'transformers' packages.") from e
+
+        if self.settings.MODEL_NUM_THREADS:
+            torch.set_num_threads(self.settings.MODEL_NUM_THREADS)
+        self._torch = torch
+        self.processor = CLIPTokenizer.from_pretrained(self.model_name)
+        self.model = CLIPModel.from_pretrained(self.model_name).eval()
+        self.embedding_dim = self.model.config.projection_dim
+        self.logit_scale = float(self.model.logit_scale.exp())
+        if self.precision == "int8":
+            self.model = quantize_torch_model(torch, self.model)
+        self.labels = read_labels(self.settings.LABEL_SET_PATH) if self.settings.LABEL_SET_PATH else list(MOCK_TAGS_POOL)
+        self._label_embeddings = self._encode_text(
+            [self.settings.LABEL_PROMPT_TEMPLATE.format(label) for label in self.labels]
+        )
+
+    def _encode_text(self, texts: List[str]) -> np.ndarray:
+        tokens = self.processor(texts, padding=True, truncation=True, return_tensors="pt")
+        with self._torch.inference_mode():
+            features = self.model.get_text_features(**tokens)
+        return l2_normalize(features.numpy())
+
+    def _embed_images(self, batch: np.ndarray) -> np.ndarray:
+        with preprocessed_batch(batch, self.input_spec) as pixel_values, self._torch.inference_mode():
+            features = self.model.get_image_features(pixel_values=self._torch.from_numpy(pixel_values))
+        return l2_normalize(features.numpy())
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        return softmax(self.logit_scale * (self._embed_images(batch) @ self._label_embeddings.T))
+
+    @property
+    def model_name(self) -> str:
+        return self._select_model(self.settings.CLIP_MODEL_NAME, self.settings.CLIP_SMALL_MODEL_NAME)
+
+    def memory_footprint_bytes(self) -> int:
+        return torch_model_bytes(self.model) if self.model is not None else 0
+
+    def version_info(self) -> Dict[str, Any]:
+        return {**super().version_info(), "model_name": self.model_name,
+                "label_set": self.settings.LABEL_SET_PATH, "prompt_template": self.settings.LABEL_PROMPT_TEMPLATE}
@@ -0,0 +1,144 @@
+from collections import deque
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import threading
+
+from PIL import Image
+import numpy as np
+
+from backend.src.core.config import get_settings
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Computes the difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and each bit
+    records whether a pixel is brighter than its right neighbour. Re-encoded, resized or
+    slightly recompressed copies of an image land within a few bits of each other.
+
+    Args:
+        image (Image.Image): The (already decoded) image.
+        hash_size (int): Rows of the thumbnail; the hash has hash_size ** 2 bits.
+
+    Returns:
+        int: The hash, as an unsigned integer of hash_size ** 2 bits.
+    """
+    thumbnail = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    Multi-index hashing (MIH) index of perceptual hashes, for Hamming-radius queries.
+
+    Each hash is split into `num_chunks` disjoint chunks and every chunk value is indexed in
+    its own hash table. By the pigeonhole principle, two hashes within distance r agree to
+    within floor(r / num_chunks) bits on at least one chunk, so a query only probes the chunk
+    values near its own chunks and verifies the few candidates found, instead of scanning
+    every stored hash.
+
+    The index is bounded: once `max_entries` hashes are stored, the oldest ones are dropped.
+    """
+    def __init__(self, hash_bits: int = 64, num_chunks: int = 4, max_entries: int = 100000):
+        if hash_bits % num_chunks:
+            raise ValueError("hash_bits must be divisible by num_chunks.")
+        self.hash_bits = hash_bits
+        self.num_chunks = num_chunks
+        self.chunk_bits = hash_bits // num_chunks
+        self.chunk_mask = (1 << self.chunk_bits) - 1
+        self.max_entries = max(1, max_entries)
+
+        self._entries: Dict[int, Tuple[int, Any]] = {}  # entry id -> (hash, payload)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(num_chunks)]  # chunk value -> entry ids
+        self._order: Deque[int] = deque()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _chunks(self, value: int) -> Iterator[int]:
+        for i in range(self.num_chunks):
+            yield (value >> (i * self.chunk_bits)) & self.chunk_mask
+
+    def add(self, value: int, payload: Any) -> None:
+        """
+        Stores a hash with an arbitrary payload (e.g. the analysis result of the image).
+        """
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (value, payload)
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                table.setdefault(chunk, []).append(entry_id)
+            self._order.append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(self._order.popleft())
+
+    def _remove(self, entry_id: int) -> None:
+        value, _ = self._entries.pop(entry_id)
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            bucket = table[chunk]
+            bucket.remove(entry_id)
+            if not bucket:
+                del table[chunk]
+
+    def _chunk_variants(self, chunk: int, radius: int) -> Iterator[int]:
+        """
+        Yields every chunk value within `radius` bits of `chunk`.
+        """
+        yield chunk
+        for flips in range(1, radius + 1):
+            for positions in combinations(range(self.chunk_bits), flips):
+                variant = chunk
+                for position in positions:
+                    variant ^= 1 << position
+                yield variant
+
+    def search(self, value: int, radius: int) -> Optional[Tuple[int, Any]]:
+        """
+        Finds the stored hash closest to `value` within `radius` bits.
+
+        Returns:
+            Optional[Tuple[int, Any]]: (distance, payload) of the nearest neighbour, or None.
+        """
+        sub_radius = radius // self.num_chunks
+        best: Optional[Tuple[int, Any]] = None
+        seen = set()
+        with self._lock:
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                for variant in self._chunk_variants(chunk, sub_radius):
+                    for entry_id in table.get(variant, ()):
+                        if entry_id in seen:
+                            continue
+                        seen.add(entry_id)
+                        stored, payload = self._entries[entry_id]
+                        distance = (stored ^ value).bit_count()
+                        if distance <= radius and (best is None or distance < best[0]):
+                            best = (distance, payload)
+                            if distance == 0:
+                                return best
+        return best
+
+
+@lru_cache()
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """
+    Returns the process-wide near-duplicate index configured in Settings.
+    """
+    settings = get_settings()
+    logger.info(f"Creating near-duplicate index: max_entries={settings.NEAR_DUPLICATE_MAX_ENTRIES}, "
+                f"max_distance={settings.NEAR_DUPLICATE_MAX_DISTANCE}")
+    return NearDuplicateIndex(max_entries=settings.NEAR_DUPLICATE_MAX_ENTRIES)
+
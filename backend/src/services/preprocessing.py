@@ -0,0 +1,181 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple, Union
+import threading
+
+import numpy as np
+from PIL import Image
+
+from backend.src.core.metrics import get_metrics_registry
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ImageNet normalization used by ViT/CLIP-style image encoders
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+# CLIP image encoders use their own normalization
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+# (side in pixels, center-crop) of a resized model input; models with the same geometry share one resized image
+Geometry = Tuple[int, bool]
+
+
+class InputSpec(NamedTuple):
+    """
+    What a model expects as input: a square `size` x `size` RGB image, either squashed to that
+    size or resized on its shorter side and center-cropped (`crop`), then normalized per channel
+    with `mean` / `std` (on the 0..1 scale).
+    """
+    size: int
+    mean: Tuple[float, float, float] = IMAGENET_MEAN
+    std: Tuple[float, float, float] = IMAGENET_STD
+    crop: bool = False
+
+    @property
+    def geometry(self) -> Geometry:
+        return (self.size, self.crop)
+
+
+def resize_image(img: Image.Image, geometry: Geometry) -> Image.Image:
+    """
+    Resizes an RGB image to a model input geometry in a single resampling pass: for center
+    crops, the crop box is passed to `resize` instead of cropping a resized copy.
+    """
+    size, crop = geometry
+    if not crop:
+        return img.resize((size, size), Image.BILINEAR)
+    side = min(img.width, img.height)
+    left, top = (img.width - side) // 2, (img.height - side) // 2
+    return img.resize((size, size), Image.BILINEAR, box=(left, top, left + side, top + side))
+
+
+def resize_for_models(img: Image.Image, geometries: Sequence[Geometry]) -> List[Image.Image]:
+    """
+    Resizes an opened image once per distinct geometry.
+
+    Only the largest input is ever needed, so JPEGs are decoded straight to a smaller scale with
+    `draft()` (DCT scaling) and any remaining large factor is removed with a cheap integer
+    `reduce()`; the RGB conversion is done once and shared by every geometry.
+    """
+    target = max(size for size, _ in geometries)
+    img.draft("RGB", (target, target))
+    factor = min(img.width // target, img.height // target)
+    if factor >= 2:
+        img = img.reduce(factor)
+    rgb = img.convert("RGB")
+    resized: Dict[Geometry, Image.Image] = {}
+    for geometry in geometries:
+        if geometry not in resized:
+            resized[geometry] = resize_image(rgb, geometry)
+    return [resized[geometry] for geometry in geometries]
+
+
+def stack_views(views: Sequence[Sequence[np.ndarray]]) -> Tuple[np.ndarray, ...]:
+    """
+    Stacks the per-image views (one per model geometry) into one uint8 NHWC batch per geometry.
+    Geometries that share their arrays share the stacked batch too.
+    """
+    stacked: Dict[int, np.ndarray] = {}
+    batches = []
+    for column in zip(*views):
+        key = id(column[0])
+        if key not in stacked:
+            stacked[key] = np.stack(column)
+        batches.append(stacked[key])
+    return tuple(batches)
+
+
+@lru_cache(maxsize=32)
+def _scale_and_bias(mean: Tuple[float, ...], std: Tuple[float, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the (3, 1, 1) float32 factors such that (value / 255 - mean) / std == value * scale + bias.
+    """
+    scale = (1.0 / (255.0 * np.asarray(std, dtype=np.float64))).astype(np.float32).reshape(3, 1, 1)
+    bias = (-np.asarray(mean, dtype=np.float64) / np.asarray(std, dtype=np.float64)).astype(np.float32).reshape(3, 1, 1)
+    return scale, bias
+
+
+def normalize_into(images: Union[np.ndarray, Sequence[np.ndarray]], out: np.ndarray,
+                   mean: Sequence[float] = IMAGENET_MEAN, std: Sequence[float] = IMAGENET_STD) -> np.ndarray:
+    """
+    Converts uint8 HWC images into normalized float32 NCHW, written straight into `out`.
+
+    Per image, the uint8 -> float32 cast, the HWC -> CHW transpose and the scaling are one
+    `np.multiply` into the output slice, followed by an in-place add of the bias while that
+    slice is still in cache: no float temporaries, whatever the batch size.
+
+    Args:
+        images: uint8 batch of shape (N, H, W, 3), or a sequence of N (H, W, 3) arrays.
+        out: float32 array of shape (N, 3, H, W).
+    """
+    scale, bias = _scale_and_bias(tuple(mean), tuple(std))
+    for image, target in zip(images, out):
+        np.multiply(image.transpose(2, 0, 1), scale, out=target, casting="unsafe")
+        np.add(target, bias, out=target)
+    return out
+
+
+class TensorPool:
+    """
+    Pool of float32 model input tensors, reused across batches instead of allocating (and
+    page-faulting) a new one per inference. Tensors are keyed by shape; at most `max_free`
+    idle tensors are kept per shape. Thread-safe: each borrower gets its own tensor.
+    """
+    def __init__(self, max_free: int = 4):
+        self.max_free = max_free
+        self._free: Dict[Tuple[int, ...], List[np.ndarray]] = defaultdict(list)
+        self._lock = threading.Lock()
+        registry = get_metrics_registry()
+        self.allocations = registry.counter("preprocess_tensor_allocations_total", "Input tensors allocated by the tensor pool.")
+        self.reuses = registry.counter("preprocess_tensor_reuses_total", "Input tensors served from the tensor pool.")
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                self.reuses.inc()
+                return free.pop()
+        self.allocations.inc()
+        return np.empty(shape, dtype=np.float32)
+
+    def release(self, tensor: np.ndarray) -> None:
+        with self._lock:
+            free = self._free[tensor.shape]
+            if len(free) < self.max_free:
+                free.append(tensor)
+
+    @contextmanager
+    def borrow(self, shape: Tuple[int, ...]) -> Iterator[np.ndarray]:
+        tensor = self.acquire(shape)
+        try:
+            yield tensor
+        finally:
+            self.release(tensor)
+
+
+@lru_cache()
+def get_tensor_pool() -> TensorPool:
+    """
+    Returns the tensor pool of this process (each process-pool worker has its own).
+    """
+    return TensorPool()
+
+
+@contextmanager
+def preprocessed_batch(batch: np.ndarray, spec: InputSpec) -> Iterator[np.ndarray]:
+    """
+    Yields the normalized float32 NCHW tensor of a uint8 NHWC batch, in a pooled buffer that is
+    returned to the pool on exit: the model must not keep a reference to it after the block.
+
+    Raises:
+        ValueError: If the images do not have the spec's input size.
+    """
+    n, height, width, _ = batch.shape
+    if (height, width) != (spec.size, spec.size):
+        raise ValueError(f"Expected {spec.size}x{spec.size} images, got {width}x{height}.")
+    with get_tensor_pool().borrow((n, 3, height, width)) as tensor:
+        yield normalize_into(batch, tensor, spec.mean, spec.std)
@@ -0,0 +1,287 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.models.image import ImageAnalysisResponse
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Returns a fast, collision-resistant hash of the image bytes.
+    Used both as the cache key and as the deterministic `image_id` of the image.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def make_config_version(config: Dict[str, Any]) -> str:
+    """
+    Returns a short fingerprint of the model/threshold configuration.
+    Cached results produced under a different configuration are never reused.
+    """
+    encoded = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results, keyed by content hash + configuration version.
+
+    - Memory tier: bounded LRU with a TTL, holding the response objects themselves.
+    - Disk tier (optional): SQLite table holding the responses as JSON, so results
+      survive restarts. Disk hits are promoted to the memory tier.
+
+    Disk writes are write-behind: `put` only queues the row, and a background thread writes the
+    queued rows every `flush_interval` seconds in one transaction (queued rows are still served
+    by lookups). The same thread drops rows past the TTL, and the oldest rows above
+    `max_disk_entries`, every `prune_interval` seconds. Use `aget` from the event loop: disk
+    lookups then run in a worker thread.
+    """
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 1_000_000, flush_interval: float = 0.5, prune_interval: float = 300.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path or None
+        self.max_disk_entries = max_disk_entries
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self._entries: "OrderedDict[str, Tuple[float, ImageAnalysisResponse]]" = OrderedDict()
+        self._lock = threading.Lock()  # Memory tier and write queue; never held during disk I/O
+        # key -> (created_at, response) of the rows not written yet
+        self._pending: Dict[str, Tuple[float, ImageAnalysisResponse]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closing = threading.Event()
+        self._pruned_at = 0.0
+        self._writer: Optional[threading.Thread] = None
+        if self.disk_path:
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analysis_results_created_at ON analysis_results (created_at)")
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_behind, name="result-cache-writer", daemon=True)
+            self._writer.start()
+
+        registry = get_metrics_registry()
+        self.memory_hits = registry.counter("result_cache_memory_hits_total", "Results served from the in-memory cache.")
+        self.disk_hits = registry.counter("result_cache_disk_hits_total", "Results served from the on-disk cache.")
+        self.misses = registry.counter("result_cache_misses_total", "Lookups that required a full analysis.")
+        self.evictions = registry.counter("result_cache_evictions_total", "In-memory entries evicted by the LRU size bound.")
+        self.disk_evictions = registry.counter("result_cache_disk_evictions_total",
+                                               "On-disk rows pruned by the RESULT_CACHE_DISK_MAX_ENTRIES bound.")
+        self.expirations = registry.counter("result_cache_expirations_total", "Entries dropped because their TTL elapsed.")
+        self.size = registry.gauge("result_cache_memory_entries", "Entries currently held in the in-memory cache.")
+        self.disk_writes = registry.histogram("result_cache_disk_write_rows", "Rows written per disk transaction.",
+                                              buckets=[2 ** i for i in range(0, 15, 2)])
+
+    @staticmethod
+    def make_key(image_hash: str, config_version: str) -> str:
+        return f"{config_version}:{image_hash}"
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[ImageAnalysisResponse]:
+        """
+        Looks up a cached result, first in memory and then on disk (blocking).
+        """
+        response = self._get_from_memory(key)
+        if response is None and self._db is not None:
+            response = self._get_from_disk(key)
+        if response is None:
+            self.misses.inc()
+        return response
+
+    async def aget(self, key: str) -> Optional[ImageAnalysisResponse]:
+        """
+        Same as `get`, with the disk lookup run in a worker thread (memory hits stay on the loop).
+        """
+        response = self._get_from_memory(key)
+        if response is None and self._db is not None:
+            response = await asyncio.to_thread(self._get_from_disk, key)
+        if response is None:
+            self.misses.inc()
+        return response
+
+    def _get_from_memory(self, key: str) -> Optional[ImageAnalysisResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, response = entry
+            if not self._is_expired(created_at, now):
+                self._entries.move_to_end(key)
+                self.memory_hits.inc()
+                return response
+            del self._entries[key]
+            self.expirations.inc()
+            self.size.set(len(self._entries))
+            return None
+
+    def _get_from_disk(self, key: str) -> Optional[ImageAnalysisResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._pending.get(key)
+        if entry is None:
+            # A flush in progress holds the database lock until its rows are committed
+            with self._db_lock:
+                if self._db is None:
+                    return None
+                row = self._db.execute(
+                    "SELECT value, created_at FROM analysis_results WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self._is_expired(created_at, now):  # Deleted by the next prune
+                return None
+            entry = (created_at, ImageAnalysisResponse.model_validate_json(value))
+        elif self._is_expired(entry[0], now):
+            return None
+        with self._lock:
+            self._store_in_memory(key, entry[1], entry[0])
+        self.disk_hits.inc()
+        return entry[1]
+
+    def put(self, key: str, response: ImageAnalysisResponse) -> None:
+        """
+        Stores a result in memory and, when configured, queues it for the disk tier.
+        """
+        now = time.time()
+        with self._lock:
+            self._store_in_memory(key, response, now)
+            if self._db is not None:
+                self._pending[key] = (now, response)
+        if self._db is not None:
+            self._dirty.set()
+
+    def _store_in_memory(self, key: str, response: ImageAnalysisResponse, created_at: float) -> None:
+        self._entries[key] = (created_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions.inc()
+        self.size.set(len(self._entries))
+
+    def _write_behind(self) -> None:
+        while not self._closing.is_set():
+            self._dirty.wait()
+            self._closing.wait(self.flush_interval)  # Rows queued meanwhile share the transaction
+            self._dirty.clear()
+            try:
+                self.flush()
+                if time.time() - self._pruned_at >= self.prune_interval:
+                    self.prune()
+            except sqlite3.Error:
+                logger.exception("Failed to write the result cache to %s.", self.disk_path)
+
+    def flush(self) -> None:
+        """
+        Writes the queued rows to disk, in one transaction. They stay queued (and served from
+        memory) until the transaction is committed, so a failed write loses nothing: the next
+        flush retries them.
+        """
+        with self._db_lock:
+            with self._lock:
+                pending = dict(self._pending)
+            if not pending or self._db is None:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO analysis_results (key, value, created_at) VALUES (?, ?, ?)",
+                    [(key, response.model_dump_json(), created_at) for key, (created_at, response) in pending.items()],
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+                raise
+            with self._lock:
+                for key, entry in pending.items():
+                    if self._pending.get(key) is entry:  # Not replaced by a newer result meanwhile
+                        del self._pending[key]
+        self.disk_writes.observe(len(pending))
+
+    def prune(self) -> None:
+        """
+        Deletes the rows past the TTL, then the oldest rows above `max_disk_entries`.
+        """
+        now = time.time()
+        with self._db_lock:
+            if self._db is None:
+                return
+            if self.ttl_seconds > 0:
+                expired = self._db.execute("DELETE FROM analysis_results WHERE created_at < ?",
+                                           (now - self.ttl_seconds,)).rowcount
+                self.expirations.inc(max(0, expired))
+            if self.max_disk_entries > 0:
+                excess = self._db.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0] - self.max_disk_entries
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM analysis_results WHERE key IN "
+                        "(SELECT key FROM analysis_results ORDER BY created_at LIMIT ?)", (excess,)
+                    )
+                    self.disk_evictions.inc(excess)
+            self._db.commit()
+        self._pruned_at = now
+
+    def clear(self) -> None:
+        """
+        Drops every entry from both tiers.
+        """
+        with self._db_lock:
+            with self._lock:
+                self._entries.clear()
+                self._pending.clear()
+                self.size.set(0)
+            if self._db is not None:
+                self._db.execute("DELETE FROM analysis_results")
+                self._db.commit()
+
+    def close(self) -> None:
+        """
+        Writes the queued rows and closes the database (blocking).
+        """
+        if self._writer is not None:
+            self._closing.set()
+            self._dirty.set()
+            self._writer.join()
+            self._writer = None
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+
+@lru_cache()
+def get_result_cache() -> ResultCache:
+    """
+    Returns the process-wide result cache configured in Settings.
+    """
+    settings = get_settings()
+    logger.info(f"Creating result cache: max_entries={settings.RESULT_CACHE_MAX_ENTRIES}, "
+                f"ttl={settings.RESULT_CACHE_TTL_SECONDS}s, disk_path='{settings.RESULT_CACHE_DISK_PATH}'")
+    return ResultCache(
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        disk_path=settings.RESULT_CACHE_DISK_PATH,
+        max_disk_entries=settings.RESULT_CACHE_DISK_MAX_ENTRIES,
+    )
@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import threading
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (name, confidence, source_model) of one selected tag
+AggregatedTag = Tuple[str, float, str]
+
+# Vocabularies (label lists of the general source) kept by TagAggregator: one per model in use
+_MAX_VOCABULARIES = 4
+
+
+class TagSource(NamedTuple):
+    """
+    The confidences one model produced for a batch of images.
+    """
+    source_model: str
+    labels: Sequence[str]
+    scores: np.ndarray  # Shape (N, len(labels)), confidences in [0, 1]
+
+    @classmethod
+    def from_ranked(cls, source_model: str, rows: List[List[Tuple[str, float]]]) -> "TagSource":
+        """
+        Builds a source from per-image (label, confidence) lists, e.g. zero-shot top-k results.
+        """
+        labels = list(dict.fromkeys(label for row in rows for label, _ in row))
+        column = {label: i for i, label in enumerate(labels)}
+        scores = np.zeros((len(rows), len(labels)), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for label, confidence in row:
+                scores[i, column[label]] = confidence
+        return cls(source_model, labels, scores)
+
+
+class _Vocabulary(NamedTuple):
+    """
+    Merged-matrix columns of the labels of a general source.
+    """
+    ids: Dict[str, int]  # canonical key -> column
+    names: List[str]  # column -> display name
+    columns: np.ndarray  # column of every label, in source order
+    has_duplicates: bool  # Whether two labels share a column
+
+
+def normalize_tag_name(name: str) -> str:
+    return " ".join(name.replace("_", " ").split()).lower()
+
+
+def load_synonyms(path: str) -> Dict[str, str]:
+    """
+    Reads a JSON object mapping synonyms to their canonical tag, e.g. {"puppy": "dog"}.
+    """
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TagAggregator:
+    """
+    Merges the confidences of several models into the final tags of each image, over a whole batch.
+
+    Every label is mapped to a canonical tag: names are compared case-insensitively, a label
+    listing aliases ("tabby, tabby cat") is known by its first alias, and `synonyms` maps
+    other names onto a canonical one. For each image and canonical tag the highest
+    confidence across sources wins. Then:
+
+    - When the first (general) source is confident about an image (see `is_confident`), it is
+      trusted: the other sources only contribute tags that also reach `high_confidence`.
+    - Tags below `min_confidence` are dropped.
+    - The `top_k` best tags are selected with `argpartition`, so only k values per image are sorted.
+    """
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None, min_confidence: float = 0.001,
+                 high_confidence: float = 0.6, min_confident_tags: int = 2, min_confident_margin: float = 0.3,
+                 top_k: int = 5):
+        self.synonyms = {normalize_tag_name(k): normalize_tag_name(v) for k, v in (synonyms or {}).items()}
+        self._synonym_names = {normalize_tag_name(v): v for v in (synonyms or {}).values()}
+        self.min_confidence = min_confidence
+        self.high_confidence = high_confidence
+        self.min_confident_tags = min_confident_tags
+        self.min_confident_margin = min_confident_margin
+        self.top_k = top_k
+
+        # Only the (stable) label lists of general sources are cached, in a small LRU; the labels
+        # of the other sources (e.g. per-batch zero-shot top-k) are mapped on every call
+        self._vocabularies: "OrderedDict[Tuple[str, ...], _Vocabulary]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _canonical(self, label: str) -> Tuple[str, str]:
+        """
+        Returns the canonical key of a label and the name it is displayed with.
+        """
+        display = label.split(",")[0].strip() or label
+        key = normalize_tag_name(display)
+        if key in self.synonyms:
+            key = self.synonyms[key]
+            display = self._synonym_names.get(key, key)
+        return key, display
+
+    def _vocabulary(self, labels: Sequence[str]) -> _Vocabulary:
+        """
+        Returns the columns of the labels of a general source, built once per label list.
+        """
+        cache_key = tuple(labels)
+        with self._lock:
+            cached = self._vocabularies.get(cache_key)
+            if cached is not None:
+                self._vocabularies.move_to_end(cache_key)
+                return cached
+
+        ids: Dict[str, int] = {}
+        names: List[str] = []
+        for label in labels:
+            key, display = self._canonical(label)
+            if key not in ids:
+                ids[key] = len(names)
+                names.append(display)
+        columns = np.fromiter((ids[self._canonical(label)[0]] for label in labels), dtype=np.intp, count=len(labels))
+        vocabulary = _Vocabulary(ids, names, columns, len(names) < len(columns))
+        with self._lock:
+            self._vocabularies[cache_key] = vocabulary
+            while len(self._vocabularies) > _MAX_VOCABULARIES:
+                self._vocabularies.popitem(last=False)
+        return vocabulary
+
+    def is_confident(self, general_scores: np.ndarray) -> np.ndarray:
+        """
+        Returns, per image, whether the general classifier is trusted on its own: at least
+        `min_confident_tags` of its tags reach `high_confidence` (multi-label classifiers), or
+        its top tag does and is at least `min_confident_margin` ahead of the second. The
+        latter is what a softmax classifier can reach: its scores sum to 1, so no two of them
+        reach a `high_confidence` above 0.5.
+        """
+        scores = np.asarray(general_scores)
+        confident = (scores >= self.high_confidence).sum(axis=1) >= self.min_confident_tags
+        if scores.shape[1] == 0:
+            return confident
+        if scores.shape[1] == 1:
+            top1, top2 = scores[:, 0], np.zeros(len(scores), dtype=scores.dtype)
+        else:
+            top2, top1 = np.partition(scores, -2, axis=1)[:, -2:].T
+        return confident | ((top1 >= self.high_confidence) & (top1 - top2 >= self.min_confident_margin))
+
+    def aggregate(self, sources: Sequence[TagSource]) -> List[List[AggregatedTag]]:
+        """
+        Args:
+            sources (Sequence[TagSource]): Outputs of each model for the same N images,
+                the general classifier first.
+
+        Returns:
+            List[List[AggregatedTag]]: For each image, its selected tags, best first.
+        """
+        num_images = sources[0].scores.shape[0]
+        vocabulary = self._vocabulary(sources[0].labels)
+        columns = [(vocabulary.columns, vocabulary.has_duplicates)]
+        extra: Dict[str, int] = {}  # Canonical keys only known to the other sources, for this call
+        names = vocabulary.names
+        for source in sources[1:]:
+            source_columns = np.empty(len(source.labels), dtype=np.intp)
+            for i, label in enumerate(source.labels):
+                key, display = self._canonical(label)
+                column = vocabulary.ids.get(key, extra.get(key))
+                if column is None:
+                    if names is vocabulary.names:
+                        names = list(names)
+                    column = extra[key] = len(names)
+                    names.append(display)
+                source_columns[i] = column
+            columns.append((source_columns, len(np.unique(source_columns)) < len(source_columns)))
+        width = len(names)
+        if width == 0 or self.top_k <= 0:
+            return [[] for _ in range(num_images)]
+
+        general_is_confident = self.is_confident(sources[0].scores)
+
+        merged = np.zeros((num_images, width), dtype=np.float32)
+        origin = np.zeros((num_images, width), dtype=np.int8)
+        for k, (source, (source_columns, has_duplicates)) in enumerate(zip(sources, columns)):
+            scores = np.clip(np.asarray(source.scores, dtype=np.float32), 0.0, 1.0)
+            if k > 0:
+                scores = np.where(general_is_confident[:, np.newaxis] & (scores < self.high_confidence), 0.0, scores)
+            projected = np.zeros((num_images, width), dtype=np.float32)
+            if has_duplicates:
+                # Synonyms within one source: keep the best of them
+                np.maximum.at(projected.T, source_columns, scores.T)
+            else:
+                projected[:, source_columns] = scores
+            better = projected > merged
+            merged = np.where(better, projected, merged)
+            origin = np.where(better, k, origin)
+
+        merged[merged < self.min_confidence] = 0.0
+        k = min(self.top_k, width)
+        top = np.argpartition(merged, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(merged, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.round(np.take_along_axis(top_scores, order, axis=1).astype(np.float64), 4)
+        top_origin = np.take_along_axis(origin, top, axis=1)
+
+        source_models = [source.source_model for source in sources]
+        return [
+            [(names[i], confidence, source_models[o])
+             for i, confidence, o in zip(row_ids, row_scores, row_origin) if confidence > 0]
+            for row_ids, row_scores, row_origin in zip(top.tolist(), top_scores.tolist(), top_origin.tolist())
+        ]
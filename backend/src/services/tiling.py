@@ -0,0 +1,149 @@
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backend.src.core.config import Settings
+
+# (left, top, right, bottom) of a tile, in pixels of the tiled image
+Box = Tuple[int, int, int, int]
+
+# Saliency is computed on the tiled image downscaled by this factor
+_SALIENCY_REDUCE = 4
+
+
+class TilingConfig(NamedTuple):
+    """
+    How large images are tiled (see Settings.TILING_*). Passed to `decode_image`, so it is a
+    plain picklable tuple.
+    """
+    min_pixels: int
+    max_side: int
+    tile_size: int
+    overlap: float
+    max_tiles: int
+    min_saliency: float
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TilingConfig":
+        return cls(
+            min_pixels=int(settings.TILING_MIN_MEGAPIXELS * 1_000_000),
+            max_side=settings.TILING_MAX_SIDE,
+            tile_size=settings.TILE_SIZE,
+            overlap=settings.TILE_OVERLAP,
+            max_tiles=settings.TILING_MAX_TILES,
+            min_saliency=settings.TILE_MIN_SALIENCY,
+        )
+
+
+def _starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    return starts + [length - tile]  # The last tile is flush with the edge
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: float) -> List[Box]:
+    """
+    Covers a width x height image with square tiles of `tile_size` pixels overlapping their
+    neighbours by `overlap` (fraction of a tile). A side shorter than a tile gets one tile
+    spanning it.
+    """
+    stride = max(1, int(round(tile_size * (1.0 - overlap))))
+    return [(left, top, min(left + tile_size, width), min(top + tile_size, height))
+            for top in _starts(height, tile_size, stride) for left in _starts(width, tile_size, stride)]
+
+
+def saliency_scores(img: Image.Image, boxes: Sequence[Box]) -> np.ndarray:
+    """
+    Scores every box by its mean gradient magnitude (edge density) on a downscaled grayscale
+    copy: textured regions, where objects are, score high; sky, walls and blur score low.
+    One summed-area table makes each box O(1).
+    """
+    gray = img.convert("L")
+    if min(gray.size) >= 2 * _SALIENCY_REDUCE:
+        gray = gray.reduce(_SALIENCY_REDUCE)
+    sx, sy = img.width / gray.width, img.height / gray.height  # reduce() rounds each side up
+    pixels = np.asarray(gray, dtype=np.float32)
+    gradient = np.zeros_like(pixels)
+    gradient[:, 1:] += np.abs(np.diff(pixels, axis=1))
+    gradient[1:, :] += np.abs(np.diff(pixels, axis=0))
+    table = np.zeros((pixels.shape[0] + 1, pixels.shape[1] + 1), dtype=np.float64)
+    table[1:, 1:] = gradient.cumsum(axis=0).cumsum(axis=1)
+
+    scores = np.empty(len(boxes), dtype=np.float32)
+    for i, (left, top, right, bottom) in enumerate(boxes):
+        x0, y0 = min(int(left / sx), gray.width - 1), min(int(top / sy), gray.height - 1)
+        x1 = min(max(x0 + 1, int(right / sx)), gray.width)
+        y1 = min(max(y0 + 1, int(bottom / sy)), gray.height)
+        total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        scores[i] = total / ((x1 - x0) * (y1 - y0))
+    return scores
+
+
+def select_salient_tiles(img: Image.Image, config: TilingConfig) -> List[Box]:
+    """
+    Returns the boxes of the (at most `max_tiles`) most salient tiles, skipping tiles less
+    salient than `min_saliency` times the most salient one, most salient first.
+    """
+    boxes = tile_grid(img.width, img.height, config.tile_size, config.overlap)
+    if len(boxes) <= 1:
+        return []  # A single tile is the whole image: the global view already covers it
+    scores = saliency_scores(img, boxes)
+    order = np.argsort(-scores, kind="stable")[:config.max_tiles]
+    threshold = config.min_saliency * float(scores[order[0]])
+    return [boxes[i] for i in order if scores[i] >= threshold and scores[i] > 0]
+
+
+def load_for_tiling(img: Image.Image, max_side: int) -> Image.Image:
+    """
+    Decodes an opened image at (about) `max_side` pixels on its long side: JPEGs are decoded
+    at a reduced DCT scale, then the RGB image is resized down when still larger.
+    """
+    long_side = max(img.size)
+    if long_side > max_side:
+        img.draft("RGB", (img.width * max_side // long_side, img.height * max_side // long_side))
+    rgb = img.convert("RGB")
+    if max(rgb.size) > max_side:
+        ratio = max_side / max(rgb.size)
+        rgb = rgb.resize((max(1, round(rgb.width * ratio)), max(1, round(rgb.height * ratio))), Image.BILINEAR,
+                         reducing_gap=2.0)
+    return rgb
+
+
+def extract_tiles(img: Image.Image, boxes: Sequence[Box], size: int) -> Tuple[np.ndarray, ...]:
+    """
+    Resizes every box of the image to a size x size uint8 RGB model input.
+    """
+    return tuple(np.asarray(img.resize((size, size), Image.BILINEAR, box=box), dtype=np.uint8) for box in boxes)
+
+
+def pool_tile_scores(scores: np.ndarray, tile_counts: Sequence[int], method: str = "max") -> np.ndarray:
+    """
+    Merges the classifier scores of every image's global view with those of its tiles.
+
+    `scores` holds one row per image (the global views, in order), followed by the rows of
+    the tiles of every image (in the same order, `tile_counts[i]` rows for image i).
+
+      - "max": per label, the highest confidence of any view, so an object visible in a single
+        tile keeps its tile confidence;
+      - "attention": views weighted by the softmax of their peak confidence (temperature 0.1),
+        so confident views dominate and the pooled row still sums to 1.
+
+    Returns:
+        np.ndarray: One pooled row per image.
+    """
+    pooled = scores[:len(tile_counts)].copy()
+    offset = len(tile_counts)
+    for i, count in enumerate(tile_counts):
+        if not count:
+            continue
+        views = np.concatenate([scores[i:i + 1], scores[offset:offset + count]])
+        offset += count
+        if method == "attention":
+            peaks = views.max(axis=1) / 0.1
+            weights = np.exp(peaks - peaks.max())
+            pooled[i] = (weights / weights.sum()) @ views
+        else:
+            pooled[i] = views.max(axis=0)
+    return pooled
@@ -1 +1,191 @@
 # Helper functions for file handling
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+from typing import IO, List, Optional, Tuple, Union
+
+from fastapi import UploadFile
+
+ARCHIVE_CONTENT_TYPES = {
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/x-tar",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-gtar",
+}
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """
+    Raised when an uploaded file (or archive member) exceeds the configured size limit.
+    """
+    def __init__(self, filename: Optional[str], max_bytes: int):
+        super().__init__(f"File '{filename}' is too large. The maximum is {max_bytes} bytes.")
+        self.max_bytes = max_bytes
+
+
+class ArchiveTooLargeError(UploadTooLargeError):
+    """
+    Raised when the files of an archive together exceed the configured uncompressed size limit.
+    """
+
+
+async def read_upload(file: UploadFile, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_BYTES) -> bytes:
+    """
+    Reads an uploaded file in chunks, stopping as soon as it exceeds `max_bytes`.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        max_bytes (int): Maximum accepted size, in bytes.
+        chunk_size (int): Bytes read per chunk.
+
+    Returns:
+        bytes: The file content.
+
+    Raises:
+        UploadTooLargeError: If the file is larger than `max_bytes`.
+    """
+    # The multipart parser already knows the size of spooled files: reject without reading
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(file.filename, max_bytes)
+
+    chunks: List[bytes] = []
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLargeError(file.filename, max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def is_archive(filename: Optional[str], content_type: Optional[str]) -> bool:
+    """
+    Checks whether an upload is a zip/tar archive, by content type or file extension.
+    """
+    if content_type and content_type in ARCHIVE_CONTENT_TYPES:
+        return True
+    return bool(filename) and filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _is_hidden_member(name: str) -> bool:
+    """
+    Skips OS metadata entries (e.g. '__MACOSX/', '._file.jpg', '.DS_Store').
+    """
+    parts = name.replace("\\", "/").split("/")
+    return any(part.startswith(".") or part == "__MACOSX" for part in parts if part)
+
+
+def _read_member(stream: IO[bytes], name: str, max_bytes: Optional[int], budget: Optional[int],
+                 archive_name: Optional[str], max_total_bytes: Optional[int]) -> bytes:
+    """
+    Reads an archive member in chunks, counting the bytes actually decompressed (headers can
+    understate them), and stops as soon as the member or the archive goes over its limit.
+
+    Args:
+        budget (Optional[int]): Bytes the archive may still expand to (None = unlimited).
+    """
+    chunks: List[bytes] = []
+    total = 0
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise UploadTooLargeError(name, max_bytes)
+        if budget is not None and total > budget:
+            raise ArchiveTooLargeError(archive_name, max_total_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def extract_archive_members(data: bytes, filename: Optional[str], max_members: int,
+                            max_member_bytes: Optional[int] = None,
+                            max_total_bytes: Optional[int] = None
+                            ) -> List[Tuple[str, Union[bytes, UploadTooLargeError]]]:
+    """
+    Extracts the regular files of a zip or tar archive held in memory. A file larger than
+    `max_member_bytes` is not kept: its entry holds the UploadTooLargeError instead of its bytes,
+    so the caller can reject that file alone.
+
+    Args:
+        data (bytes): The raw archive bytes.
+        filename (Optional[str]): The archive file name (used only for error messages).
+        max_members (int): Maximum number of files accepted from the archive.
+        max_member_bytes (Optional[int]): Maximum uncompressed size of each file.
+        max_total_bytes (Optional[int]): Maximum uncompressed size of all the files together.
+
+    Returns:
+        List[Tuple[str, Union[bytes, UploadTooLargeError]]]: (member name, member bytes or
+            error) pairs in archive order.
+
+    Raises:
+        ValueError: If the archive is corrupted, unsupported or has too many files.
+        ArchiveTooLargeError: If the files inside the archive together exceed `max_total_bytes`.
+    """
+    members: List[Tuple[str, Union[bytes, UploadTooLargeError]]] = []
+    buffer = io.BytesIO(data)
+    extracted_bytes = 0
+
+    def budget() -> Optional[int]:
+        return None if max_total_bytes is None else max_total_bytes - extracted_bytes
+
+    def read(stream: IO[bytes], name: str) -> Union[bytes, UploadTooLargeError]:
+        try:
+            return _read_member(stream, name, max_member_bytes, budget(), filename, max_total_bytes)
+        except ArchiveTooLargeError:
+            raise
+        except UploadTooLargeError as e:
+            return e
+
+    if zipfile.is_zipfile(buffer):
+        buffer.seek(0)
+        try:
+            with zipfile.ZipFile(buffer) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or _is_hidden_member(info.filename):
+                        continue
+                    if len(members) >= max_members:
+                        raise ValueError(f"Archive '{filename}' has more than {max_members} files.")
+                    # Declared sizes are checked before decompressing; the real ones while reading
+                    if max_member_bytes is not None and info.file_size > max_member_bytes:
+                        member = UploadTooLargeError(info.filename, max_member_bytes)
+                    else:
+                        with archive.open(info) as stream:
+                            member = read(stream, info.filename)
+                    if isinstance(member, bytes):
+                        extracted_bytes += len(member)
+                    members.append((os.path.basename(info.filename), member))
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, zlib.error, NotImplementedError, EOFError) as e:
+            raise ValueError(f"Invalid or corrupted archive '{filename}': {e}") from e
+        return members
+
+    buffer.seek(0)
+    try:
+        with tarfile.open(fileobj=buffer, mode="r:*") as archive:
+            for info in archive:
+                if not info.isfile() or _is_hidden_member(info.name):
+                    continue
+                if len(members) >= max_members:
+                    raise ValueError(f"Archive '{filename}' has more than {max_members} files.")
+                if max_member_bytes is not None and info.size > max_member_bytes:
+                    members.append((os.path.basename(info.name), UploadTooLargeError(info.name, max_member_bytes)))
+                    continue
+                extracted = archive.extractfile(info)
+                if extracted is not None:
+                    member = read(extracted, info.name)
+                    if isinstance(member, bytes):
+                        extracted_bytes += len(member)
+                    members.append((os.path.basename(info.name), member))
+    except tarfile.TarError as e:
+        raise ValueError(f"Invalid or corrupted archive '{filename}': {e}")
+    return members
@@ -0,0 +1,65 @@
+# Helpers to measure the memory used by the current process
+from typing import Dict
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_bytes() -> int:
+    """
+    Returns the peak resident set size of the current process, in bytes.
+    Without the resource module (Windows), it comes from psutil when installed, else it is 0.
+    """
+    if resource is None:
+        try:
+            import psutil
+        except ImportError:
+            return 0
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int:
+    """
+    Returns the current resident set size of the current process, in bytes.
+    Falls back to the peak RSS where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss_bytes()
+
+
+def memory_breakdown(pid="self") -> Dict[str, int]:
+    """
+    Returns the RSS of a process split into the pages it shares with other processes (e.g.
+    model weights inherited from a pre-fork master) and its private pages, plus its PSS
+    (proportional set size: shared pages divided among their sharers, so the PSS of every
+    process sums to their real memory use). Linux only (/proc/<pid>/smaps_rollup); empty elsewhere.
+    """
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                parts = value.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    fields[name] = int(parts[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss_bytes": fields.get("Rss", 0),
+        "pss_bytes": fields.get("Pss", 0),
+        "shared_bytes": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
@@ -0,0 +1,66 @@
+import sys
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from backend.src.core.config import get_settings
+from backend.src.services.admission import get_admission_controller
+from backend.src.services.embedding_store import get_embedding_store
+from backend.src.services.fetching import get_image_fetcher
+from backend.src.services.jobs import get_job_queue
+from backend.src.services.model_backends import MOCK_TAGS_POOL, MockBackend
+from backend.src.services.perceptual_hash import get_near_duplicate_index
+from backend.src.services.result_cache import get_result_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_result_cache():
+    """
+    Gives every test an empty result cache and near-duplicate index, so results
+    cached by one test never short-circuit the analysis performed by another.
+    The service shared by the API (which holds the cache) is dropped as well.
+    """
+    _reset_shared_state()
+    yield
+    _reset_shared_state()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def job_queue_path(tmp_path_factory):
+    """
+    Keeps the job queue of the test session in a temporary file, away from that of a local server.
+    """
+    settings = get_settings()
+    original, settings.JOB_QUEUE_PATH = settings.JOB_QUEUE_PATH, str(tmp_path_factory.mktemp("jobs") / "jobs.sqlite3")
+    yield settings.JOB_QUEUE_PATH
+    settings.JOB_QUEUE_PATH = original
+
+
+def _reset_shared_state():
+    get_result_cache.cache_clear()
+    get_near_duplicate_index.cache_clear()
+    get_job_queue.cache_clear()
+    get_admission_controller.cache_clear()
+    get_embedding_store.cache_clear()
+    get_image_fetcher.cache_clear()
+    main = sys.modules.get("backend.src.main")
+    if main is not None:
+        for name in ("image_analysis_service", "job_worker"):
+            if hasattr(main.app.state, name):
+                delattr(main.app.state, name)
+
+
+@pytest.fixture
+def mock_inference():
+    """
+    Makes the mock backend tag every image as 'dog' (confidence 0.9) and records each
+    batched inference call, so tests can assert how images were batched.
+    """
+    def predict(batch):
+        scores = np.zeros((batch.shape[0], len(MOCK_TAGS_POOL)), dtype=np.float32)
+        scores[:, MOCK_TAGS_POOL.index("dog")] = 0.9
+        return scores
+
+    with patch.object(MockBackend, "_predict", side_effect=predict) as mocked:
+        yield mocked
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.src.core.config import get_settings
+from backend.src.main import app
+from backend.src.services.admission import get_admission_controller
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def image_data():
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        return f.read()
+
+
+def test_clients_over_their_rate_limit_get_429(image_data, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ADMISSION_CLIENT_RATE", 0.1)
+    monkeypatch.setattr(get_settings(), "ADMISSION_CLIENT_BURST", 1)
+    files = {"file": ("dog.jpg", image_data, "image/jpeg")}
+
+    assert client.post("/api/v1/analyze", files=files, headers={"X-Client-Id": "tenant-a"}).status_code == 200
+    throttled = client.post("/api/v1/analyze", files=files, headers={"X-Client-Id": "tenant-a"})
+    other = client.post("/api/v1/analyze", files=files, headers={"X-Client-Id": "tenant-b"})
+
+    assert throttled.status_code == 429
+    assert throttled.headers["retry-after"] == "10"
+    assert other.status_code == 200
+
+
+def test_overload_serves_cached_results_only(image_data, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ADMISSION_DEGRADE_MODE", "cache_only")
+    assert client.post("/api/v1/analyze", files={"file": ("dog.jpg", image_data, "image/jpeg")}).status_code == 200
+
+    controller = get_admission_controller()
+    controller.service_time = 10.0  # Every worker busy with 10s images: ~10s of queueing ahead
+    controller.in_flight = controller.capacity
+    cached = client.post("/api/v1/analyze", files={"file": ("copy.jpg", image_data, "image/jpeg")})
+    uncached = client.post("/api/v1/analyze", files={"file": ("other.jpg", image_data + b"\0", "image/jpeg")})
+    batch = client.post("/api/v1/analyze/batch", files=[("files", ("copy.jpg", image_data, "image/jpeg")),
+                                                       ("files", ("other.jpg", image_data + b"\0", "image/jpeg"))])
+
+    assert cached.status_code == 200
+    assert cached.headers["x-degraded"] == "cache_only"
+    assert cached.json()["filename"] == "copy.jpg"
+    assert uncached.status_code == 503
+    assert int(uncached.headers["retry-after"]) >= 1
+    assert batch.status_code == 200
+    assert [item["error"] is None for item in batch.json()["items"]] == [True, False]
@@ -0,0 +1,186 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.src.main import app
+
+TEST_IMAGE_FILENAME = "dog.jpg"
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", TEST_IMAGE_FILENAME)
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def test_image_data():
+    """Loads the binary data of the test image once for all tests."""
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        return f.read()
+
+
+def test_analyze_batch_endpoint_per_item_errors(test_image_data):
+    """
+    Tests that POST /api/v1/analyze/batch returns one item per file, in order,
+    with errors reported per item instead of failing the whole batch.
+    """
+    files = [
+        ("files", ("a.jpg", test_image_data, "image/jpeg")),
+        ("files", ("notes.txt", b"not an image", "text/plain")),
+        ("files", ("corrupt.jpg", b"\xff\xd8 broken", "image/jpeg")),
+        ("files", ("b.jpg", test_image_data, "image/jpeg")),
+    ]
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 4
+    assert data["succeeded"] == 2
+    assert data["failed"] == 2
+    assert [item["filename"] for item in data["items"]] == ["a.jpg", "notes.txt", "corrupt.jpg", "b.jpg"]
+    assert [item["index"] for item in data["items"]] == [0, 1, 2, 3]
+    assert "invalid file type" in data["items"][1]["error"].lower()
+    assert "invalid" in data["items"][2]["error"].lower()
+    assert len(data["items"][3]["result"]["tags"]) > 0
+
+
+def test_analyze_batch_endpoint_zip_archive(test_image_data):
+    """
+    Tests that zip archives are expanded into one item per image.
+    """
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("catalog/one.jpg", test_image_data)
+        zf.writestr("catalog/two.jpg", test_image_data)
+        zf.writestr("__MACOSX/catalog/._one.jpg", b"metadata")
+    files = [("files", ("catalog.zip", archive.getvalue(), "application/zip"))]
+
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert data["succeeded"] == 2
+    assert [item["filename"] for item in data["items"]] == ["one.jpg", "two.jpg"]
+
+
+def test_analyze_batch_endpoint_rejects_oversized_archive_members(test_image_data, monkeypatch):
+    """
+    Tests that an image over MAX_UPLOAD_BYTES inside an archive is rejected as its own item,
+    like a standalone file, while the rest of the archive is analyzed.
+    """
+    from backend.src.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_BYTES", len(test_image_data))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("huge.jpg", test_image_data + b"\0" * 1024)
+        zf.writestr("one.jpg", test_image_data)
+    files = [("files", ("catalog.zip", archive.getvalue(), "application/zip"))]
+
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["filename"] for item in data["items"]] == ["huge.jpg", "one.jpg"]
+    assert data["succeeded"] == 1 and data["failed"] == 1
+    assert "too large" in data["items"][0]["error"].lower()
+
+
+def test_analyze_batch_endpoint_too_many_files(test_image_data, monkeypatch):
+    """
+    Tests that batches above BATCH_MAX_FILES are rejected.
+    """
+    from backend.src.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "BATCH_MAX_FILES", 1)
+
+    files = [("files", (f"{i}.jpg", test_image_data, "image/jpeg")) for i in range(2)]
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 400
+    assert "too many images" in response.json()["detail"].lower()
+
+
+def test_analyze_batch_endpoint_saturated_workers(test_image_data, monkeypatch):
+    """
+    Tests that a full worker pool is reported as 503 with a Retry-After header.
+    """
+    from backend.src.services.executor import ExecutorSaturatedError
+    from backend.src.services.image_analysis import ImageAnalysisService
+
+    async def saturated(self, images, mode="full"):
+        raise ExecutorSaturatedError(retry_after=2)
+    monkeypatch.setattr(ImageAnalysisService, "analyze_images", saturated)
+
+    files = [("files", ("a.jpg", test_image_data, "image/jpeg"))]
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+
+
+def test_analyze_batch_endpoint_compact_format(test_image_data):
+    """
+    Tests that the compact format, negotiated with Accept, returns the tags of every image
+    as parallel arrays, with the same values as the JSON format.
+    """
+    files = [("files", ("a.jpg", test_image_data, "image/jpeg")), ("files", ("notes.txt", b"text", "text/plain"))]
+
+    full = client.post("/api/v1/analyze/batch", files=files).json()
+    response = client.post("/api/v1/analyze/batch", files=files,
+                           headers={"Accept": "application/json;q=0.5, application/vnd.visual-tagger.compact+json"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.visual-tagger.compact+json"
+    assert "Accept" in response.headers["vary"]
+    compact = response.json()
+    tags = compact["items"][0]["result"]["tags"]
+    assert tags["name"] == [tag["name"] for tag in full["items"][0]["result"]["tags"]]
+    assert tags["confidence"] == [tag["confidence"] for tag in full["items"][0]["result"]["tags"]]
+    assert compact["items"][1]["result"] is None and compact["items"][1]["error"] == full["items"][1]["error"]
+    assert compact["total"] == 2 and compact["failed"] == 1
+
+
+def test_similar_finds_analyzed_images(monkeypatch, tmp_path):
+    """
+    Tests that analyzed images are added to the embedding store, and that /api/v1/similar finds
+    them by uploaded image, by image_id (excluding that image) and by text.
+    """
+    from PIL import Image
+    from backend.src.core.config import get_settings
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ZERO_SHOT_ENABLED", True)
+    monkeypatch.setattr(settings, "EMBEDDING_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "EMBEDDING_STORE_DIR", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(settings, "LABEL_INDEX_DIR", str(tmp_path / "labels"))
+    images = []
+    for color in ((200, 30, 30), (30, 200, 30), (30, 30, 200)):
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+
+    with TestClient(app) as client:
+        analyzed = client.post("/api/v1/analyze/batch",
+                               files=[("files", (f"{i}.png", data, "image/png")) for i, data in enumerate(images)]).json()
+        ids = [item["result"]["image_id"] for item in analyzed["items"]]
+        by_image = client.post("/api/v1/similar", params={"k": 5}, files={"file": ("q.png", images[0], "image/png")})
+        by_id = client.get("/api/v1/similar", params={"image_id": ids[1], "k": 5})
+        by_text = client.get("/api/v1/similar", params={"text": "a red square", "k": 2})
+        missing = client.get("/api/v1/similar", params={"image_id": "unknown"})
+        ambiguous = client.get("/api/v1/similar", params={"image_id": ids[0], "text": "red"})
+
+    assert by_image.status_code == 200
+    assert by_image.json()["query"] == "image"
+    assert sorted(result["image_id"] for result in by_image.json()["results"]) == sorted(ids[1:])
+    assert sorted(result["image_id"] for result in by_id.json()["results"]) == sorted([ids[0], ids[2]])
+    scores = [result["score"] for result in by_id.json()["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert len(by_text.json()["results"]) == 2
+    assert missing.status_code == 404
+    assert ambiguous.status_code == 400
+
+
+def test_similar_is_not_found_without_the_embedding_store():
+    with TestClient(app) as client:
+        response = client.get("/api/v1/similar", params={"text": "dog"})
+    assert response.status_code == 404
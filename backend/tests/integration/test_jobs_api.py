@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.src.core.config import get_settings
+from backend.src.main import app
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+@pytest.fixture(autouse=True)
+def jobs_enabled(monkeypatch):
+    monkeypatch.setattr(get_settings(), "JOBS_ENABLED", True)
+
+
+def test_job_round_trip_with_long_poll(mock_inference):
+    """
+    Tests that POST /api/v1/jobs enqueues the images and returns at once, and that
+    GET /api/v1/jobs/{id}?wait= returns the result once the background worker is done.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    with TestClient(app) as client:
+        files = [
+            ("files", ("a.jpg", image_data, "image/jpeg")),
+            ("files", ("notes.txt", b"not an image", "text/plain")),
+        ]
+        created = client.post("/api/v1/jobs", files=files)
+        assert created.status_code == 202
+        job = created.json()
+        assert job["priority"] == "bulk"
+        assert job["num_images"] == 2
+        assert created.headers["Location"] == f"/api/v1/jobs/{job['job_id']}"
+
+        finished = client.get(f"/api/v1/jobs/{job['job_id']}", params={"wait": 10}).json()
+
+    assert finished["status"] == "succeeded"
+    assert finished["result"]["succeeded"] == 1
+    assert [item["filename"] for item in finished["result"]["items"]] == ["a.jpg", "notes.txt"]
+    assert finished["result"]["items"][0]["result"]["tags"][0]["name"] == "dog"
+
+
+def test_single_image_jobs_default_to_interactive_and_unknown_jobs_are_404():
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    with TestClient(app) as client:
+        created = client.post("/api/v1/jobs", files=[("files", ("a.jpg", image_data, "image/jpeg"))])
+        missing = client.get("/api/v1/jobs/does-not-exist")
+
+    assert created.json()["priority"] == "interactive"
+    assert missing.status_code == 404
+
+
+def test_job_worker_only_runs_when_enabled(monkeypatch, tmp_path):
+    """
+    Tests that, with JOBS_ENABLED off (the default), the application starts no job worker and
+    does not open the job queue.
+    """
+    from backend.src.core.config import Settings
+    assert Settings.model_fields["JOBS_ENABLED"].default is False
+    monkeypatch.setattr(get_settings(), "JOBS_ENABLED", False)
+    monkeypatch.setattr(get_settings(), "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3"))
+
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert getattr(app.state, "job_worker", None) is None
+    assert not (tmp_path / "jobs.sqlite3").exists()
@@ -0,0 +1,87 @@
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.src.core.config import get_settings
+from backend.src.core.metrics import MetricsRegistry
+from backend.src.main import app
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+client = TestClient(app)
+
+
+def test_analyze_reports_stage_timings():
+    """
+    Tests that the response of /analyze carries the duration of each pipeline stage.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        response = client.post("/api/v1/analyze", files={"file": ("dog.jpg", f.read(), "image/jpeg")})
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0].strip() for entry in response.headers["server-timing"].split(",")]
+    # Aggregation runs in the shared batching task, so it is only recorded in its histogram
+    assert {"upload_read", "decode", "inference", "serialization", "total"} <= set(stages)
+
+
+def test_prometheus_metrics_endpoint():
+    """
+    Tests that /metrics exposes the stage histograms in the Prometheus text format.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        client.post("/api/v1/analyze", files={"file": ("dog.jpg", f.read(), "image/jpeg")})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE analysis_decode_seconds histogram" in body
+    assert 'analysis_image_width_pixels_bucket{le="+Inf"}' in body
+    assert "analysis_inference_batch_size_count" in body
+    assert "http_request_seconds_count" in body
+
+
+def test_render_prometheus_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.").inc(3)
+    registry.histogram("latency_seconds", "Latency.", buckets=[0.1, 1]).observe(0.5)
+
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        "jobs_total 3",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1"} 1',
+        'latency_seconds_bucket{le="+Inf"} 1',
+        "latency_seconds_sum 0.5",
+        "latency_seconds_count 1",
+    ]
+
+
+def test_profiler_endpoint_is_hidden_by_default():
+    assert client.get("/api/v1/profiler").status_code == 404
+
+
+def test_profiler_toggled_at_runtime(monkeypatch):
+    """
+    Tests that the sampling profiler can be started and stopped while the app runs,
+    and returns stacks in collapsed format.
+    """
+    settings = get_settings()
+    monkeypatch.setattr(settings, "PROFILER_ENDPOINT_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILER_ENABLED", False)
+
+    started = client.put("/api/v1/profiler", params={"enabled": True, "interval_ms": 1})
+    assert started.json()["running"] is True
+    time.sleep(0.05)
+    stopped = client.put("/api/v1/profiler", params={"enabled": False})
+    assert stopped.json()["running"] is False
+
+    stacks = client.get("/api/v1/profiler").text.splitlines()
+    assert stacks and all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    client.delete("/api/v1/profiler")
+    assert client.get("/api/v1/profiler").text == ""
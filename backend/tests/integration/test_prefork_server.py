@@ -0,0 +1,60 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+        return [int(child) for child in f.read().split()]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="Needs Linux /proc")
+def test_prefork_server_serves_from_every_worker_and_restarts_dead_ones(tmp_path):
+    """
+    Tests that the pre-fork server starts the requested workers on one socket, replaces a
+    worker that dies, and stops them all on SIGTERM.
+    """
+    pytest.importorskip("uvicorn")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, JOBS_ENABLED="False", LOG_LEVEL="WARNING",
+               JOB_QUEUE_PATH=str(tmp_path / "jobs.sqlite3"))
+    server = subprocess.Popen([sys.executable, "-m", "backend.src.server", "--host", "127.0.0.1",
+                               "--port", str(port), "--workers", "2"], env=env)
+    url = f"http://127.0.0.1:{port}"
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    try:
+        deadline = time.monotonic() + 30
+        while len(_children(server.pid)) < 2 or not _is_up(url):
+            assert time.monotonic() < deadline and server.poll() is None
+            time.sleep(0.1)
+        workers = _children(server.pid)
+
+        response = httpx.post(url + "/api/v1/analyze", files={"file": ("dog.jpg", image_data, "image/jpeg")})
+        assert response.status_code == 200
+
+        os.kill(workers[0], signal.SIGKILL)
+        while workers[0] in _children(server.pid) or len(_children(server.pid)) < 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+        assert workers[1] in _children(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(30) == 0
+
+
+def _is_up(url):
+    try:
+        return httpx.get(url + "/").status_code == 200
+    except httpx.TransportError:
+        return False
@@ -0,0 +1,48 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from backend.src.core.metrics import get_metrics_registry
+from backend.src.main import app
+from backend.src.services.image_analysis import ImageAnalysisService
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def test_lifespan_shares_one_service_across_requests():
+    """
+    Tests that the service is created once at startup, reused by every request,
+    and released on shutdown.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    instances = get_metrics_registry().counter("analysis_service_instances_total")
+    created_before = instances.value
+
+    with TestClient(app) as client:
+        service = app.state.image_analysis_service
+        assert isinstance(service, ImageAnalysisService)
+        for i in range(3):
+            files = {"file": (f"{i}.jpg", image_data + bytes([i]), "image/jpeg")}
+            assert client.post("/api/v1/analyze", files=files).status_code == 200
+        assert app.state.image_analysis_service is service
+
+    assert instances.value - created_before == 1
+    assert not hasattr(app.state, "image_analysis_service")
+    assert service.executor._pool is None
+
+
+def test_service_created_lazily_without_lifespan():
+    """
+    Tests that, when the startup hook did not run, the first request creates the shared
+    service and later requests reuse it.
+    """
+    client = TestClient(app)  # Not used as a context manager: the lifespan does not run
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    client.post("/api/v1/analyze", files={"file": ("a.jpg", image_data, "image/jpeg")}).raise_for_status()
+    service = app.state.image_analysis_service
+    client.post("/api/v1/analyze", files={"file": ("b.jpg", image_data, "image/jpeg")}).raise_for_status()
+
+    assert app.state.image_analysis_service is service
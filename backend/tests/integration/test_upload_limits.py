@@ -0,0 +1,82 @@
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.src.core.config import get_settings
+from backend.src.core.middleware import BodySizeLimitMiddleware
+from backend.src.main import app
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+client = TestClient(app)
+
+
+def _echo_app() -> FastAPI:
+    echo = FastAPI()
+
+    @echo.post("/echo")
+    async def read_body(request: Request):
+        return {"size": len(await request.body())}
+
+    echo.add_middleware(BodySizeLimitMiddleware, default_limit=100)
+    return echo
+
+
+def test_body_limit_rejects_large_content_length_early():
+    """
+    Tests that a body announced as too large is rejected with 413 before being read.
+    """
+    echo_client = TestClient(_echo_app())
+    assert echo_client.post("/echo", content=b"x" * 100).json() == {"size": 100}
+
+    response = echo_client.post("/echo", content=b"x" * 101)
+    assert response.status_code == 413
+
+
+def test_body_limit_rejects_streamed_body_without_content_length():
+    """
+    Tests that chunked bodies are aborted with 413 once they cross the limit.
+    """
+    echo_client = TestClient(_echo_app())
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 50
+
+    response = echo_client.post("/echo", content=chunks())
+    assert response.status_code == 413
+
+
+def test_analyze_endpoint_rejects_oversized_image(monkeypatch):
+    """
+    Tests that POST /api/v1/analyze answers 413 for images above MAX_UPLOAD_BYTES.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_BYTES", len(image_data) - 1)
+
+    response = client.post("/api/v1/analyze", files={"file": ("dog.jpg", image_data, "image/jpeg")})
+
+    assert response.status_code == 413
+    assert "too large" in response.json()["detail"].lower()
+
+
+def test_analyze_batch_endpoint_reports_oversized_image_per_item(monkeypatch):
+    """
+    Tests that an oversized image in a batch fails only its own item.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_BYTES", len(image_data))
+
+    files = [
+        ("files", ("ok.jpg", image_data, "image/jpeg")),
+        ("files", ("big.jpg", image_data + b"\0", "image/jpeg")),
+    ]
+    response = client.post("/api/v1/analyze/batch", files=files)
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0]["result"] is not None
+    assert "too large" in items[1]["error"].lower()
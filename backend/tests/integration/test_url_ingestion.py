@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.src.core.config import get_settings
+from backend.src.main import app
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+client = TestClient(app)
+
+
+class StubOrigin(ThreadingHTTPServer):
+    """
+    Serves the test image at /<name>.jpg (ETag "v1", honouring If-None-Match), redirects
+    /redirect?to=<url>, answers a 404 elsewhere, and records the requests and the highest number of them served at once.
+    """
+    daemon_threads = True
+
+    def __init__(self, image_data, delay=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.image_data = image_data
+        self.delay = delay
+        self.requests = []
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        origin = self.server
+        with origin.lock:
+            origin.requests.append((self.path, self.headers.get("If-None-Match")))
+            origin.active += 1
+            origin.max_active = max(origin.max_active, origin.active)
+        try:
+            time.sleep(origin.delay)
+            if self.path.startswith("/redirect?"):
+                self.send_response(302)
+                self.send_header("Location", parse_qs(urlsplit(self.path).query)["to"][0])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif not self.path.endswith(".jpg"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(origin.image_data)))
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(origin.image_data)
+        finally:
+            with origin.lock:
+                origin.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def allow_local_origin(monkeypatch):
+    """The stub origin listens on 127.0.0.1, which the fetcher refuses by default."""
+    monkeypatch.setattr(get_settings(), "FETCH_ALLOW_PRIVATE_ADDRESSES", True)
+
+
+@pytest.fixture
+def origin():
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        server = StubOrigin(f.read())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_analyze_url_revalidates_with_the_etag_and_serves_the_cached_result(origin):
+    """
+    Tests that POST /api/v1/analyze/url downloads and tags the image, and that analyzing the
+    same URL again sends If-None-Match and answers the 304 from the result cache.
+    """
+    first = client.post("/api/v1/analyze/url", json={"url": origin.url + "/photos/dog.jpg"})
+    second = client.post("/api/v1/analyze/url", json={"url": origin.url + "/photos/dog.jpg", "filename": "again.jpg"})
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["filename"] == "dog.jpg" and len(first.json()["tags"]) > 0
+    assert second.json()["image_id"] == first.json()["image_id"]
+    assert second.json()["filename"] == "again.jpg"
+    assert second.json()["tags"] == first.json()["tags"]
+    assert origin.requests == [("/photos/dog.jpg", None), ("/photos/dog.jpg", '"v1"')]
+
+
+def test_analyze_url_reports_fetch_errors(origin):
+    """
+    Tests the status of sources that cannot be fetched: missing at the origin (502),
+    unsupported or outside FETCH_ALLOWED_DIRS (400).
+    """
+    assert client.post("/api/v1/analyze/url", json={"url": origin.url + "/missing"}).status_code == 502
+    assert client.post("/api/v1/analyze/url", json={"url": "ftp://example.com/dog.jpg"}).status_code == 400
+    assert client.post("/api/v1/analyze/url", json={"url": "file:///etc/passwd"}).status_code == 400
+
+
+def test_analyze_url_caps_the_download_size_and_reads_allowed_local_files(origin, monkeypatch, tmp_path):
+    """
+    Tests that images larger than MAX_UPLOAD_BYTES are rejected (413) whether they are
+    downloaded or read from disk, and that files under FETCH_ALLOWED_DIRS are analyzed.
+    """
+    (tmp_path / "local.jpg").write_bytes(origin.image_data)
+    (tmp_path / "large.jpg").write_bytes(origin.image_data + b"\0")
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_BYTES", len(origin.image_data))
+    monkeypatch.setattr(get_settings(), "FETCH_ALLOWED_DIRS", str(tmp_path))
+    origin.image_data += b"\0"
+
+    assert client.post("/api/v1/analyze/url", json={"url": origin.url + "/dog.jpg"}).status_code == 413
+    assert client.post("/api/v1/analyze/url", json={"url": str(tmp_path / "large.jpg")}).status_code == 413
+    response = client.post("/api/v1/analyze/url", json={"url": f"file://{tmp_path / 'local.jpg'}"})
+    assert response.status_code == 200 and response.json()["filename"] == "local.jpg"
+
+
+def test_analyze_url_batch_fetches_concurrently_within_the_host_limit(origin, monkeypatch):
+    """
+    Tests that POST /api/v1/analyze/url/batch returns one item per URL, in order, with fetch
+    errors reported per item, and that downloads overlap up to FETCH_MAX_CONNECTIONS_PER_HOST.
+    """
+    monkeypatch.setattr(get_settings(), "FETCH_MAX_CONNECTIONS_PER_HOST", 2)
+    origin.delay = 0.1
+    urls = [f"{origin.url}/{i}.jpg" for i in range(5)] + [origin.url + "/missing"]
+
+    response = client.post("/api/v1/analyze/url/batch", json={"urls": urls})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 6 and data["succeeded"] == 5 and data["failed"] == 1
+    assert [item["filename"] for item in data["items"]] == ["0.jpg", "1.jpg", "2.jpg", "3.jpg", "4.jpg", "missing"]
+    assert "404" in data["items"][5]["error"]
+    assert origin.max_active == 2
+
+
+def test_analyze_url_batch_reports_malformed_urls_per_item(origin):
+    """
+    Tests that URLs that cannot even be parsed only fail their own item (400 when alone).
+    """
+    urls = ["http://[::1/a.jpg", origin.url + "/dog.jpg", "http://example.com/a\x01b.jpg"]
+
+    response = client.post("/api/v1/analyze/url/batch", json={"urls": urls})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["result"] is not None for item in items] == [False, True, False]
+    assert "invalid url" in items[0]["error"].lower() and "invalid url" in items[2]["error"].lower()
+    assert client.post("/api/v1/analyze/url", json={"url": "http://[::1/a.jpg"}).status_code == 400
+
+
+def test_analyze_url_refuses_private_addresses_by_default(origin, monkeypatch):
+    """
+    Tests that, without FETCH_ALLOW_PRIVATE_ADDRESSES, loopback, link-local (cloud metadata) and
+    private addresses are refused (400) before any request is sent, including by name.
+    """
+    monkeypatch.setattr(get_settings(), "FETCH_ALLOW_PRIVATE_ADDRESSES", False)
+    port = origin.server_address[1]
+
+    for url in (f"http://127.0.0.1:{port}/dog.jpg", f"http://localhost:{port}/dog.jpg",
+                "http://169.254.169.254/latest/meta-data/", "http://10.0.0.1/dog.jpg", "http://[::1]/dog.jpg",
+                "http://[::ffff:127.0.0.1]/dog.jpg"):
+        response = client.post("/api/v1/analyze/url", json={"url": url})
+        assert response.status_code == 400, url
+        assert "private or reserved" in response.json()["detail"]
+    assert origin.requests == []
+
+
+def test_analyze_url_checks_every_redirect_hop(origin, monkeypatch):
+    """
+    Tests that redirects are followed within FETCH_ALLOWED_HOSTS, and that a hop to another
+    host is refused before it is requested.
+    """
+    monkeypatch.setattr(get_settings(), "FETCH_ALLOWED_HOSTS", "127.0.0.1")
+    port = origin.server_address[1]
+
+    allowed = client.post("/api/v1/analyze/url", json={"url": f"{origin.url}/redirect?to=/moved/dog.jpg"})
+    refused = client.post("/api/v1/analyze/url",
+                          json={"url": f"{origin.url}/redirect?to=http://localhost:{port}/other.jpg"})
+
+    assert allowed.status_code == 200 and len(allowed.json()["tags"]) > 0
+    assert refused.status_code == 400
+    assert [path for path, _ in origin.requests if not path.startswith("/redirect")] == ["/moved/dog.jpg"]
@@ -0,0 +1,110 @@
+import pytest
+
+from backend.src.services.admission import (
+    AdmissionController, ClientRateLimiter, ClientThrottledError, OverloadedError,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_gives_each_client_its_own_bucket():
+    clock = FakeClock()
+    limiter = ClientRateLimiter(rate=1.0, burst=2, clock=clock)
+
+    assert limiter.acquire("a", 2) == 0
+    assert limiter.acquire("a", 1) == pytest.approx(1.0)
+    assert limiter.acquire("b", 1) == 0  # Another tenant is not affected
+    clock.now = 1.0
+    assert limiter.acquire("a", 1) == 0
+    assert limiter.acquire("a", 10) == pytest.approx(2.0)  # Larger than the bucket: waits for a full one
+
+
+def test_controller_rejects_beyond_the_slo_and_learns_the_service_time():
+    controller = AdmissionController(capacity=1, slo_seconds=0.5)
+    with controller.admit("a"):
+        # No completed request yet: nothing to base an estimate on
+        assert controller.estimated_queue_delay() == 0
+    assert controller.service_time is not None and controller.in_flight == 0
+
+    controller.service_time = 1.0
+    with controller.admit("a") as ticket:
+        assert ticket.mode == "full" and controller.in_flight == 1
+        with pytest.raises(OverloadedError) as error:
+            with controller.admit("b"):
+                pass
+    assert error.value.status_code == 503 and error.value.retry_after == 1
+    assert controller.in_flight == 0
+
+
+def test_controller_degrades_before_rejecting():
+    controller = AdmissionController(capacity=1, slo_seconds=0.5, degrade_mode="fast", reject_factor=2.0)
+    controller.service_time = 1.0
+    with controller.admit("a"):
+        with controller.admit("b") as fast:  # 1s estimated: over the SLO, within 2x
+            assert fast.mode == "fast" and fast.degraded
+            with pytest.raises(OverloadedError):  # 2s estimated: beyond 2x the SLO
+                with controller.admit("c"):
+                    pass
+
+    cache_only = AdmissionController(capacity=1, slo_seconds=0.5, degrade_mode="cache_only")
+    cache_only.service_time = 1.0
+    with cache_only.admit("a"), cache_only.admit("b") as ticket:
+        assert ticket.mode == "cache_only"
+        assert cache_only.in_flight == 1  # Cache lookups are not counted as load
+
+
+def test_controller_throttles_clients_over_their_rate():
+    controller = AdmissionController(capacity=4, slo_seconds=1.0,
+                                     rate_limiter=ClientRateLimiter(rate=0.5, burst=1, clock=FakeClock()))
+    with controller.admit("a"):
+        pass
+    with pytest.raises(ClientThrottledError) as error:
+        with controller.admit("a"):
+            pass
+    assert error.value.status_code == 429 and error.value.retry_after == 2
+
+
+def test_controller_admits_concurrent_load_within_the_slo():
+    """
+    Tests that 16 clients looping on one worker (0.05s of work per image, so 0.75s of queueing
+    at most against a 2s SLO) are never rejected, although the request admitted into the empty
+    system completes last: its time spent queued behind later requests is not service time.
+    """
+    clock = FakeClock()
+    controller = AdmissionController(capacity=1, slo_seconds=2.0, clock=clock)
+    rejected = controller.rejected.value
+
+    for _ in range(20):
+        requests = [controller.admit(f"client-{i}") for i in range(16)]
+        tickets = [request.__enter__() for request in requests]
+        for request in reversed(requests):  # Served in the reverse order of admission
+            clock.now += 0.05
+            request.__exit__(None, None, None)
+        assert max(ticket.estimated_delay for ticket in tickets) <= 2.0
+
+    assert controller.rejected.value == rejected
+    assert controller.in_flight == 0
+    assert 0.01 < controller.service_time < 0.2
+
+
+def test_controller_counts_only_the_served_work_as_load():
+    """
+    Tests that with `count_load` off, time spent before `serving` (e.g. downloading the images)
+    is neither load nor service time.
+    """
+    clock = FakeClock()
+    controller = AdmissionController(capacity=1, slo_seconds=2.0, clock=clock)
+    with controller.admit("a", cost=2, count_load=False):
+        assert controller.in_flight == 0
+        clock.now += 10.0  # A slow origin
+        with controller.serving(2):
+            assert controller.in_flight == 2
+            clock.now += 0.2
+    assert controller.in_flight == 0
+    assert controller.service_time == pytest.approx(0.1)
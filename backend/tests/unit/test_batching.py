@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from backend.src.services.batching import MicroBatchScheduler
+from backend.src.core.config import get_settings
+from backend.src.services.image_analysis import ImageAnalysisService
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_concurrent_requests():
+    """
+    Tests that concurrent submits are run as one batched call and results fan back out in order.
+    """
+    batch_sizes = []
+
+    async def run_batch(batch):
+        batch_sizes.append(batch.shape[0])
+        return [int(item[0]) for item in batch]
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=8, max_wait_ms=50, name="test_coalesce")
+    results = await asyncio.gather(*(scheduler.submit(np.array([i])) for i in range(5)))
+    await scheduler.close()
+
+    assert results == [0, 1, 2, 3, 4]
+    assert batch_sizes == [5]
+    assert scheduler.batch_size.count == 1
+    assert scheduler.wait_time.count == 5
+
+
+@pytest.mark.asyncio
+async def test_scheduler_respects_max_batch_size():
+    """
+    Tests that no batched call exceeds max_batch_size.
+    """
+    batch_sizes = []
+
+    async def run_batch(batch):
+        batch_sizes.append(batch.shape[0])
+        return list(batch[:, 0])
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=3, max_wait_ms=50, name="test_max_size")
+    results = await asyncio.gather(*(scheduler.submit(np.array([i])) for i in range(7)))
+    await scheduler.close()
+
+    assert results == list(range(7))
+    assert batch_sizes == [3, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_propagates_inference_errors():
+    """
+    Tests that a failing batched call raises in every request of that batch.
+    """
+    async def run_batch(batch):
+        raise RuntimeError("Simulated AI model error")
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=4, max_wait_ms=5, name="test_errors")
+    results = await asyncio.gather(*(scheduler.submit(np.array([i])) for i in range(2)), return_exceptions=True)
+    await scheduler.close()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stage", ["collecting", "inferring"])
+async def test_scheduler_close_fails_the_batch_in_progress(stage):
+    """
+    Tests that closing the scheduler while a batch is being collected or inferred fails its
+    requests instead of leaving them waiting forever.
+    """
+    started = asyncio.Event()
+
+    async def run_batch(batch):
+        started.set()
+        await asyncio.sleep(60)
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=8, max_wait_ms=60_000, name=f"test_close_{stage}")
+    requests = [asyncio.ensure_future(scheduler.submit(np.array([i]))) for i in range(8 if stage == "inferring" else 2)]
+    if stage == "inferring":
+        await started.wait()
+    else:
+        await asyncio.sleep(0.01)  # Taken from the queue, waiting for more
+    await scheduler.close()
+
+    results = await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+    assert all(isinstance(result, RuntimeError) and "shut down" in str(result) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_service_batches_concurrent_requests_with_mock_backend(monkeypatch, mock_inference):
+    """
+    Tests that concurrent analyze_image calls on the mock backend share a single inference call.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    # Decodes run in parallel worker threads; leave enough time for all of them to join the batch
+    monkeypatch.setattr(get_settings(), "BATCHING_MAX_WAIT_MS", 500.0)
+
+    service = ImageAnalysisService()
+    responses = await asyncio.gather(*(service.analyze_image(image_data, f"{i}.jpg") for i in range(4)))
+
+    assert [response.filename for response in responses] == ["0.jpg", "1.jpg", "2.jpg", "3.jpg"]
+    assert mock_inference.call_count == 1
+    assert mock_inference.call_args.args[0].shape[0] == 4
+    await service.scheduler.close()
@@ -0,0 +1,33 @@
+import io
+
+from PIL import Image
+
+from backend.benchmarks.common import compare_to_baseline
+from backend.benchmarks.corpus import generate_corpus
+
+
+def test_compare_to_baseline_flags_latency_and_throughput_regressions():
+    """
+    Tests that slower percentiles and lower throughput beyond the tolerance, and any new
+    error, are reported, and that noise within the tolerance and other fields are not.
+    """
+    baseline = {"stages": {"decode_seconds": {"a.jpg": {"p50": 0.010, "p99": 0.020, "max": 0.03}}},
+                "end_to_end": {"requests_per_second": 100.0, "errors": 0}}
+    report = {"stages": {"decode_seconds": {"a.jpg": {"p50": 0.011, "p99": 0.040, "max": 0.5}}},
+              "end_to_end": {"requests_per_second": 60.0, "errors": 3}}
+
+    regressions = compare_to_baseline(report, baseline, tolerance=0.25)
+
+    assert len(regressions) == 3
+    assert regressions[0].startswith("stages.decode_seconds.a.jpg.p99")
+    assert regressions[1].startswith("end_to_end.requests_per_second")
+    assert regressions[2] == "end_to_end.errors: 0 -> 3"
+    assert compare_to_baseline(report, report, tolerance=0.25) == []
+
+
+def test_synthetic_corpus_is_decodable_and_deterministic():
+    corpus = generate_corpus(sizes=[(32, 24)], formats=["JPEG", "PNG"])
+
+    assert [image.content_type for image in corpus] == ["image/jpeg", "image/png"]
+    assert Image.open(io.BytesIO(corpus[1].data)).size == (32, 24)
+    assert generate_corpus(sizes=[(32, 24)], formats=["PNG"])[0].data == corpus[1].data
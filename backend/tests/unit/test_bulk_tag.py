@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from backend.src.bulk_tag import bulk_tag, iter_image_paths
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def image_tree(tmp_path):
+    root = tmp_path / "images"
+    (root / "nested").mkdir(parents=True)
+    shutil.copy(TEST_IMAGE_PATH, root / "a.jpg")
+    shutil.copy(TEST_IMAGE_PATH, root / "nested" / "b.jpg")
+    (root / "corrupt.png").write_bytes(b"\x89PNG broken")
+    (root / "notes.txt").write_text("not an image")
+    return root
+
+
+@pytest.mark.asyncio
+async def test_bulk_tag_writes_jsonl_and_resumes_from_the_checkpoint(image_tree, tmp_path, mock_inference):
+    output = str(tmp_path / "tags.jsonl")
+
+    first = await bulk_tag(str(image_tree), output, chunk_size=2, progress_interval=0)
+
+    records = {os.path.relpath(record["path"], image_tree): record for record in _read_jsonl(output)}
+    assert set(records) == {"a.jpg", "corrupt.png", os.path.join("nested", "b.jpg")}
+    assert records["a.jpg"]["tags"][0]["name"] == "dog"
+    assert records["corrupt.png"]["error"]
+    assert first["tagged"] == 3 and first["failed"] == 1 and first["skipped"] == 0
+
+    # A new file appears; the resumed run only tags that one
+    shutil.copy(TEST_IMAGE_PATH, image_tree / "c.jpg")
+    second = await bulk_tag(str(image_tree), output, chunk_size=2, progress_interval=0)
+
+    assert second["tagged"] == 1 and second["skipped"] == 3
+    assert [os.path.basename(record["path"]) for record in _read_jsonl(output)].count("c.jpg") == 1
+    assert len(_read_jsonl(output)) == 4
+    assert mock_inference.call_count == 2  # b.jpg has the content of a.jpg: served from the result cache
+
+
+def test_iter_image_paths_reads_manifests(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# catalog\nimages/a.jpg\n{\"path\": \"/abs/b.png\"}\n\n")
+
+    assert list(iter_image_paths(str(manifest))) == [str(tmp_path / "images" / "a.jpg"), "/abs/b.png"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_tag_writes_a_new_parquet_part_per_run(image_tree, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = str(tmp_path / "tags.parquet")
+
+    await bulk_tag(str(image_tree), output, output_format="parquet", chunk_size=2)
+    shutil.copy(TEST_IMAGE_PATH, image_tree / "c.jpg")
+    second = await bulk_tag(str(image_tree), output, output_format="parquet", chunk_size=2)
+
+    assert pq.read_table(output).num_rows == 3
+    assert second["output"] == str(tmp_path / "tags.1.parquet")
+    assert pq.read_table(second["output"]).column("path").to_pylist() == [str(image_tree / "c.jpg")]
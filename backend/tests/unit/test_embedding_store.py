@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from backend.src.services.embedding_store import EmbeddingStore, quantize
+from backend.src.services.model_backends import l2_normalize
+
+
+def _clustered(count, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = l2_normalize(rng.standard_normal((clusters, dim)))
+    return l2_normalize(centers[rng.integers(0, clusters, count)] + 0.05 * rng.standard_normal((count, dim)))
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_store_persists_embeddings_and_skips_known_ids(tmp_path, dtype):
+    """
+    Tests that embeddings survive reopening the store, that re-adding an image_id is a no-op,
+    and that an exact search finds each stored vector first.
+    """
+    vectors = _clustered(50)
+    store = EmbeddingStore(str(tmp_path), dtype=dtype, train_size=1000)
+    assert store.add([f"img{i}" for i in range(50)], vectors) == 50
+    assert store.add(["img0", "new", "new"], vectors[:3]) == 1
+    store.close()
+
+    reopened = EmbeddingStore(str(tmp_path), dtype=dtype, train_size=1000)
+    assert len(reopened) == 51 and "new" in reopened and reopened.dim == 32
+    assert np.allclose(reopened.get("img7"), vectors[7], atol=2e-2)
+    assert reopened.search(vectors[7], k=3)[0][0] == "img7"
+    assert "img7" not in [image_id for image_id, _ in reopened.search(vectors[7], k=3, exclude="img7")]
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path), dtype="float16" if dtype == "int8" else "int8")
+
+
+def test_ivf_index_is_trained_once_and_files_later_inserts(tmp_path):
+    """
+    Tests that the IVF index is trained when train_size vectors are stored, that vectors added
+    afterwards are searchable without retraining, and that its recall against exact search is high.
+    """
+    vectors = _clustered(3000)
+    store = EmbeddingStore(str(tmp_path), nlist=16, train_size=2000, nprobe=4, train_in_background=False)
+    store.add([f"img{i}" for i in range(2000)], vectors[:2000])
+    assert store.index is not None
+    centroids = store.index.centroids.copy()
+    store.add([f"img{i}" for i in range(2000, 3000)], vectors[2000:])
+    assert (store.index.centroids == centroids).all()
+    assert store.search(vectors[2500], k=1)[0][0] == "img2500"
+
+    codes, _ = quantize(vectors, "float16")
+    exact = codes.astype(np.float32)
+    recall = []
+    for query in vectors[:50]:
+        expected = {f"img{i}" for i in np.argsort(-(exact @ query))[:10]}
+        recall.append(len(expected & {image_id for image_id, _ in store.search(query, k=10)}) / 10)
+    assert np.mean(recall) >= 0.9
+
+    store.close()
+    reopened = EmbeddingStore(str(tmp_path), nlist=16, train_size=2000, nprobe=4)
+    assert reopened.index is not None and reopened.search(vectors[2500], k=1)[0][0] == "img2500"
+
+
+def test_failed_training_is_retried(tmp_path, monkeypatch):
+    """
+    Tests that a failed k-means leaves the store searchable by exact scan, and that training
+    is retried on the next insert instead of being stuck.
+    """
+    from backend.src.services import embedding_store
+
+    def fail(*args, **kwargs):
+        raise MemoryError("k-means")
+
+    vectors = _clustered(300)
+    store = EmbeddingStore(str(tmp_path), nlist=4, train_size=200, train_in_background=False)
+    with monkeypatch.context() as patched:
+        patched.setattr(embedding_store, "spherical_kmeans", fail)
+        store.add([f"img{i}" for i in range(200)], vectors[:200])
+    assert store.index is None and not store._training
+    assert store.search(vectors[7], k=1)[0][0] == "img7"
+
+    store.add(["img200"], vectors[200:201])
+    assert store.index is not None
+    assert store.search(vectors[200], k=1)[0][0] == "img200"
+    store.close()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import threading
+
+import pytest
+
+from backend.src.core.logging_config import configure_logging, shutdown_logging
+from backend.src.services.executor import InferenceExecutor, ExecutorSaturatedError
+
+
+def _current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+def _current_pid(_: int) -> int:
+    return os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_inline_executor_runs_in_calling_thread():
+    """
+    Tests that the inline backend does not hand work to another thread.
+    """
+    executor = InferenceExecutor(backend="inline")
+    assert await executor.run(_current_thread_name) == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_runs_off_the_event_loop():
+    """
+    Tests that the thread backend runs work in a pool thread.
+    """
+    executor = InferenceExecutor(backend="thread", max_workers=2)
+    try:
+        assert (await executor.run(_current_thread_name)).startswith("analysis-worker")
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_executor_runs_in_worker_process():
+    """
+    Tests that the process backend runs work in another process.
+    """
+    executor = InferenceExecutor(backend="process", max_workers=1)
+    try:
+        assert await executor.run(_current_pid, 0) != os.getpid()
+    finally:
+        executor.shutdown()
+
+
+def _log_warning(message: str) -> None:
+    logging.getLogger("backend.src.services.worker_test").warning(message)
+
+
+@pytest.mark.asyncio
+async def test_process_executor_workers_write_their_logs(capfd):
+    """
+    Tests that records logged in a process worker are written, although the listener thread
+    of the parent's queue handler does not exist in the (forked) worker.
+    """
+    level = logging.getLogger().level
+    configure_logging(level="INFO", log_format="text")
+    executor = InferenceExecutor(backend="process", max_workers=1)
+    try:
+        await executor.run(_log_warning, "logged from the worker")
+    finally:
+        executor.shutdown()
+        shutdown_logging()
+        logging.getLogger().setLevel(level)
+
+    assert "logged from the worker" in capfd.readouterr().err
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_full_and_waits_when_asked():
+    """
+    Tests the backpressure: new work is rejected once max_pending tasks are in flight,
+    while admitted work (wait=True) queues for a free slot.
+    """
+    executor = InferenceExecutor(backend="thread", max_workers=1, max_pending=1, retry_after_seconds=3)
+    release = threading.Event()
+    try:
+        blocking = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(ExecutorSaturatedError) as exc_info:
+            await executor.run(_current_thread_name)
+        assert exc_info.value.retry_after == 3
+
+        waiting = asyncio.ensure_future(executor.run(_current_thread_name, wait=True))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        release.set()
+        await blocking
+        assert (await waiting).startswith("analysis-worker")
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_executor_rejects_unknown_backend():
+    """
+    Tests that an invalid EXECUTOR_BACKEND value fails loudly.
+    """
+    with pytest.raises(ValueError):
+        InferenceExecutor(backend="gpu")
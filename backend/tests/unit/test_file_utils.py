@@ -0,0 +1,58 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from backend.src.utils.file_utils import ArchiveTooLargeError, UploadTooLargeError, extract_archive_members
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("build", [_zip, _tar])
+def test_extract_archive_members_caps_each_file_and_the_whole_archive(build):
+    data = build({"a.jpg": b"\0" * 600, "b.jpg": b"\0" * 600, ".DS_Store": b"\0" * 10_000})
+
+    assert [name for name, _ in extract_archive_members(data, "x", 10, 1000, 1200)] == ["a.jpg", "b.jpg"]
+    # A file over its own limit is reported in its entry, without failing the archive
+    mixed = build({"a.jpg": b"\0" * 600, "b.jpg": b"\0" * 400})
+    (a, error), (b, member) = extract_archive_members(mixed, "x", 10, 500, 500)
+    assert a == "a.jpg" and isinstance(error, UploadTooLargeError) and "'a.jpg'" in str(error)
+    assert b == "b.jpg" and member == b"\0" * 400
+    with pytest.raises(ArchiveTooLargeError, match="'x'.*1000 bytes"):
+        extract_archive_members(data, "x", 10, 1000, 1000)
+
+
+def test_extract_archive_members_reports_corrupted_zips_as_invalid():
+    """
+    Tests that damaged zips (bad CRC, truncated data, a size header understating the content)
+    raise ValueError (400 at the API), not zipfile errors.
+    """
+    data = _zip({"a.jpg": b"image bytes " * 100})
+    offset = data.index(b"a.jpg") + len("a.jpg")  # Start of the compressed data (no extra field)
+    corrupt = data[:offset] + bytes(b ^ 0xFF for b in data[offset:offset + 8]) + data[offset + 8:]
+    understated = bytearray(data)
+    understated[22:26] = (10).to_bytes(4, "little")  # Local header: uncompressed size
+    central = data.index(b"PK\x01\x02")
+    understated[central + 24:central + 28] = (10).to_bytes(4, "little")  # Central directory copy
+
+    for archive in (corrupt, bytes(understated)):
+        with pytest.raises(ValueError, match="corrupted") as error:
+            extract_archive_members(archive, "x.zip", 10, 10_000)
+        assert not isinstance(error.value, UploadTooLargeError)
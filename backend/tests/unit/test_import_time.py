@@ -0,0 +1,13 @@
+from backend.benchmarks.bench_import_time import IMPORT_BUDGET_RATIO, measure_import, summarize
+
+
+def test_app_import_stays_within_cold_start_budget():
+    """
+    Tests that importing the app (a serverless cold start) loads none of the heavy modules
+    (NumPy, PIL, model runtimes) and takes at most IMPORT_BUDGET_RATIO x the FastAPI import,
+    best of three fresh processes.
+    """
+    summaries = [summarize(measure_import()) for _ in range(3)]
+
+    assert summaries[0]["heavy_modules"] == []
+    assert min(summary["ratio_to_framework"] for summary in summaries) <= IMPORT_BUDGET_RATIO
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.src.models.image import BatchImageAnalysisItem, ImageAnalysisResponse, JobResponse, Tag
+from backend.src.services.image_analysis import build_batch_response
+from backend.src.services.jobs import JOB_PRIORITIES, JobQueue, JobWorker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=60.0, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_claim_picks_interactive_jobs_before_older_bulk_jobs(queue):
+    bulk = queue.enqueue([(b"a", "a.jpg"), (b"b", "b.jpg")], [], "bulk")
+    interactive = queue.enqueue([(b"c", "c.jpg")], [], "interactive")
+
+    first = queue.claim()
+    second = queue.claim()
+
+    assert first.job.job_id == interactive.job_id
+    assert first.images == [(b"c", "c.jpg")]
+    assert second.job.job_id == bulk.job_id
+    assert second.job.status == "running" and second.job.attempts == 1
+    assert queue.claim() is None
+
+
+def test_reserved_workers_only_claim_interactive_jobs(queue):
+    queue.enqueue([(b"a", "a.jpg")], [], "bulk")
+
+    assert queue.claim(max_priority=JOB_PRIORITIES["interactive"]) is None
+    assert queue.claim() is not None
+
+
+def test_jobs_survive_reopening_and_rejected_files_keep_their_position(queue, tmp_path):
+    job = queue.enqueue([(b"a", "a.jpg")], [(0, "notes.txt", "Invalid file type: notes.txt")], "bulk")
+    queue.close()
+
+    reopened = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    claimed = reopened.claim()
+    reopened.close()
+
+    assert claimed.job.job_id == job.job_id
+    assert claimed.job.num_images == 2
+    assert claimed.rejected == [(0, "notes.txt", "Invalid file type: notes.txt")]
+
+
+def test_expired_leases_are_reclaimed_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.0, max_attempts=2)
+    job = queue.enqueue([(b"a", "a.jpg")], [], "interactive")
+
+    assert queue.claim().job.attempts == 1  # The worker "crashes": its lease expires at once
+    time.sleep(0.01)
+    assert queue.claim().job.attempts == 2
+    time.sleep(0.01)
+    assert queue.claim() is None
+
+    abandoned = queue.get(job.job_id)
+    assert abandoned.status == "failed"
+    assert "abandoned" in abandoned.error
+    queue.close()
+
+
+def test_complete_stores_the_result_and_purge_drops_old_jobs(queue):
+    job = queue.enqueue([(b"a", "a.jpg")], [], "interactive")
+    queue.claim()
+    queue.release(job.job_id)
+    assert queue.get(job.job_id).status == "queued" and queue.get(job.job_id).attempts == 0
+    queue.claim()
+
+    item = BatchImageAnalysisItem(index=0, filename="a.jpg", result=ImageAnalysisResponse(
+        image_id="x", filename="a.jpg", tags=[Tag(name="dog", confidence=0.9, source_model="mock")]))
+    queue.complete(job.job_id, build_batch_response([item], []))
+
+    response = queue.get(job.job_id).to_response()
+    assert response.status == "succeeded"
+    assert response.result.items[0].result.tags[0].name == "dog"
+    # The stored result is embedded as is in the JSON of the job
+    assert JobResponse.model_validate_json(queue.get(job.job_id).to_json()) == response
+    assert queue.purge(older_than_seconds=3600) == 0
+    assert queue.purge(older_than_seconds=0) == 1
+    assert queue.get(job.job_id) is None
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_and_wakes_up_waiters(queue):
+    class FakeService:
+        async def analyze_images(self, images):
+            return [BatchImageAnalysisItem(index=i, filename=name, error="not analyzed") for i, (_, name) in enumerate(images)]
+
+    worker = JobWorker(queue, FakeService(), concurrency=2, interactive_workers=1, poll_interval=5.0)
+    worker.start()
+    job = queue.enqueue([(b"a", "a.jpg"), (b"b", "b.jpg")], [], "bulk")
+    worker.notify()
+
+    await asyncio.wait_for(worker.wait_for(job.job_id, timeout=5.0), 6.0)
+    await worker.aclose(timeout=1.0)
+
+    finished = queue.get(job.job_id).to_response()
+    assert finished.status == "succeeded"
+    assert finished.result.total == 2 and finished.result.failed == 2
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.src.core.config import Settings, get_settings
+from backend.src.core.dependencies import get_zero_shot_backend
+from backend.src.services.label_index import LabelIndex, LabelIndexManager, build_label_index, get_label_index_manager
+from backend.src.services.model_backends import MockBackend, l2_normalize
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _counting_encoder(calls):
+    backend = MockBackend(Settings())
+
+    def encode(texts):
+        calls.append(list(texts))
+        return backend.encode_text(texts)
+    return encode
+
+
+def test_top_k_matches_full_softmax_ranking():
+    """
+    Tests that argpartition-based top-k returns the same labels and confidences
+    as a full sort of the softmax over every label.
+    """
+    rng = np.random.default_rng(1)
+    embeddings = l2_normalize(rng.standard_normal((3000, 64)))
+    images = l2_normalize(rng.standard_normal((4, 64)))
+    index = LabelIndex([f"label{i}" for i in range(3000)], embeddings, version="test")
+
+    indices, confidences = index.top_k(images, 5)
+
+    logits = 100.0 * images @ embeddings.T
+    probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    expected = np.argsort(-probabilities, axis=1)[:, :5]
+    assert (indices == expected).all()
+    assert np.allclose(confidences, np.take_along_axis(probabilities, expected, axis=1), atol=1e-5)
+
+
+def test_build_label_index_persists_and_memory_maps(tmp_path):
+    """
+    Tests that a label set is encoded once and later loaded, memory-mapped, from disk.
+    """
+    calls = []
+    encoder = _counting_encoder(calls)
+    labels = ["dog", "cat", "beach"]
+
+    first = build_label_index(labels, encoder, str(tmp_path), model_id="mock", prompt_template="a photo of {}.")
+    second = build_label_index(labels, encoder, str(tmp_path), model_id="mock", prompt_template="a photo of {}.")
+
+    assert calls == [["a photo of dog.", "a photo of cat.", "a photo of beach."]]
+    assert second.version == first.version
+    assert isinstance(second.embeddings, np.memmap)
+    assert np.allclose(np.linalg.norm(second.embeddings, axis=1), 1.0, atol=1e-5)
+    # A different template (or model) is a different index
+    third = build_label_index(labels, encoder, str(tmp_path), model_id="mock", prompt_template="{}")
+    assert third.version != first.version and len(calls) == 2
+
+
+def test_manager_reloads_label_set_when_file_changes(tmp_path):
+    """
+    Tests that editing the label set file swaps in a new index without a restart.
+    """
+    label_file = tmp_path / "labels.txt"
+    label_file.write_text("dog\ncat\n\ndog\n")
+    manager = LabelIndexManager(_counting_encoder([]), "mock", str(tmp_path / "index"),
+                                label_set_path=str(label_file), check_interval=0)
+
+    assert manager.get().labels == ["dog", "cat"]
+
+    label_file.write_text("dog\ncat\nlighthouse\n")
+    stat = os.stat(label_file)
+    os.utime(label_file, (stat.st_atime, stat.st_mtime + 10))
+
+    assert manager.get().labels == ["dog", "cat", "lighthouse"]
+
+
+@pytest.mark.asyncio
+async def test_service_adds_zero_shot_tags(monkeypatch, tmp_path, mock_inference):
+    """
+    Tests that, with zero-shot enabled, labels from the label set are scored and merged into the response.
+    """
+    from backend.src.services.image_analysis import ImageAnalysisService
+
+    label_file = tmp_path / "labels.txt"
+    label_file.write_text("lighthouse\nsunset\nharbor\n")
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ZERO_SHOT_ENABLED", True)
+    monkeypatch.setattr(settings, "ZERO_SHOT_TOP_K", 2)
+    # A single 'dog' tag is not enough to skip the zero-shot scorer
+    monkeypatch.setattr(settings, "MIN_CONFIDENT_MARGIN_GENERAL", 1.0)
+    monkeypatch.setattr(settings, "LABEL_SET_PATH", str(label_file))
+    monkeypatch.setattr(settings, "LABEL_INDEX_DIR", str(tmp_path / "index"))
+    get_zero_shot_backend.cache_clear()
+    get_label_index_manager.cache_clear()
+    try:
+        with open(TEST_IMAGE_PATH, "rb") as f:
+            image_data = f.read()
+        service = ImageAnalysisService()
+        response = await service.analyze_image(image_data, "dog.jpg")
+        await service.scheduler.close()
+    finally:
+        get_zero_shot_backend.cache_clear()
+        get_label_index_manager.cache_clear()
+
+    names = [tag.name for tag in response.tags]
+    assert "dog" in names
+    zero_shot = [tag for tag in response.tags if tag.name in {"lighthouse", "sunset", "harbor"}]
+    assert len(zero_shot) == 2
+    assert all(0 < tag.confidence <= 1 for tag in zero_shot)
@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from backend.src.core.logging_config import JsonFormatter, SamplingFilter, configure_logging, shutdown_logging
+
+
+def _record(name="backend.src.services.image_analysis", level=logging.INFO, msg="Analysis of '%s' completed.",
+            args=("dog.jpg",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    level, handlers = root.level, list(root.handlers)
+    yield
+    shutdown_logging()
+    root.setLevel(level)
+    root.handlers[:] = handlers
+
+
+def test_json_formatter_includes_message_and_extra_fields():
+    record = _record(image_id="abc", tags=[("dog", 0.9, "mock")])
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Analysis of 'dog.jpg' completed."
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "backend.src.services.image_analysis"
+    assert entry["image_id"] == "abc"
+    assert entry["tags"] == [["dog", 0.9, "mock"]]
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_json_formatter_writes_exceptions():
+    try:
+        raise ValueError("broken image")
+    except ValueError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert "ValueError: broken image" in entry["exception"]
+
+
+def test_sampling_filter_keeps_a_fraction_of_info_records_per_logger():
+    sampler = SamplingFilter({"backend.src.services": 0.1, "backend.src.services.image_analysis.quiet": 0})
+
+    kept = sum(sampler.filter(_record()) for _ in range(100))
+    silenced = sum(sampler.filter(_record(name="backend.src.services.image_analysis.quiet")) for _ in range(10))
+    other = sum(sampler.filter(_record(name="backend.src.api")) for _ in range(10))
+
+    assert kept == 10  # Inherited from the parent logger's rate
+    assert silenced == 0
+    assert other == 10
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampler = SamplingFilter({"backend": 0})
+
+    assert all(sampler.filter(_record(level=logging.WARNING)) for _ in range(10))
+    assert not sampler.filter(_record(level=logging.INFO))
+
+
+def test_configure_logging_writes_sampled_json_lines_from_the_listener_thread(restore_root_logger):
+    stream = io.StringIO()
+    configure_logging(level="INFO", log_format="json", sample_rates={"sampled": 0.5}, stream=stream)
+    tags = [("dog", 0.9, "mock")]
+
+    for i in range(4):
+        logging.getLogger("sampled").info("request %d", i, extra={"tags": tags})
+    logging.getLogger("sampled").debug("below the level")
+    shutdown_logging()  # Flushes the queue
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == ["request 0", "request 2"]
+    assert entries[0]["tags"] == [["dog", 0.9, "mock"]]
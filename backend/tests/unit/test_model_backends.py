@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+
+from backend.src.core.config import Settings
+from backend.src.services.model_backends import (
+    MOCK_TAGS_POOL, MockBackend, ModelBackend, available_backends, create_backend, register_backend,
+)
+
+
+def test_registry_lists_builtin_backends():
+    """
+    Tests that the mock, ONNX Runtime and PyTorch backends are selectable by name.
+    """
+    assert {"mock", "onnx", "torch"} <= set(available_backends())
+    assert isinstance(create_backend("mock", Settings()), MockBackend)
+
+
+def test_registry_rejects_unknown_backend():
+    """
+    Tests that an invalid MODEL_BACKEND value fails with the list of valid names.
+    """
+    with pytest.raises(ValueError) as exc_info:
+        create_backend("tensorflow", Settings())
+    assert "mock" in str(exc_info.value)
+
+
+def test_registered_custom_backend_is_selectable():
+    """
+    Tests that new backends plug in through the register_backend decorator.
+    """
+    @register_backend("constant-test")
+    class ConstantBackend(ModelBackend):
+        def load(self):
+            self.labels = ["constant"]
+
+        def _predict(self, batch):
+            return np.ones((batch.shape[0], 1), dtype=np.float32)
+
+    backend = create_backend("constant-test", Settings())
+    assert backend.name == "constant-test"
+    assert backend.predict_batch(np.zeros((3, 8, 8, 3), dtype=np.uint8)).shape == (3, 1)
+
+
+def test_mock_backend_loads_lazily_and_predicts_batches():
+    """
+    Tests that the mock backend loads on first prediction and returns one score row per image.
+    """
+    backend = MockBackend(Settings())
+    assert not backend.loaded
+
+    scores = backend.predict_batch(np.zeros((2, 224, 224, 3), dtype=np.uint8))
+
+    assert backend.loaded
+    assert backend.labels == MOCK_TAGS_POOL
+    assert scores.shape == (2, len(MOCK_TAGS_POOL))
+    assert ((scores > 0).sum(axis=1) == 5).all()
+    assert scores.max() <= 1.0
+
+
+def test_warmup_reports_cold_start_costs():
+    """
+    Tests that warmup loads the model and returns the cold-start timing report.
+    """
+    backend = MockBackend(Settings())
+    report = backend.warmup()
+
+    assert backend.loaded
+    assert set(report) == {"load_seconds", "first_inference_seconds", "warm_inference_seconds", "memory_footprint_bytes"}
+    assert all(value >= 0 for value in report.values())
+
+
+def _export_tiny_classifier(tmp_path):
+    """
+    Writes a tiny ONNX classifier (pooling + linear layer) scoring red/green/blue/nothing.
+    """
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0]], dtype=np.float32) * 10
+    graph = helper.make_graph(
+        [
+            helper.make_node("GlobalAveragePool", ["pixel_values"], ["pooled"]),
+            helper.make_node("Flatten", ["pooled"], ["features"]),
+            helper.make_node("MatMul", ["features", "weights"], ["logits"]),
+        ],
+        "tiny_classifier",
+        [helper.make_tensor_value_info("pixel_values", TensorProto.FLOAT, ["N", 3, 224, 224])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["N", 4])],
+        initializer=[numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    model_path = tmp_path / "classifier.onnx"
+    onnx.save(model, str(model_path))
+    labels_path = tmp_path / "labels.txt"
+    labels_path.write_text("red\ngreen\nblue\nnothing\n")
+    return model_path, labels_path
+
+
+def _red_and_blue_images():
+    batch = np.zeros((2, 224, 224, 3), dtype=np.uint8)
+    batch[0, ..., 0] = 255  # red image
+    batch[1, ..., 2] = 255  # blue image
+    return batch
+
+
+def test_onnx_backend_runs_exported_classifier(tmp_path):
+    """
+    Tests the ONNX Runtime backend with a tiny exported classifier (pooling + linear layer).
+    """
+    model_path, labels_path = _export_tiny_classifier(tmp_path)
+
+    backend = create_backend("onnx", Settings(ONNX_MODEL_PATH=str(model_path), ONNX_LABELS_PATH=str(labels_path)))
+    scores = backend.predict_batch(_red_and_blue_images())
+
+    assert backend.labels == ["red", "green", "blue", "nothing"]
+    assert scores.shape == (2, 4)
+    assert np.allclose(scores.sum(axis=1), 1.0, atol=1e-5)
+    assert [backend.labels[i] for i in scores.argmax(axis=1)] == ["red", "blue"]
+    assert backend.memory_footprint_bytes() > 0
+
+
+def test_onnx_backend_int8_mode_quantizes_once_and_keeps_predictions(tmp_path):
+    """
+    Tests that MODEL_PRECISION={"onnx": "int8"} loads a cached int8 copy of the model, with
+    the same predictions and a different cache version than fp32.
+    """
+    pytest.importorskip("onnxruntime.quantization")
+    model_path, labels_path = _export_tiny_classifier(tmp_path)
+    common = dict(ONNX_MODEL_PATH=str(model_path), ONNX_LABELS_PATH=str(labels_path),
+                  QUANTIZED_MODEL_DIR=str(tmp_path / "quantized"))
+    fp32 = create_backend("onnx", Settings(**common))
+    int8 = create_backend("onnx", Settings(MODEL_PRECISION={"onnx": "int8"}, **common))
+
+    scores = int8.predict_batch(_red_and_blue_images())
+
+    assert int8.precision == "int8" and fp32.precision == "fp32"
+    assert [int8.labels[i] for i in scores.argmax(axis=1)] == ["red", "blue"]
+    assert np.allclose(scores, fp32.predict_batch(_red_and_blue_images()), atol=0.05)
+    assert len(list((tmp_path / "quantized").glob("*.int8.onnx"))) == 1
+    assert int8.version_info() != fp32.version_info()
+
+
+def test_small_model_size_requires_a_configured_small_model():
+    backend = create_backend("onnx", Settings(MODEL_SIZE={"onnx": "small"}, ONNX_MODEL_PATH="base.onnx"))
+    with pytest.raises(ValueError):
+        backend.version_info()
+    assert create_backend("onnx", Settings(MODEL_SIZE={"onnx": "small"}, ONNX_SMALL_MODEL_PATH="small.onnx")).model_path == "small.onnx"
+
+
+def test_mock_backend_embeddings_are_deterministic_and_normalized():
+    """
+    Tests that the mock backend embeds text and images reproducibly, as unit vectors.
+    """
+    backend = MockBackend(Settings())
+    text = backend.encode_text(["a photo of a dog.", "a photo of a cat."])
+    images = backend.embed_images(np.random.default_rng(0).integers(0, 255, (2, 224, 224, 3), dtype=np.uint8))
+
+    assert text.shape == (2, backend.embedding_dim) and images.shape == (2, backend.embedding_dim)
+    assert np.allclose(np.linalg.norm(text, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(np.linalg.norm(images, axis=1), 1.0, atol=1e-5)
+    assert np.array_equal(text, MockBackend(Settings()).encode_text(["a photo of a dog.", "a photo of a cat."]))
+
+
+def test_backend_without_embeddings_rejects_zero_shot():
+    """
+    Tests that backends that do not implement embeddings fail clearly when used for zero-shot.
+    """
+    class ClassifierOnlyBackend(ModelBackend):
+        def load(self):
+            self.labels = ["constant"]
+
+        def _predict(self, batch):
+            return np.ones((batch.shape[0], 1), dtype=np.float32)
+
+    with pytest.raises(NotImplementedError):
+        ClassifierOnlyBackend(Settings()).encode_text(["dog"])
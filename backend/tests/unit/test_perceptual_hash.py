@@ -0,0 +1,92 @@
+import io
+import os
+import random
+
+import pytest
+from PIL import Image
+
+from backend.src.services.image_analysis import ImageAnalysisService
+from backend.src.services.perceptual_hash import NearDuplicateIndex, dhash, hamming_distance
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _reencoded_copy(image_data: bytes) -> bytes:
+    """Returns a resized, recompressed copy of the image."""
+    image = Image.open(io.BytesIO(image_data)).convert("RGB")
+    image = image.resize((image.width // 2, image.height // 2))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=60)
+    return buffer.getvalue()
+
+
+def test_dhash_is_stable_under_reencoding():
+    """
+    Tests that a resized, recompressed copy hashes within a few bits of the original.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    original = dhash(Image.open(io.BytesIO(image_data)))
+    copy = dhash(Image.open(io.BytesIO(_reencoded_copy(image_data))))
+    flipped = dhash(Image.open(io.BytesIO(image_data)).transpose(Image.FLIP_LEFT_RIGHT))
+
+    assert 0 <= original < 2 ** 64
+    assert hamming_distance(original, copy) <= 4
+    assert hamming_distance(original, flipped) > 10
+
+
+def test_index_search_matches_brute_force():
+    """
+    Tests that multi-index hashing returns exactly what a linear scan returns.
+    """
+    rng = random.Random(42)
+    stored = [rng.getrandbits(64) for _ in range(2000)]
+    index = NearDuplicateIndex(max_entries=10000)
+    for i, value in enumerate(stored):
+        index.add(value, i)
+
+    for radius in (0, 3, 4, 9):
+        for _ in range(50):
+            target = rng.choice(stored)
+            query = target
+            for bit in rng.sample(range(64), rng.randint(0, radius)):
+                query ^= 1 << bit
+            expected = min(hamming_distance(query, value) for value in stored)
+            found = index.search(query, radius)
+            assert found is not None
+            assert found[0] == expected
+
+    assert index.search(stored[0] ^ ((1 << 64) - 1), 4) is None
+
+
+def test_index_drops_oldest_entries_when_full():
+    """
+    Tests that the index stays bounded by max_entries.
+    """
+    index = NearDuplicateIndex(max_entries=2)
+    index.add(1, "a")
+    index.add(2 ** 40, "b")
+    index.add(2 ** 63, "c")
+
+    assert len(index) == 2
+    assert index.search(1, 0) is None
+    assert index.search(2 ** 63, 0) == (0, "c")
+
+
+@pytest.mark.asyncio
+async def test_service_reuses_tags_of_near_duplicate(mock_inference):
+    """
+    Tests that a re-encoded copy of an analyzed image skips inference and reuses its tags,
+    while keeping its own content-derived image_id.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    service = ImageAnalysisService()
+    original = await service.analyze_image(image_data, "original.jpg")
+    copy = await service.analyze_image(_reencoded_copy(image_data), "thumbnail.jpg")
+
+    assert mock_inference.call_count == 1
+    assert copy.image_id != original.image_id
+    assert copy.filename == "thumbnail.jpg"
+    assert [tag.name for tag in copy.tags] == ["dog"]
@@ -0,0 +1,69 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.src.services.image_analysis import decode_image
+from backend.src.services.model_backends import normalize_batch
+from backend.src.services.preprocessing import (
+    CLIP_MEAN, CLIP_STD, InputSpec, TensorPool, normalize_into, preprocessed_batch, resize_image, stack_views,
+)
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color=(10, 120, 240)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_normalize_into_matches_the_reference_formula():
+    batch = np.random.default_rng(0).integers(0, 256, size=(3, 8, 6, 3), dtype=np.uint8)
+    out = np.full((3, 3, 8, 6), np.nan, dtype=np.float32)
+
+    result = normalize_into(batch, out, CLIP_MEAN, CLIP_STD)
+
+    expected = ((batch / 255.0 - np.array(CLIP_MEAN)) / np.array(CLIP_STD)).transpose(0, 3, 1, 2)
+    assert result is out
+    np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(normalize_batch(batch, CLIP_MEAN, CLIP_STD), expected, rtol=1e-5, atol=1e-5)
+
+
+def test_preprocessed_batch_reuses_pooled_tensors_and_checks_the_size():
+    pool = TensorPool(max_free=1)
+    first = pool.acquire((2, 3, 4, 4))
+    pool.release(first)
+    assert pool.acquire((2, 3, 4, 4)) is first
+    assert pool.acquire((2, 3, 4, 4)) is not first  # Each borrower gets its own tensor
+
+    batch = np.zeros((2, 4, 4, 3), dtype=np.uint8)
+    with preprocessed_batch(batch, InputSpec(4)) as tensor:
+        held = tensor
+    with preprocessed_batch(batch, InputSpec(4)) as tensor:
+        assert tensor is held and tensor.shape == (2, 3, 4, 4)
+    with pytest.raises(ValueError):
+        with preprocessed_batch(batch, InputSpec(8)):
+            pass
+
+
+def test_resize_image_center_crops_in_a_single_pass():
+    img = Image.new("RGB", (300, 100))
+    img.paste((255, 0, 0), (0, 0, 100, 100))  # The left third is cropped away
+    cropped = np.asarray(resize_image(img, (50, True)))
+    squashed = np.asarray(resize_image(img, (50, False)))
+
+    assert cropped.shape == squashed.shape == (50, 50, 3)
+    assert cropped[:, 1:, 0].max() == 0  # Only the filter support at the edge reaches outside the box
+    assert squashed[:, :5, 0].min() == 255
+
+
+def test_decode_image_shares_views_between_equal_geometries():
+    decoded = decode_image(_jpeg(640, 480), [(224, False), (224, True), (224, False)])
+
+    assert decoded.views[0] is decoded.views[2] is decoded.pixels
+    assert decoded.views[1] is not decoded.views[0]
+    assert decoded.views[1].shape == (224, 224, 3)
+
+    batch, crops, same = stack_views([decoded.views, decoded.views])
+    assert batch is same and batch.shape == (2, 224, 224, 3)
+    assert crops is not batch
@@ -0,0 +1,21 @@
+import importlib
+import sys
+
+from backend.src.utils import resource_usage
+
+
+def test_resource_usage_works_without_the_resource_module(monkeypatch):
+    """
+    Tests that the module imports, and reports 0 for the peak RSS, where neither resource
+    nor psutil can be imported (e.g. Windows without psutil).
+    """
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    try:
+        module = importlib.reload(resource_usage)
+        assert module.resource is None
+        assert module.peak_rss_bytes() == 0
+    finally:
+        monkeypatch.undo()
+        importlib.reload(resource_usage)
+    assert resource_usage.peak_rss_bytes() > 0
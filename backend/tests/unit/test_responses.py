@@ -0,0 +1,23 @@
+import json
+
+from backend.src.core.responses import COMPACT_MEDIA_TYPE, ModelResponse
+from backend.src.models.image import ImageAnalysisResponse, Tag
+
+RESPONSE = ImageAnalysisResponse(image_id="abc", filename="a.jpg", tags=[Tag(name="dog", confidence=0.9)])
+
+
+def test_negotiated_responses_vary_on_accept():
+    """
+    Tests that every negotiated response, JSON included, is marked Vary: Accept, keeping the
+    Vary values already set.
+    """
+    default = ModelResponse.negotiated(RESPONSE, None)
+    compact = ModelResponse.negotiated(RESPONSE, COMPACT_MEDIA_TYPE, headers={"Vary": "Accept-Encoding"})
+    starred = ModelResponse.negotiated(RESPONSE, "*/*", headers={"Vary": "*"})
+
+    assert default.headers["vary"] == "Accept"
+    assert json.loads(default.body)["tags"][0]["name"] == "dog"
+    assert compact.headers["vary"] == "Accept-Encoding, Accept"
+    assert compact.headers["content-type"] == COMPACT_MEDIA_TYPE
+    assert starred.headers["vary"] == "*"
+    assert "vary" not in ModelResponse(RESPONSE).headers
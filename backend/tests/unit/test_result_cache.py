@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import time
+
+import pytest
+from unittest.mock import patch
+
+from backend.src.models.image import ImageAnalysisResponse, Tag
+from backend.src.services.image_analysis import ImageAnalysisService
+from backend.src.services.result_cache import ResultCache, content_hash, make_config_version
+
+TEST_IMAGE_PATH = os.path.join("backend", "tests", "assets", "dog.jpg")
+
+
+def _response(image_id: str) -> ImageAnalysisResponse:
+    return ImageAnalysisResponse(image_id=image_id, filename="a.jpg", tags=[Tag(name="dog", confidence=0.9)])
+
+
+def test_content_hash_and_config_version_are_deterministic():
+    """
+    Tests that identical bytes/configurations always map to the same key parts.
+    """
+    assert content_hash(b"abc") == content_hash(b"abc")
+    assert content_hash(b"abc") != content_hash(b"abd")
+    assert make_config_version({"a": 1, "b": 2}) == make_config_version({"b": 2, "a": 1})
+    assert make_config_version({"a": 1}) != make_config_version({"a": 2})
+
+
+def test_memory_tier_lru_eviction():
+    """
+    Tests that the least recently used entry is evicted once max_entries is exceeded.
+    """
+    cache = ResultCache(max_entries=2, ttl_seconds=0)
+    evictions_before = cache.evictions.value
+    cache.put("a", _response("a"))
+    cache.put("b", _response("b"))
+    assert cache.get("a") is not None  # "a" becomes the most recently used
+    cache.put("c", _response("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.evictions.value == evictions_before + 1
+
+
+def test_memory_tier_ttl_expiration():
+    """
+    Tests that entries older than the TTL are not served.
+    """
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    cache.put("a", _response("a"))
+    with patch("backend.src.services.result_cache.time.time", return_value=time.time() + 61):
+        assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """
+    Tests that results persisted on disk are served by a new cache instance.
+    """
+    db_path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=10, ttl_seconds=0, disk_path=db_path)
+    cache.put("a", _response("a"))
+    cache.close()
+
+    restarted = ResultCache(max_entries=10, ttl_seconds=0, disk_path=db_path)
+    disk_hits_before = restarted.disk_hits.value
+    cached = restarted.get("a")
+    restarted.close()
+
+    assert cached is not None and cached.tags[0].name == "dog"
+    assert restarted.disk_hits.value == disk_hits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_writes_behind_and_serves_queued_rows(tmp_path):
+    """
+    Tests that put() only queues disk rows (served by lookups meanwhile), written together by
+    one transaction, and that aget() reads the disk tier.
+    """
+    db_path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=1, ttl_seconds=0, disk_path=db_path, flush_interval=60)
+    writes_before = cache.disk_writes.count
+    cache.put("a", _response("a"))
+    cache.put("b", _response("b"))  # Evicts "a" from memory
+
+    assert (await cache.aget("a")).image_id == "a"  # From the write queue
+    cache.flush()
+    assert cache.disk_writes.count == writes_before + 1
+    cache.put("c", _response("c"))  # Evicts "a" again
+    assert (await cache.aget("a")).image_id == "a"  # From the database
+    assert await cache.aget("missing") is None
+    cache.close()
+
+    restarted = ResultCache(max_entries=10, ttl_seconds=0, disk_path=db_path)
+    assert [restarted.get(key) is not None for key in "abc"] == [True, True, True]
+    restarted.close()
+
+
+def test_disk_tier_keeps_queued_rows_when_a_write_fails(tmp_path):
+    """
+    Tests that rows whose transaction failed stay queued (and served), and are written by the next flush.
+    """
+    db_path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=1, ttl_seconds=0, disk_path=db_path, flush_interval=60)
+    cache.put("a", _response("a"))
+    cache.put("b", _response("b"))  # Evicts "a" from memory
+    other = sqlite3.connect(db_path)
+    other.execute("CREATE TRIGGER fail BEFORE INSERT ON analysis_results BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    other.commit()
+
+    with pytest.raises(sqlite3.Error):
+        cache.flush()
+    assert cache.get("a").image_id == "a"
+
+    other.execute("DROP TRIGGER fail")
+    other.commit()
+    other.close()
+    cache.flush()
+    cache.close()
+
+    restarted = ResultCache(max_entries=10, ttl_seconds=0, disk_path=db_path)
+    assert [restarted.get(key) is not None for key in "ab"] == [True, True]
+    restarted.close()
+
+
+def test_disk_tier_prunes_expired_and_oldest_rows(tmp_path):
+    """
+    Tests that pruning deletes the rows past the TTL, then the oldest rows above max_disk_entries.
+    """
+    db_path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=10, ttl_seconds=60, disk_path=db_path, max_disk_entries=2, flush_interval=60)
+    now = time.time()
+    for offset, key in ((-120, "expired"), (1, "a"), (2, "b"), (3, "c")):
+        with patch("backend.src.services.result_cache.time.time", return_value=now + offset):
+            cache.put(key, _response(key))
+    cache.flush()
+    evictions_before = cache.disk_evictions.value
+    cache.prune()
+    cache.close()
+
+    restarted = ResultCache(max_entries=10, ttl_seconds=0, disk_path=db_path)
+    assert [restarted.get(key) is not None for key in ("expired", "a", "b", "c")] == [False, False, True, True]
+    assert restarted.disk_evictions.value == evictions_before + 1
+    restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_service_reuses_cached_result_for_identical_uploads(mock_inference):
+    """
+    Tests that re-uploading the same bytes skips inference and keeps the same image_id.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    service = ImageAnalysisService()
+    first = await service.analyze_image(image_data, "first.jpg")
+    second = await service.analyze_image(image_data, "retry.jpg")
+
+    assert mock_inference.call_count == 1
+    assert first.image_id == second.image_id == content_hash(image_data)
+    assert second.filename == "retry.jpg"
+    assert [tag.name for tag in second.tags] == ["dog"]
@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch
 import os
 import io
+from PIL import Image
 
 from backend.src.services.image_analysis import ImageAnalysisService
 from backend.src.models.image import Tag, ImageAnalysisResponse
@@ -51,4 +53,149 @@ async def test_image_analysis_service_mock_behavior():
         assert "Análise simulada" in response.message
         # Adicione asserções para garantir que NÃO são tags de erro
         assert "invalid_image_format" not in [tag.name for tag in response.tags]
-        assert "Formato de imagem inválido" not in response.message
\ No newline at end of file
+        assert "Formato de imagem inválido" not in response.message
+
+@pytest.mark.asyncio
+async def test_analyze_images_batch_isolates_corrupt_files(mock_inference):
+    """
+    Tests that a corrupt image in a batch only fails its own item,
+    and that valid images are tagged in a single stacked inference call.
+    """
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+    png_buffer = io.BytesIO()
+    Image.open(io.BytesIO(image_data)).save(png_buffer, format="PNG")
+
+    service = ImageAnalysisService()
+    items = await service.analyze_images([
+        (image_data, "first.jpg"),
+        (b"not an image", "broken.jpg"),
+        (png_buffer.getvalue(), "second.png"),
+        (image_data, "first_again.jpg"),
+    ])
+
+    assert [item.filename for item in items] == ["first.jpg", "broken.jpg", "second.png", "first_again.jpg"]
+    assert items[0].result is not None and items[0].error is None
+    assert items[1].result is None and "invalid" in items[1].error.lower()
+    assert items[2].result is not None and items[2].result.tags[0].name == "dog"
+    # Identical bytes are analyzed once and share the same content-derived image_id
+    assert items[3].result.image_id == items[0].result.image_id
+    assert items[3].result.filename == "first_again.jpg"
+
+    mock_inference.assert_called_once()
+    batch = mock_inference.call_args.args[0]
+    assert batch.shape == (2, service.settings.MODEL_INPUT_SIZE, service.settings.MODEL_INPUT_SIZE, 3)
+
+
+def test_decode_image_downscales_large_images_while_decoding():
+    """
+    Tests that a large JPEG is decoded to the model input size, keeping its original dimensions
+    in the decode report.
+    """
+    from backend.src.services.image_analysis import decode_image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (4000, 3000), color=(200, 30, 30)).save(buffer, format="JPEG")
+
+    with patch.object(Image.Image, "resize", autospec=True, side_effect=Image.Image.resize) as resize:
+        decoded = decode_image(buffer.getvalue(), 224)
+
+    assert decoded.pixels.shape == (224, 224, 3)
+    assert decoded.original_size == (4000, 3000)
+    assert decoded.decode_seconds > 0
+    assert decoded.rss_bytes > 0
+    # draft()/reduce() already brought the image close to 224px before the final resize
+    model_resize = [call for call in resize.call_args_list if call.args[1] == (224, 224)][0]
+    assert max(model_resize.args[0].size) < 1000
+
+
+@pytest.mark.asyncio
+async def test_service_aclose_drains_in_flight_analyses():
+    """
+    Tests that shutting the service down waits for the analyses already in flight
+    instead of failing them, and only then stops the worker pool.
+    """
+    import time
+    import numpy as np
+    from backend.src.services.model_backends import MOCK_TAGS_POOL, MockBackend
+
+    def slow_predict(batch):
+        time.sleep(0.2)
+        return np.full((batch.shape[0], len(MOCK_TAGS_POOL)), 0.5, dtype=np.float32)
+
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        image_data = f.read()
+
+    with patch.object(MockBackend, "_predict", side_effect=slow_predict):
+        service = ImageAnalysisService()
+        task = asyncio.create_task(service.analyze_image(image_data, "slow.jpg"))
+        await asyncio.sleep(0.05)
+        assert service._in_flight == 1
+
+        await service.aclose(timeout=5)
+
+    assert task.done()
+    assert task.result().filename == "slow.jpg"
+    assert service._in_flight == 0
+    assert service.executor._pool is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("embedding_store", [False, True])
+async def test_cascade_runs_zero_shot_only_on_unsure_images(monkeypatch, tmp_path, embedding_store):
+    """
+    Tests that, with the cascade enabled, only the images for which the classifier has fewer
+    than MIN_CONFIDENT_TAGS_GENERAL high-confidence tags get zero-shot tags. Without the
+    embedding store the zero-shot scorer only sees those images; with it, both models run on
+    every image (all embeddings are stored) and the cascade only filters the tags.
+    """
+    import numpy as np
+    from backend.src.core.config import get_settings
+    from backend.src.core.dependencies import get_zero_shot_backend
+    from backend.src.services import image_analysis
+    from backend.src.services.model_backends import MOCK_TAGS_POOL, MockBackend, l2_normalize
+
+    def predict(batch):
+        # Reddish images get two confident tags, the others a single weak one
+        scores = np.zeros((batch.shape[0], len(MOCK_TAGS_POOL)), dtype=np.float32)
+        red = batch[..., 0].mean(axis=(1, 2)) > batch[..., 2].mean(axis=(1, 2))
+        scores[:, MOCK_TAGS_POOL.index("dog")] = np.where(red, 0.9, 0.3)
+        scores[:, MOCK_TAGS_POOL.index("cat")] = np.where(red, 0.8, 0.0)
+        return scores
+
+    zero_shot_batches = []
+
+    def zero_shot(batch, top_k, return_embeddings=False):
+        zero_shot_batches.append(len(batch))
+        ranked = [[("lighthouse", 0.5)] for _ in batch]
+        if return_embeddings:
+            return ranked, l2_normalize(np.random.default_rng(0).standard_normal((len(batch), 8)).astype(np.float32))
+        return ranked
+
+    def png(color):
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ZERO_SHOT_ENABLED", True)
+    monkeypatch.setattr(settings, "CASCADE_ENABLED", True)
+    monkeypatch.setattr(settings, "EMBEDDING_STORE_ENABLED", embedding_store)
+    monkeypatch.setattr(settings, "EMBEDDING_STORE_DIR", str(tmp_path / "embeddings"))
+    get_zero_shot_backend.cache_clear()
+    try:
+        with patch.object(MockBackend, "_predict", side_effect=predict), \
+             patch.object(image_analysis, "run_zero_shot_inference", side_effect=zero_shot):
+            service = ImageAnalysisService()
+            early_exits = service.cascade_early_exits.value
+            items = await service.analyze_images([(png((200, 30, 30)), "red.png"), (png((30, 30, 200)), "blue.png")])
+            stored = len(service.embedding_store) if embedding_store else 0
+            await service.aclose()
+    finally:
+        get_zero_shot_backend.cache_clear()
+
+    assert zero_shot_batches == ([2] if embedding_store else [1])
+    assert stored == (2 if embedding_store else 0)
+    assert service.cascade_early_exits.value - early_exits == 1
+    assert [tag.name for tag in items[0].result.tags] == ["dog", "cat"]
+    assert "lighthouse" in [tag.name for tag in items[1].result.tags]
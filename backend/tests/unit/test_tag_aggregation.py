@@ -0,0 +1,95 @@
+import numpy as np
+
+from backend.src.services.tag_aggregation import TagAggregator, TagSource
+
+
+def test_merges_sources_with_synonyms_and_aliases():
+    """
+    Tests that one tag is kept per canonical name (case, aliases and synonyms),
+    with the highest confidence and the model that produced it.
+    """
+    aggregator = TagAggregator(synonyms={"puppy": "dog"}, high_confidence=0.95, top_k=5)
+    vit = TagSource("ViT", ["Dog", "tabby, tabby cat", "beach"], np.array([[0.4, 0.3, 0.0]], dtype=np.float32))
+    clip = TagSource.from_ranked("CLIP", [[("puppy", 0.7), ("Tabby", 0.1), ("sunset", 0.2)]])
+
+    (tags,) = aggregator.aggregate([vit, clip])
+
+    assert tags == [("Dog", 0.7, "CLIP"), ("tabby", 0.3, "ViT"), ("sunset", 0.2, "CLIP")]
+
+
+def test_applies_confidence_thresholds():
+    """
+    Tests that tags below MIN_OVERALL_CONFIDENCE_FOR_TAG are dropped, and that a confident general
+    classifier only lets through other models' tags that are confident too.
+    """
+    aggregator = TagAggregator(min_confidence=0.05, high_confidence=0.6, min_confident_tags=2, top_k=5)
+    vit = TagSource("ViT", ["dog", "cat", "car"], np.array([
+        [0.9, 0.7, 0.01],  # Confident general classifier
+        [0.5, 0.2, 0.01],  # Not confident
+    ], dtype=np.float32))
+    clip = TagSource("CLIP", ["sunset", "harbor"], np.array([
+        [0.3, 0.65],
+        [0.3, 0.65],
+    ], dtype=np.float32))
+
+    confident, unsure = aggregator.aggregate([vit, clip])
+
+    assert [name for name, _, _ in confident] == ["dog", "cat", "harbor"]
+    assert [name for name, _, _ in unsure] == ["harbor", "dog", "sunset", "cat"]
+
+
+def test_softmax_classifier_is_confident_on_a_dominant_tag():
+    """
+    Tests that a softmax row (scores summing to 1, so never two tags at 0.6) is trusted when its
+    top tag reaches HIGH_CONFIDENCE_THRESHOLD_GENERAL well ahead of the second.
+    """
+    aggregator = TagAggregator(high_confidence=0.6, min_confident_tags=2, min_confident_margin=0.3)
+    scores = np.array([
+        [0.92, 0.05, 0.03],  # Dominant top tag
+        [0.62, 0.36, 0.02],  # Above the threshold, but close to the second
+        [0.40, 0.35, 0.25],  # Diffuse
+    ], dtype=np.float32)
+
+    assert aggregator.is_confident(scores).tolist() == [True, False, False]
+    assert aggregator.is_confident(np.array([[0.7], [0.5]], dtype=np.float32)).tolist() == [True, False]
+
+
+def test_top_k_matches_full_sort_over_batch():
+    """
+    Tests that the argpartition-based selection equals a full sort, for every image of a batch.
+    """
+    rng = np.random.default_rng(3)
+    labels = [f"label{i}" for i in range(1000)]
+    scores = rng.random((32, 1000)).astype(np.float32)
+    aggregator = TagAggregator(top_k=7)
+
+    results = aggregator.aggregate([TagSource("ViT", labels, scores)])
+
+    for row, tags in zip(scores, results):
+        expected = np.argsort(-row)[:7]
+        assert [name for name, _, _ in tags] == [labels[i] for i in expected]
+        assert [confidence for _, confidence, _ in tags] == [round(float(row[i]), 4) for i in expected]
+
+
+def test_no_tags_above_threshold_returns_empty_rows():
+    aggregator = TagAggregator(min_confidence=0.5)
+    results = aggregator.aggregate([TagSource("ViT", ["dog"], np.array([[0.1], [0.0]], dtype=np.float32))])
+    assert results == [[], []]
+
+
+def test_per_batch_labels_do_not_grow_the_cached_vocabularies():
+    """
+    Tests that zero-shot top-k labels (different in every batch) are mapped per call instead of
+    being cached, so memory stays bounded, and that top_k=0 selects nothing.
+    """
+    aggregator = TagAggregator(top_k=2)
+    vit = TagSource("ViT", ["dog", "cat"], np.array([[0.5, 0.1]], dtype=np.float32))
+
+    for i in range(200):
+        clip = TagSource.from_ranked("CLIP", [[(f"label {i}", 0.9), ("Dog", 0.2)]])
+        (tags,) = aggregator.aggregate([vit, clip])
+        assert tags == [(f"label {i}", 0.9, "CLIP"), ("dog", 0.5, "ViT")]
+
+    assert len(aggregator._vocabularies) == 1
+    assert aggregator._vocabularies[("dog", "cat")].names == ["dog", "cat"]
+    assert TagAggregator(top_k=0).aggregate([vit]) == [[]]
@@ -0,0 +1,118 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from unittest.mock import patch
+
+from backend.src.core.config import get_settings
+from backend.src.services.image_analysis import ImageAnalysisService, decode_image
+from backend.src.services.model_backends import MOCK_TAGS_POOL, MockBackend
+from backend.src.services.tiling import TilingConfig, pool_tile_scores, select_salient_tiles, tile_grid
+
+CONFIG = TilingConfig(min_pixels=1_000_000, max_side=1024, tile_size=256, overlap=0.25, max_tiles=4, min_saliency=0.5)
+
+
+def _large_image_with_object(width=2000, height=1500, box=(1500, 1100, 1700, 1300)):
+    """A flat image with a single small, textured object."""
+    img = Image.new("RGB", (width, height), color=(90, 140, 200))
+    noise = np.random.default_rng(0).integers(0, 256, size=(box[3] - box[1], box[2] - box[0], 3), dtype=np.uint8)
+    img.paste(Image.fromarray(noise), box[:2])
+    return img
+
+
+def test_tile_grid_covers_the_image_with_overlapping_tiles():
+    boxes = tile_grid(1000, 600, 256, 0.25)
+
+    covered = np.zeros((600, 1000), dtype=int)
+    for left, top, right, bottom in boxes:
+        assert (right - left, bottom - top) == (256, 256)
+        covered[top:bottom, left:right] += 1
+    assert covered.min() >= 1
+    assert boxes[1][0] - boxes[0][0] == 192  # Neighbours share a quarter of a tile
+    assert tile_grid(200, 100, 256, 0.25) == [(0, 0, 200, 100)]
+
+
+def test_select_salient_tiles_picks_the_textured_region():
+    img = _large_image_with_object().resize((1000, 750))  # The object is at (750..850, 550..650)
+
+    boxes = select_salient_tiles(img, CONFIG)
+
+    assert 1 <= len(boxes) <= CONFIG.max_tiles
+    left, top, right, bottom = boxes[0]
+    assert left <= 750 and top <= 550 and right >= 850 and bottom >= 650
+    assert select_salient_tiles(Image.new("RGB", (1000, 750)), CONFIG) == []  # Nothing stands out
+    assert select_salient_tiles(img.resize((200, 150)), CONFIG) == []  # A single tile is the global view
+
+
+def test_select_salient_tiles_handles_sides_that_do_not_reduce_evenly():
+    """
+    Tests a tall image whose reduced width is rounded up (449 / 4): the last tiles must stay
+    inside the saliency table (regression: IndexError on portrait photos).
+    """
+    img = _large_image_with_object(width=1123, height=4480, box=(100, 4000, 400, 4300))
+    img = img.resize((449, 1792))
+
+    boxes = select_salient_tiles(img, CONFIG)
+
+    assert boxes and boxes[0][3] >= 1600  # The object is at the bottom
+
+
+def test_pool_tile_scores_keeps_the_best_view_of_every_label():
+    scores = np.array([
+        [0.9, 0.1, 0.0],  # Image 0 (global)
+        [0.5, 0.5, 0.0],  # Image 1 (global, no tiles)
+        [0.2, 0.1, 0.7],  # Image 0, tile 1
+        [0.3, 0.6, 0.1],  # Image 0, tile 2
+    ], dtype=np.float32)
+
+    pooled = pool_tile_scores(scores, [2, 0], "max")
+    attention = pool_tile_scores(scores, [2, 0], "attention")
+
+    np.testing.assert_allclose(pooled, [[0.9, 0.6, 0.7], [0.5, 0.5, 0.0]])
+    np.testing.assert_allclose(attention[1], scores[1])
+    np.testing.assert_allclose(attention[0].sum(), 1.0, rtol=1e-5)
+    assert attention[0, 0] > 0.5  # The most confident view dominates
+
+
+def test_decode_image_only_tiles_large_images():
+    buffer = io.BytesIO()
+    _large_image_with_object().save(buffer, format="PNG")
+
+    decoded = decode_image(buffer.getvalue(), 224, CONFIG)
+    small = io.BytesIO()
+    Image.new("RGB", (800, 600)).save(small, format="PNG")
+
+    assert decoded.original_size == (2000, 1500)
+    assert decoded.pixels.shape == (224, 224, 3)
+    assert 1 <= len(decoded.tiles) <= CONFIG.max_tiles and decoded.tiles[0].shape == (224, 224, 3)
+    assert decode_image(buffer.getvalue(), 224).tiles == ()
+    assert decode_image(small.getvalue(), 224, CONFIG).tiles == ()
+
+
+@pytest.mark.asyncio
+async def test_service_classifies_tiles_with_the_image_and_pools_their_tags(monkeypatch):
+    """
+    Tests that a tiled image is classified in one call (the whole image, then its tiles), and
+    that a label only seen in a tile reaches the final tags.
+    """
+    settings = get_settings()
+    monkeypatch.setattr(settings, "TILING_ENABLED", True)
+    monkeypatch.setattr(settings, "TILING_MIN_MEGAPIXELS", 1.0)
+    monkeypatch.setattr(settings, "TILE_SIZE", 256)
+    buffer = io.BytesIO()
+    _large_image_with_object().save(buffer, format="PNG")
+
+    def predict(batch):
+        scores = np.zeros((batch.shape[0], len(MOCK_TAGS_POOL)), dtype=np.float32)
+        scores[0, 0] = 0.9  # The whole image only shows the first label
+        scores[1:, 1] = 0.8  # The tiles show the second one
+        return scores
+
+    with patch.object(MockBackend, "_predict", side_effect=predict) as mock_predict:
+        service = ImageAnalysisService()
+        response = await service.analyze_image(buffer.getvalue(), "large.png")
+
+    mock_predict.assert_called_once()
+    assert mock_predict.call_args.args[0].shape[0] > 1
+    assert {MOCK_TAGS_POOL[0], MOCK_TAGS_POOL[1]} <= {tag.name for tag in response.tags}